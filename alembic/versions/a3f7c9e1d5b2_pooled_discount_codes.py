@@ -0,0 +1,45 @@
+"""pooled discount codes
+
+Revision ID: a3f7c9e1d5b2
+Revises: e6a4c8d2b9f1
+Create Date: 2026-10-19 21:04:12.730158
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "a3f7c9e1d5b2"
+down_revision: Union[str, None] = "e6a4c8d2b9f1"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "pooled_discount_codes",
+        sa.Column("id", sa.UUID(), server_default=sa.text("uuid_generate_v4()"), nullable=False),
+        sa.Column(
+            "type",
+            sa.Enum("TMG_GROUP_50_USD_OFF", "TMG_GROUP_25_PERCENT_OFF", name="pooleddiscountcodetype"),
+            nullable=False,
+        ),
+        sa.Column("shopify_discount_code", sa.String(), nullable=False),
+        sa.Column("shopify_discount_code_id", sa.BigInteger(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("shopify_discount_code"),
+    )
+    op.create_index(
+        "ix_pooled_discount_codes_type_created_at", "pooled_discount_codes", ["type", "created_at"], unique=False
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_pooled_discount_codes_type_created_at", table_name="pooled_discount_codes")
+    op.drop_table("pooled_discount_codes")
+    op.execute("DROP TYPE IF EXISTS pooleddiscountcodetype")
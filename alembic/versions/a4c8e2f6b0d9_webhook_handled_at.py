@@ -0,0 +1,29 @@
+"""webhook handled at
+
+Revision ID: a4c8e2f6b0d9
+Revises: f3b7d9a1c5e2
+Create Date: 2026-10-22 11:06:53.170482
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "a4c8e2f6b0d9"
+down_revision: Union[str, None] = "f3b7d9a1c5e2"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("webhooks", sa.Column("handled_at", sa.DateTime(), nullable=True))
+    # webhooks stored so far were handled right after, only deliveries with an id are ever looked up by it
+    op.execute("UPDATE webhooks SET handled_at = created_at WHERE shopify_webhook_id IS NOT NULL")
+
+
+def downgrade() -> None:
+    op.drop_column("webhooks", "handled_at")
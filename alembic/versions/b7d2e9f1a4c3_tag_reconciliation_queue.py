@@ -0,0 +1,35 @@
+"""tag reconciliation queue
+
+Revision ID: b7d2e9f1a4c3
+Revises: a3f1c2d4e5b6
+Create Date: 2026-10-19 13:48:05.271944
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "b7d2e9f1a4c3"
+down_revision: Union[str, None] = "a3f1c2d4e5b6"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "tag_reconciliation_queue",
+        sa.Column("user_id", sa.UUID(), nullable=False),
+        sa.Column("due_at", sa.DateTime(), nullable=False),
+        sa.Column("enqueued_at", sa.DateTime(), server_default=sa.text("now()"), nullable=False),
+        sa.PrimaryKeyConstraint("user_id"),
+    )
+    op.create_index(op.f("ix_tag_reconciliation_queue_due_at"), "tag_reconciliation_queue", ["due_at"], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f("ix_tag_reconciliation_queue_due_at"), table_name="tag_reconciliation_queue")
+    op.drop_table("tag_reconciliation_queue")
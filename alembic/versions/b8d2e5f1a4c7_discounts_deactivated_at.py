@@ -0,0 +1,35 @@
+"""discounts deactivated at
+
+Revision ID: b8d2e5f1a4c7
+Revises: a3f7c9e1d5b2
+Create Date: 2026-10-19 23:41:08.215406
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "b8d2e5f1a4c7"
+down_revision: Union[str, None] = "a3f7c9e1d5b2"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("discounts", sa.Column("deactivated_at", sa.DateTime(), nullable=True))
+    op.create_index(
+        "ix_discounts_active_codes",
+        "discounts",
+        ["id"],
+        unique=False,
+        postgresql_where=sa.text("deactivated_at IS NULL AND shopify_discount_code_id IS NOT NULL"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_discounts_active_codes", table_name="discounts")
+    op.drop_column("discounts", "deactivated_at")
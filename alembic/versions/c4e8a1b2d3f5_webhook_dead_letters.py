@@ -0,0 +1,42 @@
+"""webhook dead letters
+
+Revision ID: c4e8a1b2d3f5
+Revises: b7d2e9f1a4c3
+Create Date: 2026-10-19 15:02:37.614420
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "c4e8a1b2d3f5"
+down_revision: Union[str, None] = "b7d2e9f1a4c3"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "webhook_dead_letters",
+        sa.Column("id", sa.UUID(), server_default=sa.text("uuid_generate_v4()"), nullable=False),
+        sa.Column("webhook_id", sa.UUID(), nullable=False),
+        sa.Column("type", sa.String(), nullable=False),
+        sa.Column("error", sa.String(), nullable=True),
+        sa.Column("attempts", sa.Integer(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), server_default=sa.text("now()"), nullable=False),
+        sa.ForeignKeyConstraint(
+            ["webhook_id"],
+            ["webhooks.id"],
+        ),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(op.f("ix_webhook_dead_letters_webhook_id"), "webhook_dead_letters", ["webhook_id"], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f("ix_webhook_dead_letters_webhook_id"), table_name="webhook_dead_letters")
+    op.drop_table("webhook_dead_letters")
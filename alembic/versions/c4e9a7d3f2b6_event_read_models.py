@@ -0,0 +1,37 @@
+"""event read models
+
+Revision ID: c4e9a7d3f2b6
+Revises: b8d2e5f1a4c7
+Create Date: 2026-10-20 10:12:37.508113
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "c4e9a7d3f2b6"
+down_revision: Union[str, None] = "b8d2e5f1a4c7"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "event_read_models",
+        sa.Column("event_id", sa.UUID(), nullable=False),
+        sa.Column("version", sa.BigInteger(), server_default=sa.text("0"), nullable=False),
+        sa.Column("built_version", sa.BigInteger(), nullable=True),
+        sa.Column("document", postgresql.JSONB(astext_type=sa.Text()), nullable=True),
+        sa.Column("built_at", sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(["event_id"], ["events.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("event_id"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("event_read_models")
@@ -0,0 +1,31 @@
+"""webhook processing claim
+
+Revision ID: c6e0a2b4d8f1
+Revises: b5d9f1a3c7e4
+Create Date: 2026-10-19 10:12:37.604211
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "c6e0a2b4d8f1"
+down_revision: Union[str, None] = "b5d9f1a3c7e4"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("webhooks", sa.Column("claimed_at", sa.DateTime(), nullable=True))
+    op.add_column("webhooks", sa.Column("processed_at", sa.DateTime(), nullable=True))
+    # webhooks handled so far aren't processed again
+    op.execute("UPDATE webhooks SET processed_at = handled_at WHERE handled_at IS NOT NULL")
+
+
+def downgrade() -> None:
+    op.drop_column("webhooks", "processed_at")
+    op.drop_column("webhooks", "claimed_at")
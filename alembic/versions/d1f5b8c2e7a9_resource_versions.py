@@ -0,0 +1,32 @@
+"""resource versions
+
+Revision ID: d1f5b8c2e7a9
+Revises: c4e9a7d3f2b6
+Create Date: 2026-10-20 14:03:51.662390
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "d1f5b8c2e7a9"
+down_revision: Union[str, None] = "c4e9a7d3f2b6"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "event_read_models",
+        sa.Column("updated_at", sa.DateTime(), server_default=sa.text("now()"), nullable=False),
+    )
+    op.create_index("ix_looks_user_id_updated_at", "looks", ["user_id", "updated_at"], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index("ix_looks_user_id_updated_at", table_name="looks")
+    op.drop_column("event_read_models", "updated_at")
@@ -0,0 +1,25 @@
+"""webhook queued_at
+
+Revision ID: d7f1b3c5e9a2
+Revises: c6e0a2b4d8f1
+Create Date: 2026-10-19 14:03:51.281947
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "d7f1b3c5e9a2"
+down_revision: Union[str, None] = "c6e0a2b4d8f1"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.alter_column("webhooks", "handled_at", new_column_name="queued_at")
+
+
+def downgrade() -> None:
+    op.alter_column("webhooks", "queued_at", new_column_name="handled_at")
@@ -0,0 +1,29 @@
+"""webhook shopify webhook id
+
+Revision ID: d9b3f6a2c1e7
+Revises: c4e8a1b2d3f5
+Create Date: 2026-10-19 16:41:08.203517
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "d9b3f6a2c1e7"
+down_revision: Union[str, None] = "c4e8a1b2d3f5"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("webhooks", sa.Column("shopify_webhook_id", sa.String(), nullable=True))
+    op.create_index("ix_webhooks_shopify_webhook_id_type", "webhooks", ["shopify_webhook_id", "type"], unique=True)
+
+
+def downgrade() -> None:
+    op.drop_index("ix_webhooks_shopify_webhook_id_type", table_name="webhooks")
+    op.drop_column("webhooks", "shopify_webhook_id")
@@ -0,0 +1,33 @@
+"""shopify products variants id index
+
+Revision ID: e2a6c4f8b1d3
+Revises: d1f5b8c2e7a9
+Create Date: 2026-10-21 10:17:42.318604
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "e2a6c4f8b1d3"
+down_revision: Union[str, None] = "d1f5b8c2e7a9"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        "ix_shopify_products_variants_id",
+        "shopify_products",
+        [sa.text("jsonb_path_query_array(data, '$.variants[*].id')")],
+        unique=False,
+        postgresql_using="gin",
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_shopify_products_variants_id", table_name="shopify_products", postgresql_using="gin")
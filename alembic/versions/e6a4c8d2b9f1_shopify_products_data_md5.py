@@ -0,0 +1,29 @@
+"""shopify products data md5
+
+Revision ID: e6a4c8d2b9f1
+Revises: d9b3f6a2c1e7
+Create Date: 2026-10-19 18:12:45.518204
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "e6a4c8d2b9f1"
+down_revision: Union[str, None] = "d9b3f6a2c1e7"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("shopify_products", sa.Column("data_md5", sa.String(), nullable=True))
+    op.add_column("shopify_products", sa.Column("shopify_updated_at", sa.DateTime(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column("shopify_products", "shopify_updated_at")
+    op.drop_column("shopify_products", "data_md5")
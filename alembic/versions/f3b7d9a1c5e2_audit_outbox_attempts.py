@@ -0,0 +1,29 @@
+"""audit outbox attempts
+
+Revision ID: f3b7d9a1c5e2
+Revises: e2a6c4f8b1d3
+Create Date: 2026-10-22 09:41:18.524913
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "f3b7d9a1c5e2"
+down_revision: Union[str, None] = "e2a6c4f8b1d3"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("audit_outbox", sa.Column("attempts", sa.Integer(), server_default=sa.text("0"), nullable=False))
+    op.add_column("audit_outbox", sa.Column("last_error", sa.String(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column("audit_outbox", "last_error")
+    op.drop_column("audit_outbox", "attempts")
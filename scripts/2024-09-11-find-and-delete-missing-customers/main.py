@@ -6,7 +6,7 @@ from typing import List, Any, Dict, Optional
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 
-from server.controllers.util import http
+from server.services.integrations.http_client import http
 from server.database.models import Discount, User
 
 logging.basicConfig(level=logging.INFO)
@@ -4,7 +4,7 @@ import os
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 
-from server.controllers.util import http
+from server.services.integrations.http_client import http
 from server.database.models import SuitBuilderItem
 
 DB_HOST = "tmg-db-stg-02.cfbqizbq9cdk.us-west-2.rds.amazonaws.com"
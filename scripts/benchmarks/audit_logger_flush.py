@@ -0,0 +1,123 @@
+"""
+Measures audit logger overhead per flushed entity, no database needed:
+
+    PYTHONPATH=. python scripts/benchmarks/audit_logger_flush.py
+
+"baseline" replicates the previous implementation: serialize the whole row, walk history of every column and encode
+the message with json. "current" is server.services.audit_logger as it is now.
+"""
+
+import json
+import timeit
+import uuid
+from datetime import datetime
+
+from sqlalchemy.orm.attributes import get_history, set_committed_value
+
+from server.database.models import Look, User, SerializableMixin
+from server.services import audit_logger
+
+NUM_ITERATIONS = 2000
+
+
+class FakeConnection:
+    def execute(self, statement):
+        # db round trip is the same in both implementations and is left out
+        pass
+
+
+def make_look() -> Look:
+    look = Look()
+
+    values = {
+        "id": uuid.uuid4(),
+        "name": "Classic Black Tuxedo",
+        "user_id": uuid.uuid4(),
+        "product_specs": {
+            "bundle": {"variant_id": "1", "product_id": "2", "variant_price": 299.0},
+            "suit": {"variant_id": "3", "variant_sku": "001A2BLK", "variant_price": 199.0},
+            "items": [
+                {"variant_id": str(i), "variant_sku": f"SKU{i:06d}", "variant_title": f"Item {i}" * 5}
+                for i in range(200)
+            ],
+        },
+        "image_path": "looks/image.png",
+        "is_active": True,
+        "created_at": datetime.now(),
+        "updated_at": datetime.now(),
+    }
+
+    for key, value in values.items():
+        set_committed_value(look, key, value)
+
+    return look
+
+
+def make_user() -> User:
+    user = User()
+
+    values = {
+        "id": uuid.uuid4(),
+        "legacy_id": None,
+        "first_name": "John",
+        "last_name": "Doe",
+        "email": "john.doe@example.com",
+        "phone_number": "+15555555555",
+        "shopify_id": "1234567890",
+        "account_status": True,
+        "sms_consent": False,
+        "email_consent": False,
+        "meta": {"tags": [f"tag_{i}" for i in range(50)], "history": [{"at": str(i)} for i in range(200)]},
+        "created_at": datetime.now(),
+        "updated_at": datetime.now(),
+    }
+
+    for key, value in values.items():
+        set_committed_value(user, key, value)
+
+    return user
+
+
+def baseline_log_operation(target, operation):
+    payload = target.serialize()
+    diff = {}
+
+    for attr in target.__table__.columns:
+        if attr.key in {"updated_at"}:
+            continue
+
+        history = get_history(target, attr.key)
+
+        if history.has_changes():
+            diff[attr.key] = {
+                "before": SerializableMixin.normalize(history.deleted[0] if history.deleted else None),
+                "after": SerializableMixin.normalize(getattr(target, attr.key)),
+            }
+
+    if not diff:
+        return
+
+    json.dumps({"id": str(uuid.uuid4()), "type": operation, "payload": payload, "request": {}, "diff": diff})
+
+
+def bench(name, func):
+    seconds = timeit.timeit(func, number=NUM_ITERATIONS)
+    print(f"{name:<45} {seconds / NUM_ITERATIONS * 1_000_000:10.1f} us/flush")
+
+
+def main():
+    connection = FakeConnection()
+
+    look_noop = make_look()
+    look_renamed = make_look()
+    look_renamed.name = "Classic Navy Tuxedo"
+    user_renamed = make_user()
+    user_renamed.first_name = "Jane"
+
+    for name, target in [("look no-op", look_noop), ("look name", look_renamed), ("user first_name", user_renamed)]:
+        bench(f"baseline {name}", lambda: baseline_log_operation(target, "UPDATED"))
+        bench(f"current  {name}", lambda: audit_logger._log_operation(connection, target, "UPDATED", True))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,223 @@
+"""
+Measures reading enriched attendees of an event, as the event and attendees endpoints do, for events of several sizes:
+
+    PYTHONPATH=. python scripts/benchmarks/enriched_attendees.py
+
+Events with looks, roles, orders with tracking and gift codes are created in the local database configured with
+DB_HOST, DB_NAME etc. and left there, so run it against a throwaway database.
+
+"baseline" replicates the previous implementation: a group by over whole attendee, event, user, role and look rows
+joined to orders, then a second query for gift codes, and models validated from orm objects. "current" is
+AttendeeService.get_attendees_for_events as it is now.
+"""
+
+import argparse
+import contextlib
+import random
+import statistics
+import sys
+import time
+import uuid
+
+from sqlalchemy import and_, event, func
+
+from server.database.database_manager import db, db_host
+from server.database.models import Attendee, DiscountType, Event, Look, Order, Role, User
+from server.models.attendee_model import AttendeeUserModel, EnrichedAttendeeModel, TrackingModel
+from server.models.look_model import LookModel
+from server.models.role_model import RoleModel
+from server.models.shopify_model import ShopifyVariantModel
+from server.tests.integration import fixtures
+
+EVENT_SIZES = [10, 30, 100]
+LOCAL_DB_HOSTS = {"localhost", "127.0.0.1", "::1"}
+
+_num_queries = 0
+
+
+def make_product_specs(app, index: int) -> dict:
+    variant_ids = [f"{index}{i:06d}" for i in range(6)]
+
+    for variant_id in variant_ids:
+        app.shopify_service.shopify_variants[variant_id] = ShopifyVariantModel(
+            product_id=variant_id,
+            product_title=f"Product for variant {variant_id}",
+            variant_id=variant_id,
+            variant_title=f"Variant {variant_id}",
+            variant_sku=f"00{variant_id}",
+            variant_price=100,
+            image_url="https://data.dev.tmgcorp.net/bundle.jpg",
+        )
+
+    return {"suit_variant": variant_ids[0], "variants": variant_ids}
+
+
+def seed_event(app, num_attendees: int) -> uuid.UUID:
+    owner = app.user_service.create_user(fixtures.create_user_request())
+    event_id = app.event_service.create_event(fixtures.create_event_request(user_id=owner.id)).id
+    roles = [app.role_service.create_role(fixtures.create_role_request(event_id=event_id)) for _ in range(3)]
+    looks = [
+        app.look_service.create_look(
+            fixtures.create_look_request(user_id=owner.id, product_specs=make_product_specs(app, i))
+        )
+        for i in range(3)
+    ]
+
+    for i in range(num_attendees):
+        attendee_user = app.user_service.create_user(fixtures.create_user_request())
+        attendee = app.attendee_service.create_attendee(
+            fixtures.create_attendee_request(
+                event_id=event_id, email=attendee_user.email, look_id=looks[i % 3].id, role_id=roles[i % 3].id
+            )
+        )
+
+        if i % 2 == 0:
+            app.order_service.create_order(
+                fixtures.create_order_request(
+                    user_id=attendee_user.id,
+                    event_id=event_id,
+                    outbound_tracking=str(random.randint(100000, 1000000)),
+                    shopify_order_id=str(random.randint(100000, 100000000)),
+                )
+            )
+
+        if i % 3 == 0:
+            app.discount_service.create_discount(
+                event_id,
+                attendee.id,
+                50,
+                DiscountType.GIFT,
+                False,
+                f"GIFT-{uuid.uuid4()}",
+                random.randint(10000, 10000000),
+            )
+
+    return event_id
+
+
+def baseline_get_attendees_for_events(app, event_ids: list[uuid.UUID]) -> dict[uuid.UUID, list[EnrichedAttendeeModel]]:
+    db_attendees = (
+        db.session.query(
+            Attendee,
+            Event,
+            User,
+            Role,
+            Look,
+            func.array_agg(
+                func.json_build_object(
+                    "outbound_tracking", Order.outbound_tracking, "shopify_order_id", Order.shopify_order_id
+                )
+            ).label("order_tracking"),
+        )
+        .join(Event, Event.id == Attendee.event_id)
+        .outerjoin(User, User.id == Attendee.user_id)
+        .outerjoin(Role, Attendee.role_id == Role.id)
+        .outerjoin(Look, Attendee.look_id == Look.id)
+        .outerjoin(Order, and_(Order.event_id == Attendee.event_id, Order.user_id == Attendee.user_id))
+        .filter(Attendee.event_id.in_(event_ids), Attendee.is_active)
+        .group_by(Attendee.id, Event.id, User.id, Role.id, Look.id)
+        .order_by(Attendee.created_at.asc())
+        .all()
+    )
+
+    attendees_gift_codes = app.discount_service.get_discount_codes_for_attendees(
+        {attendee.id for attendee, *_ in db_attendees}, type=DiscountType.GIFT
+    )
+    attendees = {}
+
+    for attendee, event, user, role, look, orders in db_attendees:
+        gift_codes = attendees_gift_codes.get(attendee.id, [])
+        tracking = [
+            TrackingModel(tracking_number=order["outbound_tracking"], tracking_url=f"/{order['shopify_order_id']}")
+            for order in orders
+            if order and order.get("outbound_tracking")
+        ]
+
+        attendees.setdefault(attendee.event_id, []).append(
+            EnrichedAttendeeModel(
+                id=attendee.id,
+                first_name=attendee.first_name or user.first_name,
+                last_name=attendee.last_name or user.last_name,
+                email=attendee.email or user.email,
+                user_id=attendee.user_id,
+                is_owner=attendee.user_id == event.user_id,
+                event_id=attendee.event_id,
+                style=attendee.style,
+                invite=attendee.invite,
+                pay=attendee.pay,
+                size=attendee.size,
+                ship=attendee.ship or bool(tracking),
+                role_id=attendee.role_id,
+                look_id=attendee.look_id,
+                role=RoleModel.model_validate(role) if role else None,
+                look=LookModel.model_validate(look) if look else None,
+                is_active=attendee.is_active,
+                gift_codes=gift_codes,
+                has_gift_codes=len(gift_codes) > 0,
+                tracking=tracking,
+                can_be_deleted=attendee.pay is False and len(gift_codes) == 0,
+                user=AttendeeUserModel(first_name=user.first_name, last_name=user.last_name, email=user.email),
+            )
+        )
+
+    return attendees
+
+
+def bench(name: str, func, iterations: int) -> None:
+    global _num_queries
+
+    durations = []
+
+    for _ in range(iterations):
+        _num_queries = 0
+        started_at = time.perf_counter()
+        func()
+        durations.append(time.perf_counter() - started_at)
+        # nothing cached in the identity map between iterations
+        db.session.expunge_all()
+
+    print(f"{name:<30} {statistics.median(durations) * 1000:10.2f} ms {_num_queries:>8} queries")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measures reading enriched attendees of an event.")
+    parser.add_argument("--iterations", type=int, default=50, help="number of reads per event size")
+    parser.add_argument(
+        "--allow-remote-target", action="store_true", help="allow seeding events in a database that isn't local"
+    )
+    args = parser.parse_args()
+
+    if db_host not in LOCAL_DB_HOSTS and not args.allow_remote_target:
+        sys.exit(f"Refusing to seed events in database at {db_host}, use --allow-remote-target to do so")
+
+    from server.app import init_app, init_db
+
+    app = init_app(is_testing=True).app
+
+    with contextlib.redirect_stdout(sys.stderr):
+        init_db()
+
+    app.app_context().push()
+
+    @event.listens_for(db.engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        global _num_queries
+        _num_queries += 1
+
+    for num_attendees in EVENT_SIZES:
+        event_ids = [seed_event(app, num_attendees)]
+
+        bench(
+            f"baseline {num_attendees} attendees",
+            lambda: baseline_get_attendees_for_events(app, event_ids),
+            args.iterations,
+        )
+        bench(
+            f"current  {num_attendees} attendees",
+            lambda: app.attendee_service.get_attendees_for_events(event_ids),
+            args.iterations,
+        )
+
+
+if __name__ == "__main__":
+    main()
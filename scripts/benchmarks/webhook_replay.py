@@ -0,0 +1,239 @@
+"""
+Replays stored Shopify webhooks through the webhook dispatcher in parallel worker processes and reports throughput and
+latency percentiles per topic and stage:
+
+    PYTHONPATH=. SOURCE_DB_URI=postgresql://... python scripts/benchmarks/webhook_replay.py \
+        --topic orders/paid --topic customers/update --since 2024-11-01 --until 2024-11-08 --workers 4
+
+Webhooks are read from SOURCE_DB_URI (the local database if not set) and processed against the local database
+configured with DB_HOST, DB_NAME etc. the same way the api does, with fake integrations. Replayed webhooks are stored
+again, so run it against a throwaway database, ideally restored from a production snapshot so handlers find the users,
+events and products the payloads refer to.
+
+Stages:
+    store       storing the webhook, as the controller does before dispatching
+    handler     the topic handler
+    handler_db  time the handler spent in sql statements
+    handler_app handler minus handler_db
+    total       store and handler
+"""
+
+import argparse
+import contextlib
+import json
+import multiprocessing
+import os
+import sys
+import time
+from collections import defaultdict
+from datetime import datetime
+from typing import Any, Optional
+
+from sqlalchemy import create_engine, event, select
+
+from server.database.database_manager import DATABASE_URL, db_host
+from server.database.models import Webhook
+
+STAGES = ["store", "handler", "handler_db", "handler_app", "total"]
+PERCENTILES = [50, 95, 99]
+LOCAL_DB_HOSTS = {"localhost", "127.0.0.1", "::1"}
+
+# per worker process
+_app = None
+_sql_seconds = 0.0
+
+
+def load_webhooks(
+    source_db_uri: str, topics: list[str], since: Optional[datetime], until: Optional[datetime], limit: Optional[int]
+) -> list[tuple[str, dict[str, Any]]]:
+    stmt = select(Webhook.type, Webhook.payload).order_by(Webhook.created_at)
+
+    if topics:
+        stmt = stmt.where(Webhook.type.in_(topics))
+
+    if since:
+        stmt = stmt.where(Webhook.created_at >= since)
+
+    if until:
+        stmt = stmt.where(Webhook.created_at < until)
+
+    if limit:
+        stmt = stmt.limit(limit)
+
+    engine = create_engine(source_db_uri)
+
+    try:
+        with engine.connect() as connection:
+            return [(row.type, row.payload) for row in connection.execute(stmt)]
+    finally:
+        engine.dispose()
+
+
+def init_worker(workers_ready) -> None:
+    global _app
+
+    from server.app import init_app, init_db
+    from server.database.database_manager import db
+
+    _app = init_app(is_testing=True).app
+
+    # keeps stdout clean for the json report
+    with contextlib.redirect_stdout(sys.stderr):
+        init_db()
+
+    _app.app_context().push()
+
+    @event.listens_for(db.engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started_at", []).append(time.perf_counter())
+
+    @event.listens_for(db.engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        global _sql_seconds
+        _sql_seconds += time.perf_counter() - conn.info["query_started_at"].pop()
+
+    workers_ready.wait()
+
+
+def replay(webhook: tuple[str, dict[str, Any]]) -> tuple[str, dict[str, float], Optional[str]]:
+    global _sql_seconds
+
+    from server.database.database_manager import db
+
+    topic, payload = webhook
+    durations = {}
+    error = None
+
+    started_at = time.perf_counter()
+
+    try:
+        stored_webhook = _app.webhook_service.store_webhook(topic, payload)
+        durations["store"] = time.perf_counter() - started_at
+
+        _sql_seconds = 0.0
+        handler_started_at = time.perf_counter()
+
+        try:
+            _app.shopify_webhook_dispatcher.dispatch(topic, stored_webhook.id, payload)
+        finally:
+            durations["handler"] = time.perf_counter() - handler_started_at
+            durations["handler_db"] = _sql_seconds
+            durations["handler_app"] = durations["handler"] - _sql_seconds
+    except Exception as e:
+        # the controller swallows handler errors too, the webhook still counts towards throughput
+        db.session.rollback()
+        error = f"{type(e).__name__}: {e}"
+
+    durations["total"] = time.perf_counter() - started_at
+
+    return topic, durations, error
+
+
+def percentile(sorted_values: list[float], p: int) -> float:
+    # nearest rank
+    index = max(0, min(len(sorted_values) - 1, round(p / 100 * len(sorted_values) + 0.5) - 1))
+
+    return sorted_values[index]
+
+
+def summarize(results: list[tuple[str, dict[str, float], Optional[str]]], elapsed: float) -> dict[str, Any]:
+    durations_by_topic: dict[str, dict[str, list[float]]] = defaultdict(lambda: defaultdict(list))
+    errors_by_topic: dict[str, int] = defaultdict(int)
+
+    for topic, durations, error in results:
+        for stage, seconds in durations.items():
+            durations_by_topic[topic][stage].append(seconds)
+            durations_by_topic["all"][stage].append(seconds)
+
+        if error:
+            errors_by_topic[topic] += 1
+            errors_by_topic["all"] += 1
+
+    topics = {}
+
+    for topic, durations_by_stage in sorted(durations_by_topic.items(), key=lambda item: item[0] != "all"):
+        stages = {}
+
+        for stage in STAGES:
+            values = sorted(durations_by_stage.get(stage, []))
+
+            if values:
+                stages[stage] = {f"p{p}_ms": round(percentile(values, p) * 1000, 2) for p in PERCENTILES}
+
+        count = len(durations_by_stage["total"])
+        topics[topic] = {
+            "count": count,
+            "errors": errors_by_topic[topic],
+            "throughput_per_second": round(count / elapsed, 2) if elapsed else 0,
+            "stages": stages,
+        }
+
+    return {"elapsed_seconds": round(elapsed, 2), "topics": topics}
+
+
+def print_report(report: dict[str, Any]) -> None:
+    print(f"Replayed {report['topics'].get('all', {}).get('count', 0)} webhooks in {report['elapsed_seconds']}s")
+    print()
+    print(
+        f"{'topic':<22} {'stage':<12} {'count':>7} {'errors':>7} {'per sec':>9} "
+        f"{'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}"
+    )
+
+    for topic, topic_report in report["topics"].items():
+        for index, (stage, stage_report) in enumerate(topic_report["stages"].items()):
+            counts = (
+                f"{topic_report['count']:>7} {topic_report['errors']:>7} {topic_report['throughput_per_second']:>9}"
+                if index == 0
+                else " " * 25
+            )
+            print(
+                f"{topic if index == 0 else '':<22} {stage:<12} {counts} "
+                f"{stage_report['p50_ms']:>9} {stage_report['p95_ms']:>9} {stage_report['p99_ms']:>9}"
+            )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replays stored Shopify webhooks and reports their latencies.")
+    parser.add_argument("--topic", action="append", default=[], help="topic to replay, repeatable, all by default")
+    parser.add_argument("--since", type=datetime.fromisoformat, help="replay webhooks created at or after")
+    parser.add_argument("--until", type=datetime.fromisoformat, help="replay webhooks created before")
+    parser.add_argument("--limit", type=int, help="max number of webhooks to replay")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="number of worker processes")
+    parser.add_argument("--json", action="store_true", help="print the report as json")
+    parser.add_argument(
+        "--allow-remote-target", action="store_true", help="allow replaying against a database that isn't local"
+    )
+    args = parser.parse_args()
+
+    if db_host not in LOCAL_DB_HOSTS and not args.allow_remote_target:
+        sys.exit(f"Refusing to replay webhooks against database at {db_host}, use --allow-remote-target to do so")
+
+    webhooks = load_webhooks(os.getenv("SOURCE_DB_URI", DATABASE_URL), args.topic, args.since, args.until, args.limit)
+
+    if not webhooks:
+        sys.exit("No webhooks found")
+
+    print(f"Replaying {len(webhooks)} webhooks with {args.workers} workers...", file=sys.stderr)
+
+    # fresh interpreters, so the app and its db engine aren't shared with the parent
+    context = multiprocessing.get_context("spawn")
+    workers_ready = context.Barrier(args.workers + 1)
+
+    with context.Pool(args.workers, initializer=init_worker, initargs=(workers_ready,)) as pool:
+        # app startup isn't counted towards throughput
+        workers_ready.wait()
+
+        started_at = time.perf_counter()
+        results = list(pool.imap_unordered(replay, webhooks, chunksize=8))
+        elapsed = time.perf_counter() - started_at
+
+    report = summarize(results, elapsed)
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report)
+
+
+if __name__ == "__main__":
+    main()
@@ -21,8 +21,12 @@ from server.logs import (
 from server.services.activity_service import FakeActivityService, ActivityService
 from server.services.attendee_service import AttendeeService
 from server.services.audit_logger import init_audit_logging
+from server.services.audit_message_codec import AuditMessageCodec
+from server.services.audit_outbox_service import AuditOutboxService
 from server.services.audit_service import AuditLogService
+from server.services.discount_code_pool_service import DiscountCodePoolService
 from server.services.discount_service import DiscountService
+from server.services.event_read_model_service import EventReadModelService, init_event_read_model_versioning
 from server.services.event_service import EventService
 from server.services.integrations.activecampaign_service import ActiveCampaignService, FakeActiveCampaignService
 from server.services.integrations.aws_service import AWSService, FakeAWSService
@@ -36,6 +40,7 @@ from server.services.measurement_service import MeasurementService
 from server.services.order_service import OrderService
 from server.services.product_service import ProductService
 from server.services.role_service import RoleService
+from server.services.shiphero_catalog_service import ShipHeroCatalogService
 from server.services.shipping_service import ShippingService
 from server.services.shopify_product_service import ShopifyProductService
 from server.services.size_service import SizeService
@@ -50,6 +55,8 @@ from server.services.webhook_handlers.shopify_fulfillment_webhook_handler import
 from server.services.webhook_handlers.shopify_order_webhook_handler import ShopifyWebhookOrderHandler
 from server.services.webhook_handlers.shopify_product_webhook_handler import ShopifyWebhookProductHandler
 from server.services.webhook_handlers.shopify_user_webhook_handler import ShopifyWebhookUserHandler
+from server.services.webhook_handlers.shopify_webhook_dispatcher import ShopifyWebhookDispatcher
+from server.services.webhook_queue_service import WebhookQueueService
 from server.services.webhook_service import WebhookService
 from server.services.workers.e2e_ac_clean_up_worker import E2EActiveCampaignCleanUpWorker
 from server.services.workers.e2e_clean_up_worker import E2ECleanUpWorker
@@ -119,6 +126,9 @@ def init_app(is_testing=False):
     if not run_in_test_mode:
         init_audit_logging()
 
+    # also in tests, documents built there must not be served after the changes tests make
+    init_event_read_model_versioning()
+
     init_services(api.app, run_in_test_mode)
 
     # Do not reorder, this is ensuring requests are logged with the attributes
@@ -135,6 +145,10 @@ def init_services(app, is_testing=False):
     online_store_sales_channel_id = os.getenv("online_store_sales_channel_id", "gid://shopify/Publication/94480072835")
     app.online_store_shop_id = os.getenv("online_store_shop_id", "56965365891")
     app.audit_log_sqs_queue_url = os.getenv("AUDIT_QUEUE_URL", "https://sqs.us-west-2.amazonaws.com/123456789012/audit")
+    app.webhook_sqs_queue_url = os.getenv(
+        "WEBHOOK_QUEUE_URL", "https://sqs.us-west-2.amazonaws.com/123456789012/webhooks"
+    )
+    app.webhook_async_ingest = os.getenv("WEBHOOK_ASYNC_INGEST", "false").lower() == "true"
     app.images_data_endpoint_host = f"data.{app.stage if app.stage == 'prd' else 'dev'}.tmgcorp.net"
 
     app.aws_service = FakeAWSService() if is_testing else AWSService()
@@ -151,11 +165,21 @@ def init_services(app, is_testing=False):
         app.shopify_service, app.user_service, app.look_service, app.email_service, app.activecampaign_service
     )
     app.sku_builder = SkuBuilder()
+    app.event_read_model_service = EventReadModelService(app.attendee_service, app.role_service, app.look_service)
     app.event_service = EventService(
-        attendee_service=app.attendee_service, role_service=app.role_service, look_service=app.look_service
+        attendee_service=app.attendee_service,
+        role_service=app.role_service,
+        look_service=app.look_service,
+        event_read_model_service=app.event_read_model_service,
     )
+    app.discount_code_pool_service = DiscountCodePoolService(app.shopify_service)
     app.discount_service = DiscountService(
-        app.shopify_service, app.user_service, app.event_service, app.attendee_service, app.look_service
+        app.shopify_service,
+        app.user_service,
+        app.event_service,
+        app.attendee_service,
+        app.look_service,
+        app.discount_code_pool_service,
     )
     app.measurement_service = MeasurementService()
     app.product_service = ProductService()
@@ -173,7 +197,7 @@ def init_services(app, is_testing=False):
         shopify_service=app.shopify_service,
     )
     app.webhook_service = WebhookService()
-    app.__user_activity_log_service = UserActivityLogService(
+    app.user_activity_log_service = UserActivityLogService(
         app.user_service,
         app.event_service,
         app.attendee_service,
@@ -181,15 +205,19 @@ def init_services(app, is_testing=False):
         app.look_service,
         app.order_service,
     )
-    app.__tagging_service = TaggingService(
+    app.tagging_service = TaggingService(
         app.user_service,
         app.event_service,
         app.attendee_service,
         app.look_service,
         app.shopify_service,
     )
-    app.audit_log_service = AuditLogService(app.__tagging_service, app.__user_activity_log_service)
+    app.audit_log_service = AuditLogService(app.tagging_service, app.user_activity_log_service)
+    app.audit_log_service.subscribe(app.event_read_model_service.audit_subscriber())
+    app.audit_message_codec = AuditMessageCodec(app.aws_service)
+    app.audit_outbox_service = AuditOutboxService(app.aws_service, app.audit_message_codec, app.audit_log_sqs_queue_url)
     app.shiphero_service = FakeShipHeroService() if is_testing else ShipHeroService()
+    app.shiphero_catalog_service = ShipHeroCatalogService(app.shiphero_service, app.product_service)
     app.shopify_webhook_order_handler = ShopifyWebhookOrderHandler(
         app.shopify_service,
         app.discount_service,
@@ -202,7 +230,7 @@ def init_services(app, is_testing=False):
         app.product_service,
         app.sku_builder,
         app.event_service,
-        app.shiphero_service,
+        app.shiphero_catalog_service,
         app.activecampaign_service,
         app.email_service,
         app.sms_service,
@@ -217,6 +245,17 @@ def init_services(app, is_testing=False):
     app.shopify_webhook_checkout_handler = ShopifyWebhookCheckoutHandler()
     app.shopify_product_service = ShopifyProductService()
     app.shopify_webhook_product_handler = ShopifyWebhookProductHandler(app.shopify_product_service)
+    app.shopify_webhook_dispatcher = ShopifyWebhookDispatcher(
+        app.shopify_webhook_order_handler,
+        app.shopify_webhook_user_handler,
+        app.shopify_webhook_cart_handler,
+        app.shopify_webhook_checkout_handler,
+        app.shopify_webhook_product_handler,
+        app.shopify_webhoook_fullfillment_handler,
+    )
+    app.webhook_queue_service = WebhookQueueService(
+        app.webhook_service, app.shopify_webhook_dispatcher, app.aws_service, app.webhook_sqs_queue_url
+    )
     app.shipping_service = ShippingService(
         look_service=app.look_service,
         attendee_service=app.attendee_service,
@@ -2,11 +2,17 @@ import logging
 import uuid
 
 from flask import request
+from pydantic import ValidationError
 
 from server.controllers import FORCE_DELETE_HEADER
-from server.controllers.util import hmac_verification, error_handler
+from server.controllers.util import hmac_verification, error_handler, error_status
 from server.flask_app import FlaskApp
-from server.models.attendee_model import CreateAttendeeModel, UpdateAttendeeModel
+from server.models.attendee_model import (
+    AttendeeModel,
+    BatchUpdateAttendeeModel,
+    CreateAttendeeModel,
+    UpdateAttendeeModel,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -41,6 +47,52 @@ def update_attendee(attendee_id, update_attendee):
     return attendee.to_response(), 200
 
 
+@hmac_verification
+@error_handler
+def create_and_update_attendees(attendees_batch):
+    attendee_service = FlaskApp.current().attendee_service
+
+    # requests that don't validate get their own result, the rest of the batch is applied
+    create_attendees = [_validate(CreateAttendeeModel, request) for request in attendees_batch.get("create", [])]
+    update_attendees = [_validate(BatchUpdateAttendeeModel, request) for request in attendees_batch.get("update", [])]
+
+    created, updated = attendee_service.create_and_update_attendees(
+        [request for request in create_attendees if not isinstance(request, ValidationError)],
+        [request for request in update_attendees if not isinstance(request, ValidationError)],
+    )
+    created, updated = iter(created), iter(updated)
+
+    return {
+        "create": [
+            _batch_result(request if isinstance(request, ValidationError) else next(created), 201)
+            for request in create_attendees
+        ],
+        "update": [
+            _batch_result(request if isinstance(request, ValidationError) else next(updated), 200)
+            for request in update_attendees
+        ],
+    }, 200
+
+
+def _validate(model_class, request: dict):
+    try:
+        return model_class(**request)
+    except ValidationError as e:
+        return e
+
+
+def _batch_result(result, status: int) -> dict:
+    if isinstance(result, AttendeeModel):
+        return {"status": status, "attendee": result.to_response()}
+
+    if isinstance(result, ValidationError):
+        first_error = result.errors()[0]
+
+        return {"status": 400, "errors": str(first_error.get("ctx", {}).get("error") or first_error.get("msg"))}
+
+    return {"status": error_status(result), "errors": result.message}
+
+
 @hmac_verification
 @error_handler
 def delete_attendee(attendee_id):
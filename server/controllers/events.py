@@ -4,15 +4,26 @@ import uuid
 from flask import request
 
 from server.controllers import FORCE_DELETE_HEADER
-from server.controllers.util import hmac_verification, error_handler
+from server.controllers.util import hmac_verification, error_handler, conditional_get
 from server.flask_app import FlaskApp
 from server.models.event_model import CreateEventModel, UpdateEventModel
 
 logger = logging.getLogger(__name__)
 
 
+def event_version(event_id, enriched=False):
+    return FlaskApp.current().event_read_model_service.get_version(
+        uuid.UUID(event_id), "enriched-event" if enriched else "event"
+    )
+
+
+def event_attendees_version(event_id):
+    return FlaskApp.current().event_read_model_service.get_version(uuid.UUID(event_id), "attendees")
+
+
 @hmac_verification
 @error_handler
+@conditional_get(event_version)
 def get_event_by_id(event_id, enriched=False):
     event_service = FlaskApp.current().event_service
 
@@ -67,6 +78,7 @@ def get_event_roles(event_id):
 
 @hmac_verification
 @error_handler
+@conditional_get(event_attendees_version)
 def get_event_attendees(event_id):
     attendee_service = FlaskApp.current().attendee_service
 
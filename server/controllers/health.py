@@ -1,9 +1,10 @@
 import logging
 from concurrent.futures import ThreadPoolExecutor, as_completed
 
-from server.controllers.util import http, token_verification
+from server.controllers.util import token_verification
 from server.database.models import Product
 from server.flask_app import FlaskApp
+from server.services.integrations.http_client import http
 
 logger = logging.getLogger(__name__)
 
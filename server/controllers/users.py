@@ -3,7 +3,7 @@ import uuid
 
 from pydantic import validate_email
 
-from server.controllers.util import hmac_verification, error_handler
+from server.controllers.util import hmac_verification, error_handler, conditional_get
 from server.flask_app import FlaskApp
 from server.models.event_model import EventUserStatus
 from server.models.user_model import CreateUserModel, UpdateUserModel
@@ -12,6 +12,10 @@ from server.services.user_service import UserService
 logger = logging.getLogger(__name__)
 
 
+def user_looks_version(user_id):
+    return FlaskApp.current().look_service.get_looks_version_by_user_id(uuid.UUID(user_id))
+
+
 @hmac_verification
 @error_handler
 def create_user(create_user):
@@ -53,6 +57,7 @@ def get_user_events(user_id, status=None, enriched=False):
 
 @hmac_verification
 @error_handler
+@conditional_get(user_looks_version)
 def get_user_looks(user_id):
     look_service = FlaskApp.current().look_service
 
@@ -3,12 +3,12 @@ import hashlib
 import hmac
 import logging
 import os
-from copy import deepcopy
+from datetime import timezone
 from functools import wraps
 
-import urllib3
 from flask import request, abort, jsonify
 from pydantic import ValidationError
+from werkzeug.http import http_date
 
 from server.flask_app import FlaskApp
 from server.services import DuplicateError, ServiceError, NotFoundError, BadRequestError
@@ -17,7 +17,6 @@ secret_key = os.getenv("client_secret", "")
 secret_key = secret_key.encode("utf-8")
 webhook_signature_key = os.getenv("webhook_signature_key")
 
-http_pool = urllib3.PoolManager()
 logger = logging.getLogger(__name__)
 
 
@@ -112,6 +111,18 @@ def token_verification(func, api_token=os.getenv("API_TOKEN", None)):
     return wrapper
 
 
+def error_status(e: ServiceError) -> int:
+    # as error_handler responds to the error
+    if isinstance(e, BadRequestError):
+        return 400
+    elif isinstance(e, NotFoundError):
+        return 404
+    elif isinstance(e, DuplicateError):
+        return 409
+
+    return 500
+
+
 def error_handler(func):
     @wraps(func)
     def wrapper(*args, **kwargs):
@@ -150,66 +161,36 @@ def error_handler(func):
     return wrapper
 
 
-def http(method, *args, **kwargs):
-    merge_kwargs = {}
-
-    if method == "POST":
-        merge_kwargs.update(
-            {
-                "timeout": 5,
-                "retries": urllib3.util.Retry(
-                    total=3,  # Number of retries
-                    backoff_factor=1,  # Delay between retries
-                    connect=3,  # Retry only on connection failures
-                    read=0,  # Do not retry on read errors (timeout while receiving data)
-                    status=0,  # Do not retry on specific HTTP status codes
-                    redirect=0,  # No retries for redirects
-                    raise_on_redirect=False,
-                    raise_on_status=False,
-                    allowed_methods=["POST"],  # Enable retries for POST requests
-                ),
-            }
-        )
-    else:
-        merge_kwargs.update(
-            {
-                "timeout": 3,
-                "retries": urllib3.util.Retry(total=3, connect=None, read=None, redirect=0, status=None),
-            }
-        )
+def conditional_get(get_version):
+    """
+    Answers If-None-Match with 304 before the endpoint loads anything, get_version is called with the arguments of the
+    endpoint and returns a ResourceVersionModel, or None to serve the response without validators.
+    """
+
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            version = get_version(*args, **kwargs)
 
-    merge_kwargs.update(kwargs)
+            if not version:
+                return func(*args, **kwargs)
 
-    _log_request(method, *args, **merge_kwargs)
-    if method == "POST":
-        # Avoid caching connections for POST, use new pool every time.
-        with urllib3.PoolManager() as http_temp:
-            response = http_temp.request(method, *args, **merge_kwargs)
-    else:
-        response = http_pool.request(method, *args, **merge_kwargs)
-    _log_response(response)
+            headers = {"ETag": f'"{version.tag}"', "Cache-Control": "private, no-cache"}
 
-    return response
+            if version.last_modified:
+                headers["Last-Modified"] = http_date(version.last_modified.replace(tzinfo=timezone.utc))
 
+            # If-Modified-Since isn't evaluated, several changes can happen within the second it is precise to
+            if request.if_none_match.contains_weak(version.tag):
+                return None, 304, headers
 
-def _log_request(method, *args, **kwargs):
-    log_kwargs = deepcopy(kwargs)
-    headers = log_kwargs.get("headers", {})
+            response = func(*args, **kwargs)
 
-    redact_headers = [
-        "Authorization",
-        "X-Shopify-Access-Token",
-        "X-Shopify-Storefront-Access-Token",
-        "Api-Token",
-        "X-Api-Access-Token",
-        "X-Postmark-Server-Token",
-    ]
-    for h in redact_headers:
-        if h in headers:
-            headers[h] = "***"
+            if isinstance(response, tuple) and len(response) == 2 and response[1] == 200:
+                return response[0], 200, headers
 
-    logger.debug(f"Making {method} request with args {args} {log_kwargs}")
+            return response
 
+        return wrapper
 
-def _log_response(response):
-    logger.debug(f"Received response {response.status} with data {response.data}")
+    return decorator
@@ -1,4 +1,6 @@
 import os
+from contextlib import contextmanager
+from typing import Callable, ContextManager
 
 db_user = os.getenv("DB_USER", "postgres")
 db_password = os.getenv("DB_PASSWORD", "postgres")
@@ -22,17 +24,41 @@ engine_options = dict(
 
 if os.getenv("USE_FLASK") == "false":
     from sqlalchemy import create_engine
-    from sqlalchemy.orm import sessionmaker
+    from sqlalchemy.orm import sessionmaker, scoped_session
 
     engine = create_engine(DATABASE_URL)
     Session = sessionmaker(bind=engine)
 
     class DBManager:
         def __init__(self):
-            self.session = Session()
+            # thread local, so work handed off to worker threads doesn't share the session of the caller
+            self.session = scoped_session(Session)
 
     db = DBManager()
+
+    def thread_session_scope() -> Callable[[], ContextManager]:
+        """Context manager factory giving code running in a worker thread its own session."""
+
+        @contextmanager
+        def session_scope():
+            try:
+                yield
+            finally:
+                db.session.remove()
+
+        return session_scope
+
 else:
     from flask_sqlalchemy import SQLAlchemy
 
     db = SQLAlchemy(engine_options=engine_options)
+
+    def thread_session_scope() -> Callable[[], ContextManager]:
+        """
+        Context manager factory giving code running in a worker thread its own session. Must be called in the thread
+        owning the app context, sessions are scoped to app contexts and removed when the context is torn down.
+        """
+
+        from flask import current_app
+
+        return current_app._get_current_object().app_context
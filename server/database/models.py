@@ -189,6 +189,9 @@ class Look(Base, SerializableMixin):
     created_at = Column(DateTime, default=text("now()"), nullable=False)
     updated_at = Column(DateTime, default=text("now()"), nullable=False)
 
+    # versions looks of a user without reading them
+    __table_args__ = (Index("ix_looks_user_id_updated_at", "user_id", "updated_at"),)
+
 
 class Role(Base, SerializableMixin):
     __tablename__ = "roles"
@@ -381,6 +384,31 @@ class Webhook(Base):
     )
     type = Column(String, nullable=False)
     payload = Column(JSON, default=dict, nullable=False)
+    shopify_webhook_id = Column(String, nullable=True)
+    # queued for the worker, processing is tracked apart from it as a queued webhook can still fail to be processed
+    queued_at = Column(DateTime, nullable=True)
+    # taken by whoever processes the webhook, a claim older than the claim timeout was left by a crashed process
+    claimed_at = Column(DateTime, nullable=True)
+    # redeliveries of a webhook are only skipped once it's processed
+    processed_at = Column(DateTime, nullable=True)
+    created_at = Column(DateTime, default=text("now()"), nullable=False)
+
+    __table_args__ = (Index("ix_webhooks_shopify_webhook_id_type", "shopify_webhook_id", "type", unique=True),)
+
+
+class WebhookDeadLetter(Base):
+    __tablename__ = "webhook_dead_letters"
+    id = Column(
+        UUID(as_uuid=True),
+        primary_key=True,
+        default=uuid.uuid4,
+        server_default=text("uuid_generate_v4()"),
+        nullable=False,
+    )
+    webhook_id = Column(UUID(as_uuid=True), ForeignKey("webhooks.id"), nullable=False, index=True)
+    type = Column(String, nullable=False)
+    error = Column(String, nullable=True)
+    attempts = Column(Integer, nullable=False)
     created_at = Column(DateTime, default=text("now()"), nullable=False)
 
 
@@ -465,9 +493,45 @@ class Discount(Base, SerializableMixin):
     shopify_discount_code_id = Column(BigInteger)
     shopify_virtual_product_id = Column(BigInteger)
     shopify_virtual_product_variant_id = Column(BigInteger)
+    # set once the code is deactivated in shopify
+    deactivated_at = Column(DateTime, nullable=True)
     created_at = Column(DateTime, default=text("now()"), nullable=False)
     updated_at = Column(DateTime, default=text("now()"), nullable=False)
 
+    __table_args__ = (
+        Index(
+            "ix_discounts_active_codes",
+            "id",
+            postgresql_where=text("deactivated_at IS NULL AND shopify_discount_code_id IS NOT NULL"),
+        ),
+    )
+
+
+@enum.unique
+class PooledDiscountCodeType(enum.Enum):
+    TMG_GROUP_50_USD_OFF = "tmg_group_50_usd_off"
+    TMG_GROUP_25_PERCENT_OFF = "tmg_group_25_percent_off"
+
+    def __str__(self):
+        return self.value
+
+
+class PooledDiscountCode(Base):
+    __tablename__ = "pooled_discount_codes"
+    id = Column(
+        UUID(as_uuid=True),
+        primary_key=True,
+        default=uuid.uuid4,
+        server_default=text("uuid_generate_v4()"),
+        nullable=False,
+    )
+    type = Column(Enum(PooledDiscountCodeType), nullable=False)
+    shopify_discount_code = Column(String, nullable=False, unique=True)
+    shopify_discount_code_id = Column(BigInteger, nullable=False)
+    created_at = Column(DateTime, default=text("now()"), nullable=False)
+
+    __table_args__ = (Index("ix_pooled_discount_codes_type_created_at", "type", "created_at"),)
+
 
 class Size(Base, SerializableMixin):
     __tablename__ = "sizes"
@@ -569,6 +633,50 @@ class AuditLog(Base):
     created_at = Column(DateTime, default=text("now()"), nullable=False)
 
 
+class AuditOutbox(Base):
+    __tablename__ = "audit_outbox"
+
+    # monotonically increasing id preserves the order in which audit messages were written
+    id = Column(BigInteger, primary_key=True, autoincrement=True)
+    type = Column(String, nullable=False)
+    message = Column(JSONB, nullable=False)
+    # failed relays of the message on its own, it's dead-lettered and no longer relayed once they reach the maximum
+    attempts = Column(Integer, default=0, server_default=text("0"), nullable=False)
+    last_error = Column(String, nullable=True)
+    created_at = Column(DateTime, default=text("now()"), nullable=False)
+
+
+class EventReadModel(Base):
+    __tablename__ = "event_read_models"
+
+    event_id = Column(UUID(as_uuid=True), ForeignKey("events.id", ondelete="CASCADE"), primary_key=True, nullable=False)
+    # bumped by every change to the event or what it shows, the document is current while it's built off this version
+    version = Column(BigInteger, default=0, server_default=text("0"), nullable=False)
+    built_version = Column(BigInteger, nullable=True)
+    document = Column(JSONB, nullable=True)
+    built_at = Column(DateTime, nullable=True)
+    # when the version was last bumped
+    updated_at = Column(DateTime, default=text("now()"), server_default=text("now()"), nullable=False)
+
+
+class TagReconciliationQueue(Base):
+    __tablename__ = "tag_reconciliation_queue"
+
+    # one pending entry per user, repeated changes only push due_at forward (debounce)
+    user_id = Column(UUID(as_uuid=True), primary_key=True, nullable=False)
+    due_at = Column(DateTime, nullable=False, index=True)
+    enqueued_at = Column(DateTime, default=text("now()"), nullable=False)
+
+
+class SyncCursor(Base):
+    __tablename__ = "sync_cursors"
+
+    # where a paginated sync that didn't get through in one run resumes from
+    name = Column(String, primary_key=True, nullable=False)
+    cursor = Column(String, nullable=False)
+    updated_at = Column(DateTime, default=text("now()"), nullable=False)
+
+
 class UserActivityLog(Base):
     __tablename__ = "user_activity_logs"
 
@@ -598,6 +706,16 @@ class ShopifyProduct(Base):
     )
     product_id = Column(BigInteger, nullable=False, unique=True)
     data = Column(JSONB, default=dict, nullable=False)
+    data_md5 = Column(String, nullable=True)  # of data without updated_at
+    shopify_updated_at = Column(DateTime, nullable=True)  # updated_at of the stored payload, in utc
     is_deleted = Column(Boolean, nullable=False, default=False)
     created_at = Column(DateTime, default=text("now()"), nullable=False)
     updated_at = Column(DateTime, default=text("now()"), nullable=False)
+
+    __table_args__ = (
+        Index(
+            "ix_shopify_products_variants_id",
+            text("jsonb_path_query_array(data, '$.variants[*].id')"),
+            postgresql_using="gin",
+        ),
+    )
@@ -1,8 +1,5 @@
 import os
 
-import sentry_sdk
-from sentry_sdk.integrations.logging import ignore_logger
-
 from server.version import get_version
 
 
@@ -10,6 +7,10 @@ def init_sentry():
     if os.getenv("TMG_APP_TESTING", "false").lower() == "true" or not os.getenv("STAGE"):
         return
 
+    # imported here, sentry is not needed (and not worth the import time) when it is disabled
+    import sentry_sdk
+    from sentry_sdk.integrations.logging import ignore_logger
+
     sentry_sdk.init(
         dsn="https://8e6bac4bea5b3bf97a544417ca20e275@o4507018035724288.ingest.us.sentry.io/4507018177609728",
         environment=os.getenv("STAGE"),
@@ -1,28 +1,30 @@
 import json
 import os
+from datetime import timedelta
+from typing import Optional, TYPE_CHECKING
 
 from aws_lambda_powertools import Logger
 from aws_lambda_powertools.utilities.typing import LambdaContext
 
-from server.flask_app import FlaskApp
 from server.handlers import init_sentry
-from server.models.audit_log_model import AuditLogMessage
-from server.services.attendee_service import AttendeeService
-from server.services.audit_service import AuditLogService
-from server.services.event_service import EventService
-from server.services.integrations.shopify_service import ShopifyService
-from server.services.look_service import LookService
-from server.services.order_service import OrderService
-from server.services.role_service import RoleService
-from server.services.tagging_service import TaggingService
-from server.services.user_activity_log_service import UserActivityLogService
-from server.services.user_service import UserService
+
+# service modules pull in sqlalchemy, pydantic models and integrations, they are imported when the service graph is
+# built on the first invocation instead of at module load
+if TYPE_CHECKING:
+    from server.services.audit_message_codec import AuditMessageCodec
+    from server.services.audit_service import AuditLogService
+    from server.services.integrations.shopify_service import AbstractShopifyService
 
 init_sentry()
 
 logger = Logger(service="audit-log-processor")
 
 ONLINE_STORE_SALES_CHANNEL_ID = os.getenv("online_store_sales_channel_id", "gid://shopify/Publication/94480072835")
+AUDIT_LOG_BATCH_MODE = os.getenv("AUDIT_LOG_BATCH_MODE", "true").lower() == "true"
+TAG_RECONCILIATION_DEBOUNCE_SECONDS = int(os.getenv("TAG_RECONCILIATION_DEBOUNCE_SECONDS", 30))
+
+# built once per container and reused by warm invocations
+__services: Optional[tuple["AuditLogService", "AuditMessageCodec"]] = None
 
 
 class FakeLambdaContext(LambdaContext):
@@ -35,11 +37,102 @@ class FakeLambdaContext(LambdaContext):
 
 @logger.inject_lambda_context
 def lambda_handler(event: dict, context: LambdaContext):
-    shopify_service = (
-        FlaskApp().current().shopify_service
-        if __in_test_context(context)
-        else ShopifyService(ONLINE_STORE_SALES_CHANNEL_ID)
-    )
+    audit_log_service, audit_message_codec = __get_services(context)
+
+    records = event.get("Records", [])
+
+    if not AUDIT_LOG_BATCH_MODE:
+        for record in records:
+            message = record.get("body", "{}")
+
+            try:
+                audit_log_service.process(audit_message_codec.decode(message))
+            except Exception as e:
+                logger.exception(f"Error processing audit message: {message}")
+
+        return {"statusCode": 200, "body": json.dumps("Messages processed successfully")}
+
+    batch_item_failures = __process_batch(audit_log_service, audit_message_codec, records)
+
+    # with ReportBatchItemFailures enabled on the event source only the failed records are returned to the queue
+    return {
+        "statusCode": 200,
+        "body": json.dumps(f"Processed {len(records) - len(batch_item_failures)} of {len(records)} messages"),
+        "batchItemFailures": batch_item_failures,
+    }
+
+
+def __process_batch(
+    audit_log_service: "AuditLogService", audit_message_codec: "AuditMessageCodec", records: list[dict]
+) -> list[dict[str, str]]:
+    failed_record_ids = []
+    record_ids_by_message_id: dict[str, list[str]] = {}
+    audit_log_messages = []
+
+    for index, record in enumerate(records):
+        record_id = record.get("messageId", str(index))
+        message = record.get("body", "{}")
+
+        try:
+            audit_log_message = audit_message_codec.decode(message)
+        except Exception as e:
+            logger.exception(f"Error parsing audit message: {message}")
+            failed_record_ids.append(record_id)
+            continue
+
+        audit_log_messages.append(audit_log_message)
+        record_ids_by_message_id.setdefault(audit_log_message.id, []).append(record_id)
+
+    for failed_message_id in audit_log_service.process_batch(audit_log_messages):
+        failed_record_ids.extend(record_ids_by_message_id.get(failed_message_id, []))
+
+    return [{"itemIdentifier": record_id} for record_id in failed_record_ids]
+
+
+def __get_services(context: LambdaContext) -> tuple["AuditLogService", "AuditMessageCodec"]:
+    global __services
+
+    if __in_test_context(context):
+        from server.flask_app import FlaskApp
+
+        # every test runs against its own app and fake integrations, nothing can be reused between invocations
+        return __create_services(
+            FlaskApp.current().shopify_service,
+            FlaskApp.current().audit_message_codec,
+            # tests expect tags right after the message is processed
+            timedelta(seconds=0),
+        )
+
+    if __services is None:
+        from server.services.audit_message_codec import AuditMessageCodec
+        from server.services.integrations.aws_service import AWSService
+        from server.services.integrations.shopify_service import ShopifyService
+
+        __services = __create_services(
+            ShopifyService(ONLINE_STORE_SALES_CHANNEL_ID),
+            AuditMessageCodec(AWSService()),
+            timedelta(seconds=TAG_RECONCILIATION_DEBOUNCE_SECONDS),
+        )
+
+    return __services
+
+
+def __create_services(
+    shopify_service: "AbstractShopifyService",
+    audit_message_codec: "AuditMessageCodec",
+    tag_reconciliation_debounce: timedelta,
+) -> tuple["AuditLogService", "AuditMessageCodec"]:
+    from server.services.attendee_service import AttendeeService
+    from server.services.audit_service import AuditLogService
+    from server.services.event_read_model_service import EventReadModelService
+    from server.services.event_service import EventService
+    from server.services.look_service import LookService
+    from server.services.order_service import OrderService
+    from server.services.role_service import RoleService
+    from server.services.tagging_service import TaggingService
+    from server.services.user_activity_log_service import UserActivityLogService
+    from server.services.user_service import UserService
+
     user_service = UserService(shopify_service)
     attendee_service = AttendeeService(shopify_service, user_service, None, None, None)
     event_service = EventService()
@@ -55,18 +148,15 @@ def lambda_handler(event: dict, context: LambdaContext):
         attendee_service,
         look_service,
         shopify_service,
+        reconciliation_debounce=tag_reconciliation_debounce,
     )
-    audit_log_service = AuditLogService(tagging_service, user_activity_log_service)
 
-    for record in event.get("Records", []):
-        message = record.get("body", "{}")
+    event_read_model_service = EventReadModelService(attendee_service, role_service, look_service)
 
-        try:
-            audit_log_service.process(AuditLogMessage.from_string(message))
-        except Exception as e:
-            logger.exception(f"Error processing audit message: {message}")
+    audit_log_service = AuditLogService(tagging_service, user_activity_log_service)
+    audit_log_service.subscribe(event_read_model_service.audit_subscriber())
 
-    return {"statusCode": 200, "body": json.dumps("Messages processed successfully")}
+    return audit_log_service, audit_message_codec
 
 
 def __in_test_context(context) -> bool:
@@ -0,0 +1,66 @@
+import json
+import os
+import time
+
+from aws_lambda_powertools import Logger
+from aws_lambda_powertools.utilities.typing import LambdaContext
+
+from server.flask_app import FlaskApp
+from server.handlers import init_sentry
+from server.services.audit_message_codec import AuditMessageCodec
+from server.services.audit_outbox_service import AuditOutboxService
+from server.services.integrations.aws_service import AWSService
+
+init_sentry()
+
+logger = Logger(service="audit-outbox-relay")
+
+AUDIT_QUEUE_URL = os.getenv("AUDIT_QUEUE_URL", "https://sqs.us-west-2.amazonaws.com/123456789012/audit")
+RELAY_BATCH_SIZE = int(os.getenv("AUDIT_OUTBOX_RELAY_BATCH_SIZE", 100))
+POLL_INTERVAL_SECONDS = 1
+# stop polling early enough to finish the in-flight batch before the lambda times out
+STOP_BEFORE_TIMEOUT_MILLIS = 10000
+
+
+class FakeLambdaContext(LambdaContext):
+    def __init__(self):
+        self._function_name = "test_function"
+        self._memory_limit_in_mb = 128
+        self._invoked_function_arn = "arn:aws:lambda:us-east-1:123456789012:function:test_function"
+        self._aws_request_id = "test-request-id"
+
+    @staticmethod
+    def get_remaining_time_in_millis() -> int:
+        return 0
+
+
+@logger.inject_lambda_context
+def lambda_handler(event: dict, context: LambdaContext):
+    audit_outbox_service = (
+        FlaskApp.current().audit_outbox_service if __in_test_context(context) else __create_audit_outbox_service()
+    )
+
+    num_relayed = audit_outbox_service.relay_all(RELAY_BATCH_SIZE)
+
+    # schedule fires once a minute, keep draining the outbox in between so messages are not delayed for a minute
+    while context.get_remaining_time_in_millis() > STOP_BEFORE_TIMEOUT_MILLIS:
+        num_relayed_in_poll = audit_outbox_service.relay_all(RELAY_BATCH_SIZE)
+
+        if not num_relayed_in_poll:
+            time.sleep(POLL_INTERVAL_SECONDS)
+
+        num_relayed += num_relayed_in_poll
+
+    logger.info(f"Relayed {num_relayed} audit messages")
+
+    return {"statusCode": 200, "body": json.dumps(f"Relayed {num_relayed} messages")}
+
+
+def __create_audit_outbox_service() -> AuditOutboxService:
+    aws_service = AWSService()
+
+    return AuditOutboxService(aws_service, AuditMessageCodec(aws_service), AUDIT_QUEUE_URL)
+
+
+def __in_test_context(context) -> bool:
+    return isinstance(context, FakeLambdaContext)
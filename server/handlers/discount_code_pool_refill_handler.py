@@ -0,0 +1,49 @@
+import json
+import os
+
+from aws_lambda_powertools import Logger
+from aws_lambda_powertools.utilities.typing import LambdaContext
+
+from server.flask_app import FlaskApp
+from server.handlers import init_sentry
+from server.services.discount_code_pool_service import (
+    DiscountCodePoolService,
+    DISCOUNT_CODE_POOL_SIZE,
+    DISCOUNT_CODE_POOL_LOW_WATERMARK,
+)
+from server.services.integrations.shopify_service import ShopifyService
+
+init_sentry()
+
+logger = Logger(service="discount-code-pool-refill")
+
+ONLINE_STORE_SALES_CHANNEL_ID = os.getenv("online_store_sales_channel_id", "gid://shopify/Publication/94480072835")
+POOL_SIZE = int(os.getenv("DISCOUNT_CODE_POOL_SIZE", DISCOUNT_CODE_POOL_SIZE))
+LOW_WATERMARK = int(os.getenv("DISCOUNT_CODE_POOL_LOW_WATERMARK", DISCOUNT_CODE_POOL_LOW_WATERMARK))
+
+
+class FakeLambdaContext(LambdaContext):
+    def __init__(self):
+        self._function_name = "test_function"
+        self._memory_limit_in_mb = 128
+        self._invoked_function_arn = "arn:aws:lambda:us-east-1:123456789012:function:test_function"
+        self._aws_request_id = "test-request-id"
+
+
+@logger.inject_lambda_context
+def lambda_handler(event: dict, context: LambdaContext):
+    # applying discounts in the cart claims group discount codes from the pool instead of creating them in shopify
+    if __in_test_context(context):
+        discount_code_pool_service = FlaskApp.current().discount_code_pool_service
+    else:
+        discount_code_pool_service = DiscountCodePoolService(
+            ShopifyService(ONLINE_STORE_SALES_CHANNEL_ID), POOL_SIZE, LOW_WATERMARK
+        )
+
+    result = discount_code_pool_service.refill()
+
+    return {"statusCode": 200, "body": json.dumps(result)}
+
+
+def __in_test_context(context) -> bool:
+    return isinstance(context, FakeLambdaContext)
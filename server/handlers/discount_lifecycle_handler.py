@@ -0,0 +1,43 @@
+import json
+import os
+
+from aws_lambda_powertools import Logger
+from aws_lambda_powertools.utilities.typing import LambdaContext
+
+from server.flask_app import FlaskApp
+from server.handlers import init_sentry
+from server.services.discount_service import DiscountService, DISCOUNT_DEACTIVATION_BATCH_SIZE
+from server.services.integrations.shopify_service import ShopifyService
+
+init_sentry()
+
+logger = Logger(service="discount-lifecycle")
+
+ONLINE_STORE_SALES_CHANNEL_ID = os.getenv("online_store_sales_channel_id", "gid://shopify/Publication/94480072835")
+BATCH_SIZE = int(os.getenv("DISCOUNT_DEACTIVATION_BATCH_SIZE", DISCOUNT_DEACTIVATION_BATCH_SIZE))
+# keeps a run well within the lambda timeout, the next run picks up where this one stopped
+MAX_BATCHES = int(os.getenv("DISCOUNT_DEACTIVATION_MAX_BATCHES", 50))
+
+
+class FakeLambdaContext(LambdaContext):
+    def __init__(self):
+        self._function_name = "test_function"
+        self._memory_limit_in_mb = 128
+        self._invoked_function_arn = "arn:aws:lambda:us-east-1:123456789012:function:test_function"
+        self._aws_request_id = "test-request-id"
+
+
+@logger.inject_lambda_context
+def lambda_handler(event: dict, context: LambdaContext):
+    if __in_test_context(context):
+        discount_service = FlaskApp.current().discount_service
+    else:
+        discount_service = DiscountService(ShopifyService(ONLINE_STORE_SALES_CHANNEL_ID), None, None, None, None, None)
+
+    result = discount_service.deactivate_used_and_expired_discounts(BATCH_SIZE, MAX_BATCHES)
+
+    return {"statusCode": 200, "body": json.dumps(result)}
+
+
+def __in_test_context(context) -> bool:
+    return isinstance(context, FakeLambdaContext)
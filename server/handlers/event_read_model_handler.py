@@ -0,0 +1,54 @@
+import json
+import os
+
+from aws_lambda_powertools import Logger
+from aws_lambda_powertools.utilities.typing import LambdaContext
+
+from server.flask_app import FlaskApp
+from server.handlers import init_sentry
+from server.services.attendee_service import AttendeeService
+from server.services.event_read_model_service import EventReadModelService, DEFAULT_EVENT_READ_MODEL_BATCH_SIZE
+from server.services.look_service import LookService
+from server.services.role_service import RoleService
+
+init_sentry()
+
+logger = Logger(service="event-read-model")
+
+BATCH_SIZE = int(os.getenv("EVENT_READ_MODEL_BATCH_SIZE", DEFAULT_EVENT_READ_MODEL_BATCH_SIZE))
+REBUILD_ACTION = "rebuild"
+CHECK_ACTION = "check"
+
+
+class FakeLambdaContext(LambdaContext):
+    def __init__(self):
+        self._function_name = "test_function"
+        self._memory_limit_in_mb = 128
+        self._invoked_function_arn = "arn:aws:lambda:us-east-1:123456789012:function:test_function"
+        self._aws_request_id = "test-request-id"
+
+
+@logger.inject_lambda_context
+def lambda_handler(event: dict, context: LambdaContext):
+    if __in_test_context(context):
+        event_read_model_service = FlaskApp.current().event_read_model_service
+    else:
+        event_read_model_service = EventReadModelService(
+            AttendeeService(None, None, None, None, None), RoleService(), LookService(None, None, None)
+        )
+
+    # scheduled runs check consistency, rebuilding everything is invoked by hand with {"action": "rebuild"}
+    action = event.get("action", CHECK_ACTION)
+
+    if action == REBUILD_ACTION:
+        result = {"rebuilt": event_read_model_service.rebuild(BATCH_SIZE)}
+    elif action == CHECK_ACTION:
+        result = event_read_model_service.check_consistency(BATCH_SIZE)
+    else:
+        return {"statusCode": 400, "body": json.dumps(f"Unknown action: {action}")}
+
+    return {"statusCode": 200, "body": json.dumps(result)}
+
+
+def __in_test_context(context) -> bool:
+    return isinstance(context, FakeLambdaContext)
@@ -0,0 +1,47 @@
+import json
+import os
+
+from aws_lambda_powertools import Logger
+from aws_lambda_powertools.utilities.typing import LambdaContext
+
+from server.flask_app import FlaskApp
+from server.handlers import init_sentry
+from server.services.integrations.shiphero_service import ShipHeroService
+from server.services.product_service import ProductService
+from server.services.shiphero_catalog_service import ShipHeroCatalogService, DEFAULT_CATALOG_PAGE_SIZE
+
+init_sentry()
+
+logger = Logger(service="shiphero-catalog-sync")
+
+CATALOG_PAGE_SIZE = int(os.getenv("SHIPHERO_CATALOG_PAGE_SIZE", DEFAULT_CATALOG_PAGE_SIZE))
+# keeps a run well within the lambda timeout, the next run resumes from where it stopped
+MAX_PAGES = int(os.getenv("SHIPHERO_CATALOG_MAX_PAGES", 500))
+
+
+class FakeLambdaContext(LambdaContext):
+    def __init__(self):
+        self._function_name = "test_function"
+        self._memory_limit_in_mb = 128
+        self._invoked_function_arn = "arn:aws:lambda:us-east-1:123456789012:function:test_function"
+        self._aws_request_id = "test-request-id"
+
+
+@logger.inject_lambda_context
+def lambda_handler(event: dict, context: LambdaContext):
+    # order processing only calls shiphero for skus that aren't synced yet
+    if __in_test_context(context):
+        shiphero_catalog_service = FlaskApp.current().shiphero_catalog_service
+    else:
+        shiphero_catalog_service = ShipHeroCatalogService(ShipHeroService(), ProductService())
+
+    result = shiphero_catalog_service.sync_catalog(CATALOG_PAGE_SIZE, MAX_PAGES)
+
+    if not result["complete"]:
+        logger.info(f"ShipHero catalog sync stopped after {MAX_PAGES} pages, the next run resumes from there")
+
+    return {"statusCode": 200, "body": json.dumps(result)}
+
+
+def __in_test_context(context) -> bool:
+    return isinstance(context, FakeLambdaContext)
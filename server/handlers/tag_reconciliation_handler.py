@@ -0,0 +1,67 @@
+import json
+import os
+
+from aws_lambda_powertools import Logger
+from aws_lambda_powertools.utilities.typing import LambdaContext
+
+from server.flask_app import FlaskApp
+from server.handlers import init_sentry
+from server.services.attendee_service import AttendeeService
+from server.services.event_service import EventService
+from server.services.integrations.shopify_service import ShopifyService
+from server.services.look_service import LookService
+from server.services.tagging_service import TaggingService
+from server.services.user_service import UserService
+
+init_sentry()
+
+logger = Logger(service="tag-reconciliation")
+
+ONLINE_STORE_SALES_CHANNEL_ID = os.getenv("online_store_sales_channel_id", "gid://shopify/Publication/94480072835")
+RECONCILIATION_BATCH_SIZE = int(os.getenv("TAG_RECONCILIATION_BATCH_SIZE", 100))
+MAX_BATCHES = 50
+
+
+class FakeLambdaContext(LambdaContext):
+    def __init__(self):
+        self._function_name = "test_function"
+        self._memory_limit_in_mb = 128
+        self._invoked_function_arn = "arn:aws:lambda:us-east-1:123456789012:function:test_function"
+        self._aws_request_id = "test-request-id"
+
+
+@logger.inject_lambda_context
+def lambda_handler(event: dict, context: LambdaContext):
+    # audit log consumer reconciles after every batch, this picks up customers whose debounce window ran out while
+    # no audit messages were coming in
+    tagging_service = FlaskApp.current().tagging_service if __in_test_context(context) else __create_tagging_service()
+
+    num_reconciled = 0
+
+    for _ in range(MAX_BATCHES):
+        num_reconciled_in_batch = tagging_service.reconcile_customer_tags(RECONCILIATION_BATCH_SIZE)
+        num_reconciled += num_reconciled_in_batch
+
+        if num_reconciled_in_batch < RECONCILIATION_BATCH_SIZE:
+            break
+
+    logger.info(f"Reconciled tags of {num_reconciled} customers")
+
+    return {"statusCode": 200, "body": json.dumps(f"Reconciled {num_reconciled} customers")}
+
+
+def __create_tagging_service() -> TaggingService:
+    shopify_service = ShopifyService(ONLINE_STORE_SALES_CHANNEL_ID)
+    user_service = UserService(shopify_service)
+
+    return TaggingService(
+        user_service,
+        EventService(),
+        AttendeeService(shopify_service, user_service, None, None, None),
+        LookService(user_service, None, None),
+        shopify_service,
+    )
+
+
+def __in_test_context(context) -> bool:
+    return isinstance(context, FakeLambdaContext)
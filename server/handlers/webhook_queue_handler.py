@@ -0,0 +1,110 @@
+import json
+import os
+import uuid
+
+from aws_lambda_powertools import Logger
+from aws_lambda_powertools.utilities.typing import LambdaContext
+
+from server.flask_app import FlaskApp
+from server.handlers import init_sentry
+
+init_sentry()
+
+logger = Logger(service="webhook-queue-processor")
+
+# sqs redelivers a failed record after its visibility timeout, after this many receives the webhook is dead lettered
+MAX_ATTEMPTS = int(os.getenv("WEBHOOK_MAX_ATTEMPTS", 5))
+
+# webhook handlers need the whole service graph of the api, the app is initialized once per container
+__app = None
+
+
+class FakeLambdaContext(LambdaContext):
+    def __init__(self):
+        self._function_name = "test_function"
+        self._memory_limit_in_mb = 128
+        self._invoked_function_arn = "arn:aws:lambda:us-east-1:123456789012:function:test_function"
+        self._aws_request_id = "test-request-id"
+
+
+@logger.inject_lambda_context
+def lambda_handler(event: dict, context: LambdaContext):
+    records = event.get("Records", [])
+
+    if __in_test_context(context):
+        batch_item_failures = __process_records(records)
+    else:
+        with __get_app().app_context():
+            batch_item_failures = __process_records(records)
+
+    # with ReportBatchItemFailures enabled on the event source only the failed records are returned to the queue
+    return {
+        "statusCode": 200,
+        "body": json.dumps(f"Processed {len(records) - len(batch_item_failures)} of {len(records)} webhooks"),
+        "batchItemFailures": batch_item_failures,
+    }
+
+
+def __process_records(records: list[dict]) -> list[dict[str, str]]:
+    webhook_queue_service = FlaskApp.current().webhook_queue_service
+    batch_item_failures = []
+    messages = []
+
+    for index, record in enumerate(records):
+        try:
+            message = json.loads(record.get("body", "{}"))
+            webhook_id = uuid.UUID(message["webhook_id"])
+            topic = message.get("topic")
+        except Exception:
+            # retrying won't make a malformed message any better
+            logger.exception(f"Dropping malformed webhook queue message: {record.get('body')}")
+            continue
+
+        messages.append((record, record.get("messageId", str(index)), webhook_id, topic))
+
+    try:
+        superseded_webhook_ids = webhook_queue_service.get_superseded_webhook_ids(
+            [webhook_id for _, _, webhook_id, _ in messages]
+        )
+    except Exception:
+        logger.exception("Failed to coalesce webhooks, processing all of them")
+        superseded_webhook_ids = set()
+
+    for record, record_id, webhook_id, topic in messages:
+        if webhook_id in superseded_webhook_ids:
+            logger.info(f"Skipping webhook {webhook_id} with topic {topic}, superseded by a newer one in the batch")
+            continue
+
+        attempts = int(record.get("attributes", {}).get("ApproximateReceiveCount", 1))
+
+        try:
+            webhook_queue_service.process(webhook_id)
+        except Exception as e:
+            logger.exception(f"Error processing webhook {webhook_id} (attempt {attempts} of {MAX_ATTEMPTS}): {e}")
+
+            if attempts < MAX_ATTEMPTS:
+                batch_item_failures.append({"itemIdentifier": record_id})
+                continue
+
+            try:
+                webhook_queue_service.dead_letter(webhook_id, topic, str(e), attempts)
+            except Exception:
+                batch_item_failures.append({"itemIdentifier": record_id})
+
+    return batch_item_failures
+
+
+def __get_app():
+    global __app
+
+    if __app is None:
+        from server.app import init_app, init_db
+
+        __app = init_app().app
+        init_db()
+
+    return __app
+
+
+def __in_test_context(context) -> bool:
+    return isinstance(context, FakeLambdaContext)
@@ -96,3 +96,7 @@ class UpdateAttendeeModel(CoreModel):
     is_active: bool = True
     role_id: Optional[UUID] = None
     look_id: Optional[UUID] = None
+
+
+class BatchUpdateAttendeeModel(UpdateAttendeeModel):
+    id: UUID
@@ -1,8 +1,11 @@
 import json
+from enum import Enum
 from typing import Dict, Any, Optional
 
 from pydantic import BaseModel
 
+AUDIT_LOG_MESSAGE_ENVELOPE_VERSION = 2
+
 
 class AuditLogMessage(BaseModel):
     id: str
@@ -17,3 +20,30 @@ class AuditLogMessage(BaseModel):
     @classmethod
     def from_string(cls, string: str) -> "AuditLogMessage":
         return cls.model_validate_json(string)
+
+
+class AuditLogMessageEncoding(str, Enum):
+    GZIP = "gzip"
+    S3_GZIP = "s3+gzip"
+
+    def __str__(self):
+        return self.value
+
+
+class AuditLogMessageEnvelope(BaseModel):
+    """
+    Wraps an encoded AuditLogMessage. Messages sent before envelopes were introduced are plain AuditLogMessage json
+    (version 1) and have no "version" field. For "gzip" data holds base64 of the gzipped message, for "s3+gzip" the
+    gzipped message is stored in S3 under bucket/key.
+    """
+
+    version: int = AUDIT_LOG_MESSAGE_ENVELOPE_VERSION
+    encoding: AuditLogMessageEncoding
+    id: Optional[str] = None
+    type: Optional[str] = None
+    data: Optional[str] = None
+    bucket: Optional[str] = None
+    key: Optional[str] = None
+
+    def to_string(self) -> str:
+        return self.model_dump_json(exclude_none=True)
@@ -6,7 +6,7 @@ from uuid import UUID
 from pydantic import field_validator
 
 from server.models import CoreModel
-from server.models.attendee_model import AttendeeModel
+from server.models.attendee_model import AttendeeModel, EnrichedAttendeeModel
 from server.models.look_model import LookModel
 from server.models.role_model import RoleModel
 from server.models.user_model import UserModel
@@ -106,5 +106,13 @@ class EventModel(CoreModel):
         return response
 
 
+class EventReadModelDocument(CoreModel):
+    # what enriched event responses show besides the event itself, notifications depend on the current date and looks
+    # are stored without prices, they aren't shown and change with the products, which don't bump the version
+    attendees: List[EnrichedAttendeeModel] = []
+    looks: List[LookModel] = []
+    roles: List[RoleModel] = []
+
+
 class UpdateEventModel(EventRequestModel):
     pass
@@ -0,0 +1,10 @@
+from datetime import datetime
+from typing import Optional
+
+from server.models import CoreModel
+
+
+class ResourceVersionModel(CoreModel):
+    # changes whenever the response of the resource does, served as its ETag
+    tag: str
+    last_modified: Optional[datetime] = None
@@ -1,3 +1,5 @@
+from typing import Optional
+
 from pydantic import BaseModel
 
 
@@ -6,3 +8,8 @@ class ShipHeroProductModel(BaseModel):
     name: str
     sku: str
     price: float = 0.0
+
+
+class ShipHeroProductsPageModel(BaseModel):
+    products: list[ShipHeroProductModel] = []
+    next_cursor: Optional[str] = None
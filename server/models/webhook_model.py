@@ -1,4 +1,4 @@
-from typing import Any, Dict
+from typing import Any, Dict, Optional
 from uuid import UUID
 
 from server.models import CoreModel
@@ -8,6 +8,7 @@ class WebhookModel(CoreModel):
     id: UUID
     type: str
     payload: Dict[str, Any]
+    shopify_webhook_id: Optional[str] = None
 
     class Config:
         from_attributes = True
@@ -1,21 +1,24 @@
 import os
 import uuid
 from datetime import datetime
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Set, Tuple, Union
 
-from sqlalchemy import and_, func, select
+from sqlalchemy import func, select, true
+from sqlalchemy.dialects.postgresql import aggregate_order_by
 
 from server.database.database_manager import db
-from server.database.models import Attendee, DiscountType, Event, User, Role, Look, Size, Order
+from server.database.models import Attendee, Discount, DiscountType, Event, User, Role, Look, Size, Order
 from server.flask_app import FlaskApp
 from server.models.attendee_model import (
     AttendeeModel,
     CreateAttendeeModel,
     UpdateAttendeeModel,
+    BatchUpdateAttendeeModel,
     EnrichedAttendeeModel,
     AttendeeUserModel,
     TrackingModel,
 )
+from server.models.discount_model import DiscountGiftCodeModel
 from server.models.event_model import EventModel
 from server.models.look_model import LookModel
 from server.models.role_model import RoleModel
@@ -28,6 +31,7 @@ from server.services.look_service import LookService
 from server.services.user_service import UserService
 
 STAGE = os.getenv("STAGE")
+ONLINE_STORE_SHOP_ID = os.getenv("online_store_shop_id", "56965365891")
 DATA_CDN = os.getenv("DATA_CDN")
 
 
@@ -95,80 +99,174 @@ class AttendeeService:
     def get_attendees_for_events(
         self, event_ids: List[uuid.UUID], user_id: Optional[uuid.UUID] = None
     ) -> Dict[uuid.UUID, List[EnrichedAttendeeModel]]:
+        """Reads only the columns the response needs, tracking and gift codes come from lateral subqueries."""
+
+        tracking = (
+            select(
+                func.json_agg(
+                    aggregate_order_by(
+                        func.json_build_object(
+                            "outbound_tracking", Order.outbound_tracking, "shopify_order_id", Order.shopify_order_id
+                        ),
+                        Order.created_at,
+                    )
+                ).label("orders")
+            )
+            .where(
+                Order.event_id == Attendee.event_id,
+                Order.user_id == Attendee.user_id,
+                Order.outbound_tracking.isnot(None),
+                Order.outbound_tracking != "",
+            )
+            .lateral("tracking")
+        )
 
-        query = (
-            db.session.query(
-                Attendee,
-                Event,
-                User,
-                Role,
-                Look,
-                func.array_agg(
-                    func.json_build_object(
-                        "outbound_tracking", Order.outbound_tracking, "shopify_order_id", Order.shopify_order_id
+        gift_codes = (
+            select(
+                func.json_agg(
+                    aggregate_order_by(
+                        func.json_build_object(
+                            "code",
+                            Discount.shopify_discount_code,
+                            "amount",
+                            Discount.amount,
+                            "type",
+                            Discount.type,
+                            "used",
+                            Discount.used,
+                        ),
+                        Discount.created_at,
                     )
-                ).label("order_tracking"),
+                ).label("codes")
+            )
+            .where(
+                Discount.attendee_id == Attendee.id,
+                Discount.type == DiscountType.GIFT,
+                Discount.shopify_discount_code.isnot(None),
+            )
+            .lateral("gift_codes")
+        )
+
+        query = (
+            select(
+                Attendee.id,
+                Attendee.first_name,
+                Attendee.last_name,
+                Attendee.email,
+                Attendee.user_id,
+                Attendee.event_id,
+                Attendee.style,
+                Attendee.invite,
+                Attendee.pay,
+                Attendee.size,
+                Attendee.ship,
+                Attendee.role_id,
+                Attendee.look_id,
+                Attendee.is_active,
+                Event.user_id.label("owner_id"),
+                User.id.label("attendee_user_id"),
+                User.first_name.label("user_first_name"),
+                User.last_name.label("user_last_name"),
+                User.email.label("user_email"),
+                Role.name.label("role_name"),
+                Role.event_id.label("role_event_id"),
+                Role.is_active.label("role_is_active"),
+                Look.name.label("look_name"),
+                Look.user_id.label("look_user_id"),
+                Look.product_specs,
+                Look.image_path,
+                Look.is_active.label("look_is_active"),
+                tracking.c.orders,
+                gift_codes.c.codes,
             )
             .join(Event, Event.id == Attendee.event_id)
             .outerjoin(User, User.id == Attendee.user_id)
             .outerjoin(Role, Attendee.role_id == Role.id)
             .outerjoin(Look, Attendee.look_id == Look.id)
-            .outerjoin(Order, and_(Order.event_id == Attendee.event_id, Order.user_id == Attendee.user_id))
-            .filter(Attendee.event_id.in_(event_ids), Attendee.is_active)
-            .group_by(Attendee.id, Event.id, User.id, Role.id, Look.id)
+            .outerjoin(tracking, true())
+            .outerjoin(gift_codes, true())
+            .where(Attendee.event_id.in_(event_ids), Attendee.is_active)
             .order_by(Attendee.created_at.asc())
         )
 
         if user_id is not None:
-            query = query.filter(Attendee.user_id == user_id)
+            query = query.where(Attendee.user_id == user_id)
 
-        db_attendees = query.all()
+        rows = db.session.execute(query).all()
 
-        if not db_attendees:
+        if not rows:
             return {}
 
         attendees = {}
-
-        attendee_ids = {attendee.id for attendee, _, _, _, _, _ in db_attendees}
-        attendees_gift_codes = FlaskApp.current().discount_service.get_discount_codes_for_attendees(
-            attendee_ids, type=DiscountType.GIFT
-        )
-
-        for attendee, event, user, role, look, orders in db_attendees:
-            if attendee.event_id not in attendees:
-                attendees[attendee.event_id] = list()
-
-            attendee_gift_codes = attendees_gift_codes.get(attendee.id, set())
-            has_gift_codes = len(attendee_gift_codes) > 0
-            attendee_tracking = self.__get_tracking_for_attendee(orders)
-
-            attendees[attendee.event_id].append(
-                EnrichedAttendeeModel(
-                    id=attendee.id,
-                    first_name=attendee.first_name or user.first_name,
-                    last_name=attendee.last_name or user.last_name,
-                    email=attendee.email or (user.email if user else None),
-                    user_id=attendee.user_id,
-                    is_owner=(attendee.user_id == event.user_id),
-                    event_id=attendee.event_id,
-                    style=attendee.style,
-                    invite=attendee.invite,
-                    pay=attendee.pay,
-                    size=attendee.size,
-                    ship=attendee.ship or bool(attendee_tracking),
-                    role_id=attendee.role_id,
-                    look_id=attendee.look_id,
-                    role=RoleModel.model_validate(role) if role else None,
-                    look=LookModel.model_validate(look) if look else None,
-                    is_active=attendee.is_active,
+        tracking_url_prefix = self.__get_tracking_url_prefix()
+
+        # the rows come straight from the db, models are constructed without validation
+        for row in rows:
+            if row.event_id not in attendees:
+                attendees[row.event_id] = list()
+
+            attendee_gift_codes = [
+                DiscountGiftCodeModel.model_construct(
+                    code=gift_code["code"],
+                    amount=gift_code["amount"],
+                    type=str(DiscountType[gift_code["type"]]),
+                    used=gift_code["used"],
+                )
+                for gift_code in row.codes or []
+            ]
+            attendee_tracking = [
+                TrackingModel.model_construct(
+                    tracking_number=order["outbound_tracking"],
+                    tracking_url=f"{tracking_url_prefix}{order['shopify_order_id']}",
+                )
+                for order in row.orders or []
+            ]
+            has_user = row.attendee_user_id is not None
+
+            attendees[row.event_id].append(
+                EnrichedAttendeeModel.model_construct(
+                    id=row.id,
+                    first_name=row.first_name or row.user_first_name,
+                    last_name=row.last_name or row.user_last_name,
+                    email=row.email or row.user_email,
+                    user_id=row.user_id,
+                    is_owner=(row.user_id == row.owner_id),
+                    event_id=row.event_id,
+                    style=row.style,
+                    invite=row.invite,
+                    pay=row.pay,
+                    size=row.size,
+                    ship=row.ship or bool(attendee_tracking),
+                    role_id=row.role_id,
+                    look_id=row.look_id,
+                    role=(
+                        RoleModel.model_construct(
+                            id=row.role_id, event_id=row.role_event_id, name=row.role_name, is_active=row.role_is_active
+                        )
+                        if row.role_event_id is not None
+                        else None
+                    ),
+                    look=(
+                        LookModel.model_construct(
+                            id=row.look_id,
+                            name=row.look_name,
+                            user_id=row.look_user_id,
+                            product_specs=row.product_specs,
+                            image_path=row.image_path,
+                            is_active=row.look_is_active,
+                        )
+                        if row.look_user_id is not None
+                        else None
+                    ),
+                    is_active=row.is_active,
                     gift_codes=attendee_gift_codes,
-                    has_gift_codes=has_gift_codes,
+                    has_gift_codes=len(attendee_gift_codes) > 0,
                     tracking=attendee_tracking,
-                    can_be_deleted=(attendee.pay is False and len(attendee_gift_codes) == 0),
-                    user=AttendeeUserModel(
-                        first_name=user.first_name if user else attendee.first_name,
-                        last_name=user.last_name if user else attendee.last_name,
-                        email=user.email if user else attendee.email,
+                    can_be_deleted=(row.pay is False and len(attendee_gift_codes) == 0),
+                    user=AttendeeUserModel.model_construct(
+                        first_name=row.user_first_name if has_user else row.first_name,
+                        last_name=row.user_last_name if has_user else row.last_name,
+                        email=row.user_email if has_user else row.email,
                     ),
                 )
             )
@@ -308,6 +406,269 @@ class AttendeeService:
 
         return AttendeeModel.model_validate(attendee)
 
+    def create_and_update_attendees(
+        self, create_attendees: List[CreateAttendeeModel], update_attendees: List[BatchUpdateAttendeeModel]
+    ) -> Tuple[List[Union[AttendeeModel, ServiceError]], List[Union[AttendeeModel, ServiceError]]]:
+        """
+        Creates and updates attendees the way create_attendee and update_attendee do, validated with a query per kind
+        of check for all of them and applied in one transaction. Results are in the order of the requests, attendees
+        that don't pass validation get the error instead and the others are applied regardless.
+        """
+
+        db_attendees = {
+            attendee.id: attendee
+            for attendee in db.session.execute(
+                select(Attendee).where(
+                    Attendee.id.in_([update_attendee.id for update_attendee in update_attendees]), Attendee.is_active
+                )
+            )
+            .scalars()
+            .all()
+        }
+        event_ids = {create_attendee.event_id for create_attendee in create_attendees} | {
+            attendee.event_id for attendee in db_attendees.values()
+        }
+        events = {
+            event.id: event
+            for event in db.session.execute(select(Event).where(Event.id.in_(event_ids), Event.is_active))
+            .scalars()
+            .all()
+        }
+
+        # attendees by email and user of each event, kept up to date with the batch as it's validated
+        emails_in_events = {event_id: {} for event_id in event_ids}
+        user_ids_in_events = {event_id: set() for event_id in event_ids}
+
+        for attendee_id, event_id, email, user_id in db.session.execute(
+            select(Attendee.id, Attendee.event_id, Attendee.email, Attendee.user_id).where(
+                Attendee.event_id.in_(event_ids), Attendee.is_active
+            )
+        ).all():
+            if email:
+                emails_in_events[event_id][email] = attendee_id
+
+            if user_id:
+                user_ids_in_events[event_id].add(user_id)
+
+        users = self.user_service.get_users_by_ids_or_emails(
+            {attendee.user_id for attendee in db_attendees.values() if attendee.user_id and not attendee.first_name},
+            {create_attendee.email for create_attendee in create_attendees if create_attendee.email},
+        )
+        users_by_id = {user.id: user for user in users}
+        users_by_email = {user.email.lower(): user for user in users}
+        sized_user_ids = set(
+            db.session.execute(select(Size.user_id).where(Size.user_id.in_(users_by_id.keys())).distinct())
+            .scalars()
+            .all()
+        )
+
+        requests = [*create_attendees, *update_attendees]
+        role_ids = set(
+            db.session.execute(
+                select(Role.id).where(Role.id.in_({request.role_id for request in requests if request.role_id}))
+            )
+            .scalars()
+            .all()
+        )
+        look_ids = set(
+            db.session.execute(
+                select(Look.id).where(Look.id.in_({request.look_id for request in requests if request.look_id}))
+            )
+            .scalars()
+            .all()
+        )
+        gift_codes = FlaskApp.current().discount_service.get_discount_codes_for_attendees(
+            set(db_attendees.keys()), type=DiscountType.GIFT
+        )
+
+        created = []
+
+        for create_attendee in create_attendees:
+            try:
+                created.append(
+                    self.__new_attendee(
+                        create_attendee,
+                        events,
+                        emails_in_events,
+                        user_ids_in_events,
+                        users_by_email,
+                        sized_user_ids,
+                        role_ids,
+                        look_ids,
+                    )
+                )
+            except ServiceError as e:
+                created.append(e)
+
+        updated = []
+        changed_looks = []
+
+        for update_attendee in update_attendees:
+            try:
+                attendee = db_attendees.get(update_attendee.id)
+
+                if not attendee:
+                    raise NotFoundError("Attendee not found.")
+
+                previous_look_id, user_id = attendee.look_id, attendee.user_id
+
+                self.__apply_update(
+                    attendee,
+                    update_attendee,
+                    bool(attendee.pay or gift_codes.get(attendee.id)),
+                    emails_in_events[attendee.event_id],
+                    users_by_id,
+                    role_ids,
+                    look_ids,
+                )
+                updated.append(attendee)
+
+                if previous_look_id and previous_look_id != attendee.look_id and user_id:
+                    changed_looks.append((user_id, attendee.look_id))
+            except ServiceError as e:
+                updated.append(e)
+
+        new_attendees = [attendee for attendee in created if isinstance(attendee, Attendee)]
+
+        try:
+            db.session.add_all(new_attendees)
+            db.session.flush()
+
+            # models before committing, the attendees expire with it
+            results = [
+                AttendeeModel.model_validate(result) if isinstance(result, Attendee) else result
+                for result in [*created, *updated]
+            ]
+
+            db.session.commit()
+        except Exception as e:
+            raise ServiceError("Failed to create and update attendees.", e)
+
+        for user_id, look_id in changed_looks:
+            user = self.user_service.get_user_by_id(user_id)
+            look = self.look_service.get_look_by_id(look_id)
+            self.active_campaign_service.sync_contact(user.email, fields={"LOOK_IMAGE": f"{DATA_CDN}{look.image_path}"})
+
+        return results[: len(created)], results[len(created) :]
+
+    @staticmethod
+    def __new_attendee(
+        create_attendee: CreateAttendeeModel,
+        events: Dict[uuid.UUID, Event],
+        emails_in_events: Dict[uuid.UUID, Dict[str, uuid.UUID]],
+        user_ids_in_events: Dict[uuid.UUID, Set[uuid.UUID]],
+        users_by_email: Dict[str, UserModel],
+        sized_user_ids: Set[uuid.UUID],
+        role_ids: Set[uuid.UUID],
+        look_ids: Set[uuid.UUID],
+    ) -> Attendee:
+        event = events.get(create_attendee.event_id)
+
+        if not event:
+            raise NotFoundError("Event not found.")
+
+        if create_attendee.role_id and create_attendee.role_id not in role_ids:
+            raise NotFoundError("Role not found.")
+
+        if create_attendee.look_id and create_attendee.look_id not in look_ids:
+            raise NotFoundError("Look not found.")
+
+        attendee_user = None
+
+        if create_attendee.email:
+            if create_attendee.email in emails_in_events[event.id]:
+                raise DuplicateError("Attendee with this email already exists.")
+
+            attendee_user = users_by_email.get(create_attendee.email.lower())
+
+        if attendee_user and attendee_user.id in user_ids_in_events[event.id]:
+            raise DuplicateError("Attendee already exists.")
+
+        new_attendee = Attendee(
+            id=uuid.uuid4(),
+            first_name=create_attendee.first_name,
+            last_name=create_attendee.last_name,
+            email=create_attendee.email,
+            user_id=attendee_user.id if attendee_user else None,
+            event_id=create_attendee.event_id,
+            role_id=create_attendee.role_id,
+            look_id=create_attendee.look_id,
+            is_active=create_attendee.is_active,
+            size=attendee_user.id in sized_user_ids if attendee_user else False,
+            style=create_attendee.style,
+            invite=create_attendee.invite or (event.user_id == attendee_user.id if attendee_user else False),
+            pay=create_attendee.pay,
+            ship=create_attendee.ship,
+            # set here rather than by the database so new attendees are inserted with one statement
+            created_at=datetime.now(),
+            updated_at=datetime.now(),
+        )
+
+        if new_attendee.email:
+            emails_in_events[event.id][new_attendee.email] = new_attendee.id
+
+        if new_attendee.user_id:
+            user_ids_in_events[event.id].add(new_attendee.user_id)
+
+        return new_attendee
+
+    @staticmethod
+    def __apply_update(
+        attendee: Attendee,
+        update_attendee: UpdateAttendeeModel,
+        is_paid_or_has_discount: bool,
+        emails_in_event: Dict[str, uuid.UUID],
+        users_by_id: Dict[uuid.UUID, UserModel],
+        role_ids: Set[uuid.UUID],
+        look_ids: Set[uuid.UUID],
+    ) -> None:
+        # validated as a whole before anything is changed, the attendee is committed with the rest of the batch
+        changes_look = update_attendee.look_id is not None and attendee.look_id not in (None, update_attendee.look_id)
+        changes_email = update_attendee.email is not None and attendee.email != update_attendee.email
+
+        if changes_look and is_paid_or_has_discount:
+            raise BadRequestError("Cannot update look for attendee that has already paid or has an issued gift code.")
+
+        if update_attendee.look_id and update_attendee.look_id not in look_ids:
+            raise NotFoundError("Look not found.")
+
+        if update_attendee.role_id and update_attendee.role_id not in role_ids:
+            raise NotFoundError("Role not found.")
+
+        if changes_email:
+            if attendee.email is not None and attendee.user_id is not None and is_paid_or_has_discount:
+                raise BadRequestError(
+                    "Cannot update email for attendee that has already paid or has an issued gift code."
+                )
+
+            if emails_in_event.get(update_attendee.email, attendee.id) != attendee.id:
+                raise DuplicateError("Attendee with this email already exists.")
+
+        if update_attendee.look_id is not None:
+            attendee.look_id = update_attendee.look_id
+
+        if changes_email:
+            if attendee.email is not None and attendee.user_id is not None:
+                attendee.user_id = None
+                attendee.invite = False
+                attendee.size = False
+
+            emails_in_event.pop(attendee.email, None)
+            emails_in_event[update_attendee.email] = attendee.id
+            attendee.email = update_attendee.email
+
+        if attendee.first_name or update_attendee.first_name:
+            attendee.first_name = update_attendee.first_name or attendee.first_name
+            attendee.last_name = update_attendee.last_name or attendee.last_name
+        else:
+            user = users_by_id.get(attendee.user_id)
+            attendee.first_name = user.first_name if user else None
+            attendee.last_name = user.last_name if user else None
+
+        attendee.role_id = update_attendee.role_id or attendee.role_id
+        attendee.style = True if attendee.role_id and attendee.look_id else False
+        attendee.updated_at = datetime.now()
+
     @staticmethod
     def __is_attendee_paid_or_has_discount(attendee: Attendee) -> bool:
         return attendee.pay or FlaskApp.current().discount_service.get_discount_codes_for_attendees(
@@ -417,44 +778,41 @@ class AttendeeService:
 
         attendees = [attendee for attendee, _ in rows]
 
-        invited_users: list[UserModel] = []
-        invited_attendees: list[Attendee] = []
-
         for attendee in attendees:
-            if attendee.user_id is not None:
-                # user already associated with attendee
-                invited_users.append(self.user_service.get_user_by_id(attendee.user_id))
-                invited_attendees.append(attendee)
-
-                continue
-
-            if attendee.email is None:
+            if attendee.user_id is None and attendee.email is None:
                 logger.error(f"Attendee {attendee.id} has no email.")
-                continue
 
-            try:
-                user = self.user_service.get_user_by_email(attendee.email)
-                attendee.user_id = user.id
+        attendees_to_invite = [attendee for attendee in attendees if attendee.user_id or attendee.email]
+        users = self.user_service.get_users_by_ids_or_emails(
+            {attendee.user_id for attendee in attendees_to_invite if attendee.user_id},
+            {attendee.email for attendee in attendees_to_invite if not attendee.user_id},
+        )
+        users_by_id = {user.id: user for user in users}
+        users_by_email = {user.email.lower(): user for user in users}
+
+        new_users = self.user_service.create_users(
+            [
+                CreateUserModel(first_name=attendee.first_name, last_name=attendee.last_name, email=attendee.email)
+                for attendee in attendees_to_invite
+                if not attendee.user_id and attendee.email.lower() not in users_by_email
+            ]
+        )
+        users_by_email.update({user.email: user for user in new_users})
 
-                db.session.commit()
+        invited_users: list[UserModel] = []
 
-                invited_attendees.append(attendee)
-                invited_users.append(user)
-            except NotFoundError:
-                try:
-                    user = self.user_service.create_user(
-                        CreateUserModel(
-                            first_name=attendee.first_name, last_name=attendee.last_name, email=attendee.email
-                        )
-                    )
-                    attendee.user_id = user.id
+        for attendee in attendees_to_invite:
+            if attendee.user_id:
+                user = users_by_id.get(attendee.user_id)
+            else:
+                user = users_by_email.get(attendee.email.lower())
 
-                    db.session.commit()
+            if not user:
+                logger.error(f"Failed to create user for attendee {attendee.id}.")
+                continue
 
-                    invited_users.append(user)
-                    invited_attendees.append(attendee)
-                except Exception:
-                    logger.exception(f"Failed to create user for attendee {attendee.id}.")
+            attendee.user_id = user.id
+            invited_users.append(user)
 
         if not invited_users:
             return
@@ -467,27 +825,19 @@ class AttendeeService:
             for attendee in attendees:
                 attendee.invite = True
 
+            # new users, attendees linked to them and the invites in one go, nothing is saved if emails failed
             db.session.commit()
         except Exception as e:
             raise ServiceError("Failed to update attendee.", e)
 
+        self.user_service.on_users_created(new_users)
+
     @staticmethod
-    def __get_tracking_for_attendee(orders) -> List[TrackingModel]:
-        shop_id = FlaskApp.current().online_store_shop_id
-        tracking = []
+    def __get_tracking_url_prefix() -> str:
+        if STAGE == "prd":
+            return "https://account.themoderngroom.com/orders/"
 
-        for order in orders:
-            if not order:
-                continue
-            if order.get("outbound_tracking"):
-                tracking_number = order.get("outbound_tracking")
-                if STAGE == "prd":
-                    tracking_url = f"https://account.themoderngroom.com/orders/{order.get('shopify_order_id')}"
-                else:
-                    tracking_url = f"https://shopify.com/{shop_id}/account/orders/{order.get('shopify_order_id')}"
-                tracking.append(TrackingModel(tracking_number=tracking_number, tracking_url=tracking_url))
-
-        return tracking
+        return f"https://shopify.com/{ONLINE_STORE_SHOP_ID}/account/orders/"
 
     @staticmethod
     def find_attendees_by_look_id(look_id: uuid.UUID) -> List[AttendeeModel]:
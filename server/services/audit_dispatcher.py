@@ -0,0 +1,210 @@
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, Future, TimeoutError as FutureTimeoutError
+from contextlib import nullcontext
+from enum import Enum
+from typing import Callable, ContextManager, Hashable, Iterable, Optional
+
+from server.database.database_manager import db, thread_session_scope
+from server.models.audit_log_model import AuditLogMessage
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SUBSCRIBER_TIMEOUT_SECONDS = 20
+MAX_CONCURRENT_SUBSCRIBERS = 8
+
+
+class AuditSubscriberKind(str, Enum):
+    # only reads/writes the db, runs inline in the consumer thread as part of its transaction
+    DB = "db"
+    # calls external services, runs concurrently in a worker thread with its own db session
+    EXTERNAL = "external"
+
+    def __str__(self):
+        return self.value
+
+
+class AuditSubscriber:
+    """
+    Handles audit messages of the given types. Messages of a batch with equal key are handled once, with the last of
+    them, by default every message is handled. Subscribers that don't run on redelivery only handle a message the
+    first time it's persisted.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        message_types: Iterable[str],
+        handler: Callable[[AuditLogMessage], None],
+        kind: AuditSubscriberKind = AuditSubscriberKind.DB,
+        timeout_seconds: float = DEFAULT_SUBSCRIBER_TIMEOUT_SECONDS,
+        key: Optional[Callable[[AuditLogMessage], Hashable]] = None,
+        on_redelivery: bool = True,
+    ):
+        self.name = name
+        self.message_types = frozenset(message_types)
+        self.handler = handler
+        self.kind = kind
+        self.timeout_seconds = timeout_seconds
+        self.key = key if key else lambda audit_log_message: audit_log_message.id
+        self.on_redelivery = on_redelivery
+
+
+class AuditSubscriberMetrics:
+    def __init__(self):
+        self.calls = 0
+        self.failures = 0
+        self.timeouts = 0
+        self.total_duration = 0.0
+        self.max_duration = 0.0
+
+    def to_dict(self) -> dict:
+        return {
+            "calls": self.calls,
+            "failures": self.failures,
+            "timeouts": self.timeouts,
+            "avg_duration_ms": round(self.total_duration / self.calls * 1000, 2) if self.calls else 0,
+            "max_duration_ms": round(self.max_duration * 1000, 2),
+        }
+
+
+class AuditDispatcher:
+    def __init__(self, max_workers: int = MAX_CONCURRENT_SUBSCRIBERS):
+        self.__max_workers = max_workers
+        self.__executor: Optional[ThreadPoolExecutor] = None
+        self.__subscribers_by_type: dict[str, list[AuditSubscriber]] = {}
+        self.__metrics: dict[str, AuditSubscriberMetrics] = {}
+        self.__metrics_lock = threading.Lock()
+
+    def register(self, subscriber: AuditSubscriber) -> None:
+        for message_type in subscriber.message_types:
+            self.__subscribers_by_type.setdefault(message_type, []).append(subscriber)
+
+        self.__metrics.setdefault(subscriber.name, AuditSubscriberMetrics())
+
+    def subscribers_for(self, message_type: str) -> list[AuditSubscriber]:
+        return self.__subscribers_by_type.get(message_type, [])
+
+    def dispatch(
+        self, audit_log_messages: list[AuditLogMessage], redelivered_message_ids: Iterable[str] = ()
+    ) -> "AuditDispatch":
+        """Starts external subscribers right away, db subscribers are run by the caller with run_db_subscribers."""
+
+        return AuditDispatch(self, audit_log_messages, set(redelivered_message_ids))
+
+    def metrics(self) -> dict[str, dict]:
+        with self.__metrics_lock:
+            return {name: metrics.to_dict() for name, metrics in self.__metrics.items()}
+
+    def _submit(self, fn: Callable[[], None]) -> Future:
+        if not self.__executor:
+            self.__executor = ThreadPoolExecutor(max_workers=self.__max_workers, thread_name_prefix="audit-subscriber")
+
+        session_scope = thread_session_scope()
+
+        def run_in_own_session():
+            with session_scope():
+                fn()
+
+        return self.__executor.submit(run_in_own_session)
+
+    def _run(self, subscriber: AuditSubscriber, audit_log_message: AuditLogMessage) -> None:
+        started_at = time.perf_counter()
+        failed = False
+
+        try:
+            subscriber.handler(audit_log_message)
+        except Exception:
+            failed = True
+            raise
+        finally:
+            self.__record(subscriber.name, time.perf_counter() - started_at, failed)
+
+    def _record_timeout(self, subscriber: AuditSubscriber) -> None:
+        with self.__metrics_lock:
+            self.__metrics[subscriber.name].timeouts += 1
+
+    def __record(self, name: str, duration: float, failed: bool) -> None:
+        with self.__metrics_lock:
+            metrics = self.__metrics[name]
+            metrics.calls += 1
+            metrics.failures += int(failed)
+            metrics.total_duration += duration
+            metrics.max_duration = max(metrics.max_duration, duration)
+
+
+class AuditDispatch:
+    def __init__(
+        self, dispatcher: AuditDispatcher, audit_log_messages: list[AuditLogMessage], redelivered_message_ids: set[str]
+    ):
+        self.__dispatcher = dispatcher
+        self.__work: dict[tuple[str, Hashable], tuple[AuditSubscriber, AuditLogMessage]] = {}
+        self.__message_ids_by_work_key: dict[tuple[str, Hashable], set[str]] = {}
+
+        for audit_log_message in audit_log_messages:
+            for subscriber in dispatcher.subscribers_for(audit_log_message.type):
+                if audit_log_message.id in redelivered_message_ids and not subscriber.on_redelivery:
+                    continue
+
+                work_key = (subscriber.name, subscriber.key(audit_log_message))
+
+                # re-inserted so the work is ordered by the last message it's done for
+                self.__work.pop(work_key, None)
+                self.__work[work_key] = (subscriber, audit_log_message)
+                self.__message_ids_by_work_key.setdefault(work_key, set()).add(audit_log_message.id)
+
+        self.__external_work: list[tuple[tuple[str, Hashable], AuditSubscriber, float, Future]] = [
+            (
+                work_key,
+                subscriber,
+                time.monotonic() + subscriber.timeout_seconds,
+                dispatcher._submit(lambda s=subscriber, m=audit_log_message: dispatcher._run(s, m)),
+            )
+            for work_key, (subscriber, audit_log_message) in self.__work.items()
+            if subscriber.kind == AuditSubscriberKind.EXTERNAL
+        ]
+
+    def run_db_subscribers(
+        self, message_scope: Optional[Callable[[AuditLogMessage], ContextManager]] = None
+    ) -> set[str]:
+        """
+        Runs db subscribers in message order, each inside message_scope and its own savepoint. Returns ids of messages
+        that failed.
+        """
+
+        failed_message_ids = set()
+
+        for work_key, (subscriber, audit_log_message) in self.__work.items():
+            if subscriber.kind != AuditSubscriberKind.DB:
+                continue
+
+            try:
+                with message_scope(audit_log_message) if message_scope else nullcontext():
+                    # a failing subscriber rolls back to its savepoint, the transaction stays usable for the rest
+                    with db.session.begin_nested():
+                        self.__dispatcher._run(subscriber, audit_log_message)
+            except Exception as e:
+                logger.exception(f"Subscriber '{subscriber.name}' failed for audit message {audit_log_message.id}: {e}")
+                failed_message_ids.update(self.__message_ids_by_work_key[work_key])
+
+        return failed_message_ids
+
+    def wait(self) -> set[str]:
+        """Waits for external subscribers up to their timeouts. Returns ids of messages that failed or timed out."""
+
+        failed_message_ids = set()
+
+        for work_key, subscriber, deadline, future in self.__external_work:
+            try:
+                future.result(timeout=max(0.0, deadline - time.monotonic()))
+            except FutureTimeoutError:
+                # the worker can't be interrupted, it finishes in the background and the messages are retried
+                self.__dispatcher._record_timeout(subscriber)
+                logger.error(f"Subscriber '{subscriber.name}' timed out after {subscriber.timeout_seconds}s")
+                failed_message_ids.update(self.__message_ids_by_work_key[work_key])
+            except Exception as e:
+                logger.exception(f"Subscriber '{subscriber.name}' failed: {e}")
+                failed_message_ids.update(self.__message_ids_by_work_key[work_key])
+
+        return failed_message_ids
@@ -1,10 +1,11 @@
-import json
 import logging
 import uuid
-from typing import Dict, Any
+from typing import Callable, Dict, Any, Optional, Set
 
-from flask import request
-from sqlalchemy import event
+import orjson
+from flask import request, g
+from sqlalchemy import event, insert, inspect, cast, literal, String, Connection
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm.attributes import get_history
 
 from server.database.models import (
@@ -12,6 +13,7 @@ from server.database.models import (
     Event,
     Attendee,
     Look,
+    Role,
     Order,
     OrderItem,
     Product,
@@ -19,101 +21,127 @@ from server.database.models import (
     Size,
     Measurement,
     Address,
+    AuditOutbox,
     SerializableMixin,
 )
 from server.flask_app import FlaskApp
-from server.models.audit_log_model import AuditLogMessage
 
 logger = logging.getLogger(__name__)
 
 
-def init_audit_logging():
+# Columns that are always sent in the payload of *_UPDATED messages along with the changed ones, audit log consumers
+# (user activity log, tagging) look them up in the payload. Full rows are only sent for created/deleted entities.
+DEFAULT_KEY_COLUMNS = frozenset({"id", "user_id", "event_id", "is_active"})
+KEY_COLUMNS: Dict[type, Set[str]] = {
+    User: {"first_name", "last_name", "email"},
+    Event: {"name"},
+    Attendee: {"first_name", "last_name", "email", "role_id", "look_id"},
+    Look: {"name"},
+    Order: {"order_number"},
+}
+IGNORED_DIFF_COLUMNS = frozenset({"updated_at"})
+
+
+def init_audit_logging(key_columns: Optional[Dict[type, Set[str]]] = None):
     if not FlaskApp.current():
         return
 
-    entities = [User, Event, Attendee, Look, Order, OrderItem, Product, Discount, Size, Measurement, Address]
+    entities = [User, Event, Attendee, Look, Role, Order, OrderItem, Product, Discount, Size, Measurement, Address]
 
     for entity in entities:
-        log_prefix = entity.__name__.upper()
+        for identifier, listener in _listeners(entity, key_columns):
+            event.listen(entity, identifier, listener)
 
-        event.listen(
-            entity,
-            "after_insert",
-            lambda m, c, t, lp=log_prefix: _log_operation(t, f"{lp}_CREATED", False),
-        )
-        event.listen(
-            entity,
-            "after_update",
-            lambda m, c, t, lp=log_prefix: _log_operation(t, f"{lp}_UPDATED", True),
-        )
-        event.listen(
-            entity,
-            "before_delete",
-            lambda m, c, t, lp=log_prefix: _log_operation(t, f"{lp}_DELETED", False),
-        )
 
+def _listeners(entity, key_columns: Optional[Dict[type, Set[str]]] = None) -> list[tuple[str, Callable]]:
+    log_prefix = entity.__name__.upper()
+    entity_key_columns = _key_columns(entity, KEY_COLUMNS if key_columns is None else key_columns)
+
+    return [
+        ("after_insert", lambda m, c, t: _log_operation(c, t, f"{log_prefix}_CREATED", False)),
+        ("after_update", lambda m, c, t: _log_operation(c, t, f"{log_prefix}_UPDATED", True, entity_key_columns)),
+        ("before_delete", lambda m, c, t: _log_operation(c, t, f"{log_prefix}_DELETED", False)),
+    ]
 
-def _log_operation(target, operation, include_diff=False):
-    try:
-        serializable_request = _request_to_dict()
-        serializable_payload = target.serialize()
 
+def _key_columns(entity, key_columns: Dict[type, Set[str]]) -> frozenset:
+    columns = set(entity.__table__.columns.keys())
+
+    return frozenset((DEFAULT_KEY_COLUMNS | key_columns.get(entity, set())) & columns)
+
+
+def _log_operation(connection, target, operation, include_diff=False, key_columns: Optional[frozenset] = None):
+    try:
         if include_diff:
-            diff: Dict[str, Any] = _build_diff(target)
+            # diff is built off the changed attributes only, so no-op updates are dropped before any serialization
+            diff: Optional[Dict[str, Any]] = _build_diff(target)
 
             if not diff:
                 return
 
-            _send_message(
-                AuditLogMessage(
-                    id=str(uuid.uuid4()),
-                    type=operation,
-                    request=serializable_request,
-                    payload=serializable_payload,
-                    diff=diff,
-                )
-            )
+            if key_columns is None:
+                key_columns = _key_columns(type(target), KEY_COLUMNS)
+
+            serializable_payload = {
+                column: SerializableMixin.normalize(getattr(target, column))
+                for column in key_columns.difference(diff.keys())
+            }
+
+            for column, change in diff.items():
+                serializable_payload[column] = change["after"]
         else:
-            _send_message(
-                AuditLogMessage(
-                    id=str(uuid.uuid4()),
-                    type=operation,
-                    request=serializable_request,
-                    payload=serializable_payload,
-                    diff=None,
-                )
-            )
+            diff = None
+            serializable_payload = target.serialize()
+
+        _store_message(
+            connection,
+            {
+                "id": str(uuid.uuid4()),
+                "type": operation,
+                "payload": serializable_payload,
+                "request": _request_to_dict(),
+                "diff": diff,
+            },
+        )
     except Exception as e:
         logger.exception(f"Failed to enqueue audit log message: {e}")
 
 
-def _build_diff(target):
+def _build_diff(target) -> Dict[str, Any]:
     diff = {}
+    state = inspect(target)
+    columns = state.mapper.columns
 
-    after_state = {attr.key: getattr(target, attr.key) for attr in target.__table__.columns}
-
-    before_state = {}
-    for attr in target.__table__.columns:
-        if attr.key in {"updated_at"}:
+    # committed_state holds the previous values of the attributes modified since the last flush
+    for key in state.committed_state.keys():
+        if key in IGNORED_DIFF_COLUMNS or key not in columns:
             continue
 
-        history = get_history(target, attr.key)
+        history = get_history(target, key)
 
         if history.has_changes():
-            before_state[attr.key] = history.deleted[0] if history.deleted else None
-            diff[attr.key] = {
-                "before": SerializableMixin.normalize(before_state[attr.key]),
-                "after": SerializableMixin.normalize(after_state[attr.key]),
+            diff[key] = {
+                "before": SerializableMixin.normalize(history.deleted[0] if history.deleted else None),
+                "after": SerializableMixin.normalize(getattr(target, key)),
             }
 
     return diff
 
 
 def _request_to_dict() -> dict:
-    # if no request or default request
-    if not request or (
-        request.method == "GET" and request.path == "/" and not request.query_string and not request.data
-    ):
+    if not request:
+        return {}
+
+    # every entity flushed within the same request shares the request dict, body is parsed only once
+    if "audit_request" not in g:
+        g.audit_request = _build_request_dict()
+
+    return g.audit_request
+
+
+def _build_request_dict() -> dict:
+    # if default request
+    if request.method == "GET" and request.path == "/" and not request.query_string and not request.data:
         return {}
 
     query_string = request.query_string.decode("utf-8") if request.query_string else ""
@@ -135,7 +163,7 @@ def _request_to_dict() -> dict:
     json_data = {}
 
     if data:
-        json_data = json.loads(data)
+        json_data = orjson.loads(data)
 
         # do not send serialized image base64 into audit log queue - too big
         if "image" in json_data:
@@ -149,19 +177,12 @@ def _request_to_dict() -> dict:
     }
 
 
-def _is_in_test_mode() -> bool:
-    return FlaskApp.current().config["TMG_APP_TESTING"]
-
-
-def _send_message(audit_log_message: AuditLogMessage) -> None:
-    app = FlaskApp.current()
-
-    try:
-        if _is_in_test_mode():
-            audit_log_service = app.audit_log_service
-            audit_log_service.process(audit_log_message)
-        else:
-            aws_service = app.aws_service
-            aws_service.enqueue_message(app.audit_log_sqs_queue_url, audit_log_message.to_string())
-    except Exception as e:
-        logger.exception(f"Failed to send audit log message: {e}")
+def _store_message(connection: Connection, message: Dict[str, Any]) -> None:
+    # Written through the flushing connection so the message commits or rolls back together with the change
+    # itself. AuditOutboxService relays stored messages to SQS, keeping network I/O out of the request path.
+    # Message is encoded with orjson and cast on the db side, bypassing the slower default JSON serializer.
+    connection.execute(
+        insert(AuditOutbox).values(
+            type=message["type"], message=cast(literal(orjson.dumps(message).decode("utf-8"), String), JSONB)
+        )
+    )
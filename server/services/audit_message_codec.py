@@ -0,0 +1,86 @@
+import base64
+import gzip
+import json
+import logging
+import os
+import uuid
+from typing import Optional
+
+from server.models.audit_log_model import (
+    AuditLogMessage,
+    AuditLogMessageEnvelope,
+    AuditLogMessageEncoding,
+    AUDIT_LOG_MESSAGE_ENVELOPE_VERSION,
+)
+from server.services import ServiceError
+from server.services.integrations.aws_service import AbstractAWSService
+
+logger = logging.getLogger(__name__)
+
+AUDIT_BUCKET = os.getenv("AUDIT_BUCKET", "audit-bucket")
+# messages below this size are sent as is, compression would not pay off
+COMPRESSION_THRESHOLD_BYTES = int(os.getenv("AUDIT_MESSAGE_COMPRESSION_THRESHOLD_BYTES", 8 * 1024))
+# SQS limits a batch of 10 messages to 256KB in total, larger compressed messages are offloaded to S3 so a full batch
+# of inline ones always fits
+S3_OFFLOAD_THRESHOLD_BYTES = int(os.getenv("AUDIT_MESSAGE_S3_OFFLOAD_THRESHOLD_BYTES", 20 * 1024))
+S3_PREFIX = "audit-messages"
+
+
+class AuditMessageCodec:
+    def __init__(
+        self,
+        aws_service: AbstractAWSService,
+        bucket: str = AUDIT_BUCKET,
+        compression_threshold_bytes: int = COMPRESSION_THRESHOLD_BYTES,
+        s3_offload_threshold_bytes: int = S3_OFFLOAD_THRESHOLD_BYTES,
+    ):
+        self.__aws_service = aws_service
+        self.__bucket = bucket
+        self.__compression_threshold_bytes = compression_threshold_bytes
+        self.__s3_offload_threshold_bytes = s3_offload_threshold_bytes
+
+    def encode(self, message: str, message_id: Optional[str] = None, message_type: Optional[str] = None) -> str:
+        """Id and type are kept readable on the envelope for logging and tracing without decoding the body."""
+
+        raw = message.encode("utf-8")
+
+        if len(raw) < self.__compression_threshold_bytes:
+            return message
+
+        compressed = gzip.compress(raw, compresslevel=6)
+        header = {"id": message_id, "type": message_type}
+
+        encoded = base64.b64encode(compressed).decode("ascii")
+
+        if len(encoded) < self.__s3_offload_threshold_bytes:
+            return AuditLogMessageEnvelope(encoding=AuditLogMessageEncoding.GZIP, data=encoded, **header).to_string()
+
+        key = f"{S3_PREFIX}/{message_id or uuid.uuid4()}.json.gz"
+
+        self.__aws_service.put_object_to_s3(compressed, self.__bucket, key, "application/gzip")
+
+        logger.info(f"Audit message of {len(raw)} bytes offloaded to s3://{self.__bucket}/{key}")
+
+        return AuditLogMessageEnvelope(
+            encoding=AuditLogMessageEncoding.S3_GZIP, bucket=self.__bucket, key=key, **header
+        ).to_string()
+
+    def decode(self, body: str) -> AuditLogMessage:
+        parsed = json.loads(body)
+
+        if "version" not in parsed:
+            return AuditLogMessage.model_validate(parsed)
+
+        envelope = AuditLogMessageEnvelope.model_validate(parsed)
+
+        if envelope.version > AUDIT_LOG_MESSAGE_ENVELOPE_VERSION:
+            raise ServiceError(f"Unsupported audit message envelope version: {envelope.version}")
+
+        if envelope.encoding == AuditLogMessageEncoding.GZIP:
+            compressed = base64.b64decode(envelope.data)
+        elif envelope.encoding == AuditLogMessageEncoding.S3_GZIP:
+            compressed = self.__aws_service.get_object_from_s3(envelope.bucket, envelope.key)
+        else:
+            raise ServiceError(f"Unsupported audit message encoding: {envelope.encoding}")
+
+        return AuditLogMessage.model_validate_json(gzip.decompress(compressed))
@@ -0,0 +1,136 @@
+import logging
+
+from sqlalchemy import select, delete, update, cast, Text
+
+from server.database.database_manager import db
+from server.database.models import AuditOutbox
+from server.services import ServiceError
+from server.services.audit_message_codec import AuditMessageCodec
+from server.services.integrations.aws_service import AbstractAWSService
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_RELAY_BATCH_SIZE = 100
+# a message failing to relay on its own that many times is dead-lettered, left in the outbox but no longer relayed
+MAX_RELAY_ATTEMPTS = 5
+
+
+class AuditOutboxService:
+    def __init__(
+        self, aws_service: AbstractAWSService, audit_message_codec: AuditMessageCodec, audit_log_sqs_queue_url: str
+    ):
+        self.__aws_service = aws_service
+        self.__audit_message_codec = audit_message_codec
+        self.__audit_log_sqs_queue_url = audit_log_sqs_queue_url
+
+    @staticmethod
+    def get_num_pending_messages() -> int:
+        return db.session.query(AuditOutbox).filter(AuditOutbox.attempts < MAX_RELAY_ATTEMPTS).count()
+
+    @staticmethod
+    def get_num_dead_letter_messages() -> int:
+        return db.session.query(AuditOutbox).filter(AuditOutbox.attempts >= MAX_RELAY_ATTEMPTS).count()
+
+    def relay(self, batch_size: int = DEFAULT_RELAY_BATCH_SIZE) -> int:
+        # SKIP LOCKED lets several relays drain the outbox concurrently without picking up the same rows
+        rows = (
+            db.session.execute(
+                # messages are relayed as stored text, no need to decode them
+                select(
+                    AuditOutbox.id,
+                    AuditOutbox.type,
+                    AuditOutbox.message["id"].astext,
+                    cast(AuditOutbox.message, Text),
+                )
+                .where(AuditOutbox.attempts < MAX_RELAY_ATTEMPTS)
+                .order_by(AuditOutbox.id)
+                .limit(batch_size)
+                .with_for_update(skip_locked=True)
+            )
+            .tuples()
+            .all()
+        )
+
+        if not rows:
+            db.session.commit()
+            return 0
+
+        # nothing is written before the messages are enqueued, the rows stay locked while failed ones are retried
+        relayed_ids, errors = self.__enqueue(rows)
+
+        if not relayed_ids:
+            # nothing went through, SQS is likely unavailable rather than the messages bad, attempts aren't counted
+            db.session.rollback()
+            raise ServiceError("Failed to relay audit outbox messages.", next(iter(errors.values())))
+
+        try:
+            db.session.execute(delete(AuditOutbox).where(AuditOutbox.id.in_(relayed_ids)))
+
+            for row_id, error in errors.items():
+                attempts = db.session.execute(
+                    update(AuditOutbox)
+                    .where(AuditOutbox.id == row_id)
+                    .values(attempts=AuditOutbox.attempts + 1, last_error=str(error))
+                    .returning(AuditOutbox.attempts)
+                ).scalar_one()
+
+                if attempts >= MAX_RELAY_ATTEMPTS:
+                    logger.error(f"Audit outbox message {row_id} dead-lettered after {attempts} attempts: {error}")
+
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            raise ServiceError("Failed to relay audit outbox messages.", e)
+
+        logger.info(f"Relayed {len(relayed_ids)} audit messages to SQS, {len(errors)} failed")
+
+        return len(relayed_ids)
+
+    def __enqueue(self, rows: list[tuple]) -> tuple[list[int], dict[int, Exception]]:
+        """Returns ids of relayed rows and errors of the ones that failed."""
+
+        try:
+            failed_indices = set(
+                self.__aws_service.enqueue_messages(
+                    self.__audit_log_sqs_queue_url, [self.__encode(row) for row in rows]
+                )
+            )
+        except Exception as e:
+            logger.warning(f"Failed to relay {len(rows)} audit messages as a batch: {e}")
+            failed_indices = set(range(len(rows)))
+
+        relayed_ids = [row[0] for i, row in enumerate(rows) if i not in failed_indices]
+        errors = {}
+
+        if failed_indices:
+            # one bad message must not hold back the ones behind it, only the ones that failed are retried one by one
+            # to find it, the ones the batch accepted aren't sent twice
+            logger.warning(f"Relaying {len(failed_indices)} of {len(rows)} audit messages one by one")
+
+        for i in sorted(failed_indices):
+            row = rows[i]
+
+            try:
+                self.__aws_service.enqueue_message(self.__audit_log_sqs_queue_url, self.__encode(row))
+                relayed_ids.append(row[0])
+            except Exception as e:
+                errors[row[0]] = e
+
+        return relayed_ids, errors
+
+    def __encode(self, row: tuple) -> str:
+        _, message_type, message_id, message = row
+
+        return self.__audit_message_codec.encode(message, message_id, message_type)
+
+    def relay_all(self, batch_size: int = DEFAULT_RELAY_BATCH_SIZE, max_batches: int = 100) -> int:
+        num_relayed = 0
+
+        for _ in range(max_batches):
+            num_relayed_in_batch = self.relay(batch_size)
+            num_relayed += num_relayed_in_batch
+
+            if num_relayed_in_batch < batch_size:
+                break
+
+        return num_relayed
@@ -1,9 +1,17 @@
 import logging
+import uuid
+from contextlib import contextmanager
 from datetime import datetime, timezone
+from typing import Any, Iterator, Optional
+
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert
 
 from server.database.database_manager import db
 from server.database.models import AuditLog
 from server.models.audit_log_model import AuditLogMessage
+from server.services import ServiceError
+from server.services.audit_dispatcher import AuditDispatcher, AuditSubscriber, AuditSubscriberKind
 from server.services.tagging_service import TaggingService
 from server.services.user_activity_log_service import UserActivityLogService
 
@@ -11,54 +19,206 @@ logger = logging.getLogger(__name__)
 
 
 class AuditLogService:
-    def __init__(self, tagging_service: TaggingService, user_activity_log_service: UserActivityLogService):
+    def __init__(
+        self,
+        tagging_service: TaggingService,
+        user_activity_log_service: UserActivityLogService,
+        audit_dispatcher: Optional[AuditDispatcher] = None,
+    ):
         self.__tagging_service = tagging_service
         self.__user_activity_log_service = user_activity_log_service
+        self.__audit_dispatcher = audit_dispatcher if audit_dispatcher else AuditDispatcher()
+
+        self.__register_default_subscribers()
+
+    def subscribe(self, subscriber: AuditSubscriber) -> None:
+        self.__audit_dispatcher.register(subscriber)
 
     def process(self, audit_log_message: AuditLogMessage) -> None:
-        self.__persist(audit_log_message)
-
-        logger.info(f"Processing '{audit_log_message.type}' message for '{audit_log_message.payload.get('id')}'")
-
-        if audit_log_message.type == "USER_CREATED":
-            self.__user_activity_log_service.user_created(audit_log_message)
-        elif audit_log_message.type == "USER_UPDATED":
-            self.__user_activity_log_service.user_updated(audit_log_message)
-        elif audit_log_message.type == "EVENT_CREATED":
-            self.__user_activity_log_service.event_created(audit_log_message)
-        elif audit_log_message.type == "EVENT_UPDATED":
-            self.__user_activity_log_service.event_updated(audit_log_message)
-            self.__tagging_service.tag_customers_on_event_updated(audit_log_message)
-        elif audit_log_message.type == "ATTENDEE_CREATED":
-            self.__user_activity_log_service.attendee_created(audit_log_message)
-        elif audit_log_message.type == "ATTENDEE_UPDATED":
-            self.__user_activity_log_service.attendee_updated(audit_log_message)
-            self.__tagging_service.tag_customers_on_attendee_updated(audit_log_message)
-            self.__tagging_service.tag_products_on_attendee_updated(audit_log_message)
-        elif audit_log_message.type == "LOOK_CREATED":
-            self.__user_activity_log_service.look_created(audit_log_message)
-        elif audit_log_message.type == "LOOK_UPDATED":
-            self.__user_activity_log_service.look_updated(audit_log_message)
-        elif audit_log_message.type == "MEASUREMENT_CREATED":
-            self.__user_activity_log_service.measurements_created(audit_log_message)
-        elif audit_log_message.type == "SIZE_CREATED":
-            self.__user_activity_log_service.sizes_created(audit_log_message)
-        elif audit_log_message.type == "ORDER_CREATED":
-            self.__user_activity_log_service.order_created(audit_log_message)
-        elif audit_log_message.type == "ORDER_UPDATED":
-            self.__user_activity_log_service.order_updated(audit_log_message)
+        if self.process_batch([audit_log_message]):
+            raise ServiceError(f"Failed to process audit message {audit_log_message.id}.")
 
-    @staticmethod
-    def __persist(audit_log_message: AuditLogMessage) -> None:
-        db.session.add(
-            AuditLog(
-                id=audit_log_message.id,
-                request=audit_log_message.request,
-                type=audit_log_message.type,
-                payload=audit_log_message.payload,
-                diff=audit_log_message.diff,
-                created_at=datetime.now(timezone.utc),
+    def process_batch(self, audit_log_messages: list[AuditLogMessage]) -> set[str]:
+        """
+        Processes messages as one unit: audit logs and the db writes of subscribers for the whole batch are committed in
+        a single transaction while subscribers doing external I/O run concurrently. Returns ids of messages that failed
+        and must be retried. Messages that were already persisted (redeliveries) only go to subscribers that run on
+        redelivery.
+        """
+
+        messages_by_id: dict[str, AuditLogMessage] = {}
+
+        for audit_log_message in audit_log_messages:
+            messages_by_id.setdefault(audit_log_message.id, audit_log_message)
+
+        already_persisted_ids = self.__get_persisted_audit_log_ids(list(messages_by_id.keys()))
+        dispatch = self.__audit_dispatcher.dispatch(list(messages_by_id.values()), already_persisted_ids)
+
+        for message_id, audit_log_message in messages_by_id.items():
+            if message_id not in already_persisted_ids:
+                logger.info(
+                    f"Processing '{audit_log_message.type}' message for '{audit_log_message.payload.get('id')}'"
+                )
+
+        activity_logs_by_message_id: dict[str, list[dict[str, Any]]] = {
+            message_id: [] for message_id in messages_by_id.keys() if message_id not in already_persisted_ids
+        }
+
+        @contextmanager
+        def collect_activity_logs(audit_log_message: AuditLogMessage) -> Iterator[None]:
+            with self.__user_activity_log_service.buffered() as activity_logs:
+                yield
+
+            if audit_log_message.id in activity_logs_by_message_id:
+                activity_logs_by_message_id[audit_log_message.id].extend(activity_logs)
+
+        failed_message_ids = dispatch.run_db_subscribers(collect_activity_logs)
+
+        for message_id in failed_message_ids:
+            activity_logs_by_message_id.pop(message_id, None)
+
+        try:
+            self.__persist_batch(
+                [messages_by_id[message_id] for message_id in activity_logs_by_message_id.keys()],
+                activity_logs_by_message_id,
+            )
+        except Exception as e:
+            db.session.rollback()
+            logger.exception(f"Error persisting audit messages batch, falling back to one by one: {e}")
+
+            # isolate the offending messages so the rest of the batch is not retried with them
+            for message_id, activity_logs in activity_logs_by_message_id.items():
+                try:
+                    self.__persist_batch([messages_by_id[message_id]], {message_id: activity_logs})
+                except Exception as e:
+                    db.session.rollback()
+                    logger.exception(f"Error persisting audit message {message_id}: {e}")
+                    failed_message_ids.add(message_id)
+
+        failed_message_ids.update(dispatch.wait())
+
+        self.__reconcile_customer_tags()
+
+        logger.info(f"Audit subscriber metrics: {self.__audit_dispatcher.metrics()}")
+
+        return failed_message_ids
+
+    def __reconcile_customer_tags(self) -> None:
+        # customers left in the queue are picked up by the next batch or the scheduled reconciliation
+        try:
+            self.__tagging_service.reconcile_customer_tags()
+        except Exception as e:
+            db.session.rollback()
+            logger.exception(f"Error reconciling customer tags: {e}")
+
+    def __register_default_subscribers(self) -> None:
+        user_activity_log_handlers = {
+            "USER_CREATED": self.__user_activity_log_service.user_created,
+            "USER_UPDATED": self.__user_activity_log_service.user_updated,
+            "EVENT_CREATED": self.__user_activity_log_service.event_created,
+            "EVENT_UPDATED": self.__user_activity_log_service.event_updated,
+            "ATTENDEE_CREATED": self.__user_activity_log_service.attendee_created,
+            "ATTENDEE_UPDATED": self.__user_activity_log_service.attendee_updated,
+            "LOOK_CREATED": self.__user_activity_log_service.look_created,
+            "LOOK_UPDATED": self.__user_activity_log_service.look_updated,
+            "MEASUREMENT_CREATED": self.__user_activity_log_service.measurements_created,
+            "SIZE_CREATED": self.__user_activity_log_service.sizes_created,
+            "ORDER_CREATED": self.__user_activity_log_service.order_created,
+            "ORDER_UPDATED": self.__user_activity_log_service.order_updated,
+        }
+
+        for message_type, handler in user_activity_log_handlers.items():
+            # activity logs are written together with the audit log, a redelivered message already has them
+            self.subscribe(AuditSubscriber("user_activity_log", {message_type}, handler, on_redelivery=False))
+
+        # both only queue the customers of the event for reconciliation, once per event is enough
+        self.subscribe(
+            AuditSubscriber(
+                "customer_tags_on_event_updated",
+                {"EVENT_UPDATED"},
+                self.__tagging_service.tag_customers_on_event_updated,
+                key=lambda audit_log_message: audit_log_message.payload.get("id"),
+            )
+        )
+        self.subscribe(
+            AuditSubscriber(
+                "customer_tags_on_attendee_updated",
+                {"ATTENDEE_UPDATED"},
+                self.__tagging_service.tag_customers_on_attendee_updated,
+                key=lambda audit_log_message: (
+                    audit_log_message.payload.get("event_id"),
+                    bool(audit_log_message.payload.get("user_id")),
+                ),
+            )
+        )
+        self.subscribe(
+            AuditSubscriber(
+                "product_tags_on_attendee_updated",
+                {"ATTENDEE_UPDATED"},
+                self.__tagging_service.tag_products_on_attendee_updated,
+                kind=AuditSubscriberKind.EXTERNAL,
+                key=self.__look_ids_in_question,
             )
         )
 
+    @staticmethod
+    def __look_ids_in_question(audit_log_message: AuditLogMessage) -> frozenset[str]:
+        look_ids = {audit_log_message.payload.get("look_id")}
+        look_id_diff = (audit_log_message.diff or {}).get("look_id") or {}
+        look_ids.update({look_id_diff.get("before"), look_id_diff.get("after")})
+
+        return frozenset(look_id for look_id in look_ids if look_id)
+
+    @staticmethod
+    def __get_persisted_audit_log_ids(audit_log_ids: list[str]) -> set[str]:
+        if not audit_log_ids:
+            return set()
+
+        return {
+            str(audit_log_id)
+            for audit_log_id in db.session.execute(
+                select(AuditLog.id).where(AuditLog.id.in_([uuid.UUID(audit_log_id) for audit_log_id in audit_log_ids]))
+            ).scalars()
+        }
+
+    def __persist_batch(
+        self, audit_log_messages: list[AuditLogMessage], activity_logs_by_message_id: dict[str, list[dict[str, Any]]]
+    ) -> None:
+        if not audit_log_messages:
+            return
+
+        created_at = datetime.now(timezone.utc)
+
+        inserted_ids = {
+            str(audit_log_id)
+            for audit_log_id in db.session.execute(
+                insert(AuditLog)
+                .values(
+                    [
+                        {
+                            "id": audit_log_message.id,
+                            "request": audit_log_message.request,
+                            "type": audit_log_message.type,
+                            "payload": audit_log_message.payload,
+                            "diff": audit_log_message.diff,
+                            "created_at": created_at,
+                        }
+                        for audit_log_message in audit_log_messages
+                    ]
+                )
+                .on_conflict_do_nothing(index_elements=["id"])
+                .returning(AuditLog.id)
+            ).scalars()
+        }
+
+        # audit logs persisted concurrently by another consumer already have their activity logs
+        activity_logs = [
+            activity_log
+            for message_id, message_activity_logs in activity_logs_by_message_id.items()
+            if message_id in inserted_ids
+            for activity_log in message_activity_logs
+        ]
+
+        self.__user_activity_log_service.persist_all(activity_logs)
+
         db.session.commit()
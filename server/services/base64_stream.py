@@ -0,0 +1,54 @@
+import base64
+import io
+
+DATA_URL_SEPARATOR = ";base64,"
+# multiple of 4 so chunks without whitespace decode without carrying anything over
+DEFAULT_CHUNK_SIZE = 256 * 1024
+
+
+class Base64DecodeStream(io.RawIOBase):
+    """
+    Binary stream of base64 encoded data, decoded a chunk at a time as it's read so the whole decoded body is never
+    held in memory next to the encoded one. Data URLs are read from their payload on and whitespace is skipped.
+    """
+
+    def __init__(self, encoded: str, chunk_size: int = DEFAULT_CHUNK_SIZE):
+        super().__init__()
+
+        separator = encoded.find(DATA_URL_SEPARATOR, 0, 256) if encoded.startswith("data:") else -1
+
+        self.__encoded = encoded
+        self.__offset = separator + len(DATA_URL_SEPARATOR) if separator >= 0 else 0
+        self.__chunk_size = chunk_size
+        # encoded characters left over from the previous chunk, less than 4 of them
+        self.__carry = ""
+        self.__decoded = memoryview(b"")
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        while not self.__decoded and (self.__offset < len(self.__encoded) or self.__carry):
+            self.__decoded = memoryview(self.__decode_next_chunk())
+
+        size = min(len(buffer), len(self.__decoded))
+        buffer[:size] = self.__decoded[:size]
+        # slicing a memoryview doesn't copy what's left of the chunk
+        self.__decoded = self.__decoded[size:]
+
+        return size
+
+    def __decode_next_chunk(self) -> bytes:
+        chunk = self.__encoded[self.__offset : self.__offset + self.__chunk_size]
+        self.__offset += len(chunk)
+
+        # joining a single part returns it as is, chunks without whitespace aren't copied
+        chunk = self.__carry + "".join(chunk.split())
+
+        if self.__offset < len(self.__encoded):
+            aligned = len(chunk) - len(chunk) % 4
+            chunk, self.__carry = chunk[:aligned], chunk[aligned:]
+        else:
+            self.__carry = ""
+
+        return base64.b64decode(chunk, validate=True) if chunk else b""
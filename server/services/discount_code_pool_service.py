@@ -0,0 +1,172 @@
+import logging
+import secrets
+import uuid
+from typing import Optional
+
+from sqlalchemy import delete, func, select
+
+from server.database.database_manager import db
+from server.database.models import Discount, DiscountType, PooledDiscountCode, PooledDiscountCodeType
+from server.models.discount_model import DiscountModel
+from server.services import ServiceError
+from server.services.integrations.shopify_service import AbstractShopifyService, DiscountAmountType
+
+logger = logging.getLogger(__name__)
+
+TMG_GROUP_50_USD_OFF_DISCOUNT_CODE_PREFIX = "TMG-GROUP-50-OFF"
+TMG_GROUP_50_USD_AMOUNT = 50
+TMG_GROUP_25_PERCENT_OFF_DISCOUNT_CODE_PREFIX = "TMG-GROUP-25%-OFF"
+TMG_GROUP_25_PERCENT_OFF = 0.25
+TMG_MIN_SUIT_PRICE_FOR_25_PERCENT_OFF = 300
+TMG_MIN_SUIT_PRICE: int = 260
+
+# code prefix, amount type, amount and minimum order amount of the shopify discount
+POOLED_DISCOUNT_CODES = {
+    PooledDiscountCodeType.TMG_GROUP_50_USD_OFF: (
+        TMG_GROUP_50_USD_OFF_DISCOUNT_CODE_PREFIX,
+        DiscountAmountType.FIXED_AMOUNT,
+        TMG_GROUP_50_USD_AMOUNT,
+        TMG_MIN_SUIT_PRICE,
+    ),
+    PooledDiscountCodeType.TMG_GROUP_25_PERCENT_OFF: (
+        TMG_GROUP_25_PERCENT_OFF_DISCOUNT_CODE_PREFIX,
+        DiscountAmountType.PERCENTAGE,
+        TMG_GROUP_25_PERCENT_OFF,
+        TMG_MIN_SUIT_PRICE_FOR_25_PERCENT_OFF,
+    ),
+}
+
+DISCOUNT_CODE_POOL_SIZE = 200
+DISCOUNT_CODE_POOL_LOW_WATERMARK = 50
+
+
+class DiscountCodePoolService:
+    """
+    Keeps a pool of group discount codes created in Shopify ahead of time, so applying discounts in the cart doesn't
+    wait for Shopify. Pooled codes aren't bound to a customer in Shopify, only to the attendee that claims them in our
+    db, that's why they get a random suffix that can't be guessed like the one of codes created on demand.
+    """
+
+    def __init__(
+        self,
+        shopify_service: AbstractShopifyService,
+        pool_size: int = DISCOUNT_CODE_POOL_SIZE,
+        low_watermark: int = DISCOUNT_CODE_POOL_LOW_WATERMARK,
+    ):
+        self.__shopify_service = shopify_service
+        self.__pool_size = pool_size
+        self.__low_watermark = low_watermark
+
+    def claim_group_discount(
+        self,
+        pooled_discount_code_type: PooledDiscountCodeType,
+        attendee_id: uuid.UUID,
+        event_id: uuid.UUID,
+        amount: float,
+    ) -> Optional[DiscountModel]:
+        """
+        Takes a code out of the pool into a group discount of the attendee, None if the pool is empty. The claim is
+        part of the current transaction, committing is up to the caller.
+        """
+
+        # concurrent claims skip the rows locked by each other instead of waiting for them
+        claimable_code_id = (
+            select(PooledDiscountCode.id)
+            .where(PooledDiscountCode.type == pooled_discount_code_type)
+            .order_by(PooledDiscountCode.created_at)
+            .limit(1)
+            .with_for_update(skip_locked=True)
+            .scalar_subquery()
+        )
+
+        try:
+            # a failed claim is rolled back on its own, leaving the rest of the caller's transaction as it was
+            with db.session.begin_nested():
+                pooled_discount_code = db.session.execute(
+                    delete(PooledDiscountCode)
+                    .where(PooledDiscountCode.id == claimable_code_id)
+                    .returning(PooledDiscountCode.shopify_discount_code, PooledDiscountCode.shopify_discount_code_id)
+                    .execution_options(synchronize_session=False)
+                ).one_or_none()
+
+                if not pooled_discount_code:
+                    return None
+
+                discount = Discount(
+                    attendee_id=attendee_id,
+                    event_id=event_id,
+                    type=DiscountType.PARTY_OF_FOUR,
+                    amount=amount,
+                    shopify_discount_code=pooled_discount_code.shopify_discount_code,
+                    shopify_discount_code_id=pooled_discount_code.shopify_discount_code_id,
+                )
+                db.session.add(discount)
+        except Exception as e:
+            raise ServiceError("Failed to claim pooled discount code.", e)
+
+        return DiscountModel.model_validate(discount)
+
+    @staticmethod
+    def get_num_available_codes() -> dict[PooledDiscountCodeType, int]:
+        num_available_codes = dict(
+            db.session.execute(
+                select(PooledDiscountCode.type, func.count(PooledDiscountCode.id)).group_by(PooledDiscountCode.type)
+            ).all()
+        )
+
+        return {
+            pooled_discount_code_type: num_available_codes.get(pooled_discount_code_type, 0)
+            for pooled_discount_code_type in POOLED_DISCOUNT_CODES
+        }
+
+    def refill(self) -> dict[str, dict[str, int]]:
+        """Tops up the pool of each code type to the pool size. Alerts on types that ran below the low watermark."""
+
+        result = {}
+
+        for pooled_discount_code_type, num_available in self.get_num_available_codes().items():
+            if num_available < self.__low_watermark:
+                # claims fall back to creating codes in shopify while the customer waits once the pool is empty
+                logger.error(
+                    f"Discount code pool {pooled_discount_code_type} is low: {num_available} codes left, "
+                    f"low watermark is {self.__low_watermark}"
+                )
+
+            num_created = 0
+
+            for _ in range(self.__pool_size - num_available):
+                try:
+                    self.__create_pooled_discount_code(pooled_discount_code_type)
+                except Exception as e:
+                    logger.error(f"Failed to create pooled discount code {pooled_discount_code_type}: {e}")
+                    break
+
+                num_created += 1
+
+            result[str(pooled_discount_code_type)] = {"available": num_available, "created": num_created}
+
+        logger.info(f"Refilled discount code pool: {result}")
+
+        return result
+
+    def __create_pooled_discount_code(self, pooled_discount_code_type: PooledDiscountCodeType) -> None:
+        prefix, discount_amount_type, amount, minimum_order_amount = POOLED_DISCOUNT_CODES[pooled_discount_code_type]
+        code = f"{prefix}-{secrets.token_hex(6).upper()}"
+
+        shopify_discount = self.__shopify_service.create_discount_code(
+            code, code, None, discount_amount_type, amount, minimum_order_amount
+        )
+
+        # committed one by one, so codes already created in shopify aren't lost if a later one fails
+        try:
+            db.session.add(
+                PooledDiscountCode(
+                    type=pooled_discount_code_type,
+                    shopify_discount_code=shopify_discount.get("shopify_discount_code"),
+                    shopify_discount_code_id=shopify_discount.get("shopify_discount_id"),
+                )
+            )
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            raise ServiceError("Failed to save pooled discount code.", e)
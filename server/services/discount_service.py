@@ -1,12 +1,16 @@
 import logging
 import random
 import uuid
-from datetime import datetime, timezone
-from operator import or_
+from datetime import datetime, timedelta, timezone
+from typing import Optional
 from uuid import UUID
 
+from sqlalchemy import and_, any_, bindparam, func, or_, select, update
+from sqlalchemy.dialects.postgresql import ARRAY, UUID as PG_UUID, aggregate_order_by
+from sqlalchemy.orm import aliased
+
 from server.database.database_manager import db
-from server.database.models import Discount, Attendee, DiscountType, Event, User, Look
+from server.database.models import Discount, Attendee, DiscountType, Event, User, Look, PooledDiscountCodeType
 from server.models.attendee_model import AttendeeModel
 from server.models.discount_model import (
     DiscountModel,
@@ -20,6 +24,15 @@ from server.models.discount_model import (
 from server.models.shopify_model import ShopifyProduct
 from server.services import ServiceError, NotFoundError, BadRequestError
 from server.services.attendee_service import AttendeeService
+from server.services.discount_code_pool_service import (
+    DiscountCodePoolService,
+    TMG_GROUP_50_USD_OFF_DISCOUNT_CODE_PREFIX,
+    TMG_GROUP_50_USD_AMOUNT,
+    TMG_GROUP_25_PERCENT_OFF_DISCOUNT_CODE_PREFIX,
+    TMG_GROUP_25_PERCENT_OFF,
+    TMG_MIN_SUIT_PRICE_FOR_25_PERCENT_OFF,
+    TMG_MIN_SUIT_PRICE,
+)
 from server.services.event_service import EventService
 from server.services.integrations.shopify_service import AbstractShopifyService, DiscountAmountType, ShopifyService
 from server.services.look_service import LookService
@@ -27,12 +40,8 @@ from server.services.user_service import UserService
 
 DISCOUNT_GIFT_FOR_ATTENDEE = "DISCOUNT_GIFT_FOR_ATTENDEE"
 GIFT_DISCOUNT_CODE_PREFIX = "GIFT"
-TMG_GROUP_50_USD_OFF_DISCOUNT_CODE_PREFIX = "TMG-GROUP-50-OFF"
-TMG_GROUP_50_USD_AMOUNT = 50
-TMG_GROUP_25_PERCENT_OFF_DISCOUNT_CODE_PREFIX = "TMG-GROUP-25%-OFF"
-TMG_GROUP_25_PERCENT_OFF = 0.25
-TMG_MIN_SUIT_PRICE_FOR_25_PERCENT_OFF = 300
-TMG_MIN_SUIT_PRICE: int = 260
+DISCOUNT_DEACTIVATION_BATCH_SIZE = 100
+GROUP_DISCOUNT_EXPIRES_AFTER_EVENT = timedelta(days=180)
 
 logger = logging.getLogger(__name__)
 
@@ -45,12 +54,14 @@ class DiscountService:
         event_service: EventService,
         attendee_service: AttendeeService,
         look_service: LookService,
+        discount_code_pool_service: DiscountCodePoolService,
     ):
         self.shopify_service = shopify_service
         self.user_service = user_service
         self.event_service = event_service
         self.attendee_service = attendee_service
         self.look_service = look_service
+        self.discount_code_pool_service = discount_code_pool_service
 
     @staticmethod
     def get_discount_by_id(discount_id: uuid.UUID) -> Discount:
@@ -115,60 +126,129 @@ class DiscountService:
         return Discount.query.filter(Discount.event_id == event_id).all()
 
     def get_owner_discounts_for_event(self, event_id: UUID) -> list[EventDiscountModel]:
-        event = self.event_service.get_event_by_id(event_id)
+        """Reads the event, its active attendees with their looks and discounts in a single query."""
 
-        if not event:
-            raise NotFoundError("Event not found.")
+        event_owner = aliased(User)
 
-        users_attendees_looks = (
-            db.session.query(Attendee, User, Look, Event)
-            .outerjoin(User, User.id == Attendee.user_id)
-            .outerjoin(Look, Attendee.look_id == Look.id)
-            .join(Event, event_id == Event.id)
-            .filter(Attendee.event_id == event_id, Attendee.is_active)
-            .all()
+        discount_intents = (
+            select(
+                Discount.attendee_id,
+                func.json_agg(aggregate_order_by(Discount.amount, Discount.created_at)).label("amounts"),
+            )
+            .where(
+                Discount.event_id == event_id,
+                Discount.type == DiscountType.GIFT,
+                Discount.shopify_discount_code.is_(None),
+            )
+            .group_by(Discount.attendee_id)
+            .cte("discount_intents")
         )
 
-        if not users_attendees_looks:
-            return []
+        paid_discounts = (
+            select(
+                Discount.attendee_id,
+                func.json_agg(
+                    aggregate_order_by(
+                        func.json_build_object(
+                            "code",
+                            Discount.shopify_discount_code,
+                            "amount",
+                            Discount.amount,
+                            "type",
+                            Discount.type,
+                            "used",
+                            Discount.used,
+                        ),
+                        Discount.created_at,
+                    )
+                ).label("discounts"),
+            )
+            .where(
+                Discount.event_id == event_id,
+                Discount.type.in_([DiscountType.GIFT, DiscountType.PARTY_OF_FOUR]),
+                Discount.shopify_discount_code.is_not(None),
+            )
+            .group_by(Discount.attendee_id)
+            .cte("paid_discounts")
+        )
 
-        look_bundle_prices = self.__fetch_look_prices(users_attendees_looks)
+        rows = db.session.execute(
+            select(
+                Event.user_id.label("owner_id"),
+                Attendee.id.label("attendee_id"),
+                Attendee.first_name,
+                Attendee.last_name,
+                Attendee.style,
+                Attendee.invite,
+                Attendee.pay,
+                User.id.label("user_id"),
+                User.first_name.label("user_first_name"),
+                User.last_name.label("user_last_name"),
+                Look.id.label("look_id"),
+                Look.name.label("look_name"),
+                Look.product_specs,
+                discount_intents.c.amounts.label("discount_intent_amounts"),
+                paid_discounts.c.discounts.label("paid_discounts"),
+            )
+            .select_from(Event)
+            # event without an owner is not found, same as get_event_by_id
+            .join(event_owner, event_owner.id == Event.user_id)
+            .outerjoin(Attendee, and_(Attendee.event_id == Event.id, Attendee.is_active))
+            .outerjoin(User, User.id == Attendee.user_id)
+            .outerjoin(Look, Look.id == Attendee.look_id)
+            .outerjoin(discount_intents, discount_intents.c.attendee_id == Attendee.id)
+            .outerjoin(paid_discounts, paid_discounts.c.attendee_id == Attendee.id)
+            .where(Event.id == event_id)
+        ).all()
+
+        if not rows:
+            raise NotFoundError("Event not found.")
 
         owner_discounts = {}
+        bundle_prices = self.look_service.get_bundle_prices([row.product_specs for row in rows])
 
-        num_attendees = 0
+        for row in rows:
+            if not row.attendee_id:
+                # event without attendees
+                continue
 
-        for attendee, user, look, event in users_attendees_looks:
             look_model = None
 
-            if look and look.product_specs:
-                bundle_variant_id = look.product_specs.get("bundle", {}).get("variant_id")
-
-                if bundle_variant_id:
-                    look_price = look_bundle_prices.get(bundle_variant_id, 0.0)
-                    look_model = DiscountLookModel(id=look.id, name=look.name, price=float(look_price))
-
-            num_attendees += 1
+            if row.product_specs and row.product_specs.get("bundle", {}).get("variant_id"):
+                look_model = DiscountLookModel(
+                    id=row.look_id,
+                    name=row.look_name,
+                    price=float(self.look_service.get_look_price(row, bundle_prices)),
+                )
 
-            owner_discounts[attendee.id] = EventDiscountModel(
+            owner_discount = EventDiscountModel(
                 event_id=event_id,
-                amount=0.0,
+                amount=row.discount_intent_amounts[-1] if row.discount_intent_amounts else 0.0,
                 type=DiscountType.GIFT,
-                attendee_id=attendee.id,
-                user_id=user.id if user else None,
-                is_owner=(user.id == event.user_id) if user else False,
-                first_name=attendee.first_name or user.first_name,
-                last_name=attendee.last_name or user.last_name,
+                attendee_id=row.attendee_id,
+                user_id=row.user_id,
+                is_owner=(row.user_id == row.owner_id) if row.user_id else False,
+                first_name=row.first_name or row.user_first_name,
+                last_name=row.last_name or row.user_last_name,
                 look=look_model,
-                status=DiscountStatusModel(style=attendee.style, invite=attendee.invite, pay=attendee.pay),
+                status=DiscountStatusModel(style=row.style, invite=row.invite, pay=row.pay),
             )
 
-        attendee_ids = owner_discounts.keys()
+            for paid_discount in row.paid_discounts or []:
+                owner_discount.gift_codes.append(
+                    DiscountGiftCodeModel(
+                        code=paid_discount["code"],
+                        amount=paid_discount["amount"],
+                        type=str(DiscountType[paid_discount["type"]]),
+                        used=paid_discount["used"],
+                    )
+                )
 
-        self.__enrich_owner_discounts_with_discount_intents_information(owner_discounts, attendee_ids, event_id)
-        self.__enrich_owner_discounts_with_paid_discounts_information(owner_discounts, attendee_ids, event_id)
+            owner_discounts[row.attendee_id] = owner_discount
 
-        if num_attendees >= 4:
+        attendee_ids = owner_discounts.keys()
+
+        if len(owner_discounts) >= 4:
             self.__enrich_owner_discounts_with_tmg_group_virtual_discount_code(owner_discounts, attendee_ids)
 
         self.__calculate_remaining_amount(owner_discounts)
@@ -213,52 +293,6 @@ class DiscountService:
             for gift_code in owner_discount.gift_codes:
                 owner_discount.remaining_amount -= gift_code.amount
 
-    def __fetch_look_prices(self, users_attendees_looks: list[tuple]) -> dict[str, float]:
-        look_bundle_prices: dict[str, float] = dict()
-
-        for _, _, look, _ in users_attendees_looks:
-            if not look or not look.product_specs:
-                continue
-
-            bundle_variant_id = look.product_specs.get("bundle", {}).get("variant_id")
-            look_bundle_prices[bundle_variant_id] = self.look_service.get_look_price(look)
-
-        return look_bundle_prices
-
-    @staticmethod
-    def __enrich_owner_discounts_with_discount_intents_information(owner_discounts, attendee_ids, event_id):
-        discount_intents = Discount.query.filter(
-            Discount.event_id == event_id,
-            Discount.type == DiscountType.GIFT,
-            Discount.shopify_discount_code == None,
-            Discount.attendee_id.in_(attendee_ids),
-        ).all()
-
-        for discount_intent in discount_intents:
-            owner_discount = owner_discounts[discount_intent.attendee_id]
-            owner_discount.attendee_id = discount_intent.attendee_id
-            owner_discount.type = discount_intent.type
-            owner_discount.amount = discount_intent.amount
-
-    @staticmethod
-    def __enrich_owner_discounts_with_paid_discounts_information(owner_discounts, attendee_ids, event_id):
-        paid_discounts = Discount.query.filter(
-            Discount.event_id == event_id,
-            or_(Discount.type == DiscountType.GIFT, Discount.type == DiscountType.PARTY_OF_FOUR),
-            Discount.shopify_discount_code != None,
-            Discount.attendee_id.in_(attendee_ids),
-        ).all()
-
-        for paid_discount in paid_discounts:
-            owner_discounts[paid_discount.attendee_id].gift_codes.append(
-                DiscountGiftCodeModel(
-                    code=paid_discount.shopify_discount_code,
-                    amount=paid_discount.amount,
-                    type=str(paid_discount.type),
-                    used=paid_discount.used,
-                )
-            )
-
     @staticmethod
     def __enrich_owner_discounts_with_tmg_group_virtual_discount_code(owner_discounts, attendee_ids):
         for attendee_id in attendee_ids:
@@ -325,8 +359,100 @@ class DiscountService:
 
         self.shopify_service.deactivate_discount(ShopifyService.discount_gid(discount.shopify_discount_code_id))
 
+        discount.deactivated_at = datetime.now(timezone.utc)
+        db.session.commit()
+
         return DiscountModel.model_validate(discount)
 
+    def deactivate_used_and_expired_discounts(
+        self, batch_size: int = DISCOUNT_DEACTIVATION_BATCH_SIZE, max_batches: Optional[int] = None
+    ) -> dict[str, int]:
+        """
+        Deactivates codes in Shopify that can't or shouldn't be used anymore: used codes and group discount codes of
+        removed attendees, removed events or events long past. Gift codes are paid for and never expire. Every batch is
+        committed, deactivated codes aren't picked up again, so a run that stops midway is resumed by the next one.
+        """
+
+        expired_after = datetime.now(timezone.utc) - GROUP_DISCOUNT_EXPIRES_AFTER_EVENT
+        num_batches, num_found, num_deactivated = 0, 0, 0
+        # codes shopify failed to deactivate are skipped for the rest of the run and retried by the next one
+        last_discount_id = None
+
+        while max_batches is None or num_batches < max_batches:
+            query = (
+                select(Discount.id, Discount.shopify_discount_code_id)
+                .join(Attendee, Attendee.id == Discount.attendee_id)
+                .join(Event, Event.id == Discount.event_id)
+                .where(
+                    Discount.deactivated_at.is_(None),
+                    Discount.shopify_discount_code_id.isnot(None),
+                    or_(
+                        Discount.used,
+                        and_(
+                            Discount.type == DiscountType.PARTY_OF_FOUR,
+                            or_(
+                                Attendee.is_active.is_(False),
+                                Event.is_active.is_(False),
+                                Event.event_at < expired_after,
+                            ),
+                        ),
+                    ),
+                )
+                .order_by(Discount.id)
+                .limit(batch_size)
+            )
+
+            if last_discount_id:
+                query = query.where(Discount.id > last_discount_id)
+
+            discounts = db.session.execute(query).all()
+
+            if not discounts:
+                break
+
+            num_batches += 1
+            num_found += len(discounts)
+            last_discount_id = discounts[-1].id
+
+            discount_ids_by_gid = {
+                ShopifyService.discount_gid(discount.shopify_discount_code_id): discount.id for discount in discounts
+            }
+
+            try:
+                deactivated_discount_gids = self.shopify_service.deactivate_discounts(list(discount_ids_by_gid.keys()))
+            except ServiceError as e:
+                logger.error(f"Failed to deactivate {len(discounts)} discounts in Shopify: {e}")
+                continue
+
+            if not deactivated_discount_gids:
+                continue
+
+            deactivated_discount_ids = [discount_ids_by_gid[gid] for gid in deactivated_discount_gids]
+
+            try:
+                db.session.execute(
+                    update(Discount)
+                    .where(Discount.id == any_(bindparam("discount_ids", type_=ARRAY(PG_UUID(as_uuid=True)))))
+                    .values(deactivated_at=datetime.now(timezone.utc))
+                    .execution_options(synchronize_session=False),
+                    {"discount_ids": deactivated_discount_ids},
+                )
+                db.session.commit()
+            except Exception as e:
+                db.session.rollback()
+                raise ServiceError("Failed to mark discounts as deactivated.", e)
+
+            num_deactivated += len(deactivated_discount_ids)
+
+            if len(discounts) < batch_size:
+                break
+
+        result = {"batches": num_batches, "found": num_found, "deactivated": num_deactivated}
+
+        logger.info(f"Deactivated used and expired discounts: {result}")
+
+        return result
+
     def create_discount_intents(
         self, event_id: uuid.UUID, discount_intents: list[CreateDiscountIntent]
     ) -> DiscountPayResponseModel:
@@ -338,11 +464,30 @@ class DiscountService:
         if not event or not event.is_active:
             raise NotFoundError("Event not found.")
 
-        attendees = {}
+        # attendees of all intents with their looks and users, and the number of attendees of the event
+        event_attendee = aliased(Attendee)
+        attendees_looks_users = {
+            attendee.id: (attendee, look, user, num_attendees)
+            for attendee, look, user, num_attendees in db.session.execute(
+                select(
+                    Attendee,
+                    Look,
+                    User,
+                    select(func.count(event_attendee.id))
+                    .where(event_attendee.event_id == event_id, event_attendee.is_active)
+                    .scalar_subquery(),
+                )
+                .outerjoin(Look, Look.id == Attendee.look_id)
+                .outerjoin(User, User.id == Attendee.user_id)
+                .where(Attendee.id.in_({intent.attendee_id for intent in discount_intents}), Attendee.is_active)
+            ).all()
+        }
 
         for intent in discount_intents:
-            attendee = self.attendee_service.get_attendee_by_id(intent.attendee_id)
-            attendees[attendee.id] = attendee
+            if intent.attendee_id not in attendees_looks_users:
+                raise NotFoundError("Attendee not found.")
+
+            attendee, _, _, _ = attendees_looks_users[intent.attendee_id]
 
             if not attendee.style:
                 raise BadRequestError("Attendee is not styled.")
@@ -353,30 +498,28 @@ class DiscountService:
             if not attendee.look_id:
                 raise BadRequestError("Attendee has no look associated.")
 
-        num_attendees = self.attendee_service.get_num_discountable_attendees_for_event(event_id)
-        existing_discounts = self.get_discounts_for_event(event_id)
+        existing_discounts = Discount.query.filter(Discount.event_id == event_id).all()
         discounts_without_codes = self.__filter_discounts_without_codes(existing_discounts)
 
-        intents = []
-        total_intent_amount = 0
-        shopify_products_to_remove = set()
+        already_paid_discount_amounts = {}
+
+        for discount in existing_discounts:
+            if discount.shopify_discount_code is not None and discount.type == DiscountType.GIFT:
+                already_paid_discount_amounts[discount.attendee_id] = (
+                    already_paid_discount_amounts.get(discount.attendee_id, 0) + discount.amount
+                )
 
-        created_discounts = []
+        bundle_prices = self.look_service.get_bundle_prices(
+            [look.product_specs for _, look, _, _ in attendees_looks_users.values() if look]
+        )
 
         for intent in discount_intents:
-            attendee = attendees.get(intent.attendee_id)
-            look = self.look_service.get_look_by_id(attendee.look_id)
-            look_price = self.look_service.get_look_price(look)
+            attendee, look, _, num_attendees = attendees_looks_users[intent.attendee_id]
 
-            already_paid_discount_amount = 0
+            if not look:
+                raise NotFoundError("Look not found")
 
-            for discount in existing_discounts:
-                if (
-                    discount.attendee_id == attendee.id
-                    and discount.shopify_discount_code is not None
-                    and discount.type == DiscountType.GIFT
-                ):
-                    already_paid_discount_amount += discount.amount
+            look_price = self.look_service.get_look_price(look, bundle_prices)
 
             tmg_group_discount = 0
 
@@ -386,29 +529,44 @@ class DiscountService:
                 else:
                     tmg_group_discount = look_price * TMG_GROUP_25_PERCENT_OFF
 
-            if already_paid_discount_amount + intent.amount + tmg_group_discount > look_price:
+            if already_paid_discount_amounts.get(attendee.id, 0) + intent.amount + tmg_group_discount > look_price:
                 raise BadRequestError("Pay amount exceeds look price")
 
+        total_intent_amount = sum(intent.amount for intent in discount_intents)
+        # read before commit expires the loaded users
+        attendee_user_names = {
+            attendee_id: (user.first_name, user.last_name)
+            for attendee_id, (_, _, user, _) in attendees_looks_users.items()
+            if user
+        }
+        shopify_products_to_remove = {
+            discount.shopify_virtual_product_id
+            for discount in discounts_without_codes
+            if discount.shopify_virtual_product_variant_id
+        }
+
+        # Ids and timestamps are set here so the flush has nothing to read back and inserts the intents in a single
+        # batch. Writes go through the session so they're audit logged.
+        now = datetime.now(timezone.utc)
+        intents = [
+            Discount(
+                id=uuid.uuid4(),
+                event_id=event_id,
+                attendee_id=intent.attendee_id,
+                amount=intent.amount,
+                type=DiscountType.GIFT,
+                created_at=now,
+                updated_at=now,
+            )
+            for intent in discount_intents
+        ]
+        intent_ids = [intent.id for intent in intents]
+
         try:
             for discount in discounts_without_codes:
-                if discount.shopify_virtual_product_variant_id:
-                    shopify_products_to_remove.add(discount.shopify_virtual_product_id)
-
                 db.session.delete(discount)
 
-            for intent in discount_intents:
-                attendee = attendees.get(intent.attendee_id)
-
-                total_intent_amount += intent.amount
-
-                discount_intent = Discount(
-                    event_id=event_id, attendee_id=attendee.id, amount=intent.amount, type=DiscountType.GIFT
-                )
-
-                intents.append(discount_intent)
-
-                db.session.add(discount_intent)
-
+            db.session.add_all(intents)
             db.session.commit()
 
             for shopify_product_id in shopify_products_to_remove:
@@ -424,18 +582,16 @@ class DiscountService:
             db.session.rollback()
             raise ServiceError("Failed to persist discount intents.", e)
 
-        for intent in intents:
-            db.session.refresh(intent)
-
         try:
             product_body = "<strong>Groom gift discounts:</strong>"
             product_body += "<ul>"
 
-            for intent in intents:
-                attendee_user = self.user_service.get_user_for_attendee(intent.attendee_id)
-                product_body += (
-                    f"<li>Gift for {attendee_user.first_name} {attendee_user.last_name}: ${intent.amount}</li>"
-                )
+            for intent in discount_intents:
+                if intent.attendee_id not in attendee_user_names:
+                    raise NotFoundError("User not found.")
+
+                first_name, last_name = attendee_user_names[intent.attendee_id]
+                product_body += f"<li>Gift for {first_name} {last_name}: ${intent.amount}</li>"
 
             product_body += "</ul>"
 
@@ -447,16 +603,20 @@ class DiscountService:
                 tags=["hidden", "event_id=" + str(event.id), "user_id=" + str(event.user_id)],
             )
 
-            for discount_intent in intents:
-                discount_intent.shopify_virtual_product_id = shopify_product.get_id()
-                discount_intent.shopify_virtual_product_variant_id = shopify_product.variants[0].get_id()
-                db.session.add(discount_intent)
+            # reloads the intents expired by the commit in one query rather than one per intent
+            intents = Discount.query.filter(Discount.id.in_(intent_ids)).all()
+
+            for intent in intents:
+                intent.shopify_virtual_product_id = shopify_product.get_id()
+                intent.shopify_virtual_product_variant_id = shopify_product.variants[0].get_id()
 
             db.session.commit()
         except Exception as e:
+            db.session.rollback()
+
             # remove newly created discount intents if shopify product creation fails
-            for discount in created_discounts:
-                db.session.delete(discount)
+            for intent in Discount.query.filter(Discount.id.in_(intent_ids)).all():
+                db.session.delete(intent)
 
             db.session.commit()
 
@@ -504,16 +664,32 @@ class DiscountService:
         if not look or not look.product_specs or not look.product_specs.get("bundle", {}).get("variant_id"):
             raise ServiceError("Look has no bundle associated")
 
-        event = self.event_service.get_event_by_id(event_id)
-        look_price = self.look_service.get_look_price(look)
+        look_price = self.look_service.get_look_prices([look])[look.id]
+
+        if look_price <= TMG_MIN_SUIT_PRICE_FOR_25_PERCENT_OFF:
+            pooled_discount_code_type = PooledDiscountCodeType.TMG_GROUP_50_USD_OFF
+            discount_amount = TMG_GROUP_50_USD_AMOUNT
+        else:
+            pooled_discount_code_type = PooledDiscountCodeType.TMG_GROUP_25_PERCENT_OFF
+            discount_amount = look_price * TMG_GROUP_25_PERCENT_OFF
+
+        discount = self.discount_code_pool_service.claim_group_discount(
+            pooled_discount_code_type, attendee.id, event_id, discount_amount
+        )
+
+        if discount:
+            db.session.commit()
+
+            return discount
+
+        logger.warning(f"Discount code pool {pooled_discount_code_type} is empty, creating code in Shopify")
+
         attendee_user = self.user_service.get_user_for_attendee(attendee.id)
 
         if look_price <= TMG_MIN_SUIT_PRICE_FOR_25_PERCENT_OFF:
             code = f"{TMG_GROUP_50_USD_OFF_DISCOUNT_CODE_PREFIX}-{random.randint(100000, 999999)}"
-            discount_amount = TMG_GROUP_50_USD_AMOUNT
         else:
             code = f"{TMG_GROUP_25_PERCENT_OFF_DISCOUNT_CODE_PREFIX}-{random.randint(100000, 999999)}"
-            discount_amount = look_price * TMG_GROUP_25_PERCENT_OFF
 
         title = code
 
@@ -0,0 +1,435 @@
+import logging
+import uuid
+from datetime import datetime, timezone
+from typing import Hashable, Iterable, Optional
+
+from sqlalchemy import event, select, literal, or_, delete, inspect, func, Text, cast
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session, object_session
+from sqlalchemy.orm.attributes import get_history
+
+from server.database.database_manager import db
+from server.database.models import Event, Attendee, Role, Look, Discount, Order, User, EventReadModel
+from server.models.audit_log_model import AuditLogMessage
+from server.models.event_model import EventReadModelDocument
+from server.models.resource_version_model import ResourceVersionModel
+from server.services import ServiceError
+from server.services.attendee_service import AttendeeService
+from server.services.audit_dispatcher import AuditSubscriber
+from server.services.look_service import LookService
+from server.services.role_service import RoleService
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_EVENT_READ_MODEL_BATCH_SIZE = 100
+# attendees show the name and email of their users, other changes of users don't show up in events
+USER_COLUMNS_IN_EVENT_READ_MODEL = frozenset({"first_name", "last_name", "email"})
+EVENT_READ_MODEL_MESSAGE_TYPES = frozenset(
+    {
+        f"{entity}_{operation}"
+        for entity in ["EVENT", "ATTENDEE", "ROLE", "LOOK", "DISCOUNT", "ORDER"]
+        for operation in ["CREATED", "UPDATED", "DELETED"]
+    }
+    | {"USER_UPDATED"}
+)
+
+TOUCHED_SESSION_INFO_KEY = "event_read_model_touched"
+
+
+class EventReadModelService:
+    """
+    Keeps a document per event with what enriched event responses show: attendees with their users, looks, roles, gift
+    codes and tracking, looks of the owner and roles of the event. Documents are rebuilt by an audit log subscriber
+    for the events touched by a change. Until then the document is behind the version bumped by the change itself (see
+    init_event_read_model_versioning) and the event is computed live instead.
+    """
+
+    def __init__(self, attendee_service: AttendeeService, role_service: RoleService, look_service: LookService):
+        self.__attendee_service = attendee_service
+        self.__role_service = role_service
+        self.__look_service = look_service
+
+    def audit_subscriber(self) -> AuditSubscriber:
+        return AuditSubscriber(
+            "event_read_model",
+            EVENT_READ_MODEL_MESSAGE_TYPES,
+            self.on_audit_message,
+            key=self.__audit_message_key,
+        )
+
+    def on_audit_message(self, audit_log_message: AuditLogMessage) -> None:
+        self.refresh(self.__get_event_ids_in_question(audit_log_message))
+
+    def get_documents(
+        self, owner_ids_by_event_id: dict[uuid.UUID, uuid.UUID]
+    ) -> dict[uuid.UUID, EventReadModelDocument]:
+        """Documents of the events, built live for events without a current document."""
+
+        documents = {
+            event_id: EventReadModelDocument.model_validate(document)
+            for event_id, document in db.session.execute(
+                select(EventReadModel.event_id, EventReadModel.document).where(
+                    EventReadModel.event_id.in_(owner_ids_by_event_id.keys()),
+                    EventReadModel.built_version == EventReadModel.version,
+                )
+            ).all()
+        }
+
+        if len(documents) < len(owner_ids_by_event_id):
+            documents.update(
+                self.build_documents(
+                    {
+                        event_id: owner_id
+                        for event_id, owner_id in owner_ids_by_event_id.items()
+                        if event_id not in documents
+                    }
+                )
+            )
+
+        return documents
+
+    @staticmethod
+    def get_version(event_id: uuid.UUID, representation: str) -> Optional[ResourceVersionModel]:
+        """
+        Version of a representation of the event, None when the event doesn't exist or was never versioned. The
+        read model version covers the event and everything enriched responses show, the owner is hashed as any of
+        its columns is shown.
+        """
+
+        row = db.session.execute(
+            select(
+                EventReadModel.version,
+                EventReadModel.updated_at,
+                User.updated_at,
+                func.md5(cast(func.row_to_json(User.__table__.table_valued()), Text)),
+            )
+            .select_from(Event)
+            .join(User, User.id == Event.user_id)
+            .join(EventReadModel, EventReadModel.event_id == Event.id)
+            .where(Event.id == event_id)
+        ).one_or_none()
+
+        if not row:
+            return None
+
+        version, updated_at, owner_updated_at, owner_hash = row
+
+        return ResourceVersionModel(
+            tag=f"{representation}-{version}-{owner_hash}", last_modified=max(updated_at, owner_updated_at)
+        )
+
+    def build_documents(
+        self, owner_ids_by_event_id: dict[uuid.UUID, uuid.UUID]
+    ) -> dict[uuid.UUID, EventReadModelDocument]:
+        if not owner_ids_by_event_id:
+            return {}
+
+        event_ids = list(owner_ids_by_event_id.keys())
+        attendees = self.__attendee_service.get_attendees_for_events(event_ids)
+        roles = self.__role_service.get_roles_for_events(event_ids)
+        looks = self.__look_service.get_looks_by_user_ids(set(owner_ids_by_event_id.values()))
+
+        return {
+            event_id: EventReadModelDocument(
+                attendees=attendees.get(event_id, []),
+                looks=looks.get(owner_id, []),
+                roles=roles.get(event_id, []),
+            )
+            for event_id, owner_id in owner_ids_by_event_id.items()
+        }
+
+    def refresh(self, event_ids: Iterable[uuid.UUID]) -> None:
+        """Rebuilds documents of the events as part of the current transaction, committing is up to the caller."""
+
+        event_ids = set(event_ids)
+
+        if not event_ids:
+            return
+
+        # read before building, a change committed meanwhile leaves the document behind and it isn't served
+        versions = dict(
+            db.session.execute(
+                select(EventReadModel.event_id, EventReadModel.version).where(EventReadModel.event_id.in_(event_ids))
+            ).all()
+        )
+        owner_ids_by_event_id = dict(
+            db.session.execute(select(Event.id, Event.user_id).where(Event.id.in_(event_ids), Event.is_active)).all()
+        )
+
+        inactive_event_ids = event_ids - owner_ids_by_event_id.keys()
+
+        if inactive_event_ids:
+            db.session.execute(delete(EventReadModel).where(EventReadModel.event_id.in_(inactive_event_ids)))
+
+        documents = self.build_documents(owner_ids_by_event_id)
+
+        if not documents:
+            return
+
+        built_at = datetime.now(timezone.utc)
+        stmt = insert(EventReadModel).values(
+            [
+                {
+                    "event_id": event_id,
+                    "version": versions.get(event_id, 0),
+                    "built_version": versions.get(event_id, 0),
+                    "document": document.model_dump(mode="json"),
+                    "built_at": built_at,
+                }
+                for event_id, document in documents.items()
+            ]
+        )
+
+        # version isn't touched, changes may have bumped it since it was read
+        db.session.execute(
+            stmt.on_conflict_do_update(
+                index_elements=[EventReadModel.event_id],
+                set_={
+                    "built_version": stmt.excluded.built_version,
+                    "document": stmt.excluded.document,
+                    "built_at": stmt.excluded.built_at,
+                },
+            )
+        )
+
+    def rebuild(self, batch_size: int = DEFAULT_EVENT_READ_MODEL_BATCH_SIZE) -> int:
+        """Rebuilds documents of all active events, batch by batch."""
+
+        num_rebuilt = 0
+        last_event_id = None
+
+        while True:
+            stmt = select(Event.id).where(Event.is_active).order_by(Event.id).limit(batch_size)
+
+            if last_event_id:
+                stmt = stmt.where(Event.id > last_event_id)
+
+            event_ids = db.session.execute(stmt).scalars().all()
+
+            if not event_ids:
+                break
+
+            try:
+                self.refresh(event_ids)
+                db.session.commit()
+            except Exception as e:
+                db.session.rollback()
+                raise ServiceError("Failed to rebuild event read models.", e)
+
+            num_rebuilt += len(event_ids)
+            last_event_id = event_ids[-1]
+
+        logger.info(f"Rebuilt read models of {num_rebuilt} events")
+
+        return num_rebuilt
+
+    def check_consistency(self, batch_size: int = DEFAULT_EVENT_READ_MODEL_BATCH_SIZE) -> dict[str, int]:
+        """Compares current documents with the live computation. Alerts on documents that drifted and rebuilds them."""
+
+        num_checked = 0
+        drifted_event_ids = []
+        last_event_id = None
+
+        while True:
+            stmt = (
+                select(EventReadModel.event_id, EventReadModel.version, EventReadModel.document, Event.user_id)
+                .join(Event, Event.id == EventReadModel.event_id)
+                .where(EventReadModel.built_version == EventReadModel.version, Event.is_active)
+                .order_by(EventReadModel.event_id)
+                .limit(batch_size)
+            )
+
+            if last_event_id:
+                stmt = stmt.where(EventReadModel.event_id > last_event_id)
+
+            rows = db.session.execute(stmt).all()
+
+            if not rows:
+                break
+
+            live_documents = self.build_documents({row.event_id: row.user_id for row in rows})
+            versions = {
+                row.event_id: row.version
+                for row in rows
+                if row.document != live_documents[row.event_id].model_dump(mode="json")
+            }
+
+            if versions:
+                # documents of events changed while checking are being rebuilt off the audit stream anyway
+                current_versions = dict(
+                    db.session.execute(
+                        select(EventReadModel.event_id, EventReadModel.version).where(
+                            EventReadModel.event_id.in_(versions.keys())
+                        )
+                    ).all()
+                )
+                drifted_event_ids.extend(
+                    event_id for event_id, version in versions.items() if current_versions.get(event_id) == version
+                )
+
+            num_checked += len(rows)
+            last_event_id = rows[-1].event_id
+
+        if drifted_event_ids:
+            logger.error(
+                f"Read models of {len(drifted_event_ids)} events drifted from the live computation, rebuilding them: "
+                f"{[str(event_id) for event_id in drifted_event_ids[:20]]}"
+            )
+
+            try:
+                self.refresh(drifted_event_ids)
+                db.session.commit()
+            except Exception as e:
+                db.session.rollback()
+                raise ServiceError("Failed to rebuild drifted event read models.", e)
+        else:
+            db.session.commit()
+
+        result = {"checked": num_checked, "drifted": len(drifted_event_ids)}
+
+        logger.info(f"Checked event read models: {result}")
+
+        return result
+
+    @staticmethod
+    def __audit_message_key(audit_log_message: AuditLogMessage) -> Hashable:
+        entity = audit_log_message.type.rsplit("_", 1)[0]
+        payload = audit_log_message.payload
+
+        if entity in {"EVENT", "LOOK", "USER"}:
+            return entity, payload.get("id")
+
+        # one rebuild of the event covers all messages of its attendees, roles, discounts and orders in a batch
+        return "EVENT", payload.get("event_id")
+
+    @staticmethod
+    def __get_event_ids_in_question(audit_log_message: AuditLogMessage) -> set[uuid.UUID]:
+        entity = audit_log_message.type.rsplit("_", 1)[0]
+        payload = audit_log_message.payload
+
+        if entity == "EVENT":
+            return {uuid.UUID(payload["id"])}
+
+        if entity == "USER":
+            if not USER_COLUMNS_IN_EVENT_READ_MODEL.intersection((audit_log_message.diff or {}).keys()):
+                return set()
+
+            return set(
+                db.session.execute(select(Attendee.event_id).where(Attendee.user_id == uuid.UUID(payload["id"])))
+                .scalars()
+                .all()
+            )
+
+        if entity == "LOOK":
+            # looks of the owner are listed in the event, the others only as looks of attendees
+            return set(
+                db.session.execute(
+                    select(Event.id).where(
+                        or_(
+                            Event.user_id == uuid.UUID(payload["user_id"]),
+                            Event.id.in_(select(Attendee.event_id).where(Attendee.look_id == uuid.UUID(payload["id"]))),
+                        )
+                    )
+                )
+                .scalars()
+                .all()
+            )
+
+        event_ids = {payload.get("event_id"), ((audit_log_message.diff or {}).get("event_id") or {}).get("before")}
+
+        return {uuid.UUID(event_id) for event_id in event_ids if event_id}
+
+
+def init_event_read_model_versioning() -> None:
+    """
+    Bumps versions of the read models of events touched by a flush, in the same transaction and with one statement per
+    flush. Documents built before the change aren't served from then on.
+    """
+
+    if event.contains(Session, "after_flush", _bump_versions):
+        return
+
+    for entity in [Event, Attendee, Role, Look, Discount, Order, User]:
+        event.listen(entity, "after_insert", _collect_touched)
+        event.listen(entity, "after_update", _collect_touched)
+        event.listen(entity, "after_delete", _collect_touched)
+
+    event.listen(Session, "after_flush", _bump_versions)
+
+
+def _collect_touched(mapper, connection, target) -> None:
+    session = object_session(target)
+
+    if session is None:
+        return
+
+    touched = session.info.setdefault(
+        TOUCHED_SESSION_INFO_KEY, {"event_ids": set(), "look_ids": set(), "look_user_ids": set(), "user_ids": set()}
+    )
+
+    if isinstance(target, User):
+        # new users aren't attendees yet
+        if _changed_columns(target).intersection(USER_COLUMNS_IN_EVENT_READ_MODEL):
+            touched["user_ids"].add(target.id)
+    elif isinstance(target, Look):
+        touched["look_ids"].add(target.id)
+        # a look moved to another user leaves the events of the previous one too
+        touched["look_user_ids"].update(_current_and_previous(target, "user_id"))
+    elif isinstance(target, Event):
+        touched["event_ids"].add(target.id)
+    else:
+        # an attendee, discount or order moved to another event leaves the previous one too
+        touched["event_ids"].update(_current_and_previous(target, "event_id"))
+
+
+def _current_and_previous(target, key: str) -> set:
+    # history is kept until the flush ends, deleted holds the value the row had before it
+    return {value for value in [getattr(target, key), *get_history(target, key).deleted] if value}
+
+
+def _changed_columns(target) -> set[str]:
+    # committed_state holds the previous values of the attributes modified since the last flush, empty for inserts
+    return {key for key in inspect(target).committed_state.keys() if get_history(target, key).has_changes()}
+
+
+def _bump_versions(session: Session, flush_context) -> None:
+    touched: Optional[dict[str, set]] = session.info.pop(TOUCHED_SESSION_INFO_KEY, None)
+
+    if not touched:
+        return
+
+    conditions = []
+
+    if touched["event_ids"]:
+        conditions.append(Event.id.in_(touched["event_ids"]))
+
+    if touched["look_user_ids"]:
+        conditions.append(Event.user_id.in_(touched["look_user_ids"]))
+
+    attendee_conditions = []
+
+    if touched["look_ids"]:
+        attendee_conditions.append(Attendee.look_id.in_(touched["look_ids"]))
+
+    if touched["user_ids"]:
+        attendee_conditions.append(Attendee.user_id.in_(touched["user_ids"]))
+
+    if attendee_conditions:
+        conditions.append(Event.id.in_(select(Attendee.event_id).where(or_(*attendee_conditions))))
+
+    if not conditions:
+        return
+
+    stmt = insert(EventReadModel).from_select(
+        # rows are locked in the same order by concurrent flushes touching several events
+        ["event_id", "version"],
+        select(Event.id, literal(1)).where(or_(*conditions)).order_by(Event.id),
+    )
+
+    # straight on the connection, the orm is in the middle of finishing the flush
+    session.connection().execute(
+        stmt.on_conflict_do_update(
+            index_elements=[EventReadModel.event_id],
+            set_={"version": EventReadModel.version + 1, "updated_at": func.now()},
+        )
+    )
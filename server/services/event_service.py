@@ -2,7 +2,7 @@ import uuid
 from datetime import datetime, timedelta, timezone
 from typing import List, Optional
 
-from sqlalchemy import select, func
+from sqlalchemy import select, func, or_
 
 from server.database.database_manager import db
 from server.database.models import Event, User, Attendee, Look, EventType
@@ -11,6 +11,7 @@ from server.models.role_model import CreateRoleModel
 from server.models.user_model import UserModel
 from server.services import ServiceError, NotFoundError, DuplicateError, BadRequestError
 from server.services.attendee_service import AttendeeService
+from server.services.event_read_model_service import EventReadModelService
 from server.services.look_service import LookService
 from server.services.role_service import RoleService, PREDEFINED_ROLES
 
@@ -23,10 +24,12 @@ class EventService:
         attendee_service: Optional[AttendeeService] = None,
         role_service: Optional[RoleService] = None,
         look_service: Optional[LookService] = None,
+        event_read_model_service: Optional[EventReadModelService] = None,
     ):
         self.role_service = role_service
         self.look_service = look_service
         self.attendee_service = attendee_service
+        self.event_read_model_service = event_read_model_service
 
     def get_event_by_id(self, event_id: uuid.UUID, enriched=False) -> EventModel:
         event_with_owner = db.session.execute(select(Event, User).join(User).where(Event.id == event_id)).first()
@@ -38,13 +41,13 @@ class EventService:
         event_model.owner = UserModel.model_validate(event_with_owner[1])
 
         if enriched:
-            attendees = self.attendee_service.get_attendees_for_events([event_model.id])
-            looks = self.look_service.get_looks_by_user_id(event_model.user_id)
-            roles = self.role_service.get_roles_for_events([event_model.id])
+            document = self.event_read_model_service.get_documents({event_model.id: event_model.user_id})[
+                event_model.id
+            ]
 
-            event_model.attendees = attendees.get(event_model.id, [])
-            event_model.looks = looks
-            event_model.roles = roles.get(event_model.id, [])
+            event_model.attendees = document.attendees
+            event_model.looks = document.looks
+            event_model.roles = document.roles
 
         return event_model
 
@@ -181,99 +184,67 @@ class EventService:
         except Exception as e:
             raise ServiceError("Failed to deactivate event.", e)
 
-    def get_user_owned_events(self, user_id: uuid.UUID, enriched: bool = False) -> List[EventModel]:
-        events = db.session.execute(
-            select(Event, User).join(User, User.id == Event.user_id).where(Event.user_id == user_id, Event.is_active)
-        ).all()
-
-        if not events:
-            return []
-
-        models = []
-        for event, user in events:
-            event_model = EventModel.model_validate(event)
-            event_model.owner = UserModel.model_validate(user)
-            models.append(event_model)
-
-        if enriched:
-            event_ids = [event.id for event in models]
-            attendees = self.attendee_service.get_attendees_for_events(event_ids)
-            looks = self.look_service.get_looks_by_user_id(user_id)
-            roles = self.role_service.get_roles_for_events(event_ids)
-
-            for event_model in models:
-                event_model.attendees = attendees.get(event_model.id, [])
-                event_model.looks = looks
-                event_model.roles = roles.get(event_model.id, [])
-                event_model.notifications = self.__owner_notifications(event_model, attendees.get(event_model.id, []))
-
-        return models
-
-    def get_user_invited_events(self, user_id: uuid.UUID, enriched: bool = False) -> List[EventModel]:
-        events_with_owners = db.session.execute(
-            select(Event, User)
-            .join(User, User.id == Event.user_id)
-            .join(Attendee, Event.id == Attendee.event_id)
+    def get_user_events(
+        self, user_id: uuid.UUID, status: EventUserStatus = None, enriched: bool = False
+    ) -> List[EventModel]:
+        is_owner = Event.user_id == user_id
+        is_invited = (
+            select(Attendee.id)
             .where(
+                Attendee.event_id == Event.id,
                 Attendee.user_id == user_id,
-                Event.is_active,
                 Attendee.is_active,
                 Attendee.invite,
                 Attendee.user_id != Event.user_id,
             )
+            .exists()
+        )
+        conditions = []
+
+        if not status or status == EventUserStatus.OWNER:
+            conditions.append(is_owner)
+
+        if not status or status == EventUserStatus.ATTENDEE:
+            conditions.append(is_invited)
+
+        # owned and invited events in one go, tagged with what the user is to them
+        rows = db.session.execute(
+            select(Event, User, is_owner.label("is_owner"))
+            .join(User, User.id == Event.user_id)
+            .where(Event.is_active, or_(*conditions))
         ).all()
 
+        if not rows:
+            if not db.session.execute(select(User.id).where(User.id == user_id)).scalar_one_or_none():
+                raise NotFoundError("User not found.")
+
+            return []
+
         events = []
 
-        for event, user in events_with_owners:
+        for event, owner, is_event_owner in rows:
             event_model = EventModel.model_validate(event)
-            event_model.owner = UserModel.model_validate(user)
+            event_model.owner = UserModel.model_validate(owner)
+            event_model.status = EventUserStatus.OWNER if is_event_owner else EventUserStatus.ATTENDEE
             events.append(event_model)
 
-        if not events:
-            return []
-
         if enriched:
-            event_ids = [event.id for event in events]
-            attendees = self.attendee_service.get_attendees_for_events(event_ids, user_id)
+            documents = self.event_read_model_service.get_documents({event.id: event.user_id for event in events})
 
             for event_model in events:
-                event_model.attendees = attendees.get(event_model.id, [])
-                event_model.notifications = self.__attendee_notifications(
-                    event_model, attendees.get(event_model.id, [])
-                )
-
-        return events
-
-    def get_user_events(
-        self, user_id: uuid.UUID, status: EventUserStatus = None, enriched: bool = False
-    ) -> List[EventModel]:
-        user = db.session.execute(select(User).where(User.id == user_id)).scalar_one_or_none()
-
-        if not user:
-            raise NotFoundError("User not found.")
-
-        owned_events = []
-        invited_events = []
-
-        if not status or status == EventUserStatus.OWNER:
-            try:
-                owned_events = self.get_user_owned_events(user_id, enriched)
-            except Exception as e:
-                raise ServiceError("Failed to get user owned events.", e)
-
-        if not status or status == EventUserStatus.ATTENDEE:
-            invited_events = self.get_user_invited_events(user_id, enriched)
-
-        combined_events = owned_events + invited_events
-
-        events = {}
-
-        for event in combined_events:
-            events[event.id] = event
-            events[event.id].status = EventUserStatus.OWNER if event.user_id == user_id else EventUserStatus.ATTENDEE
-
-        return sorted(list(events.values()), key=lambda x: (x.event_at is None, x.event_at))
+                document = documents[event_model.id]
+
+                if event_model.status == EventUserStatus.OWNER:
+                    event_model.attendees = document.attendees
+                    event_model.looks = document.looks
+                    event_model.roles = document.roles
+                    event_model.notifications = self.__owner_notifications(event_model, document.attendees)
+                else:
+                    # attendees only see themselves
+                    event_model.attendees = [attendee for attendee in document.attendees if attendee.user_id == user_id]
+                    event_model.notifications = self.__attendee_notifications(event_model, event_model.attendees)
+
+        return sorted(events, key=lambda x: (x.event_at is None, x.event_at))
 
     @staticmethod
     def get_events_for_look(look_id: uuid.UUID) -> List[EventModel]:
@@ -5,7 +5,7 @@ from abc import ABC, abstractmethod
 from typing import Any, Dict, List, Optional
 from urllib.parse import urlencode
 
-from server.controllers.util import http
+from server.services.integrations.http_client import http
 from server.services import ServiceError
 from server.services.integrations.activecampaign_fields import field_resolver
 
@@ -4,18 +4,54 @@ import shutil
 import tempfile
 from abc import ABC, abstractmethod
 from collections import deque
-from typing import List
-
-import boto3
+from functools import cached_property
+from typing import BinaryIO, List
 
 from server.services import ServiceError
 
 logger = logging.getLogger(__name__)
 
+SQS_MAX_BATCH_SIZE = 10
+# SQS limits a batch request to 256KB in total, same as a single message
+SQS_MAX_BATCH_BYTES = 256 * 1024
+# bodies larger than that are uploaded in parts of that size, a part at a time is buffered in memory
+S3_MULTIPART_THRESHOLD = 8 * 1024 * 1024
+S3_MULTIPART_CONCURRENCY = 4
+
+
+def split_into_sqs_batches(messages: List[str]) -> List[List[str]]:
+    """Splits messages in order into batches SQS accepts, at most 10 messages and 256KB per batch."""
+
+    batches = []
+    batch, batch_bytes = [], 0
+
+    for message in messages:
+        message_bytes = len(message.encode("utf-8"))
+
+        if batch and (len(batch) == SQS_MAX_BATCH_SIZE or batch_bytes + message_bytes > SQS_MAX_BATCH_BYTES):
+            batches.append(batch)
+            batch, batch_bytes = [], 0
+
+        batch.append(message)
+        batch_bytes += message_bytes
+
+    if batch:
+        batches.append(batch)
+
+    return batches
+
 
 class AbstractAWSService(ABC):
     @abstractmethod
-    def upload_to_s3(self, local_file: str, bucket: str, s3_file: str) -> None:
+    def upload_fileobj_to_s3(self, fileobj: BinaryIO, bucket: str, s3_file: str, content_type: str) -> None:
+        pass
+
+    @abstractmethod
+    def put_object_to_s3(self, data: bytes, bucket: str, s3_file: str, content_type: str) -> None:
+        pass
+
+    @abstractmethod
+    def get_object_from_s3(self, bucket: str, s3_file: str) -> bytes:
         pass
 
     @abstractmethod
@@ -26,6 +62,11 @@ class AbstractAWSService(ABC):
     def enqueue_message(self, queue_url: str, message: str) -> None:
         pass
 
+    @abstractmethod
+    def enqueue_messages(self, queue_url: str, messages: List[str]) -> List[int]:
+        """Returns indices of the messages that weren't enqueued, raises if none of them were."""
+        pass
+
     @abstractmethod
     def dequeue_message(self, queue_url: str, max_messages: int = 10) -> List[str]:
         pass
@@ -36,10 +77,23 @@ class FakeAWSService(AbstractAWSService):
         self.__data_folder = tempfile.gettempdir()
         self.__queue = deque()
 
-    def upload_to_s3(self, local_file: str, bucket: str, s3_file: str) -> None:
+    def upload_fileobj_to_s3(self, fileobj: BinaryIO, bucket: str, s3_file: str, content_type: str) -> None:
+        dst_dir = os.path.dirname(s3_file)
+        os.makedirs(os.path.join(self.__data_folder, dst_dir), exist_ok=True)
+
+        with open(os.path.join(self.__data_folder, s3_file), "wb") as f:
+            shutil.copyfileobj(fileobj, f)
+
+    def put_object_to_s3(self, data: bytes, bucket: str, s3_file: str, content_type: str) -> None:
         dst_dir = os.path.dirname(s3_file)
         os.makedirs(os.path.join(self.__data_folder, dst_dir), exist_ok=True)
-        shutil.copy(local_file, os.path.join(self.__data_folder, s3_file))
+
+        with open(os.path.join(self.__data_folder, s3_file), "wb") as f:
+            f.write(data)
+
+    def get_object_from_s3(self, bucket: str, s3_file: str) -> bytes:
+        with open(os.path.join(self.__data_folder, s3_file), "rb") as f:
+            return f.read()
 
     def delete_from_s3(self, bucket: str, s3_file: str) -> None:
         os.remove(os.path.join(self.__data_folder, s3_file))
@@ -47,24 +101,67 @@ class FakeAWSService(AbstractAWSService):
     def enqueue_message(self, queue_url: str, message: str) -> None:
         self.__queue.append(message)
 
+    def enqueue_messages(self, queue_url: str, messages: List[str]) -> List[int]:
+        self.__queue.extend(messages)
+
+        return []
+
     def dequeue_message(self, queue_url: str, max_messages: int = 10) -> List[str]:
         return self.__queue.popleft()
 
 
 class AWSService(AbstractAWSService):
-    def __init__(self):
-        self.__sqs_client = boto3.client("sqs")
-        self.__s3_client = boto3.client("s3")
+    # boto3 and its clients are slow to load, they are created on first use so lambdas that rarely touch AWS don't pay
+    # for it on cold start
+    @cached_property
+    def __sqs_client(self):
+        import boto3
+
+        return boto3.client("sqs")
+
+    @cached_property
+    def __s3_client(self):
+        import boto3
+
+        return boto3.client("s3")
+
+    @cached_property
+    def __s3_transfer_config(self):
+        from boto3.s3.transfer import TransferConfig
+
+        return TransferConfig(
+            multipart_threshold=S3_MULTIPART_THRESHOLD,
+            multipart_chunksize=S3_MULTIPART_THRESHOLD,
+            max_concurrency=S3_MULTIPART_CONCURRENCY,
+        )
 
-    def upload_to_s3(self, local_file: str, bucket: str, s3_file: str) -> None:
+    def upload_fileobj_to_s3(self, fileobj: BinaryIO, bucket: str, s3_file: str, content_type: str) -> None:
         try:
-            self.__s3_client.upload_file(local_file, bucket, s3_file, ExtraArgs={"ContentType": "image/png"})
+            self.__s3_client.upload_fileobj(
+                fileobj, bucket, s3_file, ExtraArgs={"ContentType": content_type}, Config=self.__s3_transfer_config
+            )
 
             logger.info(f"File uploaded to S3: {s3_file}")
         except Exception as e:
             logger.exception(e)
             raise ServiceError(f"Error uploading file to S3: {e}")
 
+    def put_object_to_s3(self, data: bytes, bucket: str, s3_file: str, content_type: str) -> None:
+        try:
+            self.__s3_client.put_object(Bucket=bucket, Key=s3_file, Body=data, ContentType=content_type)
+
+            logger.info(f"Object put to S3: {s3_file}")
+        except Exception as e:
+            logger.exception(e)
+            raise ServiceError(f"Error putting object to S3: {e}")
+
+    def get_object_from_s3(self, bucket: str, s3_file: str) -> bytes:
+        try:
+            return self.__s3_client.get_object(Bucket=bucket, Key=s3_file)["Body"].read()
+        except Exception as e:
+            logger.exception(e)
+            raise ServiceError(f"Error getting object from S3: {e}")
+
     def delete_from_s3(self, bucket: str, s3_file: str) -> None:
         try:
             self.__s3_client.delete_object(Bucket=bucket, Key=s3_file)
@@ -83,6 +180,35 @@ class AWSService(AbstractAWSService):
             logger.exception(e)
             raise ServiceError(f"Error pushing message to SQS: {e}")
 
+    def enqueue_messages(self, queue_url: str, messages: List[str]) -> List[int]:
+        failed_indices = []
+        offset = 0
+
+        for chunk in split_into_sqs_batches(messages):
+            try:
+                response = self.__sqs_client.send_message_batch(
+                    QueueUrl=queue_url,
+                    Entries=[{"Id": str(i), "MessageBody": message} for i, message in enumerate(chunk)],
+                )
+                # batches are sent one after another, entries failing in one don't undo the batches accepted before it
+                failed = response.get("Failed", [])
+                failed_indices.extend(offset + int(entry["Id"]) for entry in failed)
+
+                if failed:
+                    logger.error(f"Error pushing {len(failed)} of {len(chunk)} messages to SQS: {failed}")
+                else:
+                    logger.debug(f"{len(chunk)} messages pushed to SQS")
+            except Exception as e:
+                logger.exception(e)
+                failed_indices.extend(range(offset, offset + len(chunk)))
+
+            offset += len(chunk)
+
+        if messages and len(failed_indices) == len(messages):
+            raise ServiceError(f"Error pushing {len(messages)} messages to SQS")
+
+        return failed_indices
+
     def dequeue_message(self, queue_url: str, max_messages: int = 10) -> List[str]:
         try:
             response = self.__sqs_client.receive_message(
@@ -5,7 +5,7 @@ from concurrent.futures import ThreadPoolExecutor, as_completed
 from typing import Any, Dict
 from urllib.parse import urlencode
 
-from server.controllers.util import http
+from server.services.integrations.http_client import http
 from server.models.event_model import EventModel, EventTypeModel
 from server.models.user_model import UserModel
 from server.services import ServiceError
@@ -0,0 +1,73 @@
+import logging
+from copy import deepcopy
+
+import urllib3
+
+# kept free of flask so integrations can be used from lambdas without pulling in the web stack
+http_pool = urllib3.PoolManager()
+logger = logging.getLogger(__name__)
+
+
+def http(method, *args, **kwargs):
+    merge_kwargs = {}
+
+    if method == "POST":
+        merge_kwargs.update(
+            {
+                "timeout": 5,
+                "retries": urllib3.util.Retry(
+                    total=3,  # Number of retries
+                    backoff_factor=1,  # Delay between retries
+                    connect=3,  # Retry only on connection failures
+                    read=0,  # Do not retry on read errors (timeout while receiving data)
+                    status=0,  # Do not retry on specific HTTP status codes
+                    redirect=0,  # No retries for redirects
+                    raise_on_redirect=False,
+                    raise_on_status=False,
+                    allowed_methods=["POST"],  # Enable retries for POST requests
+                ),
+            }
+        )
+    else:
+        merge_kwargs.update(
+            {
+                "timeout": 3,
+                "retries": urllib3.util.Retry(total=3, connect=None, read=None, redirect=0, status=None),
+            }
+        )
+
+    merge_kwargs.update(kwargs)
+
+    _log_request(method, *args, **merge_kwargs)
+    if method == "POST":
+        # Avoid caching connections for POST, use new pool every time.
+        with urllib3.PoolManager() as http_temp:
+            response = http_temp.request(method, *args, **merge_kwargs)
+    else:
+        response = http_pool.request(method, *args, **merge_kwargs)
+    _log_response(response)
+
+    return response
+
+
+def _log_request(method, *args, **kwargs):
+    log_kwargs = deepcopy(kwargs)
+    headers = log_kwargs.get("headers", {})
+
+    redact_headers = [
+        "Authorization",
+        "X-Shopify-Access-Token",
+        "X-Shopify-Storefront-Access-Token",
+        "Api-Token",
+        "X-Api-Access-Token",
+        "X-Postmark-Server-Token",
+    ]
+    for h in redact_headers:
+        if h in headers:
+            headers[h] = "***"
+
+    logger.debug(f"Making {method} request with args {args} {log_kwargs}")
+
+
+def _log_response(response):
+    logger.debug(f"Received response {response.status} with data {response.data}")
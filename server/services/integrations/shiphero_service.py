@@ -4,10 +4,11 @@ import os
 import random
 import uuid
 from abc import ABC, abstractmethod
+from typing import Optional
 
-from server.controllers.util import http
-from server.models.shiphero_model import ShipHeroProductModel
-from server.services import ServiceError
+from server.services.integrations.http_client import http
+from server.models.shiphero_model import ShipHeroProductModel, ShipHeroProductsPageModel
+from server.services import ServiceError, NotFoundError
 
 logger = logging.getLogger(__name__)
 
@@ -17,11 +18,18 @@ class AbstractShipHeroService(ABC):
     def get_product_by_sku(self, sku: str) -> ShipHeroProductModel:
         pass
 
+    @abstractmethod
+    def get_products(self, page_size: int, cursor: Optional[str] = None) -> ShipHeroProductsPageModel:
+        pass
+
 
 class FakeShipHeroService(AbstractShipHeroService):
+    def __init__(self):
+        self.catalog: list[ShipHeroProductModel] = []
+
     def get_product_by_sku(self, sku: str) -> ShipHeroProductModel:
         if "SHIPHERO_NOT_FOUND" in sku:
-            raise ServiceError(f"Product with SKU {sku} not found")
+            raise NotFoundError(f"Product with SKU {sku} not found")
 
         return ShipHeroProductModel(
             id=f"{uuid.uuid4()}",
@@ -30,6 +38,15 @@ class FakeShipHeroService(AbstractShipHeroService):
             price=random.randint(100, 1000),
         )
 
+    def get_products(self, page_size: int, cursor: Optional[str] = None) -> ShipHeroProductsPageModel:
+        offset = int(cursor) if cursor else 0
+        next_offset = offset + page_size
+
+        return ShipHeroProductsPageModel(
+            products=self.catalog[offset:next_offset],
+            next_cursor=str(next_offset) if next_offset < len(self.catalog) else None,
+        )
+
 
 class ShipHeroService(AbstractShipHeroService):
     def __init__(self):
@@ -84,12 +101,65 @@ class ShipHeroService(AbstractShipHeroService):
 
         if not product:
             logger.error(f"Invalid response from shiphero for SKU {sku}: {response}")
-            raise ServiceError(f"Invalid response from shiphero for SKU {sku}")
+            raise NotFoundError(f"Invalid response from shiphero for SKU {sku}")
 
         return ShipHeroProductModel(
             id=product["id"], name=product["name"], sku=product["sku"], price=product.get("price") or 0.0
         )
 
+    def get_products(self, page_size: int, cursor: Optional[str] = None) -> ShipHeroProductsPageModel:
+        after = f', after: "{cursor}"' if cursor else ""
+
+        status, response = self.api_request(
+            "POST",
+            self.__shiphero_api_graphql_endpoint,
+            {
+                "query": f"""
+                    query {{
+                        products {{
+                            request_id
+                            complexity
+                            data(first: {page_size}{after}) {{
+                                pageInfo {{
+                                    hasNextPage
+                                    endCursor
+                                }}
+                                edges {{
+                                    node {{
+                                        id
+                                        name
+                                        sku
+                                        price
+                                    }}
+                                }}
+                            }}
+                        }}
+                    }}
+                """
+            },
+        )
+
+        if status != 200 or "errors" in response:
+            logger.error(f"Failed to get products page after cursor {cursor}: {response}")
+            raise ServiceError(f"Failed to get products page after cursor {cursor}")
+
+        data = response.get("data", {}).get("products", {}).get("data") or {}
+        page_info = data.get("pageInfo") or {}
+
+        return ShipHeroProductsPageModel(
+            products=[
+                ShipHeroProductModel(
+                    id=edge["node"]["id"],
+                    name=edge["node"]["name"],
+                    sku=edge["node"]["sku"],
+                    price=edge["node"].get("price") or 0.0,
+                )
+                for edge in data.get("edges", [])
+                if edge.get("node", {}).get("sku")
+            ],
+            next_cursor=page_info.get("endCursor") if page_info.get("hasNextPage") else None,
+        )
+
 
 if __name__ == "__main__":
     service = ShipHeroService()
@@ -7,13 +7,17 @@ import random
 from abc import ABC, abstractmethod
 from datetime import datetime, timezone
 
-from server.controllers.util import http
+from server.services.integrations.http_client import http
 from server.models.shopify_model import ShopifyCustomer, ShopifyVariantModel, ShopifyProduct, ShopifyVariant
 from server.services import ServiceError, NotFoundError, DuplicateError
 
 logger = logging.getLogger(__name__)
 
 
+# aliased mutations in a single request, each one adds to the query cost
+DISCOUNTS_PER_DEACTIVATION_REQUEST = 25
+
+
 class DiscountAmountType(enum.Enum):
     FIXED_AMOUNT = "fixed_amount"
     PERCENTAGE = "percentage"
@@ -94,7 +98,7 @@ class AbstractShopifyService(ABC):
         self,
         title: str,
         code: str,
-        shopify_customer_id: str,
+        shopify_customer_id: str | None,
         discount_type: DiscountAmountType,
         amount: float,
         minimum_order_amount: int | None = None,
@@ -152,6 +156,10 @@ class AbstractShopifyService(ABC):
     def deactivate_discount(self, discount_gid: str) -> None:
         pass
 
+    @abstractmethod
+    def deactivate_discounts(self, discount_gids: list[str]) -> list[str]:
+        pass
+
     @abstractmethod
     def add_products_to_collection(self, collection_id: int, product_ids: list[int]) -> None:
         pass
@@ -292,7 +300,7 @@ class FakeShopifyService(AbstractShopifyService):
         self,
         title: str,
         code: str,
-        shopify_customer_id: str,
+        shopify_customer_id: str | None,
         discount_type: DiscountAmountType,
         amount: float,
         minimum_order_amount: int | None = None,
@@ -441,6 +449,9 @@ class FakeShopifyService(AbstractShopifyService):
     def deactivate_discount(self, discount_gid: str) -> None:
         return
 
+    def deactivate_discounts(self, discount_gids: list[str]) -> list[str]:
+        return list(discount_gids)
+
     def add_products_to_collection(self, collection_id: int, product_ids: list[int]) -> None:
         pass
 
@@ -972,7 +983,7 @@ class ShopifyService(AbstractShopifyService):
         self,
         title: str,
         code: str,
-        shopify_customer_id: str,
+        shopify_customer_id: str | None,
         discount_type: DiscountAmountType,
         amount: float,
         minimum_order_amount: int | None = None,
@@ -1007,7 +1018,12 @@ class ShopifyService(AbstractShopifyService):
                 "title": title,
                 "code": code,
                 "usageLimit": 1,
-                "customerSelection": {"customers": {"add": [ShopifyService.customer_gid(int(shopify_customer_id))]}},
+                # codes without a customer are bound to one in our db only, e.g. pooled group discount codes
+                "customerSelection": (
+                    {"customers": {"add": [ShopifyService.customer_gid(int(shopify_customer_id))]}}
+                    if shopify_customer_id
+                    else {"all": True}
+                ),
                 "startsAt": datetime.now(timezone.utc).isoformat(),
                 "appliesOncePerCustomer": True,
                 "combinesWith": {"orderDiscounts": True, "productDiscounts": True},
@@ -1205,6 +1221,51 @@ class ShopifyService(AbstractShopifyService):
         except ShopifyQueryError:
             raise ServiceError(f"Failed to deactivate discount code in shopify store.")
 
+    def deactivate_discounts(self, discount_gids: list[str]) -> list[str]:
+        """
+        Deactivates discounts with one aliased mutation per chunk, returns the gids that were deactivated. A chunk failing
+        stops at it, the gids deactivated by the chunks before it are still returned so the caller can record them.
+        Raises if no chunk went through.
+        """
+
+        deactivated_discount_gids = []
+
+        for i in range(0, len(discount_gids), DISCOUNTS_PER_DEACTIVATION_REQUEST):
+            chunk = discount_gids[i : i + DISCOUNTS_PER_DEACTIVATION_REQUEST]
+
+            query = "mutation discountCodesDeactivate({}) {{\n{}\n}}".format(
+                ", ".join(f"$id{index}: ID!" for index in range(len(chunk))),
+                "\n".join(
+                    f"d{index}: discountCodeDeactivate(id: $id{index}) {{ codeDiscountNode {{ id }} "
+                    f"userErrors {{ field message }} }}"
+                    for index in range(len(chunk))
+                ),
+            )
+            variables = {f"id{index}": discount_gid for index, discount_gid in enumerate(chunk)}
+
+            try:
+                body = self.__admin_api_graphql_request(query, variables)
+            except ShopifyQueryError:
+                if not deactivated_discount_gids:
+                    raise ServiceError(f"Failed to deactivate discount codes in shopify store.")
+
+                logger.error(
+                    f"Failed to deactivate {len(discount_gids) - i} discount codes in shopify store, "
+                    f"{len(deactivated_discount_gids)} were deactivated before"
+                )
+                break
+
+            for index, discount_gid in enumerate(chunk):
+                result = body.get("data", {}).get(f"d{index}") or {}
+
+                if result.get("userErrors") or not result.get("codeDiscountNode"):
+                    logger.error(f"Failed to deactivate discount {discount_gid}: {result.get('userErrors')}")
+                    continue
+
+                deactivated_discount_gids.append(discount_gid)
+
+        return deactivated_discount_gids
+
     def add_products_to_collection(self, collection_id: int, product_ids: list[int]) -> None:
         query = """
         mutation collectionAddProducts($id: ID!, $productIds: [ID!]!) {
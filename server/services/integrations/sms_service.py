@@ -4,7 +4,7 @@ import os
 from abc import ABC, abstractmethod
 
 from server.services import ServiceError
-from server.controllers.util import http
+from server.services.integrations.http_client import http
 
 TWILIO_ACCOUNT_SID = os.getenv("TWILIO_ACCOUNT_SID")
 TWILIO_AUTH_TOKEN = os.getenv("TWILIO_AUTH_TOKEN")
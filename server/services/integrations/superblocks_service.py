@@ -1,7 +1,7 @@
 import json
 from abc import ABC, abstractmethod
 
-from server.controllers.util import http
+from server.services.integrations.http_client import http
 
 
 class AbstractSuperblocksService(ABC):
@@ -1,10 +1,10 @@
-import base64
 import logging
 import os
 import random
 import time
 import uuid
 from datetime import datetime
+from typing import Iterable, Optional
 
 from sqlalchemy import text, select, func
 
@@ -12,16 +12,19 @@ from server.database.database_manager import db
 from server.database.models import Look, Attendee
 from server.flask_app import FlaskApp
 from server.models.look_model import CreateLookModel, LookModel, UpdateLookModel
+from server.models.resource_version_model import ResourceVersionModel
 from server.models.shopify_model import ShopifyVariantModel
 from server.services import ServiceError, DuplicateError, NotFoundError, BadRequestError
+from server.services.base64_stream import Base64DecodeStream
 from server.services.integrations.aws_service import AbstractAWSService
 from server.services.integrations.shopify_service import ShopifyService, AbstractShopifyService
+from server.services.shopify_product_service import ShopifyProductService
 from server.services.user_service import UserService
 
 logger = logging.getLogger(__name__)
 
 DATA_BUCKET = os.environ.get("DATA_BUCKET", "data-bucket")
-TMP_DIR = os.environ.get("TMPDIR", "/tmp")
+IMAGE_CONTENT_TYPE = "image/png"
 BUY_NOW_COLLECTION_ID = os.environ.get("buy_now_suit_collection_id", "gid://shopify/Collection/1234567890")
 
 
@@ -55,8 +58,10 @@ class LookService:
             .all()
         ]
 
+        look_prices = self.get_look_prices(look_models)
+
         for look_model in look_models:
-            look_model.price = self.get_look_price(look_model)
+            look_model.price = look_prices[look_model.id]
 
         return look_models
 
@@ -91,12 +96,98 @@ class LookService:
         return LookModel.model_validate(look)
 
     @staticmethod
-    def get_look_price(look) -> float:
+    def get_looks_version_by_user_id(user_id: uuid.UUID) -> ResourceVersionModel:
+        # looks are soft deleted and every change touches updated_at, so the number of looks and the latest change
+        # identify what is listed. Prices of listed looks change with the stored products of their bundles instead.
+        num_looks, last_modified, bundle_variant_ids = db.session.execute(
+            select(
+                func.count(),
+                func.max(Look.updated_at),
+                func.array_agg(Look.product_specs[("bundle", "variant_id")].as_string()).filter(Look.is_active),
+            ).where(Look.user_id == user_id)
+        ).one()
+
+        if not last_modified:
+            return ResourceVersionModel(tag="0", last_modified=None)
+
+        products_modified = ShopifyProductService.get_variants_last_modified(
+            variant_id for variant_id in bundle_variant_ids or [] if variant_id
+        )
+        tag = f"{num_looks}-{last_modified:%Y%m%d%H%M%S%f}"
+
+        if products_modified:
+            tag += f"-{products_modified:%Y%m%d%H%M%S%f}"
+            last_modified = max(last_modified, products_modified)
+
+        return ResourceVersionModel(tag=tag, last_modified=last_modified)
+
+    @staticmethod
+    def get_looks_by_user_ids(user_ids: Iterable[uuid.UUID]) -> dict[uuid.UUID, list[LookModel]]:
+        """Looks of the users without their prices, which change with the products rather than the looks."""
+
+        looks = {}
+
+        for look in (
+            db.session.execute(
+                select(Look).where(Look.user_id.in_(user_ids), Look.is_active).order_by(Look.created_at.asc())
+            )
+            .scalars()
+            .all()
+        ):
+            looks.setdefault(look.user_id, []).append(LookModel.model_validate(look))
+
+        return looks
+
+    def get_look_prices(self, looks: Iterable) -> dict[uuid.UUID, float]:
+        looks = list(looks)
+        bundle_prices = self.get_bundle_prices([look.product_specs for look in looks])
+
+        return {look.id: self.get_look_price(look, bundle_prices) for look in looks}
+
+    def get_bundle_prices(self, product_specs: Iterable[Optional[dict]]) -> dict[str, float]:
+        """
+        Current prices of bundles of looks by variant id, from the products stored off Shopify webhooks and from
+        Shopify for bundles not stored there.
+        """
+
+        variant_ids = {
+            str(specs["bundle"]["variant_id"])
+            for specs in product_specs
+            if (specs or {}).get("bundle", {}).get("variant_id")
+        }
+        prices = ShopifyProductService.get_variant_prices(variant_ids)
+        missing_variant_ids = sorted(variant_ids - prices.keys())
+
+        if missing_variant_ids and self.shopify_service:
+            try:
+                shopify_prices = {
+                    variant.variant_id: float(variant.variant_price)
+                    for variant in self.shopify_service.get_variants_by_id(missing_variant_ids)
+                    if variant and variant.variant_price is not None
+                }
+            except Exception as e:
+                logger.error(f"Failed to get prices of variants {missing_variant_ids} from Shopify: {e}")
+                shopify_prices = {}
+
+            ShopifyProductService.cache_variant_prices(shopify_prices)
+            prices.update(shopify_prices)
+
+        return prices
+
+    @staticmethod
+    def get_look_price(look, bundle_prices: Optional[dict[str, float]] = None) -> float:
+        """Price of the look's bundle out of get_bundle_prices, the price it had when the look was saved otherwise."""
+
         bundle = look.product_specs.get("bundle", {})
 
         if not bundle:
             return 0.0
 
+        variant_id = str(bundle.get("variant_id"))
+
+        if bundle_prices and variant_id in bundle_prices:
+            return bundle_prices[variant_id]
+
         return bundle.get("variant_price", bundle.get("price", 0.0))
 
     @staticmethod
@@ -123,11 +214,11 @@ class LookService:
 
     def __store_look_image_to_s3(self, create_look: CreateLookModel, db_look: Look) -> str:
         timestamp = str(int(time.time() * 1000))
-        local_file = f"{TMP_DIR}/{timestamp}.png"
         s3_file = f"looks/{create_look.user_id}/{db_look.id}/{timestamp}.png"
 
-        self.__save_image(create_look.image, local_file)
-        self.aws_service.upload_to_s3(local_file, DATA_BUCKET, s3_file)
+        self.aws_service.upload_fileobj_to_s3(
+            Base64DecodeStream(create_look.image), DATA_BUCKET, s3_file, IMAGE_CONTENT_TYPE
+        )
 
         return s3_file
 
@@ -253,6 +344,7 @@ class LookService:
 
         db_look.image_path = s3_file
         db_look.product_specs = enriched_product_specs
+        db_look.updated_at = datetime.now()
 
         db.session.commit()
         db.session.refresh(db_look)
@@ -312,6 +404,7 @@ class LookService:
 
         db_look.image_path = s3_file
         db_look.product_specs = enriched_product_specs
+        db_look.updated_at = datetime.now()
 
         db.session.commit()
         db.session.refresh(db_look)
@@ -458,18 +551,6 @@ class LookService:
         if has_bundle_identifier_product:
             self.shopify_service.archive_product(ShopifyService.product_gid(bundle_identifier_product_id))
 
-    @staticmethod
-    def __save_image(image_b64: str, local_file: str) -> None:
-        try:
-            image_b64 = image_b64.replace("data:image/png;base64,", "")
-            decoded_image = base64.b64decode(image_b64)
-
-            with open(local_file, "wb") as f:
-                f.write(decoded_image)
-        except Exception as e:
-            logger.exception(e)
-            raise ServiceError("Failed to save image.", e)
-
     @staticmethod
     def find_look_by_item_sku(sku: str) -> LookModel | None:
         query = text(
@@ -1,8 +1,10 @@
 import logging
 import uuid
-from typing import List
+from datetime import datetime
+from typing import Dict, Iterable, List, Tuple
 
 from sqlalchemy import func
+from sqlalchemy.exc import SQLAlchemyError
 
 from server.database.database_manager import db
 from server.database.models import Product, OrderItem
@@ -39,6 +41,22 @@ class ProductService:
 
         return ProductModel.model_validate(product)
 
+    def get_products_by_skus(self, skus: Iterable[str]) -> Dict[str, ProductModel]:
+        skus = set(skus)
+
+        if not skus:
+            return {}
+
+        products_by_sku = {}
+
+        for product in Product.query.filter(
+            Product.sku.in_(skus),
+            func.length(Product.sku) > 8,  # this should be removed later once db is fixed
+        ).all():
+            products_by_sku.setdefault(product.sku, ProductModel.model_validate(product))
+
+        return products_by_sku
+
     def get_products_for_order(self, order_id: uuid.UUID) -> List[ProductModel]:
         return [
             ProductModel.model_validate(product)
@@ -56,3 +74,111 @@ class ProductService:
             raise ServiceError("Failed to save new product.", e)
 
         return ProductModel.model_validate(new_product)
+
+    def create_products(self, create_products: List[CreateProductModel]) -> List[ProductModel]:
+        """
+        Inserts products in a single batch, returned by sku in the order they were given. Skus already stored are
+        returned as stored. If the batch fails, products are inserted one by one and those failing on their own are
+        logged and left out, so one bad product doesn't throw away the rest.
+        """
+
+        if not create_products:
+            return []
+
+        products_by_sku = {
+            product.sku: product
+            for product in Product.query.filter(
+                Product.sku.in_({create_product.sku for create_product in create_products})
+            ).all()
+        }
+        # one product per new sku
+        new_products_by_sku = {
+            create_product.sku: create_product
+            for create_product in create_products
+            if create_product.sku not in products_by_sku
+        }
+        now = datetime.now()
+
+        try:
+            try:
+                with db.session.begin_nested():
+                    inserted_products = {
+                        sku: self.__new_product(create_product, now)
+                        for sku, create_product in new_products_by_sku.items()
+                    }
+                    db.session.add_all(inserted_products.values())
+            except SQLAlchemyError as e:
+                logger.warning(f"Failed to insert products in one batch, inserting them one by one: {e}")
+                inserted_products = {}
+
+                for sku, create_product in new_products_by_sku.items():
+                    try:
+                        with db.session.begin_nested():
+                            product = self.__new_product(create_product, now)
+                            db.session.add(product)
+
+                        inserted_products[sku] = product
+                    except SQLAlchemyError as e:
+                        logger.error(f"Failed to save new product with sku {sku}: {e}")
+
+            products_by_sku.update(inserted_products)
+            # before commit expires them
+            product_models = {sku: ProductModel.model_validate(product) for sku, product in products_by_sku.items()}
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            raise ServiceError("Failed to save new products.", e)
+
+        return [
+            product_models[sku]
+            for sku in dict.fromkeys(create_product.sku for create_product in create_products)
+            if sku in product_models
+        ]
+
+    @staticmethod
+    def __new_product(create_product: CreateProductModel, now: datetime) -> Product:
+        # ids and timestamps are set here so the flush has nothing to read back and inserts the products in one batch
+        return Product(
+            id=uuid.uuid4(),
+            sku=create_product.sku,
+            name=create_product.name,
+            price=create_product.price,
+            created_at=now,
+            updated_at=now,
+        )
+
+    def sync_products(self, create_products: List[CreateProductModel]) -> Tuple[int, int]:
+        """Creates products with new skus and updates name and price of existing ones. Returns created and updated count."""
+
+        create_products_by_sku = {create_product.sku: create_product for create_product in create_products}
+
+        if not create_products_by_sku:
+            return 0, 0
+
+        existing_products = Product.query.filter(Product.sku.in_(create_products_by_sku.keys())).all()
+        existing_skus = {product.sku for product in existing_products}
+        changed_products = [
+            product
+            for product in existing_products
+            if product.name != create_products_by_sku[product.sku].name
+            or float(product.price or 0) != create_products_by_sku[product.sku].price
+        ]
+
+        try:
+            if changed_products:
+                # set through the session so updates are audit logged, flushed as one batch by primary key
+                for product in changed_products:
+                    product.name = create_products_by_sku[product.sku].name
+                    product.price = create_products_by_sku[product.sku].price
+                    product.updated_at = datetime.now()
+
+                db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            raise ServiceError("Failed to update products.", e)
+
+        created_products = self.create_products(
+            [create_product for sku, create_product in create_products_by_sku.items() if sku not in existing_skus]
+        )
+
+        return len(created_products), len(changed_products)
@@ -0,0 +1,230 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from typing import Dict, Iterable, Optional
+
+from sqlalchemy import delete, func, select
+from sqlalchemy.dialects.postgresql import insert
+
+from server.database.database_manager import db
+from server.database.models import SyncCursor
+from server.models.product_model import CreateProductModel, ProductModel
+from server.models.shiphero_model import ShipHeroProductModel
+from server.services import ServiceError, NotFoundError
+from server.services.integrations.shiphero_service import AbstractShipHeroService
+from server.services.product_service import ProductService
+
+logger = logging.getLogger(__name__)
+
+UNKNOWN_SKU_TTL = timedelta(minutes=15)
+UNKNOWN_SKUS_SIZE = 10000
+MAX_CONCURRENT_SHIPHERO_REQUESTS = 8
+DEFAULT_CATALOG_PAGE_SIZE = 100
+CATALOG_SYNC_CURSOR = "shiphero_catalog"
+
+
+class ShipHeroCatalogMetrics:
+    def __init__(self):
+        # skus looked up by order processing
+        self.lookups = 0
+        self.db_hits = 0
+        self.unknown_sku_hits = 0
+        # skus that had to be fetched from shiphero
+        self.shiphero_hits = 0
+        self.shiphero_misses = 0
+        self.shiphero_duration = 0.0
+
+    def to_dict(self) -> dict:
+        fetches = self.shiphero_hits + self.shiphero_misses
+
+        return {
+            "lookups": self.lookups,
+            "db_hits": self.db_hits,
+            "unknown_sku_hits": self.unknown_sku_hits,
+            "shiphero_hits": self.shiphero_hits,
+            "shiphero_misses": self.shiphero_misses,
+            # share of lookups answered without calling shiphero
+            "hit_rate": round((self.db_hits + self.unknown_sku_hits) / self.lookups, 4) if self.lookups else 0,
+            "avg_shiphero_duration_ms": round(self.shiphero_duration / fetches * 1000, 2) if fetches else 0,
+        }
+
+
+class ShipHeroCatalogService:
+    """
+    Resolves ShipHero skus to products. The products table is kept in sync with the ShipHero catalog by a scheduled
+    job, so ShipHero is only called for skus added since the last sync. Skus ShipHero doesn't know are remembered for a
+    while so repeated orders for them don't call it over and over.
+    """
+
+    def __init__(
+        self,
+        shiphero_service: AbstractShipHeroService,
+        product_service: ProductService,
+        unknown_sku_ttl: timedelta = UNKNOWN_SKU_TTL,
+    ):
+        self.__shiphero_service = shiphero_service
+        self.__product_service = product_service
+        self.__unknown_sku_ttl = unknown_sku_ttl.total_seconds()
+        # sku -> monotonic time it expires at
+        self.__unknown_skus: OrderedDict[str, float] = OrderedDict()
+        self.__lock = threading.Lock()
+        self.__metrics = ShipHeroCatalogMetrics()
+
+    def get_products_by_skus(self, skus: Iterable[str]) -> Dict[str, ProductModel]:
+        skus = set(skus)
+        products_by_sku = self.__product_service.get_products_by_skus(skus)
+        missing_skus = skus - products_by_sku.keys()
+        skus_to_fetch = sorted(sku for sku in missing_skus if not self.__is_unknown(sku))
+
+        with self.__lock:
+            self.__metrics.lookups += len(skus)
+            self.__metrics.db_hits += len(products_by_sku)
+            self.__metrics.unknown_sku_hits += len(missing_skus) - len(skus_to_fetch)
+
+        if not skus_to_fetch:
+            return products_by_sku
+
+        logger.debug(f"No products found for ShipHero SKUs {skus_to_fetch} in our db. Pulling from ShipHero API")
+
+        with ThreadPoolExecutor(
+            max_workers=min(len(skus_to_fetch), MAX_CONCURRENT_SHIPHERO_REQUESTS),
+            thread_name_prefix="shiphero-product",
+        ) as executor:
+            shiphero_products = list(executor.map(self.__get_shiphero_product, skus_to_fetch))
+
+        fetched = [
+            (sku, CreateProductModel(**shiphero_product.model_dump(exclude={"id"})))
+            for sku, shiphero_product in zip(skus_to_fetch, shiphero_products)
+            if shiphero_product
+        ]
+
+        try:
+            products = self.__product_service.create_products([create_product for _, create_product in fetched])
+        except ServiceError as e:
+            logger.error(f"Error creating products from ShipHero for SKUs {[sku for sku, _ in fetched]}: {e}")
+            return products_by_sku
+
+        for product in products:
+            products_by_sku[product.sku] = product
+
+        logger.info(f"ShipHero catalog metrics: {self.metrics()}")
+
+        return products_by_sku
+
+    def sync_catalog(self, page_size: int = DEFAULT_CATALOG_PAGE_SIZE, max_pages: Optional[int] = None) -> dict:
+        """
+        Pulls the ShipHero catalog page by page into products, each page is committed on its own. A run that stops
+        before the last page saves where it got to and the next one resumes from there instead of starting over.
+        """
+
+        num_pages, num_products, num_created, num_updated = 0, 0, 0, 0
+        cursor = self.__get_sync_cursor()
+
+        while max_pages is None or num_pages < max_pages:
+            page = self.__shiphero_service.get_products(page_size, cursor)
+
+            num_created_in_page, num_updated_in_page = self.__product_service.sync_products(
+                [CreateProductModel(**product.model_dump(exclude={"id"})) for product in page.products]
+            )
+
+            with self.__lock:
+                for product in page.products:
+                    self.__unknown_skus.pop(product.sku, None)
+
+            num_pages += 1
+            num_products += len(page.products)
+            num_created += num_created_in_page
+            num_updated += num_updated_in_page
+            cursor = page.next_cursor
+            self.__save_sync_cursor(cursor)
+
+            if not cursor:
+                break
+
+        result = {
+            "pages": num_pages,
+            "products": num_products,
+            "created": num_created,
+            "updated": num_updated,
+            "complete": cursor is None,
+        }
+
+        logger.info(f"Synced ShipHero catalog: {result}")
+
+        return result
+
+    def __get_sync_cursor(self) -> Optional[str]:
+        return db.session.execute(
+            select(SyncCursor.cursor).where(SyncCursor.name == CATALOG_SYNC_CURSOR)
+        ).scalar_one_or_none()
+
+    def __save_sync_cursor(self, cursor: Optional[str]) -> None:
+        try:
+            if cursor:
+                db.session.execute(
+                    insert(SyncCursor)
+                    .values(name=CATALOG_SYNC_CURSOR, cursor=cursor, updated_at=func.now())
+                    .on_conflict_do_update(index_elements=["name"], set_={"cursor": cursor, "updated_at": func.now()})
+                )
+            else:
+                # the whole catalog got synced, the next run starts a new pass from the first page
+                db.session.execute(delete(SyncCursor).where(SyncCursor.name == CATALOG_SYNC_CURSOR))
+
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            raise ServiceError("Failed to save ShipHero catalog sync cursor.", e)
+
+    def metrics(self) -> dict:
+        with self.__lock:
+            return self.__metrics.to_dict()
+
+    def __get_shiphero_product(self, sku: str) -> Optional[ShipHeroProductModel]:
+        started_at = time.perf_counter()
+        shiphero_product = None
+        unknown = False
+
+        try:
+            shiphero_product = self.__shiphero_service.get_product_by_sku(sku)
+        except NotFoundError as e:
+            unknown = True
+            logger.error(f"Error fetching product from ShipHero for SKU '{sku}': {e}")
+        except Exception as e:
+            logger.error(f"Error fetching product from ShipHero for SKU '{sku}': {e}")
+
+        with self.__lock:
+            self.__metrics.shiphero_duration += time.perf_counter() - started_at
+
+            if shiphero_product:
+                self.__metrics.shiphero_hits += 1
+            else:
+                self.__metrics.shiphero_misses += 1
+
+            if unknown:
+                self.__mark_unknown(sku)
+
+        return shiphero_product
+
+    def __is_unknown(self, sku: str) -> bool:
+        with self.__lock:
+            expires_at = self.__unknown_skus.get(sku)
+
+            if expires_at is None:
+                return False
+
+            if expires_at <= time.monotonic():
+                del self.__unknown_skus[sku]
+                return False
+
+            return True
+
+    def __mark_unknown(self, sku: str) -> None:
+        # called with the lock held
+        self.__unknown_skus[sku] = time.monotonic() + self.__unknown_sku_ttl
+        self.__unknown_skus.move_to_end(sku)
+
+        while len(self.__unknown_skus) > UNKNOWN_SKUS_SIZE:
+            self.__unknown_skus.popitem(last=False)
@@ -1,8 +1,14 @@
+import hashlib
+import json
 import logging
-from typing import Any
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Any, Iterable, Optional
 
-from sqlalchemy import select, text
-from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy import and_, or_, select, text, func, literal, literal_column
+from sqlalchemy.dialects.postgresql import insert, JSONB
 from sqlalchemy.exc import SQLAlchemyError
 
 from server.database.database_manager import db
@@ -12,6 +18,59 @@ from server.services import NotFoundError
 
 logger = logging.getLogger(__name__)
 
+# webhooks handled by other processes can't invalidate prices cached by this one, so they expire after a while
+VARIANT_PRICE_TTL = timedelta(minutes=5)
+VARIANT_PRICES_SIZE = 10000
+
+
+class VariantPriceCache:
+    """Prices by variant id, shared by the process and invalidated when products are written."""
+
+    def __init__(self, ttl: timedelta = VARIANT_PRICE_TTL, size: int = VARIANT_PRICES_SIZE):
+        self.__ttl = ttl.total_seconds()
+        self.__size = size
+        # variant id -> (price, monotonic time it expires at)
+        self.__prices: OrderedDict[str, tuple[float, float]] = OrderedDict()
+        self.__lock = threading.Lock()
+
+    def get_many(self, variant_ids: Iterable[str]) -> dict[str, float]:
+        now = time.monotonic()
+        prices = {}
+
+        with self.__lock:
+            for variant_id in variant_ids:
+                price, expires_at = self.__prices.get(variant_id, (None, 0))
+
+                if expires_at > now:
+                    prices[variant_id] = price
+                else:
+                    self.__prices.pop(variant_id, None)
+
+        return prices
+
+    def put_many(self, prices: dict[str, float]) -> None:
+        expires_at = time.monotonic() + self.__ttl
+
+        with self.__lock:
+            for variant_id, price in prices.items():
+                self.__prices[variant_id] = (price, expires_at)
+                self.__prices.move_to_end(variant_id)
+
+            while len(self.__prices) > self.__size:
+                self.__prices.popitem(last=False)
+
+    def invalidate(self, variant_ids: Iterable[str]) -> None:
+        with self.__lock:
+            for variant_id in variant_ids:
+                self.__prices.pop(variant_id, None)
+
+    def clear(self) -> None:
+        with self.__lock:
+            self.__prices.clear()
+
+
+_variant_prices = VariantPriceCache()
+
 
 class ShopifyProductService:
     @staticmethod
@@ -67,34 +126,144 @@ class ShopifyProductService:
         )
 
     @staticmethod
-    def upsert_product(product_id: int, data: dict[str, Any]) -> ShopifyProduct | None:
-        try:
-            stmt = (
-                insert(ShopifyProduct)
-                .values(product_id=product_id, data=data, is_deleted=False)
-                .on_conflict_do_update(
-                    index_elements=["product_id"],
-                    set_={
-                        "data": data,
-                        "updated_at": text("now()"),
-                        "is_deleted": False,
-                    },
+    def get_variant_prices(variant_ids: Iterable[str]) -> dict[str, float]:
+        """Prices of variants of stored products by variant id, leaving out variants not stored or without a price."""
+
+        variant_ids = {str(variant_id) for variant_id in variant_ids if str(variant_id).isdigit()}
+        prices = _variant_prices.get_many(variant_ids)
+        missing_variant_ids = variant_ids - prices.keys()
+
+        if not missing_variant_ids:
+            return prices
+
+        products_data = (
+            db.session.execute(
+                select(ShopifyProduct.data).where(
+                    ShopifyProduct.is_deleted.is_(False), ShopifyProductService.__has_any_variant(missing_variant_ids)
                 )
             )
+            .scalars()
+            .all()
+        )
 
-            db.session.execute(stmt)
-            db.session.commit()
+        stored_prices = {}
+
+        for data in products_data:
+            for variant in data.get("variants") or []:
+                variant_id = str(variant.get("id"))
+
+                if variant_id in missing_variant_ids and variant.get("price") is not None:
+                    stored_prices[variant_id] = float(variant["price"])
+
+        _variant_prices.put_many(stored_prices)
 
+        return {**prices, **stored_prices}
+
+    @staticmethod
+    def get_variants_last_modified(variant_ids: Iterable[str]) -> Optional[datetime]:
+        """When a product with any of the variants was last written, deleted ones included, None if none is stored."""
+
+        variant_ids = {str(variant_id) for variant_id in variant_ids if str(variant_id).isdigit()}
+
+        if not variant_ids:
+            return None
+
+        return db.session.execute(
+            select(func.max(ShopifyProduct.updated_at)).where(ShopifyProductService.__has_any_variant(variant_ids))
+        ).scalar_one()
+
+    @staticmethod
+    def cache_variant_prices(prices: dict[str, float]) -> None:
+        """Caches prices of variants resolved elsewhere, until their product is written or they expire."""
+
+        _variant_prices.put_many(prices)
+
+    @staticmethod
+    def clear_variant_prices() -> None:
+        _variant_prices.clear()
+
+    @staticmethod
+    def upsert_product(product_id: int, data: dict[str, Any]) -> ShopifyProduct | None:
+        """Returns the written product, None if the stored product is newer or has the same content."""
+
+        stmt = insert(ShopifyProduct).values(
+            product_id=product_id,
+            data=data,
+            data_md5=ShopifyProductService.__data_md5(data),
+            shopify_updated_at=ShopifyProductService.parse_updated_at(data),
+            is_deleted=False,
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["product_id"],
+            set_={
+                "data": stmt.excluded.data,
+                "data_md5": stmt.excluded.data_md5,
+                "shopify_updated_at": stmt.excluded.shopify_updated_at,
+                "updated_at": text("now()"),
+                "is_deleted": False,
+            },
+            # shopify doesn't deliver webhooks in order and often sends updates that don't change the product
+            where=and_(
+                or_(ShopifyProduct.data_md5.is_distinct_from(stmt.excluded.data_md5), ShopifyProduct.is_deleted),
+                or_(
+                    ShopifyProduct.shopify_updated_at.is_(None),
+                    stmt.excluded.shopify_updated_at.is_(None),
+                    stmt.excluded.shopify_updated_at >= ShopifyProduct.shopify_updated_at,
+                ),
+            ),
+        )
+
+        try:
             upserted_product = db.session.execute(
-                select(ShopifyProduct).where(ShopifyProduct.product_id == product_id)
+                stmt.returning(ShopifyProduct), execution_options={"populate_existing": True}
             ).scalar_one_or_none()
-
-            return upserted_product
+            db.session.commit()
         except SQLAlchemyError as e:
             db.session.rollback()
             logger.exception(f"Failed to upsert product with product_id: {product_id}", e)
             return None
 
+        if not upserted_product:
+            logger.debug(f"Skipped upsert of product with product_id: {product_id}, stored product is up to date")
+        else:
+            _variant_prices.invalidate(ShopifyProductService.__variant_ids(data))
+
+        return upserted_product
+
+    @staticmethod
+    def parse_updated_at(data: dict[str, Any]) -> Optional[datetime]:
+        """Shopify's updated_at of the product payload, in utc."""
+
+        try:
+            updated_at = datetime.fromisoformat(data["updated_at"])
+        except (KeyError, TypeError, ValueError):
+            return None
+
+        if updated_at.tzinfo:
+            updated_at = updated_at.astimezone(timezone.utc).replace(tzinfo=None)
+
+        return updated_at
+
+    @staticmethod
+    def __has_any_variant(variant_ids: Iterable[str]):
+        # same expression as ix_shopify_products_variants_id, so each containment is answered by the index
+        stored_variant_ids = func.jsonb_path_query_array(ShopifyProduct.data, literal_column("'$.variants[*].id'"))
+
+        return or_(
+            *[stored_variant_ids.op("@>")(literal([int(variant_id)], JSONB)) for variant_id in sorted(variant_ids)]
+        )
+
+    @staticmethod
+    def __variant_ids(data: dict[str, Any]) -> list[str]:
+        return [str(variant.get("id")) for variant in data.get("variants") or []]
+
+    @staticmethod
+    def __data_md5(data: dict[str, Any]) -> str:
+        # updated_at changes with every update even when nothing else does
+        content = {key: value for key, value in data.items() if key != "updated_at"}
+
+        return hashlib.md5(json.dumps(content, sort_keys=True).encode("utf-8")).hexdigest()
+
     @staticmethod
     def delete_product(product_id: int) -> ShopifyProduct | None:
         product = db.session.execute(
@@ -108,6 +277,7 @@ class ShopifyProductService:
         try:
             product.is_deleted = True
             product.updated_at = text("now()")
+            _variant_prices.invalidate(ShopifyProductService.__variant_ids(product.data))
 
             db.session.commit()
             db.session.refresh(product)
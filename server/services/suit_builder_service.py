@@ -1,7 +1,5 @@
-import base64
 import logging
 import os
-import tempfile
 from datetime import datetime
 from typing import Any
 
@@ -17,11 +15,13 @@ from server.models.suit_builder_model import (
     SuitBuilderItemsCollection,
 )
 from server.services import DuplicateError, ServiceError, NotFoundError
+from server.services.base64_stream import Base64DecodeStream
 from server.services.integrations.aws_service import AbstractAWSService
 from server.services.integrations.shopify_service import AbstractShopifyService
 from server.services.shopify_product_service import ShopifyProductService
 
 DATA_BUCKET = os.environ.get("DATA_BUCKET", "data-bucket")
+IMAGE_CONTENT_TYPE = "image/png"
 
 logger = logging.getLogger(__name__)
 
@@ -42,8 +42,6 @@ class SuitBuilderService:
         return f"suit-builder/v1/{item_type}/{filename}"
 
     def __save_image_by_url_to_s3(self, url: str, image_type: str, filename: str) -> None:
-        image_path = os.path.join(tempfile.gettempdir(), filename)
-
         headers = {
             "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/85.0.4183.83 Safari/537.36",
             "Accept-Language": "en-US,en;q=0.9",
@@ -52,19 +50,19 @@ class SuitBuilderService:
             "Referer": "https://www.google.com/",
         }
 
-        response = requests.get(url, headers=headers)
+        with requests.get(url, headers=headers, stream=True) as response:
+            if response.status_code != 200:
+                raise ServiceError(f"Failed to download image from {url}")
 
-        if response.status_code == 200:
-            with open(image_path, "wb") as f:
-                f.write(response.content)
-        else:
-            raise ServiceError(f"Failed to download image from {url}")
+            # the body is streamed to S3 as it's downloaded, decompressed as per its content encoding
+            response.raw.decode_content = True
 
-        self.aws_service.upload_to_s3(
-            image_path,
-            DATA_BUCKET,
-            self.__build_s3_image_path(image_type, filename),
-        )
+            self.aws_service.upload_fileobj_to_s3(
+                response.raw,
+                DATA_BUCKET,
+                self.__build_s3_image_path(image_type, filename),
+                IMAGE_CONTENT_TYPE,
+            )
 
     def add_item(self, item: CreateSuitBuilderModel) -> SuitBuilderItemModel:
         suit_builder_item = db.session.execute(
@@ -187,20 +185,18 @@ class SuitBuilderService:
         elif field == "index":
             suit_builder_item.index = int(value)
         elif field == "image_b64":
-            local_file_path = f"{tempfile.gettempdir()}/{suit_builder_item.sku}.png"
-            self.__save_image(value, local_file_path)
-            self.aws_service.upload_to_s3(
-                local_file_path,
+            self.aws_service.upload_fileobj_to_s3(
+                Base64DecodeStream(value),
                 DATA_BUCKET,
                 self.__build_s3_image_path(suit_builder_item.type.value, f"{suit_builder_item.sku}.png"),
+                IMAGE_CONTENT_TYPE,
             )
         elif field == "icon_b64":
-            local_file_path = f"{tempfile.gettempdir()}/{suit_builder_item.sku}-icon.png"
-            self.__save_image(value, local_file_path)
-            self.aws_service.upload_to_s3(
-                local_file_path,
+            self.aws_service.upload_fileobj_to_s3(
+                Base64DecodeStream(value),
                 DATA_BUCKET,
                 self.__build_s3_image_path(suit_builder_item.type.value, f"{suit_builder_item.sku}-icon.png"),
+                IMAGE_CONTENT_TYPE,
             )
         else:
             raise ServiceError(f"Field {field} not supported")
@@ -242,14 +238,3 @@ class SuitBuilderService:
         except Exception as e:
             db.session.rollback()
             raise ServiceError("Failed to delete suit builder item", e)
-
-    @staticmethod
-    def __save_image(image_b64: str, local_file: str) -> None:
-        try:
-            decoded_image = base64.b64decode(image_b64)
-
-            with open(local_file, "wb") as f:
-                f.write(decoded_image)
-        except Exception as e:
-            logger.exception(e)
-            raise ServiceError("Failed to save image.", e)
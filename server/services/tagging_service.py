@@ -1,6 +1,13 @@
 import logging
 import uuid
+from datetime import datetime, timezone, timedelta
 
+from sqlalchemy import select, update, delete, func, tuple_, union, or_
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import aliased
+
+from server.database.database_manager import db
+from server.database.models import TagReconciliationQueue, Event, Attendee, User
 from server.models.audit_log_model import AuditLogMessage
 from server.services import NotFoundError
 from server.services.attendee_service import AttendeeService
@@ -15,6 +22,12 @@ TAG_EVENT_OWNER_4_PLUS = "event_owner_4_plus"
 TAG_MEMBER_OF_4_PLUS_EVENT = "member_of_4_plus_event"
 TAG_PRODUCT_LINKED_TO_EVENT = "linked_to_event"
 TAG_PRODUCT_NOT_LINKED_TO_EVENT = "not_linked_to_event"
+CUSTOMER_RECONCILED_TAGS = {TAG_EVENT_OWNER_4_PLUS, TAG_MEMBER_OF_4_PLUS_EVENT}
+
+DEFAULT_RECONCILIATION_DEBOUNCE = timedelta(seconds=30)
+DEFAULT_RECONCILIATION_MAX_WAIT = timedelta(minutes=5)
+DEFAULT_RECONCILIATION_BATCH_SIZE = 100
+RECONCILIATION_LEASE = timedelta(minutes=5)
 
 
 class TaggingService:
@@ -25,99 +38,93 @@ class TaggingService:
         attendee_service: AttendeeService,
         look_service: LookService,
         shopify_service: AbstractShopifyService,
+        reconciliation_debounce: timedelta = DEFAULT_RECONCILIATION_DEBOUNCE,
+        reconciliation_max_wait: timedelta = DEFAULT_RECONCILIATION_MAX_WAIT,
     ):
         self.__user_service = user_service
         self.__event_service = event_service
         self.__attendee_service = attendee_service
         self.__look_service = look_service
         self.__shopify_service = shopify_service
+        self.__reconciliation_debounce = reconciliation_debounce
+        self.__reconciliation_max_wait = reconciliation_max_wait
 
     def tag_customers_on_event_updated(self, audit_log_message: AuditLogMessage):
-        user_id = audit_log_message.payload.get("user_id")
         event_id = audit_log_message.payload.get("id")
 
-        user_tags_that_should_be_present = {}
-        user_tags_that_should_not_be_present = {}
-
-        events = self.__event_service.get_user_owned_events_with_n_attendees(user_id, 4)
-
-        if events:
-            user_tags_that_should_be_present[user_id] = {TAG_EVENT_OWNER_4_PLUS}
-        else:
-            user_tags_that_should_not_be_present[user_id] = {TAG_EVENT_OWNER_4_PLUS}
-
-        attendees = self.__attendee_service.get_invited_attendees_for_the_event(uuid.UUID(event_id))
-
-        for attendee in attendees:
-            events = self.__event_service.get_user_member_events_with_n_attendees(attendee.user_id, 4)
-
-            user_tags_that_should_be_present.setdefault(attendee.user_id, set())
-            user_tags_that_should_not_be_present.setdefault(attendee.user_id, set())
-
-            if events:
-                if not user_tags_that_should_be_present.get(attendee.user_id):
-                    user_tags_that_should_be_present[attendee.user_id] = set()
-
-                user_tags_that_should_be_present[attendee.user_id].add(TAG_MEMBER_OF_4_PLUS_EVENT)
-            else:
-                if not user_tags_that_should_not_be_present.get(attendee.user_id):
-                    user_tags_that_should_not_be_present[attendee.user_id] = set()
-
-                user_tags_that_should_not_be_present[attendee.user_id].add(TAG_MEMBER_OF_4_PLUS_EVENT)
-
-        if user_tags_that_should_be_present:
-            self.__add_tags_to_customers(user_tags_that_should_be_present)
-
-        if user_tags_that_should_not_be_present:
-            self.__remove_tags_from_customers(user_tags_that_should_not_be_present)
+        self.__enqueue_event_customers_for_reconciliation(uuid.UUID(event_id))
 
     def tag_customers_on_attendee_updated(self, audit_log_message: AuditLogMessage):
         event_id = audit_log_message.payload.get("event_id")
         user_id = audit_log_message.payload.get("user_id")
-        attendee_id = audit_log_message.payload.get("id")
-        attendee_is_active = audit_log_message.payload.get("is_active")
 
         if not user_id:
             # nothing to do, we don't care about attendees without user_id (not invited)
             return
 
-        event = self.__event_service.get_event_by_id(uuid.UUID(event_id))
-        event_owner_user_id = event.user_id
-
-        user_tags_that_should_be_present: dict[uuid.UUID, set[str]] = {}
-        user_tags_that_should_not_be_present: dict[uuid.UUID, set[str]] = {}
-
-        events = self.__event_service.get_user_owned_events_with_n_attendees(event_owner_user_id, 4)
-
-        if events:
-            user_tags_that_should_be_present[event_owner_user_id] = {TAG_EVENT_OWNER_4_PLUS}
-        else:
-            user_tags_that_should_not_be_present[event_owner_user_id] = {TAG_EVENT_OWNER_4_PLUS}
-
-        attendees = self.__attendee_service.get_invited_attendees_for_the_event(uuid.UUID(event_id))
-
-        if not attendee_is_active:
-            attendees.append(self.__attendee_service.get_attendee_by_id(uuid.UUID(attendee_id), False))
-
-        for attendee in attendees:
-            events = self.__event_service.get_user_member_events_with_n_attendees(attendee.user_id, 4)
-
-            if events:
-                if not user_tags_that_should_be_present.get(attendee.user_id):
-                    user_tags_that_should_be_present[attendee.user_id] = set()
-
-                user_tags_that_should_be_present[attendee.user_id].add(TAG_MEMBER_OF_4_PLUS_EVENT)
-            else:
-                if not user_tags_that_should_not_be_present.get(attendee.user_id):
-                    user_tags_that_should_not_be_present[attendee.user_id] = set()
-
-                user_tags_that_should_not_be_present[attendee.user_id].add(TAG_MEMBER_OF_4_PLUS_EVENT)
+        self.__enqueue_event_customers_for_reconciliation(uuid.UUID(event_id))
+
+    def reconcile_customer_tags(self, batch_size: int = DEFAULT_RECONCILIATION_BATCH_SIZE) -> int:
+        """
+        Brings 4+ event tags of customers whose debounce window has passed in line with the current state of the db.
+        Returns number of customers picked up.
+        """
+
+        now = func.now()
+
+        # lease the entries instead of deleting them, if reconciliation dies halfway they become due again
+        leased_entries = (
+            db.session.execute(
+                update(TagReconciliationQueue)
+                .where(
+                    TagReconciliationQueue.user_id.in_(
+                        select(TagReconciliationQueue.user_id)
+                        .where(TagReconciliationQueue.due_at <= now)
+                        .order_by(TagReconciliationQueue.due_at)
+                        .limit(batch_size)
+                        .with_for_update(skip_locked=True)
+                    )
+                )
+                .values(due_at=now + RECONCILIATION_LEASE)
+                .returning(TagReconciliationQueue.user_id, TagReconciliationQueue.due_at)
+            )
+            .tuples()
+            .all()
+        )
+        db.session.commit()
+
+        if not leased_entries:
+            return 0
+
+        failed_user_ids = set()
+
+        for user_id, shopify_id, tags, desired_tags in self.__get_desired_customer_tags(
+            [user_id for user_id, _ in leased_entries]
+        ):
+            try:
+                self.__apply_customer_tags(user_id, shopify_id, set(tags or []), desired_tags)
+            except Exception as e:
+                db.session.rollback()
+                logger.exception(f"Failed to reconcile tags for user {user_id}: {e}")
+                failed_user_ids.add(user_id)
+
+        # failed entries are retried once their lease expires, entries re-enqueued while being reconciled got a new
+        # due_at and stay in the queue as well
+        done_entries = [
+            (user_id, leased_until) for user_id, leased_until in leased_entries if user_id not in failed_user_ids
+        ]
+
+        if done_entries:
+            db.session.execute(
+                delete(TagReconciliationQueue).where(
+                    tuple_(TagReconciliationQueue.user_id, TagReconciliationQueue.due_at).in_(done_entries)
+                )
+            )
+            db.session.commit()
 
-        if user_tags_that_should_be_present:
-            self.__add_tags_to_customers(user_tags_that_should_be_present)
+        logger.info(f"Reconciled tags of {len(done_entries)} of {len(leased_entries)} customers")
 
-        if user_tags_that_should_not_be_present:
-            self.__remove_tags_from_customers(user_tags_that_should_not_be_present)
+        return len(leased_entries)
 
     def tag_products_on_attendee_updated(self, audit_log_message: AuditLogMessage):
         look_id = audit_log_message.payload.get("look_id")
@@ -173,40 +180,108 @@ class TaggingService:
                 self.__shopify_service.remove_tags(shopify_product_gid, {TAG_PRODUCT_LINKED_TO_EVENT})
                 self.__shopify_service.add_tags(shopify_product_gid, {TAG_PRODUCT_NOT_LINKED_TO_EVENT})
 
-    def __add_tags_to_customers(self, user_tags_that_should_be_present: dict[uuid.UUID, set[str]]):
-        for user_id, tags in user_tags_that_should_be_present.items():
-            user = self.__user_service.get_user_by_id(user_id)
-
-            if user.shopify_id is None:
-                logger.info(f"User {user.id} does not have a Shopify ID. Skipping ...")
-                continue
-
-            current_user_tags = set(user.meta.get("tags", []))
-
-            if tags.issubset(current_user_tags):
-                logger.info(f"User {user.id}/{user.shopify_id} already has tags {tags}. Skipping ...")
-            else:
-                logger.info(f"User {user.id}/{user.shopify_id} does not have tags {tags}. Adding ...")
-                current_user_tags.update(tags)
+    def __enqueue_event_customers_for_reconciliation(self, event_id: uuid.UUID) -> None:
+        """Queues as part of the current transaction, committing is up to the caller."""
+
+        # owner and every attendee of the event, including removed ones, membership of all of them might have changed
+        users_in_question = union(
+            select(Event.user_id).where(Event.id == event_id),
+            select(Attendee.user_id).where(Attendee.event_id == event_id, Attendee.user_id.isnot(None)),
+        ).subquery()
+
+        now = func.now()
+
+        db.session.execute(
+            insert(TagReconciliationQueue)
+            .from_select(
+                ["user_id", "due_at", "enqueued_at"],
+                select(users_in_question.c[0], now + self.__reconciliation_debounce, now),
+            )
+            .on_conflict_do_update(
+                index_elements=["user_id"],
+                # trailing debounce, capped so a constantly edited event still gets its tags eventually
+                set_={
+                    "due_at": func.least(
+                        now + self.__reconciliation_debounce,
+                        TagReconciliationQueue.enqueued_at + self.__reconciliation_max_wait,
+                    )
+                },
+            )
+        )
+
+    @staticmethod
+    def __get_desired_customer_tags(user_ids: list[uuid.UUID]) -> list[tuple[uuid.UUID, str, list[str], set[str]]]:
+        users_attendee = aliased(Attendee)
+        events_with_4_plus_attendees = (
+            select(Event.id, Event.user_id)
+            .join(Attendee, Attendee.event_id == Event.id)
+            .where(
+                Event.is_active,
+                Attendee.is_active,
+                Attendee.invite,
+                Event.event_at > datetime.now(timezone.utc),
+                # only events of the given users, the cte is materialized rather than filtered by the lookups below
+                or_(
+                    Event.user_id.in_(user_ids),
+                    Event.id.in_(select(users_attendee.event_id).where(users_attendee.user_id.in_(user_ids))),
+                ),
+            )
+            .group_by(Event.id)
+            .having(func.count(Attendee.id) >= 4)
+            .cte("events_with_4_plus_attendees")
+        )
+
+        is_owner = (
+            select(events_with_4_plus_attendees.c.id).where(events_with_4_plus_attendees.c.user_id == User.id).exists()
+        )
+        is_member = (
+            select(Attendee.id)
+            .where(
+                Attendee.user_id == User.id,
+                Attendee.is_active,
+                Attendee.invite,
+                Attendee.event_id == events_with_4_plus_attendees.c.id,
+            )
+            .exists()
+        )
+
+        rows = db.session.execute(
+            select(User.id, User.shopify_id, User.meta, is_owner, is_member).where(User.id.in_(user_ids))
+        ).all()
+
+        return [
+            (
+                user_id,
+                shopify_id,
+                (meta or {}).get("tags", []),
+                ({TAG_EVENT_OWNER_4_PLUS} if owner else set()) | ({TAG_MEMBER_OF_4_PLUS_EVENT} if member else set()),
+            )
+            for user_id, shopify_id, meta, owner, member in rows
+        ]
+
+    def __apply_customer_tags(
+        self, user_id: uuid.UUID, shopify_id: str, current_tags: set[str], desired_tags: set[str]
+    ) -> None:
+        tags_to_add = desired_tags - current_tags
+        tags_to_remove = (CUSTOMER_RECONCILED_TAGS - desired_tags) & current_tags
+
+        if not tags_to_add and not tags_to_remove:
+            return
 
-                self.__shopify_service.add_tags(ShopifyService.customer_gid(int(user.shopify_id)), current_user_tags)
-                self.__user_service.add_meta_tag(user.id, current_user_tags)
+        if shopify_id is None:
+            logger.info(f"User {user_id} does not have a Shopify ID. Skipping ...")
+            return
 
-    def __remove_tags_from_customers(self, user_tags_that_should_not_be_present: dict[uuid.UUID, set[str]]):
-        for user_id, tags in user_tags_that_should_not_be_present.items():
-            user = self.__user_service.get_user_by_id(user_id)
+        customer_gid = ShopifyService.customer_gid(int(shopify_id))
 
-            if user.shopify_id is None:
-                logger.info(f"User {user.id} does not have a Shopify ID. Skipping ...")
-                continue
+        if tags_to_add:
+            logger.info(f"User {user_id}/{shopify_id} does not have tags {tags_to_add}. Adding ...")
 
-            current_user_tags = set(user.meta.get("tags", []))
+            self.__shopify_service.add_tags(customer_gid, tags_to_add)
+            self.__user_service.add_meta_tag(user_id, tags_to_add)
 
-            if not tags.intersection(current_user_tags):
-                logger.info(f"User {user.id}/{user.shopify_id} does not have tags {tags}. Skipping ...")
-            else:
-                logger.info(f"User {user.id}/{user.shopify_id} has tags {tags}. Removing ...")
-                current_user_tags.difference_update(tags)
+        if tags_to_remove:
+            logger.info(f"User {user_id}/{shopify_id} has tags {tags_to_remove}. Removing ...")
 
-                self.__shopify_service.remove_tags(ShopifyService.customer_gid(int(user.shopify_id)), tags)
-                self.__user_service.remove_meta_tag(user.id, tags)
+            self.__shopify_service.remove_tags(customer_gid, tags_to_remove)
+            self.__user_service.remove_meta_tag(user_id, tags_to_remove)
@@ -1,6 +1,10 @@
+from contextlib import contextmanager
 from datetime import datetime
+from typing import Any, Iterator, Optional
 from uuid import UUID
 
+from sqlalchemy import insert
+
 from server.database.database_manager import db
 from server.database.models import UserActivityLog
 from server.models.audit_log_model import AuditLogMessage
@@ -29,6 +33,24 @@ class UserActivityLogService:
         self.__role_service = role_service
         self.__look_service = look_service
         self.__order_service = order_service
+        self.__buffer: Optional[list[dict[str, Any]]] = None
+
+    @contextmanager
+    def buffered(self) -> Iterator[list[dict[str, Any]]]:
+        # activity logs are collected into the yielded list instead of being committed one by one
+        self.__buffer = []
+
+        try:
+            yield self.__buffer
+        finally:
+            self.__buffer = None
+
+    @staticmethod
+    def persist_all(activity_logs: list[dict[str, Any]]) -> None:
+        if not activity_logs:
+            return
+
+        db.session.execute(insert(UserActivityLog), activity_logs)
 
     def user_created(self, audit_log_message: AuditLogMessage):
         data = audit_log_message.payload
@@ -436,8 +458,13 @@ class UserActivityLogService:
                 f'Order {order_number}, {shopify_order_number} status updated from "{old_status}" to "{new_status}"',
             )
 
-    @staticmethod
-    def __persist(user_id: UUID, audit_log_id: UUID, handle: str, message: str) -> None:
+    def __persist(self, user_id: UUID, audit_log_id: UUID, handle: str, message: str) -> None:
+        if self.__buffer is not None:
+            self.__buffer.append(
+                {"user_id": user_id, "audit_log_id": audit_log_id, "handle": handle, "message": message}
+            )
+            return
+
         user_activity_log = UserActivityLog(
             user_id=user_id,
             audit_log_id=audit_log_id,
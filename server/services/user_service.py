@@ -1,12 +1,13 @@
 import logging
 import uuid
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from typing import List, Optional, Set
 
-from sqlalchemy import func, select, and_
+from sqlalchemy import func, select, and_, or_
 
 from server.database.database_manager import db
-from server.database.models import User, Attendee, Discount, DiscountType
+from server.database.models import User, Attendee, Discount, DiscountType, Size
 from server.flask_app import FlaskApp
 from server.models.discount_model import DiscountModel
 from server.models.user_model import CreateUserModel, UserModel, UpdateUserModel
@@ -18,6 +19,8 @@ from server.services.integrations.shopify_service import AbstractShopifyService,
 logger = logging.getLogger(__name__)
 
 MAX_NAME_LENGTH = 63
+MAX_CONCURRENT_SHOPIFY_REQUESTS = 8
+MAX_CONCURRENT_ACTIVECAMPAIGN_REQUESTS = 8
 
 
 class UserService:
@@ -46,15 +49,7 @@ class UserService:
         if create_user.shopify_id:
             shopify_customer_id = create_user.shopify_id
         else:
-            try:
-                shopify_customer_id = self.shopify_service.create_customer(
-                    first_name, last_name, create_user.email
-                ).get_id()
-            except DuplicateError as e:
-                # If the user already exists in Shopify, we should still create a user in our database
-                logger.debug(e)
-
-                shopify_customer_id = str(self.shopify_service.get_customer_by_email(create_user.email).get_id())
+            shopify_customer_id = self.__create_shopify_customer(first_name, last_name, create_user.email)
 
         try:
             db_user = User(
@@ -76,28 +71,153 @@ class UserService:
 
             user_model = UserModel.model_validate(db_user)
 
-            self.__link_new_user_to_his_latest_sizing(db_user)
+            self.__link_new_user_to_his_latest_sizing(db_user.id, db_user.email)
 
             if send_activation_email:
                 self.email_service.send_activation_email(user_model)
 
             # Tracking # TODO: async
-            events = ["Signed Up"]
+            self.__sync_new_contact(user_model)
+
+            return user_model
+        except Exception as e:
+            logger.exception(e)
+
+    def create_users(self, create_users: List[CreateUserModel]) -> List[UserModel]:
+        """
+        Creates users as part of the current transaction, committing and then calling on_users_created is up to the
+        caller. Shopify customers are created concurrently, users whose customer couldn't be created are left out
+        and so are emails that already have a user.
+        """
 
-            if user_model.account_status:
-                events.append("Activated Account")
+        create_users = list({create_user.email.lower(): create_user for create_user in create_users}.values())
 
-            self.activecampaign_service.sync_contact(
-                email=user_model.email,
-                first_name=user_model.first_name,
-                last_name=user_model.last_name,
-                phone=user_model.phone_number,
-                events=events,
+        if not create_users:
+            return []
+
+        existing_emails = set(
+            db.session.execute(
+                select(func.lower(User.email)).where(
+                    func.lower(User.email).in_([create_user.email.lower() for create_user in create_users])
+                )
+            )
+            .scalars()
+            .all()
+        )
+        create_users = [create_user for create_user in create_users if create_user.email.lower() not in existing_emails]
+
+        if not create_users:
+            return []
+
+        with ThreadPoolExecutor(
+            max_workers=min(len(create_users), MAX_CONCURRENT_SHOPIFY_REQUESTS), thread_name_prefix="shopify-customer"
+        ) as executor:
+            shopify_customer_ids = list(executor.map(self.__create_shopify_customer_for_user, create_users))
+
+        user_models = []
+
+        for create_user, shopify_customer_id in zip(create_users, shopify_customer_ids):
+            if not shopify_customer_id:
+                continue
+
+            # built from what is inserted, the users expire once the caller commits
+            user_models.append(
+                UserModel(
+                    id=uuid.uuid4(),
+                    first_name=None if not create_user.first_name else create_user.first_name[:MAX_NAME_LENGTH],
+                    last_name=None if not create_user.last_name else create_user.last_name[:MAX_NAME_LENGTH],
+                    email=create_user.email.lower(),
+                    shopify_id=str(shopify_customer_id),
+                    phone_number=create_user.phone_number,
+                    sms_consent=create_user.sms_consent,
+                    email_consent=create_user.email_consent,
+                    account_status=create_user.account_status,
+                    meta=create_user.meta,
+                )
             )
 
-            return user_model
+        try:
+            db.session.add_all(
+                [
+                    User(
+                        **user_model.model_dump(exclude={"legacy_id"}),
+                        created_at=datetime.now(),
+                        updated_at=datetime.now(),
+                    )
+                    for user_model in user_models
+                ]
+            )
+            db.session.flush()
         except Exception as e:
-            logger.exception(e)
+            raise ServiceError("Failed to create users.", e)
+
+        return user_models
+
+    def on_users_created(self, users: List[UserModel]) -> None:
+        """What create_user does once a user is created, for users created with create_users and committed."""
+
+        if not users:
+            return
+
+        # new users can only have sizing taken by email before they signed up, most have none
+        emails_with_sizing = set(
+            db.session.execute(select(Size.email).where(Size.email.in_([user.email for user in users])).distinct())
+            .scalars()
+            .all()
+        )
+
+        for user in users:
+            if user.email not in emails_with_sizing:
+                continue
+
+            # the users are committed already, failing here would fail a request that did its job and get it retried
+            try:
+                self.__link_new_user_to_his_latest_sizing(user.id, user.email)
+            except Exception:
+                db.session.rollback()
+                logger.exception(f"Failed to link new user {user.email} to their latest sizing.")
+
+        with ThreadPoolExecutor(
+            max_workers=min(len(users), MAX_CONCURRENT_ACTIVECAMPAIGN_REQUESTS), thread_name_prefix="activecampaign"
+        ) as executor:
+            list(executor.map(self.__sync_new_contact, users))
+
+    def __create_shopify_customer(self, first_name: Optional[str], last_name: Optional[str], email: str) -> str:
+        try:
+            return self.shopify_service.create_customer(first_name, last_name, email).get_id()
+        except DuplicateError as e:
+            # If the user already exists in Shopify, we should still create a user in our database
+            logger.debug(e)
+
+            return str(self.shopify_service.get_customer_by_email(email).get_id())
+
+    def __create_shopify_customer_for_user(self, create_user: CreateUserModel) -> Optional[str]:
+        if create_user.shopify_id:
+            return create_user.shopify_id
+
+        try:
+            return self.__create_shopify_customer(
+                None if not create_user.first_name else create_user.first_name[:MAX_NAME_LENGTH],
+                None if not create_user.last_name else create_user.last_name[:MAX_NAME_LENGTH],
+                create_user.email,
+            )
+        except Exception:
+            logger.exception(f"Failed to create Shopify customer for {create_user.email}.")
+            return None
+
+    def __sync_new_contact(self, user: UserModel) -> None:
+        events = ["Signed Up"]
+
+        if user.account_status:
+            events.append("Activated Account")
+
+        self.activecampaign_service.sync_contact(
+            email=user.email,
+            first_name=user.first_name,
+            last_name=user.last_name,
+            phone=user.phone_number,
+            events=events,
+        )
 
     @staticmethod
     def get_user_by_id(user_id: uuid.UUID) -> UserModel:
@@ -117,6 +237,23 @@ class UserService:
 
         return UserModel.model_validate(db_user)
 
+    @staticmethod
+    def get_users_by_ids_or_emails(user_ids: Set[uuid.UUID], emails: Set[str]) -> List[UserModel]:
+        if not user_ids and not emails:
+            return []
+
+        db_users = (
+            db.session.execute(
+                select(User).where(
+                    or_(User.id.in_(user_ids), func.lower(User.email).in_([email.lower() for email in emails]))
+                )
+            )
+            .scalars()
+            .all()
+        )
+
+        return [UserModel.model_validate(db_user) for db_user in db_users]
+
     @staticmethod
     def get_user_by_shopify_id(shopify_id: str) -> UserModel:
         db_user = db.session.execute(select(User).where(User.shopify_id == shopify_id)).scalar_one_or_none()
@@ -274,14 +411,14 @@ class UserService:
             raise ServiceError("Failed to remove tag from user.", e)
 
     @staticmethod
-    def __link_new_user_to_his_latest_sizing(user: User):
+    def __link_new_user_to_his_latest_sizing(user_id: uuid.UUID, email: str):
         size_service = FlaskApp.current().size_service
         order_service = FlaskApp.current().order_service
 
-        latest_size = size_service.get_latest_size_for_user_by_id_or_email(user.id, user.email)
+        latest_size = size_service.get_latest_size_for_user_by_id_or_email(user_id, email)
 
         if not latest_size:
             return
 
-        size_service.associate_sizing_that_has_email_with_user(user.email, user.id)
+        size_service.associate_sizing_that_has_email_with_user(email, user_id)
         order_service.update_user_pending_orders_with_latest_measurements(latest_size)
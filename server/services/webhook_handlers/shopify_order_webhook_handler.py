@@ -6,7 +6,6 @@ from typing import Any, Dict, Optional
 
 from server.database.models import SourceType, OrderType
 from server.models.order_model import AddressModel, CreateOrderModel, CreateOrderItemModel
-from server.models.product_model import CreateProductModel, ProductModel
 from server.services import NotFoundError, ServiceError
 from server.services.attendee_service import AttendeeService
 from server.services.discount_service import (
@@ -18,7 +17,6 @@ from server.services.discount_service import (
 from server.services.event_service import EventService
 from server.services.integrations.activecampaign_service import AbstractActiveCampaignService
 from server.services.integrations.email_service import AbstractEmailService
-from server.services.integrations.shiphero_service import AbstractShipHeroService
 from server.services.integrations.shopify_service import AbstractShopifyService, DiscountAmountType, ShopifyService
 from server.services.integrations.sms_service import AbstractSmsService
 from server.services.look_service import LookService
@@ -30,6 +28,7 @@ from server.services.order_service import (
     OrderService,
 )
 from server.services.product_service import ProductService
+from server.services.shiphero_catalog_service import ShipHeroCatalogService
 from server.services.size_service import SizeService
 from server.services.sku_builder_service import SkuBuilder, ProductType
 from server.services.user_service import UserService
@@ -53,7 +52,7 @@ class ShopifyWebhookOrderHandler:
         product_service: ProductService,
         sku_builder: SkuBuilder,
         event_service: EventService,
-        shiphero_service: AbstractShipHeroService,
+        shiphero_catalog_service: ShipHeroCatalogService,
         activecampaign_service: AbstractActiveCampaignService,
         email_service: AbstractEmailService,
         sms_service: AbstractSmsService,
@@ -69,7 +68,7 @@ class ShopifyWebhookOrderHandler:
         self.product_service = product_service
         self.sku_builder = sku_builder
         self.event_service = event_service
-        self.shiphero_service = shiphero_service
+        self.shiphero_catalog_service = shiphero_catalog_service
         self.activecampaign_service = activecampaign_service
         self.email_service = email_service
         self.sms_service = sms_service
@@ -237,6 +236,8 @@ class ShopifyWebhookOrderHandler:
         order_id = None
 
         line_item_skus = set()
+        # (line item, shiphero sku) pairs, products are resolved for all of them at once
+        order_line_items = []
 
         for line_item in enriched_items:
             shopify_sku = line_item.get("sku")
@@ -287,7 +288,6 @@ class ShopifyWebhookOrderHandler:
                 order_id = order.id
 
             shiphero_sku = None
-            product = None
             product_type = self.sku_builder.get_product_type_by_sku(shopify_sku)
 
             try:
@@ -312,21 +312,10 @@ class ShopifyWebhookOrderHandler:
             except ServiceError as e:
                 logger.error(f"Error building ShipHero SKU for '{shopify_sku}': {e}")
 
-            if shiphero_sku and product_type is not ProductType.UNKNOWN:
-                product = self.__get_product_by_shiphero_sku(shiphero_sku)
+            order_line_items.append((line_item, shiphero_sku if product_type is not ProductType.UNKNOWN else None))
 
-                if product:
-                    num_valid_products += 1
-
-            create_order_item = CreateOrderItemModel(
-                order_id=order_id,
-                product_id=product.id if product else None,
-                shopify_sku=shopify_sku,
-                purchased_price=line_item.get("price"),
-                quantity=line_item.get("quantity"),
-            )
-
-            self.order_service.create_order_item(create_order_item)
+        # (shopify suit sku, suit price, shiphero suit sku)
+        suit_order_items = []
 
         if track_suit_parts:
             for shopify_suit_sku_suffix, suit_parts in track_suit_parts.items():
@@ -337,21 +326,45 @@ class ShopifyWebhookOrderHandler:
                 shopify_suit_sku = suit_parts[ProductType.SUIT]
                 suit_variant = self.shopify_service.get_variant_by_sku(shopify_suit_sku)
                 shiphero_suit_sku = self.sku_builder.build(shopify_suit_sku, size_model, measurement_model)
-                suit_product = None
 
                 if shiphero_suit_sku:
-                    suit_product = self.__get_product_by_shiphero_sku(shiphero_suit_sku)
                     self.__track_suit_purchase(user.email)
 
-                create_suit_order_item = CreateOrderItemModel(
-                    order_id=order_id,
-                    product_id=suit_product.id if suit_product else None,
-                    shopify_sku=shopify_suit_sku,
-                    purchased_price=suit_variant.variant_price,
-                    quantity=1,
-                )
+                suit_order_items.append((shopify_suit_sku, suit_variant.variant_price, shiphero_suit_sku))
 
-                self.order_service.create_order_item(create_suit_order_item)
+        products_by_shiphero_sku = self.shiphero_catalog_service.get_products_by_skus(
+            [shiphero_sku for _, shiphero_sku in order_line_items if shiphero_sku]
+            + [shiphero_suit_sku for _, _, shiphero_suit_sku in suit_order_items if shiphero_suit_sku]
+        )
+
+        for line_item, shiphero_sku in order_line_items:
+            product = products_by_shiphero_sku.get(shiphero_sku) if shiphero_sku else None
+
+            if product:
+                num_valid_products += 1
+
+            create_order_item = CreateOrderItemModel(
+                order_id=order_id,
+                product_id=product.id if product else None,
+                shopify_sku=line_item.get("sku"),
+                purchased_price=line_item.get("price"),
+                quantity=line_item.get("quantity"),
+            )
+
+            self.order_service.create_order_item(create_order_item)
+
+        for shopify_suit_sku, suit_price, shiphero_suit_sku in suit_order_items:
+            suit_product = products_by_shiphero_sku.get(shiphero_suit_sku) if shiphero_suit_sku else None
+
+            create_suit_order_item = CreateOrderItemModel(
+                order_id=order_id,
+                product_id=suit_product.id if suit_product else None,
+                shopify_sku=shopify_suit_sku,
+                purchased_price=suit_price,
+                quantity=1,
+            )
+
+            self.order_service.create_order_item(create_suit_order_item)
 
         if num_valid_products < num_processable_items:
             if has_products_that_requires_measurements and not (size_model or measurement_model):
@@ -418,33 +431,6 @@ class ShopifyWebhookOrderHandler:
 
         return monday_of_week
 
-    def __get_product_by_shiphero_sku(self, shiphero_sku: str) -> Optional[ProductModel]:
-        product = None
-
-        try:
-            product = self.product_service.get_product_by_sku(shiphero_sku)
-        except NotFoundError:
-            logger.debug(f"No product found for ShipHero SKU '{shiphero_sku}' in our db. Pulling from ShipHero API")
-
-        if product:
-            return product
-
-        try:
-            shiphero_product = self.shiphero_service.get_product_by_sku(shiphero_sku)
-        except Exception as e:
-            logger.error(f"Error fetching product from ShipHero for SKU '{shiphero_sku}': {e}")
-            return None
-
-        try:
-            product = self.product_service.create_product(
-                CreateProductModel(**shiphero_product.model_dump(exclude={"id"}))
-            )
-        except ServiceError as e:
-            logger.error(f"Error creating product from ShipHero for SKU '{shiphero_sku}': {e}")
-            return None
-
-        return ProductModel.model_validate(product)
-
     def __track_swatch_purchase(self, user, payload):
         items = payload.get("line_items", [])
         if any(item.get("sku", "").upper().startswith("S") for item in items):
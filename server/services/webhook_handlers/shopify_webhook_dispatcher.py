@@ -0,0 +1,49 @@
+import logging
+import uuid
+from typing import Any, Callable
+
+from server.services.webhook_handlers.shopify_cart_webhook_handler import ShopifyWebhookCartHandler
+from server.services.webhook_handlers.shopify_checkout_webhook_handler import ShopifyWebhookCheckoutHandler
+from server.services.webhook_handlers.shopify_fulfillment_webhook_handler import ShopifyWebhookFulfillmentHandler
+from server.services.webhook_handlers.shopify_order_webhook_handler import ShopifyWebhookOrderHandler
+from server.services.webhook_handlers.shopify_product_webhook_handler import ShopifyWebhookProductHandler
+from server.services.webhook_handlers.shopify_user_webhook_handler import ShopifyWebhookUserHandler
+
+logger = logging.getLogger(__name__)
+
+
+class ShopifyWebhookDispatcher:
+    def __init__(
+        self,
+        order_handler: ShopifyWebhookOrderHandler,
+        user_handler: ShopifyWebhookUserHandler,
+        cart_handler: ShopifyWebhookCartHandler,
+        checkout_handler: ShopifyWebhookCheckoutHandler,
+        product_handler: ShopifyWebhookProductHandler,
+        fulfillment_handler: ShopifyWebhookFulfillmentHandler,
+    ):
+        self.__topic_handlers: dict[str, Callable[[uuid.UUID, dict[str, Any]], dict[str, Any]]] = {
+            "orders/paid": order_handler.order_paid,
+            "orders/updated": order_handler.order_updated,
+            "customers/create": user_handler.customer_update,
+            "customers/update": user_handler.customer_update,
+            "carts/create": cart_handler.cart_create,
+            "carts/update": cart_handler.cart_update,
+            "checkouts/create": checkout_handler.checkout_create,
+            "checkouts/update": checkout_handler.checkout_update,
+            "checkouts/delete": checkout_handler.checkout_delete,
+            "products/create": product_handler.product_create,
+            "products/update": product_handler.product_update,
+            "products/delete": product_handler.product_delete,
+            "fulfillments/create": fulfillment_handler.fulfillment_create,
+        }
+
+    @property
+    def topics(self) -> list[str]:
+        return list(self.__topic_handlers.keys())
+
+    def handles(self, topic: str) -> bool:
+        return topic in self.__topic_handlers
+
+    def dispatch(self, topic: str, webhook_id: uuid.UUID, payload: dict[str, Any]) -> dict[str, Any]:
+        return self.__topic_handlers[topic](webhook_id, payload)
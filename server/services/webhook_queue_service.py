@@ -0,0 +1,133 @@
+import json
+import logging
+import uuid
+from typing import Any, Optional
+
+from sqlalchemy import select
+
+from server.database.database_manager import db
+from server.database.models import Webhook, WebhookDeadLetter
+from server.services import ServiceError, NotFoundError
+from server.services.integrations.aws_service import AbstractAWSService
+from server.services.shopify_product_service import ShopifyProductService
+from server.services.webhook_handlers.shopify_webhook_dispatcher import ShopifyWebhookDispatcher
+from server.services.webhook_service import WebhookService
+
+logger = logging.getLogger(__name__)
+
+# product webhooks carry the whole product, of several for the same product only the latest needs to be processed
+COALESCED_TOPICS = frozenset({"products/create", "products/update"})
+
+
+class WebhookQueueService:
+    def __init__(
+        self,
+        webhook_service: WebhookService,
+        shopify_webhook_dispatcher: ShopifyWebhookDispatcher,
+        aws_service: AbstractAWSService,
+        webhook_sqs_queue_url: str,
+    ):
+        self.__webhook_service = webhook_service
+        self.__shopify_webhook_dispatcher = shopify_webhook_dispatcher
+        self.__aws_service = aws_service
+        self.__webhook_sqs_queue_url = webhook_sqs_queue_url
+
+    def ingest(self, topic: str, payload: dict[str, Any], shopify_webhook_id: Optional[str] = None) -> dict[str, Any]:
+        """Stores the webhook and queues it for processing, falls back to processing it right away if queueing fails."""
+
+        webhook = self.__webhook_service.store_webhook(topic, payload, shopify_webhook_id)
+
+        if not webhook:
+            # duplicate delivery, already processed
+            return {}
+
+        try:
+            self.__aws_service.enqueue_message(
+                self.__webhook_sqs_queue_url, json.dumps({"webhook_id": str(webhook.id), "topic": topic})
+            )
+        except Exception as e:
+            logger.exception(f"Failed to queue webhook {webhook.id}, processing it inline: {e}")
+
+            return self.__webhook_service.process_webhook(
+                webhook, lambda: self.__shopify_webhook_dispatcher.dispatch(topic, webhook.id, payload)
+            )
+
+        # the queue worker retries it from here on, a redelivery before it's processed is queued again and skipped by
+        # whichever of the two messages is processed last
+        self.__webhook_service.mark_webhook_queued(webhook)
+
+        logger.info(f"Queued Shopify webhook {webhook.id} with topic: {topic}")
+
+        return {}
+
+    def process(self, webhook_id: uuid.UUID) -> dict[str, Any]:
+        try:
+            webhook = self.__webhook_service.get_webhook_by_id(webhook_id)
+        except NotFoundError:
+            # nothing to retry
+            logger.error(f"Queued Shopify webhook {webhook_id} not found")
+            return {}
+
+        logger.info(f"Processing queued Shopify webhook {webhook.id} with topic: {webhook.type}")
+
+        # sqs delivers at least once, redeliveries of a processed webhook are skipped
+        return self.__webhook_service.process_webhook(
+            webhook, lambda: self.__shopify_webhook_dispatcher.dispatch(webhook.type, webhook.id, webhook.payload)
+        )
+
+    @staticmethod
+    def get_superseded_webhook_ids(webhook_ids: list[uuid.UUID]) -> set[uuid.UUID]:
+        """Ids of product webhooks superseded by a newer webhook for the same product among the given ones."""
+
+        try:
+            webhooks = db.session.execute(
+                select(Webhook.id, Webhook.payload).where(
+                    Webhook.id.in_(webhook_ids), Webhook.type.in_(COALESCED_TOPICS)
+                )
+            ).all()
+        except Exception as e:
+            db.session.rollback()
+            raise ServiceError("Failed to load webhooks.", e)
+
+        positions = {webhook_id: position for position, webhook_id in enumerate(webhook_ids)}
+        webhooks.sort(key=lambda webhook: positions[webhook.id])
+
+        latest_by_product_id = {}
+        superseded_webhook_ids = set()
+
+        for webhook in webhooks:
+            product_id = webhook.payload.get("id")
+
+            if product_id is None:
+                continue
+
+            latest = latest_by_product_id.get(product_id)
+
+            if not latest:
+                latest_by_product_id[product_id] = webhook
+                continue
+
+            updated_at = ShopifyProductService.parse_updated_at(webhook.payload)
+            latest_updated_at = ShopifyProductService.parse_updated_at(latest.payload)
+
+            # delivered later wins unless it's older
+            if updated_at and latest_updated_at and updated_at < latest_updated_at:
+                superseded_webhook_ids.add(webhook.id)
+            else:
+                superseded_webhook_ids.add(latest.id)
+                latest_by_product_id[product_id] = webhook
+
+        return superseded_webhook_ids
+
+    @staticmethod
+    def dead_letter(webhook_id: uuid.UUID, topic: str, error: str, attempts: int) -> None:
+        try:
+            db.session.add(WebhookDeadLetter(webhook_id=webhook_id, type=topic, error=error, attempts=attempts))
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            raise ServiceError("Failed to dead letter webhook.", e)
+
+        logger.error(
+            f"Shopify webhook {webhook_id} with topic {topic} dead lettered after {attempts} attempts: {error}"
+        )
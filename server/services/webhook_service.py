@@ -1,30 +1,161 @@
 import logging
+import threading
 import uuid
-from typing import Any
+from collections import OrderedDict
+from datetime import timedelta
+from typing import Any, Callable, Optional
+
+from sqlalchemy import func, or_, select, update
+from sqlalchemy.dialects.postgresql import insert
 
 from server.database.database_manager import db
 from server.database.models import Webhook
 from server.models.webhook_model import WebhookModel
-from server.services import ServiceError, NotFoundError
+from server.services import ServiceError, NotFoundError, DuplicateError
 
 logger = logging.getLogger(__name__)
 
+RECENTLY_SEEN_WEBHOOKS_SIZE = 10000
+# longer than processing a webhook can take, the lambda timeout at most
+WEBHOOK_CLAIM_TIMEOUT = timedelta(minutes=15)
+
 
 class WebhookService:
+    def __init__(
+        self,
+        recently_seen_webhooks_size: int = RECENTLY_SEEN_WEBHOOKS_SIZE,
+        claim_timeout: timedelta = WEBHOOK_CLAIM_TIMEOUT,
+    ):
+        self.__claim_timeout = claim_timeout
+        # shopify retries deliveries that were slow to respond, those usually land on the same container
+        self.__recently_seen_webhooks: OrderedDict[tuple[str, str], None] = OrderedDict()
+        self.__recently_seen_webhooks_size = recently_seen_webhooks_size
+        self.__recently_seen_webhooks_lock = threading.Lock()
+
+    def store_webhook(
+        self, webhook_type: str, payload: dict[str, Any], shopify_webhook_id: Optional[str] = None
+    ) -> Optional[WebhookModel]:
+        """
+        Returns None if the delivery with given shopify webhook id and type has already been processed. A delivery that
+        was stored or queued but not processed, because processing it crashed or timed out, is returned again so the
+        retry processes it.
+        """
+
+        if shopify_webhook_id and self.__is_recently_seen(webhook_type, shopify_webhook_id):
+            logger.info(f"Skipping duplicate Shopify webhook {shopify_webhook_id} with topic: {webhook_type}")
+            return None
+
+        try:
+            webhook = db.session.execute(
+                insert(Webhook)
+                .values(type=webhook_type, payload=payload, shopify_webhook_id=shopify_webhook_id)
+                .on_conflict_do_nothing(index_elements=[Webhook.shopify_webhook_id, Webhook.type])
+                .returning(Webhook)
+            ).scalar_one_or_none()
+
+            if not webhook:
+                webhook = db.session.execute(
+                    select(Webhook).where(
+                        Webhook.shopify_webhook_id == shopify_webhook_id,
+                        Webhook.type == webhook_type,
+                        Webhook.processed_at.is_(None),
+                    )
+                ).scalar_one_or_none()
+
+                if webhook:
+                    logger.warning(
+                        f"Retrying unprocessed Shopify webhook {shopify_webhook_id} with topic: {webhook_type}"
+                    )
+
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            raise ServiceError("Failed to store webhook", e)
+
+        if not webhook:
+            self.__mark_recently_seen(webhook_type, shopify_webhook_id)
+            logger.info(f"Skipping already processed Shopify webhook {shopify_webhook_id} with topic: {webhook_type}")
+            return None
+
+        return WebhookModel.model_validate(webhook)
+
     @staticmethod
-    def store_webhook(webhook_type: str, payload: dict[str, Any]) -> WebhookModel:
+    def mark_webhook_queued(webhook: WebhookModel) -> None:
+        try:
+            db.session.execute(update(Webhook).where(Webhook.id == webhook.id).values(queued_at=func.now()))
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            raise ServiceError("Failed to mark webhook as queued", e)
+
+    def process_webhook(self, webhook: WebhookModel, handle: Callable[[], dict[str, Any]]) -> dict[str, Any]:
+        """
+        Handles the webhook unless it's processed already, so redeliveries and queue retries don't repeat its side
+        effects. The webhook is claimed first, marked processed once handled and released for a retry if handling
+        fails. Raises DuplicateError while another claim on it is live.
+        """
+
+        if not self.__claim(webhook.id):
+            logger.info(f"Skipping already processed webhook {webhook.id} with topic: {webhook.type}")
+            return {}
+
+        try:
+            response_payload = handle()
+        except Exception:
+            db.session.rollback()
+            self.__release(webhook.id)
+            raise
+
         try:
-            webhook = Webhook(
-                type=webhook_type,
-                payload=payload,
+            db.session.execute(update(Webhook).where(Webhook.id == webhook.id).values(processed_at=func.now()))
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            raise ServiceError("Failed to mark webhook as processed", e)
+
+        if webhook.shopify_webhook_id:
+            self.__mark_recently_seen(webhook.type, webhook.shopify_webhook_id)
+
+        return response_payload
+
+    def __claim(self, webhook_id: uuid.UUID) -> bool:
+        """True if claimed, False if the webhook is processed already."""
+
+        try:
+            # only one of concurrent claims updates the row, the rest wait for it and then match nothing
+            claimed = db.session.execute(
+                update(Webhook)
+                .where(
+                    Webhook.id == webhook_id,
+                    Webhook.processed_at.is_(None),
+                    or_(Webhook.claimed_at.is_(None), Webhook.claimed_at < func.now() - self.__claim_timeout),
+                )
+                .values(claimed_at=func.now())
+                .returning(Webhook.id)
+            ).scalar_one_or_none()
+            processed_at = (
+                None
+                if claimed
+                else db.session.execute(select(Webhook.processed_at).where(Webhook.id == webhook_id)).scalar()
             )
-            db.session.add(webhook)
             db.session.commit()
-            db.session.refresh(webhook)
+        except Exception as e:
+            db.session.rollback()
+            raise ServiceError("Failed to claim webhook", e)
 
-            return WebhookModel.model_validate(webhook)
+        if not claimed and not processed_at:
+            raise DuplicateError(f"Webhook {webhook_id} is being processed.")
+
+        return bool(claimed)
+
+    @staticmethod
+    def __release(webhook_id: uuid.UUID) -> None:
+        try:
+            db.session.execute(update(Webhook).where(Webhook.id == webhook_id).values(claimed_at=None))
+            db.session.commit()
         except Exception as e:
-            raise ServiceError("Failed to store webhook", e)
+            db.session.rollback()
+            logger.exception(f"Failed to release claim on webhook {webhook_id}, retried once it times out: {e}")
 
     @staticmethod
     def get_webhook_by_id(webhook_id: uuid.UUID) -> WebhookModel:
@@ -34,3 +165,20 @@ class WebhookService:
             raise NotFoundError("Webhook not found")
 
         return WebhookModel.model_validate(webhook)
+
+    def __is_recently_seen(self, webhook_type: str, shopify_webhook_id: str) -> bool:
+        with self.__recently_seen_webhooks_lock:
+            if (webhook_type, shopify_webhook_id) not in self.__recently_seen_webhooks:
+                return False
+
+            self.__recently_seen_webhooks.move_to_end((webhook_type, shopify_webhook_id))
+
+            return True
+
+    def __mark_recently_seen(self, webhook_type: str, shopify_webhook_id: str) -> None:
+        with self.__recently_seen_webhooks_lock:
+            self.__recently_seen_webhooks[(webhook_type, shopify_webhook_id)] = None
+            self.__recently_seen_webhooks.move_to_end((webhook_type, shopify_webhook_id))
+
+            while len(self.__recently_seen_webhooks) > self.__recently_seen_webhooks_size:
+                self.__recently_seen_webhooks.popitem(last=False)
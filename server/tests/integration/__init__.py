@@ -1,10 +1,11 @@
 import csv
 import json
 import random
+from contextlib import contextmanager
 from typing import Set, Any, Dict
 
 from flask_testing import TestCase
-from sqlalchemy import delete
+from sqlalchemy import delete, event
 
 from server import encoder
 from server.app import init_app, init_db
@@ -13,6 +14,7 @@ from server.database.models import (
     Order,
     User,
     Event,
+    EventReadModel,
     Look,
     Role,
     Attendee,
@@ -24,11 +26,17 @@ from server.database.models import (
     Address,
     SuitBuilderItem,
     AuditLog,
+    AuditOutbox,
+    TagReconciliationQueue,
+    SyncCursor,
+    WebhookDeadLetter,
+    PooledDiscountCode,
     UserActivityLog,
     ShopifyProduct,
 )
 from server.flask_app import FlaskApp
 from server.models.shopify_model import ShopifyVariantModel
+from server.services import audit_logger
 from server.services.event_service import EventService
 from server.services.integrations.shopify_service import FakeShopifyService
 from server.services.sku_builder_service import ProductType
@@ -52,6 +60,7 @@ class BaseTestCase(TestCase):
         db.session.execute(delete(Discount))
         db.session.execute(delete(Attendee))
         db.session.execute(delete(Role))
+        db.session.execute(delete(EventReadModel))
         db.session.execute(delete(Look))
         db.session.execute(delete(OrderItem))
         db.session.execute(delete(Order))
@@ -62,6 +71,11 @@ class BaseTestCase(TestCase):
         db.session.execute(delete(User))
         db.session.execute(delete(SuitBuilderItem))
         db.session.execute(delete(AuditLog))
+        db.session.execute(delete(AuditOutbox))
+        db.session.execute(delete(TagReconciliationQueue))
+        db.session.execute(delete(WebhookDeadLetter))
+        db.session.execute(delete(PooledDiscountCode))
+        db.session.execute(delete(SyncCursor))
         db.session.commit()
 
         self.content_type = CONTENT_TYPE_JSON
@@ -95,6 +109,7 @@ class BaseTestCase(TestCase):
         self.activecampaign_service = self.app.activecampaign_service
         self.suit_builder_service = self.app.suit_builder_service
         self.shopify_product_service = self.app.shopify_product_service
+        self.shopify_product_service.clear_variant_prices()
         self.shopify_skus_cache = {}
 
         num_products_in_db = self.product_service.get_num_products()
@@ -168,6 +183,41 @@ class BaseTestCase(TestCase):
             "items": items,
         }
 
+    @contextmanager
+    def audit_logging(self, *entities):
+        """Audit logs changes of the entities, as outside of tests."""
+
+        listeners = [
+            (entity, identifier, listener)
+            for entity in entities
+            for identifier, listener in audit_logger._listeners(entity)
+        ]
+
+        for listener in listeners:
+            event.listen(*listener)
+
+        try:
+            yield
+        finally:
+            for listener in listeners:
+                event.remove(*listener)
+
+    @contextmanager
+    def assert_max_queries(self, max_queries: int):
+        statements = []
+
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        event.listen(db.engine, "before_cursor_execute", before_cursor_execute)
+
+        try:
+            yield statements
+        finally:
+            event.remove(db.engine, "before_cursor_execute", before_cursor_execute)
+
+        self.assertLessEqual(len(statements), max_queries, "\n\n".join(statements))
+
     def _post(self, endpoint, payload, headers):
         return self.client.open(
             endpoint,
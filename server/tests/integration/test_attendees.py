@@ -3,11 +3,14 @@ from __future__ import absolute_import
 import json
 import random
 import uuid
+from unittest.mock import patch
 
 from server.controllers import FORCE_DELETE_HEADER
 from server.database.database_manager import db
 from server.database.models import DiscountType, Attendee, User
+from server.models.attendee_model import AttendeeModel, BatchUpdateAttendeeModel
 from server.models.shopify_model import ShopifyCustomer
+from server.services import DuplicateError
 from server.services.discount_service import GIFT_DISCOUNT_CODE_PREFIX, TMG_GROUP_50_USD_OFF_DISCOUNT_CODE_PREFIX
 from server.services.integrations.shopify_service import ShopifyService
 from server.tests import utils
@@ -1241,3 +1244,179 @@ class TestAttendees(BaseTestCase):
 
         self.assertTrue(db_user.id not in self.email_service.sent_activations)
         self.assertTrue(db_user.id in self.email_service.sent_invites[event.id])
+
+    def test_invites_party_with_users_resolved_and_created_in_bulk(self):
+        # given
+        user = self.user_service.create_user(fixtures.create_user_request())
+        event = self.event_service.create_event(fixtures.create_event_request(user_id=user.id))
+        existing_user = self.user_service.create_user(fixtures.create_user_request())
+        attendees = [
+            self.attendee_service.create_attendee(
+                fixtures.create_attendee_request(event_id=event.id, email=existing_user.email.upper())
+            )
+        ] + [
+            self.attendee_service.create_attendee(
+                fixtures.create_attendee_request(event_id=event.id, email=utils.generate_email())
+            )
+            for _ in range(5)
+        ]
+
+        # when
+        with patch.object(
+            self.shopify_service, "create_customer", wraps=self.shopify_service.create_customer
+        ) as create_customer:
+            with self.assert_max_queries(10) as statements:
+                self.attendee_service.send_invites([attendee.id for attendee in attendees])
+
+        # then
+        self.assertEqual(create_customer.call_count, 5)
+        self.assertEqual(len([statement for statement in statements if statement.startswith("INSERT INTO users")]), 1)
+
+        db_attendees = Attendee.query.filter(Attendee.event_id == event.id).all()
+        self.assertTrue(all(db_attendee.invite for db_attendee in db_attendees))
+        self.assertEqual(
+            {db_attendee.email.lower(): db_attendee.user_id for db_attendee in db_attendees},
+            {user.email: user.id for user in User.query.filter(User.id.in_([a.user_id for a in db_attendees])).all()},
+        )
+        self.assertEqual(
+            {db_attendee.user_id for db_attendee in db_attendees}, self.email_service.sent_invites[event.id]
+        )
+        self.assertIn(existing_user.id, self.email_service.sent_invites[event.id])
+
+    def test_invites_are_sent_when_linking_a_new_user_to_sizing_fails(self):
+        # given
+        user = self.user_service.create_user(fixtures.create_user_request())
+        event = self.event_service.create_event(fixtures.create_event_request(user_id=user.id))
+        emails = [utils.generate_email() for _ in range(2)]
+        sizes = []
+
+        for email in emails:
+            measurement = self.measurement_service.create_measurement(fixtures.store_measurement_request(email=email))
+            sizes.append(
+                self.size_service.create_size(fixtures.store_size_request(email=email, measurement_id=measurement.id))
+            )
+
+        attendees = [
+            self.attendee_service.create_attendee(fixtures.create_attendee_request(event_id=event.id, email=email))
+            for email in emails
+        ]
+        associate_sizing = self.size_service.associate_sizing_that_has_email_with_user
+
+        def fail_for_first_email(email, user_id):
+            if email == emails[0]:
+                raise DuplicateError("Sizing is linked already.")
+
+            associate_sizing(email, user_id)
+
+        # when
+        with patch.object(
+            self.size_service, "associate_sizing_that_has_email_with_user", side_effect=fail_for_first_email
+        ):
+            with self.assertLogs("server.services.user_service", level="ERROR"):
+                self.attendee_service.send_invites([attendee.id for attendee in attendees])
+
+        # then
+        db_attendees = Attendee.query.filter(Attendee.event_id == event.id).all()
+        self.assertTrue(all(db_attendee.invite for db_attendee in db_attendees))
+        self.assertEqual(len(self.email_service.sent_invites[event.id]), 2)
+        self.assertIsNone(self.size_service.get_size_by_id(sizes[0].id).user_id)
+        self.assertIsNotNone(self.size_service.get_size_by_id(sizes[1].id).user_id)
+
+    def test_create_and_update_attendees_in_batch(self):
+        # given
+        user = self.user_service.create_user(fixtures.create_user_request())
+        event = self.event_service.create_event(fixtures.create_event_request(user_id=user.id))
+        attendee_user = self.user_service.create_user(fixtures.create_user_request())
+        attendee = self.attendee_service.create_attendee(fixtures.create_attendee_request(event_id=event.id))
+        new_attendee = fixtures.create_attendee_request(event_id=event.id, email=attendee_user.email)
+
+        # when
+        response = self.client.open(
+            "/attendees/batch",
+            query_string=self.hmac_query_params,
+            method="POST",
+            data=json.dumps(
+                {
+                    "create": [
+                        json.loads(new_attendee.model_dump_json()),
+                        json.loads(fixtures.create_attendee_request(event_id=event.id, email=attendee.email).json()),
+                        {**json.loads(fixtures.create_attendee_request(event_id=event.id).json()), "email": "invalid"},
+                        json.loads(fixtures.create_attendee_request(event_id=uuid.uuid4()).json()),
+                    ],
+                    "update": [
+                        {"id": str(attendee.id), "first_name": "Renamed"},
+                        {"id": str(uuid.uuid4()), "first_name": "Renamed"},
+                    ],
+                }
+            ),
+            headers=self.request_headers,
+            content_type=self.content_type,
+        )
+
+        # then
+        self.assertStatus(response, 200)
+        self.assertEqual([result["status"] for result in response.json["create"]], [201, 409, 400, 404])
+        self.assertEqual([result["status"] for result in response.json["update"]], [200, 404])
+        self.assertEqual(response.json["create"][1]["errors"], "Attendee with this email already exists.")
+        self.assertEqual(response.json["update"][1]["errors"], "Attendee not found.")
+
+        created_attendee = self.attendee_service.get_attendee_by_id(
+            uuid.UUID(response.json["create"][0]["attendee"]["id"])
+        )
+        self.assertEqual(created_attendee.email, new_attendee.email)
+        self.assertEqual(created_attendee.user_id, attendee_user.id)
+        self.assertEqual(self.attendee_service.get_attendee_by_id(attendee.id).first_name, "Renamed")
+        self.assertEqual(response.json["update"][0]["attendee"]["first_name"], "Renamed")
+
+    def test_create_and_update_attendees_in_batch_over_the_size_limit(self):
+        # given
+        user = self.user_service.create_user(fixtures.create_user_request())
+        event = self.event_service.create_event(fixtures.create_event_request(user_id=user.id))
+
+        # when
+        response = self.client.open(
+            "/attendees/batch",
+            query_string=self.hmac_query_params,
+            method="POST",
+            data=json.dumps(
+                {
+                    "create": [
+                        json.loads(fixtures.create_attendee_request(event_id=event.id).model_dump_json())
+                        for _ in range(101)
+                    ]
+                }
+            ),
+            headers=self.request_headers,
+            content_type=self.content_type,
+        )
+
+        # then
+        self.assertStatus(response, 400)
+        self.assertEqual(len(self.attendee_service.get_attendees_for_event(event.id)), 0)
+
+    def test_create_and_update_attendees_in_batch_with_set_based_validation(self):
+        # given
+        user = self.user_service.create_user(fixtures.create_user_request())
+        event = self.event_service.create_event(fixtures.create_event_request(user_id=user.id))
+        role = self.role_service.create_role(fixtures.create_role_request(event_id=event.id))
+        attendees = [
+            self.attendee_service.create_attendee(fixtures.create_attendee_request(event_id=event.id)) for _ in range(5)
+        ]
+        shared_email = utils.generate_email()
+
+        # when
+        with self.assert_max_queries(12):
+            created, updated = self.attendee_service.create_and_update_attendees(
+                [fixtures.create_attendee_request(event_id=event.id, role_id=role.id) for _ in range(10)]
+                + [fixtures.create_attendee_request(event_id=event.id, email=shared_email) for _ in range(2)],
+                [
+                    BatchUpdateAttendeeModel(id=attendee.id, email=utils.generate_email(), role_id=role.id)
+                    for attendee in attendees
+                ],
+            )
+
+        # then
+        self.assertTrue(all(isinstance(attendee, AttendeeModel) for attendee in created[:11]))
+        self.assertIsInstance(created[11], DuplicateError)
+        self.assertTrue(all(attendee.role_id == role.id for attendee in updated))
+        self.assertEqual(len(self.attendee_service.get_attendees_for_event(event.id)), 16)
@@ -0,0 +1,173 @@
+import threading
+import time
+import uuid
+
+from sqlalchemy import select, text, update
+
+from server.database.database_manager import db
+from server.database.models import AuditLog, User
+from server.models.audit_log_model import AuditLogMessage
+from server.services.audit_dispatcher import AuditDispatcher, AuditSubscriber, AuditSubscriberKind
+from server.services.audit_service import AuditLogService
+from server.tests.integration import BaseTestCase, fixtures
+
+
+class TestAuditDispatcher(BaseTestCase):
+    def setUp(self):
+        super().setUp()
+
+        self.audit_dispatcher = AuditDispatcher()
+        self.audit_log_service = AuditLogService(
+            self.app.tagging_service, self.app.user_activity_log_service, self.audit_dispatcher
+        )
+
+    def __user_message(self, message_type: str = "USER_UPDATED") -> AuditLogMessage:
+        user_model = self.user_service.create_user(fixtures.create_user_request())
+        user = db.session.execute(select(User).where(User.id == user_model.id)).scalar_one()
+
+        return AuditLogMessage.from_string(fixtures.audit_log_queue_message(message_type, user))
+
+    def test_external_subscriber_runs_concurrently_with_db_subscribers(self):
+        # given
+        db_subscriber_done = threading.Event()
+        external_subscriber_saw_db_subscriber_done = []
+
+        self.audit_log_service.subscribe(
+            AuditSubscriber("db_subscriber", {"USER_UPDATED"}, lambda message: db_subscriber_done.set())
+        )
+        self.audit_log_service.subscribe(
+            AuditSubscriber(
+                "external_subscriber",
+                {"USER_UPDATED"},
+                lambda message: external_subscriber_saw_db_subscriber_done.append(db_subscriber_done.wait(5)),
+                kind=AuditSubscriberKind.EXTERNAL,
+            )
+        )
+        message = self.__user_message()
+
+        # when
+        failed_message_ids = self.audit_log_service.process_batch([message])
+
+        # then
+        self.assertEqual(failed_message_ids, set())
+        self.assertEqual(external_subscriber_saw_db_subscriber_done, [True])
+
+    def test_external_subscriber_uses_its_own_session(self):
+        # given
+        emails = []
+
+        self.audit_log_service.subscribe(
+            AuditSubscriber(
+                "external_subscriber",
+                {"USER_UPDATED"},
+                lambda message: emails.append(
+                    db.session.execute(select(User.email).where(User.id == message.payload["id"])).scalar_one()
+                ),
+                kind=AuditSubscriberKind.EXTERNAL,
+            )
+        )
+        message = self.__user_message()
+
+        # when
+        failed_message_ids = self.audit_log_service.process_batch([message])
+
+        # then
+        self.assertEqual(failed_message_ids, set())
+        self.assertEqual(emails, [message.payload["email"]])
+
+    def test_timed_out_external_subscriber_fails_message(self):
+        # given
+        self.audit_log_service.subscribe(
+            AuditSubscriber(
+                "slow_subscriber",
+                {"USER_UPDATED"},
+                lambda message: time.sleep(1),
+                kind=AuditSubscriberKind.EXTERNAL,
+                timeout_seconds=0.1,
+            )
+        )
+        message = self.__user_message()
+
+        # when
+        failed_message_ids = self.audit_log_service.process_batch([message])
+
+        # then
+        self.assertEqual(failed_message_ids, {message.id})
+        self.assertEqual(self.audit_dispatcher.metrics()["slow_subscriber"]["timeouts"], 1)
+        # db work is not held back by the slow subscriber
+        self.assertIsNotNone(db.session.execute(select(AuditLog).where(AuditLog.id == message.id)).scalar_one_or_none())
+
+    def test_failed_db_subscriber_fails_message_and_rolls_back_its_audit_log(self):
+        # given
+        def fail(message: AuditLogMessage):
+            raise Exception("boom")
+
+        self.audit_log_service.subscribe(AuditSubscriber("failing_subscriber", {"USER_UPDATED"}, fail))
+        failing_message = self.__user_message()
+        other_message = self.__user_message("USER_CREATED")
+
+        # when
+        failed_message_ids = self.audit_log_service.process_batch([failing_message, other_message])
+
+        # then
+        self.assertEqual(failed_message_ids, {failing_message.id})
+        self.assertEqual(
+            {str(audit_log_id) for audit_log_id in db.session.execute(select(AuditLog.id)).scalars().all()},
+            {other_message.id},
+        )
+        self.assertEqual(self.audit_dispatcher.metrics()["failing_subscriber"]["failures"], 1)
+
+    def test_db_subscriber_failing_in_sql_does_not_fail_the_rest_of_the_batch(self):
+        # given
+        def fail_in_sql(message: AuditLogMessage):
+            db.session.execute(update(User).where(User.id == message.payload["id"]).values(first_name="Rolled back"))
+            db.session.execute(text("SELECT 1 / 0"))
+
+        def rename(message: AuditLogMessage):
+            db.session.execute(update(User).where(User.id == message.payload["id"]).values(first_name="Renamed"))
+
+        self.audit_log_service.subscribe(AuditSubscriber("failing_subscriber", {"USER_UPDATED"}, fail_in_sql))
+        self.audit_log_service.subscribe(AuditSubscriber("renaming_subscriber", {"USER_CREATED"}, rename))
+        failing_message = self.__user_message()
+        other_message = self.__user_message("USER_CREATED")
+
+        # when
+        failed_message_ids = self.audit_log_service.process_batch([failing_message, other_message])
+
+        # then
+        self.assertEqual(failed_message_ids, {failing_message.id})
+        self.assertEqual(
+            {str(audit_log_id) for audit_log_id in db.session.execute(select(AuditLog.id)).scalars().all()},
+            {other_message.id},
+        )
+        self.assertEqual(
+            db.session.execute(select(User.first_name).where(User.id == other_message.payload["id"])).scalar_one(),
+            "Renamed",
+        )
+        self.assertEqual(
+            db.session.execute(select(User.first_name).where(User.id == failing_message.payload["id"])).scalar_one(),
+            failing_message.payload["first_name"],
+        )
+
+    def test_messages_with_equal_key_are_handled_once(self):
+        # given
+        handled_message_ids = []
+
+        self.audit_log_service.subscribe(
+            AuditSubscriber(
+                "keyed_subscriber",
+                {"USER_UPDATED"},
+                lambda message: handled_message_ids.append(message.id),
+                key=lambda message: message.payload["id"],
+            )
+        )
+        message = self.__user_message()
+        messages = [message.model_copy(update={"id": str(uuid.uuid4())}) for _ in range(5)]
+
+        # when
+        failed_message_ids = self.audit_log_service.process_batch(messages)
+
+        # then
+        self.assertEqual(failed_message_ids, set())
+        self.assertEqual(handled_message_ids, [messages[-1].id])
+        self.assertEqual(self.audit_dispatcher.metrics()["keyed_subscriber"]["calls"], 1)
@@ -1,12 +1,16 @@
+import json
+import uuid
 from datetime import datetime
+from unittest.mock import patch
 
 from sqlalchemy import select
 
 from server.database.database_manager import db
-from server.database.models import User, AuditLog, Event, Attendee
+from server.database.models import User, AuditLog, Event, Attendee, UserActivityLog, TagReconciliationQueue
 from server.handlers.audit_log_handler import lambda_handler, FakeLambdaContext
 from server.models.attendee_model import UpdateAttendeeModel
 from server.models.shopify_model import ShopifyCustomer
+from server.services.audit_message_codec import AuditMessageCodec
 from server.services.integrations.shopify_service import ShopifyService
 from server.services.tagging_service import (
     TAG_EVENT_OWNER_4_PLUS,
@@ -905,3 +909,128 @@ class TestAuditLogHandler(BaseTestCase):
         self.assertFalse(TAG_PRODUCT_LINKED_TO_EVENT in bundle_product1.tags)
         self.assertTrue(TAG_PRODUCT_LINKED_TO_EVENT in bundle_product2.tags)
         self.assertFalse(TAG_PRODUCT_NOT_LINKED_TO_EVENT in bundle_product2.tags)
+
+    def test_batch_reports_only_failed_records(self):
+        # given
+        user_model = self.user_service.create_user(fixtures.create_user_request())
+        user = db.session.execute(select(User).where(User.id == user_model.id)).scalar_one()
+        attendee = Attendee(id=uuid.uuid4(), event_id=uuid.uuid4(), first_name="John", last_name="Doe")
+
+        # when
+        response = lambda_handler(
+            {
+                "Records": [
+                    {"messageId": "1", "body": fixtures.audit_log_queue_message("USER_CREATED", user)},
+                    {"messageId": "2", "body": "not a json"},
+                    {"messageId": "3", "body": fixtures.audit_log_queue_message("ATTENDEE_CREATED", attendee)},
+                ]
+            },
+            FakeLambdaContext(),
+        )
+
+        # then
+        self.assertEqual(response["batchItemFailures"], [{"itemIdentifier": "2"}, {"itemIdentifier": "3"}])
+        self.assertEqual(
+            [audit_log.type for audit_log in db.session.execute(select(AuditLog)).scalars()], ["USER_CREATED"]
+        )
+        self.assertEqual(
+            db.session.execute(select(UserActivityLog).where(UserActivityLog.user_id == user.id)).scalar_one().handle,
+            "user_created",
+        )
+
+    def test_batch_redelivered_message_is_persisted_once(self):
+        # given
+        user_model = self.user_service.create_user(fixtures.create_user_request())
+        user = db.session.execute(select(User).where(User.id == user_model.id)).scalar_one()
+        message = fixtures.audit_log_queue_message("USER_CREATED", user)
+
+        # when
+        response1 = lambda_handler(
+            {"Records": [{"messageId": "1", "body": message}, {"messageId": "2", "body": message}]},
+            FakeLambdaContext(),
+        )
+        response2 = lambda_handler({"Records": [{"messageId": "3", "body": message}]}, FakeLambdaContext())
+
+        # then
+        self.assertEqual(response1["batchItemFailures"], [])
+        self.assertEqual(response2["batchItemFailures"], [])
+        self.assertEqual(len(db.session.execute(select(AuditLog)).scalars().all()), 1)
+        self.assertEqual(
+            len(db.session.execute(select(UserActivityLog).where(UserActivityLog.user_id == user.id)).scalars().all()),
+            1,
+        )
+
+    def test_batch_tags_customers_once_for_repeated_event_updates(self):
+        # given
+        tags = ["test1", "test2"]
+        user_model = self.user_service.create_user(fixtures.create_user_request(meta={"tags": tags}))
+        event_model = self.event_service.create_event(fixtures.create_event_request(user_id=user_model.id))
+        event = db.session.execute(select(Event).where(Event.id == event_model.id)).scalar_one()
+
+        for _ in range(4):
+            self.attendee_service.create_attendee(fixtures.create_attendee_request(event_id=event.id, invite=True))
+
+        self.shopify_service.customers[ShopifyService.customer_gid(user_model.shopify_id)] = ShopifyCustomer(
+            gid=ShopifyService.customer_gid(user_model.shopify_id),
+            first_name=user_model.first_name,
+            last_name=user_model.last_name,
+            email=user_model.email,
+            tags=tags,
+        )
+
+        # when
+        with patch.object(self.shopify_service, "add_tags", wraps=self.shopify_service.add_tags) as add_tags:
+            response = lambda_handler(
+                {
+                    "Records": [
+                        {"messageId": str(i), "body": fixtures.audit_log_queue_message("EVENT_UPDATED", event)}
+                        for i in range(5)
+                    ]
+                },
+                FakeLambdaContext(),
+            )
+
+        # then
+        self.assertEqual(response["batchItemFailures"], [])
+        self.assertEqual(len(db.session.execute(select(AuditLog)).scalars().all()), 5)
+        self.assertEqual(
+            [
+                call.args
+                for call in add_tags.call_args_list
+                if call.args[0] == ShopifyService.customer_gid(user_model.shopify_id)
+            ],
+            [(ShopifyService.customer_gid(user_model.shopify_id), {TAG_EVENT_OWNER_4_PLUS})],
+        )
+        self.assertTrue(
+            TAG_EVENT_OWNER_4_PLUS
+            in self.shopify_service.customers[ShopifyService.customer_gid(user_model.shopify_id)].tags
+        )
+        self.assertEqual(len(db.session.execute(select(TagReconciliationQueue)).scalars().all()), 0)
+
+    def test_compressed_and_offloaded_messages_are_decoded(self):
+        # given
+        user_model1 = self.user_service.create_user(fixtures.create_user_request())
+        user1 = db.session.execute(select(User).where(User.id == user_model1.id)).scalar_one()
+        user_model2 = self.user_service.create_user(fixtures.create_user_request())
+        user2 = db.session.execute(select(User).where(User.id == user_model2.id)).scalar_one()
+
+        gzip_codec = AuditMessageCodec(self.app.aws_service, compression_threshold_bytes=0)
+        s3_codec = AuditMessageCodec(self.app.aws_service, compression_threshold_bytes=0, s3_offload_threshold_bytes=0)
+
+        gzip_message = gzip_codec.encode(fixtures.audit_log_queue_message("USER_CREATED", user1))
+        s3_message = s3_codec.encode(fixtures.audit_log_queue_message("USER_CREATED", user2))
+
+        # when
+        response = lambda_handler(
+            {"Records": [{"messageId": "1", "body": gzip_message}, {"messageId": "2", "body": s3_message}]},
+            FakeLambdaContext(),
+        )
+
+        # then
+        self.assertEqual(json.loads(gzip_message)["encoding"], "gzip")
+        self.assertEqual(json.loads(s3_message)["encoding"], "s3+gzip")
+        self.assertEqual(response["batchItemFailures"], [])
+        self.assertEqual(
+            {audit_log.payload["id"] for audit_log in db.session.execute(select(AuditLog)).scalars()},
+            {str(user1.id), str(user2.id)},
+        )
@@ -0,0 +1,65 @@
+import json
+import os
+import subprocess
+import sys
+from unittest import TestCase
+
+HANDLER_MODULE = "server.handlers.audit_log_handler"
+# cumulative import time of the handler module, the service graph is imported on first invocation
+MAX_HANDLER_IMPORT_TIME_MICROS = 250_000
+# not needed to process audit messages, only loaded by the web app or on first use
+HEAVY_MODULES = ["flask", "connexion", "boto3", "sentry_sdk"]
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", ".."))
+
+
+class TestAuditLogHandlerColdStart(TestCase):
+    @staticmethod
+    def __run_in_fresh_interpreter(*args: str) -> subprocess.CompletedProcess:
+        # same environment as the lambda, a fresh interpreter so nothing is already imported by the test run
+        return subprocess.run(
+            [sys.executable, *args],
+            cwd=PROJECT_ROOT,
+            env={**os.environ, "USE_FLASK": "false", "PYTHONPATH": PROJECT_ROOT},
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+
+    def test_handler_module_import_time_is_capped(self):
+        # when
+        result = self.__run_in_fresh_interpreter("-X", "importtime", "-c", f"import {HANDLER_MODULE}")
+
+        # then
+        handler_import_line = next(
+            line for line in result.stderr.splitlines() if line.rstrip().endswith(f"| {HANDLER_MODULE}")
+        )
+        cumulative_micros = int(handler_import_line.split("|")[1])
+
+        self.assertLess(cumulative_micros, MAX_HANDLER_IMPORT_TIME_MICROS)
+
+    def test_service_graph_does_not_load_heavy_modules(self):
+        # when
+        result = self.__run_in_fresh_interpreter(
+            "-c",
+            f"import importlib, json, sys; "
+            f"handler = importlib.import_module('{HANDLER_MODULE}'); "
+            f"getattr(handler, '__get_services')(None); "
+            f"print(json.dumps([module for module in {HEAVY_MODULES!r} if module in sys.modules]))",
+        )
+
+        # then
+        self.assertEqual(json.loads(result.stdout.strip().splitlines()[-1]), [])
+
+    def test_service_graph_is_built_once_per_container(self):
+        # when
+        result = self.__run_in_fresh_interpreter(
+            "-c",
+            f"import importlib; "
+            f"handler = importlib.import_module('{HANDLER_MODULE}'); "
+            f"get_services = getattr(handler, '__get_services'); "
+            f"print(get_services(None) is get_services(None))",
+        )
+
+        # then
+        self.assertEqual(result.stdout.strip().splitlines()[-1], "True")
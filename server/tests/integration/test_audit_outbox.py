@@ -0,0 +1,277 @@
+import json
+from unittest.mock import patch, MagicMock
+
+from sqlalchemy import select
+
+from server.database.database_manager import db
+from server.database.models import User, AuditOutbox
+from server.handlers.audit_outbox_relay_handler import lambda_handler, FakeLambdaContext
+from server.services import ServiceError, audit_logger
+from server.services.audit_outbox_service import MAX_RELAY_ATTEMPTS
+from server.services.integrations.aws_service import AWSService, SQS_MAX_BATCH_BYTES, split_into_sqs_batches
+from server.tests.integration import BaseTestCase, fixtures
+
+
+class TestAuditOutbox(BaseTestCase):
+    def setUp(self):
+        super().setUp()
+
+        self.audit_outbox_service = self.app.audit_outbox_service
+        self.aws_service = self.app.aws_service
+
+    def __create_user(self) -> User:
+        user_model = self.user_service.create_user(fixtures.create_user_request())
+
+        return db.session.execute(select(User).where(User.id == user_model.id)).scalar_one()
+
+    def test_log_operation_stores_message_in_outbox(self):
+        # given
+        user = self.__create_user()
+
+        # when
+        audit_logger._log_operation(db.session.connection(), user, "USER_CREATED")
+        db.session.commit()
+
+        # then
+        outbox_message = db.session.execute(select(AuditOutbox)).scalar_one()
+        self.assertEqual(outbox_message.type, "USER_CREATED")
+        self.assertEqual(outbox_message.message["type"], "USER_CREATED")
+        self.assertEqual(outbox_message.message["payload"]["id"], str(user.id))
+        self.assertIsNone(outbox_message.message["diff"])
+
+    def test_log_operation_is_rolled_back_with_transaction(self):
+        # given
+        user = self.__create_user()
+
+        # when
+        audit_logger._log_operation(db.session.connection(), user, "USER_CREATED")
+        db.session.rollback()
+
+        # then
+        self.assertEqual(self.audit_outbox_service.get_num_pending_messages(), 0)
+
+    def test_log_operation_skips_update_without_diff(self):
+        # given
+        user = self.__create_user()
+
+        # when
+        audit_logger._log_operation(db.session.connection(), user, "USER_UPDATED", True)
+        db.session.commit()
+
+        # then
+        self.assertEqual(self.audit_outbox_service.get_num_pending_messages(), 0)
+
+    def test_log_operation_update_sends_diff_with_changed_and_key_columns(self):
+        # given
+        user = self.__create_user()
+        old_first_name = user.first_name
+        user.first_name = "Updated"
+        user.meta = {"tags": ["test"]}
+
+        # when
+        audit_logger._log_operation(db.session.connection(), user, "USER_UPDATED", True)
+        db.session.commit()
+
+        # then
+        message = db.session.execute(select(AuditOutbox)).scalar_one().message
+        self.assertEqual(
+            message["diff"],
+            {
+                "first_name": {"before": old_first_name, "after": "Updated"},
+                "meta": {"before": {}, "after": {"tags": ["test"]}},
+            },
+        )
+        self.assertEqual(
+            message["payload"],
+            {
+                "id": str(user.id),
+                "first_name": "Updated",
+                "last_name": user.last_name,
+                "email": user.email,
+                "meta": {"tags": ["test"]},
+            },
+        )
+
+    def test_relay_empty_outbox(self):
+        self.assertEqual(self.audit_outbox_service.relay(), 0)
+
+    def test_relay_sends_messages_in_order_and_drains_outbox(self):
+        # given
+        user1 = self.__create_user()
+        user2 = self.__create_user()
+        audit_logger._log_operation(db.session.connection(), user1, "USER_CREATED")
+        audit_logger._log_operation(db.session.connection(), user2, "USER_CREATED")
+        db.session.commit()
+
+        # when
+        num_relayed = self.audit_outbox_service.relay()
+
+        # then
+        self.assertEqual(num_relayed, 2)
+        self.assertEqual(self.audit_outbox_service.get_num_pending_messages(), 0)
+        self.assertEqual(json.loads(self.aws_service.dequeue_message(""))["payload"]["id"], str(user1.id))
+        self.assertEqual(json.loads(self.aws_service.dequeue_message(""))["payload"]["id"], str(user2.id))
+
+    def test_relay_all_drains_in_batches(self):
+        # given
+        users = [self.__create_user() for _ in range(5)]
+
+        for user in users:
+            audit_logger._log_operation(db.session.connection(), user, "USER_CREATED")
+        db.session.commit()
+
+        # when
+        num_relayed = self.audit_outbox_service.relay_all(batch_size=2)
+
+        # then
+        self.assertEqual(num_relayed, 5)
+        self.assertEqual(self.audit_outbox_service.get_num_pending_messages(), 0)
+
+    def test_relay_handler(self):
+        # given
+        user = self.__create_user()
+        audit_logger._log_operation(db.session.connection(), user, "USER_CREATED")
+        db.session.commit()
+
+        # when
+        response = lambda_handler({}, FakeLambdaContext())
+
+        # then
+        self.assertEqual(response["statusCode"], 200)
+        self.assertEqual(self.audit_outbox_service.get_num_pending_messages(), 0)
+        self.assertEqual(json.loads(self.aws_service.dequeue_message(""))["type"], "USER_CREATED")
+
+    def test_relay_compresses_large_messages(self):
+        # given
+        user = self.__create_user()
+        user.meta = {"notes": "x" * 20000}
+        audit_logger._log_operation(db.session.connection(), user, "USER_UPDATED", True)
+        db.session.commit()
+
+        # when
+        self.audit_outbox_service.relay()
+
+        # then
+        envelope = json.loads(self.aws_service.dequeue_message(""))
+        self.assertEqual(envelope["version"], 2)
+        self.assertEqual(envelope["encoding"], "gzip")
+        self.assertEqual(envelope["type"], "USER_UPDATED")
+        self.assertLess(len(envelope["data"]), 20000)
+
+        message = self.app.audit_message_codec.decode(json.dumps(envelope))
+        self.assertEqual(message.payload["meta"], {"notes": "x" * 20000})
+
+    def test_messages_are_split_into_batches_within_sqs_limits(self):
+        # given
+        small_messages = [str(i) for i in range(12)]
+        large_messages = ["x" * (SQS_MAX_BATCH_BYTES // 3) for _ in range(4)]
+
+        # when
+        batches = split_into_sqs_batches(small_messages + large_messages)
+
+        # then
+        self.assertEqual([len(batch) for batch in batches], [10, 4, 2])
+        self.assertEqual([message for batch in batches for message in batch], small_messages + large_messages)
+
+    def test_enqueue_messages_returns_indices_of_entries_failing_in_any_batch(self):
+        # given
+        aws_service = AWSService()
+        sqs_client = MagicMock()
+        sqs_client.send_message_batch.side_effect = [{"Failed": []}, {"Failed": [{"Id": "1", "Code": "Throttled"}]}]
+        aws_service._AWSService__sqs_client = sqs_client
+
+        # when
+        with self.assertLogs("server.services.integrations.aws_service", level="ERROR"):
+            failed_indices = aws_service.enqueue_messages("", [str(i) for i in range(12)])
+
+        # then
+        self.assertEqual(failed_indices, [11])
+        self.assertEqual(sqs_client.send_message_batch.call_count, 2)
+
+    def test_only_messages_failing_in_batch_are_relayed_again(self):
+        # given
+        users = [self.__create_user() for _ in range(3)]
+
+        for user in users:
+            audit_logger._log_operation(db.session.connection(), user, "USER_CREATED")
+        db.session.commit()
+
+        enqueue_messages = self.aws_service.enqueue_messages
+
+        def fail_for_second_message(queue_url, messages):
+            enqueue_messages(queue_url, messages[:1] + messages[2:])
+
+            return [1]
+
+        with patch.object(self.aws_service, "enqueue_messages", side_effect=fail_for_second_message), patch.object(
+            self.aws_service, "enqueue_message", wraps=self.aws_service.enqueue_message
+        ) as enqueue_message:
+            # when
+            num_relayed = self.audit_outbox_service.relay()
+
+        # then
+        self.assertEqual(num_relayed, 3)
+        self.assertEqual(enqueue_message.call_count, 1)
+        self.assertIn(str(users[1].id), enqueue_message.call_args.args[1])
+        self.assertEqual(self.audit_outbox_service.get_num_pending_messages(), 0)
+
+    def test_message_failing_to_relay_does_not_block_the_ones_behind_it(self):
+        # given
+        users = [self.__create_user() for _ in range(3)]
+
+        for user in users:
+            audit_logger._log_operation(db.session.connection(), user, "USER_CREATED")
+        db.session.commit()
+
+        enqueue_message = self.aws_service.enqueue_message
+
+        def fail_for_second_user(queue_url, message):
+            if str(users[1].id) in message:
+                raise ServiceError("Message rejected")
+
+            enqueue_message(queue_url, message)
+
+        with patch.object(
+            self.aws_service, "enqueue_messages", side_effect=ServiceError("Batch rejected")
+        ), patch.object(self.aws_service, "enqueue_message", side_effect=fail_for_second_user):
+            # when
+            num_relayed = self.audit_outbox_service.relay()
+
+            # then
+            self.assertEqual(num_relayed, 2)
+            self.assertEqual(json.loads(self.aws_service.dequeue_message(""))["payload"]["id"], str(users[0].id))
+            self.assertEqual(json.loads(self.aws_service.dequeue_message(""))["payload"]["id"], str(users[2].id))
+            outbox_message = db.session.execute(select(AuditOutbox)).scalar_one()
+            self.assertEqual(outbox_message.attempts, 1)
+            self.assertEqual(outbox_message.last_error, "Message rejected")
+
+            # when
+            with self.assertLogs("server.services.audit_outbox_service", level="ERROR"):
+                for _ in range(MAX_RELAY_ATTEMPTS - 1):
+                    user = self.__create_user()
+                    audit_logger._log_operation(db.session.connection(), user, "USER_CREATED")
+                    db.session.commit()
+
+                    self.assertEqual(self.audit_outbox_service.relay(), 1)
+
+        # then
+        self.assertEqual(self.audit_outbox_service.get_num_pending_messages(), 0)
+        self.assertEqual(self.audit_outbox_service.get_num_dead_letter_messages(), 1)
+        self.assertEqual(self.audit_outbox_service.relay(), 0)
+
+    def test_relay_failing_for_every_message_does_not_count_attempts(self):
+        # given
+        user = self.__create_user()
+        audit_logger._log_operation(db.session.connection(), user, "USER_CREATED")
+        db.session.commit()
+
+        # when
+        with patch.object(self.aws_service, "enqueue_messages", side_effect=ServiceError("Unavailable")), patch.object(
+            self.aws_service, "enqueue_message", side_effect=ServiceError("Unavailable")
+        ):
+            with self.assertRaises(ServiceError):
+                self.audit_outbox_service.relay()
+
+        # then
+        self.assertEqual(db.session.execute(select(AuditOutbox)).scalar_one().attempts, 0)
+        self.assertEqual(self.audit_outbox_service.relay(), 1)
@@ -0,0 +1,241 @@
+import json
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+
+from sqlalchemy import update
+
+from server import encoder
+from server.database.database_manager import db
+from server.database.models import Discount, DiscountType, PooledDiscountCodeType
+from server.handlers.discount_code_pool_refill_handler import lambda_handler, FakeLambdaContext
+from server.services.discount_code_pool_service import (
+    DiscountCodePoolService,
+    DISCOUNT_CODE_POOL_SIZE,
+    TMG_GROUP_50_USD_OFF_DISCOUNT_CODE_PREFIX,
+    TMG_GROUP_25_PERCENT_OFF_DISCOUNT_CODE_PREFIX,
+)
+from server.tests.integration import BaseTestCase, fixtures
+
+
+class TestDiscountCodePool(BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.populate_shopify_variants()
+
+        self.discount_code_pool_service = DiscountCodePoolService(
+            self.app.shopify_service, pool_size=5, low_watermark=2
+        )
+
+    def create_party_of_4(self):
+        user = self.app.user_service.create_user(fixtures.create_user_request())
+        event = self.app.event_service.create_event(fixtures.create_event_request(user_id=user.id))
+        look = self.app.look_service.create_look(
+            fixtures.create_look_request(user_id=user.id, product_specs=self.create_look_test_product_specs())
+        )
+
+        attendees = []
+
+        for _ in range(4):
+            attendee_user = self.app.user_service.create_user(fixtures.create_user_request())
+            attendees.append(
+                self.app.attendee_service.create_attendee(
+                    fixtures.create_attendee_request(
+                        email=attendee_user.email, event_id=event.id, look_id=look.id, invite=True, style=True
+                    )
+                )
+            )
+
+        return attendees
+
+    def apply_discounts(self, attendee_id: uuid.UUID):
+        return self.client.open(
+            f"/attendees/{str(attendee_id)}/apply-discounts",
+            query_string=self.hmac_query_params,
+            method="POST",
+            headers=self.request_headers,
+            content_type=self.content_type,
+            data=json.dumps(fixtures.apply_discounts_request().model_dump(), cls=encoder.CustomJSONEncoder),
+        )
+
+    def test_refill_handler_fills_pool_of_each_type(self):
+        # when
+        response = lambda_handler({}, FakeLambdaContext())
+
+        # then
+        self.assertEqual(response["statusCode"], 200)
+        self.assertEqual(
+            self.discount_code_pool_service.get_num_available_codes(),
+            {
+                PooledDiscountCodeType.TMG_GROUP_50_USD_OFF: DISCOUNT_CODE_POOL_SIZE,
+                PooledDiscountCodeType.TMG_GROUP_25_PERCENT_OFF: DISCOUNT_CODE_POOL_SIZE,
+            },
+        )
+
+    def test_refill_creates_only_missing_codes_without_customer(self):
+        # given
+        self.discount_code_pool_service.refill()
+        attendees = self.create_party_of_4()
+        self.app.discount_code_pool_service.claim_group_discount(
+            PooledDiscountCodeType.TMG_GROUP_50_USD_OFF, attendees[0].id, attendees[0].event_id, 50
+        )
+        db.session.commit()
+
+        # when
+        with patch.object(
+            self.app.shopify_service, "create_discount_code", wraps=self.app.shopify_service.create_discount_code
+        ) as create_discount_code:
+            result = self.discount_code_pool_service.refill()
+
+        # then
+        self.assertEqual(result[str(PooledDiscountCodeType.TMG_GROUP_50_USD_OFF)], {"available": 4, "created": 1})
+        self.assertEqual(result[str(PooledDiscountCodeType.TMG_GROUP_25_PERCENT_OFF)], {"available": 5, "created": 0})
+        self.assertEqual(create_discount_code.call_count, 1)
+        code, _, shopify_customer_id, *_ = create_discount_code.call_args.args
+        self.assertTrue(code.startswith(TMG_GROUP_50_USD_OFF_DISCOUNT_CODE_PREFIX))
+        self.assertIsNone(shopify_customer_id)
+
+    def test_refill_alerts_when_pool_is_below_low_watermark(self):
+        # when
+        with self.assertLogs("server.services.discount_code_pool_service", level="ERROR") as logs:
+            self.discount_code_pool_service.refill()
+
+        # then
+        self.assertEqual(len(logs.records), 2)
+        self.assertIn("is low: 0 codes left", logs.output[0])
+
+        # when
+        with self.assertNoLogs("server.services.discount_code_pool_service", level="ERROR"):
+            self.discount_code_pool_service.refill()
+
+    def test_refill_keeps_created_codes_when_shopify_fails(self):
+        # given
+        create_discount_code = self.app.shopify_service.create_discount_code
+        calls = []
+
+        def failing_create_discount_code(*args, **kwargs):
+            calls.append(args)
+
+            if len(calls) == 3:
+                raise Exception("Shopify is down")
+
+            return create_discount_code(*args, **kwargs)
+
+        # when
+        with patch.object(self.app.shopify_service, "create_discount_code", side_effect=failing_create_discount_code):
+            result = self.discount_code_pool_service.refill()
+
+        # then
+        self.assertEqual(result[str(PooledDiscountCodeType.TMG_GROUP_50_USD_OFF)], {"available": 0, "created": 2})
+        self.assertEqual(result[str(PooledDiscountCodeType.TMG_GROUP_25_PERCENT_OFF)], {"available": 0, "created": 5})
+
+    def test_apply_discounts_claims_pooled_code(self):
+        # given
+        self.discount_code_pool_service.refill()
+        attendees = self.create_party_of_4()
+
+        # when
+        with patch.object(self.app.shopify_service, "create_discount_code") as create_discount_code:
+            response = self.apply_discounts(attendees[0].id)
+
+        # then
+        self.assertStatus(response, 200)
+        create_discount_code.assert_not_called()
+        self.assertEqual(len(response.json), 1)
+
+        group_discount = self.app.discount_service.get_group_discount_for_attendee(attendees[0].id)
+        self.assertEqual(group_discount.shopify_discount_code, response.json[0])
+        self.assertEqual(group_discount.type, DiscountType.PARTY_OF_FOUR)
+        self.assertEqual(group_discount.event_id, attendees[0].event_id)
+        self.assertEqual(sum(self.discount_code_pool_service.get_num_available_codes().values()), 9)
+
+        # when
+        response = self.apply_discounts(attendees[0].id)
+
+        # then
+        self.assertEqual(response.json, [group_discount.shopify_discount_code])
+        self.assertEqual(sum(self.discount_code_pool_service.get_num_available_codes().values()), 9)
+
+    def test_apply_discounts_creates_code_in_shopify_when_pool_is_empty(self):
+        # given
+        attendees = self.create_party_of_4()
+
+        # when
+        response = self.apply_discounts(attendees[0].id)
+
+        # then
+        self.assertStatus(response, 200)
+        self.assertEqual(len(response.json), 1)
+        self.assertTrue(
+            response.json[0].startswith(TMG_GROUP_50_USD_OFF_DISCOUNT_CODE_PREFIX)
+            or response.json[0].startswith(TMG_GROUP_25_PERCENT_OFF_DISCOUNT_CODE_PREFIX)
+        )
+        self.assertIsNotNone(self.app.discount_service.get_group_discount_for_attendee(attendees[0].id))
+
+    def test_concurrent_claims_get_different_codes(self):
+        # given
+        self.discount_code_pool_service.refill()
+        attendees = self.create_party_of_4()
+        app = self.app
+
+        def claim(attendee):
+            with app.app_context():
+                try:
+                    discount = app.discount_code_pool_service.claim_group_discount(
+                        PooledDiscountCodeType.TMG_GROUP_25_PERCENT_OFF, attendee.id, attendee.event_id, 100
+                    )
+                    db.session.commit()
+
+                    return discount.shopify_discount_code if discount else None
+                finally:
+                    db.session.remove()
+
+        # when
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            codes = list(executor.map(claim, attendees + attendees[:2]))
+
+        # then
+        self.assertEqual(sorted(code is None for code in codes), [False] * 5 + [True])
+        claimed_codes = [code for code in codes if code]
+        self.assertEqual(len(set(claimed_codes)), 5)
+        self.assertEqual(
+            self.discount_code_pool_service.get_num_available_codes()[PooledDiscountCodeType.TMG_GROUP_25_PERCENT_OFF],
+            0,
+        )
+
+    def test_claim_from_empty_pool_keeps_the_callers_transaction(self):
+        # given
+        attendees = self.create_party_of_4()
+        attendee = attendees[0]
+        gift_discount_id = self.app.discount_service.create_discount(
+            attendee.event_id, attendee.id, 10, DiscountType.GIFT
+        ).id
+
+        # when
+        db.session.execute(update(Discount).where(Discount.id == gift_discount_id).values(amount=20))
+        discount = self.app.discount_code_pool_service.claim_group_discount(
+            PooledDiscountCodeType.TMG_GROUP_50_USD_OFF, attendee.id, attendee.event_id, 50
+        )
+        db.session.commit()
+
+        # then
+        self.assertIsNone(discount)
+        self.assertEqual(self.app.discount_service.get_discount_by_id(gift_discount_id).amount, 20)
+
+    def test_claim_is_committed_by_the_caller(self):
+        # given
+        self.discount_code_pool_service.refill()
+        attendees = self.create_party_of_4()
+
+        # when
+        discount = self.app.discount_code_pool_service.claim_group_discount(
+            PooledDiscountCodeType.TMG_GROUP_50_USD_OFF, attendees[0].id, attendees[0].event_id, 50
+        )
+        db.session.rollback()
+
+        # then
+        self.assertIsNotNone(discount)
+        self.assertIsNone(self.app.discount_service.get_group_discount_for_attendee(attendees[0].id))
+        self.assertEqual(
+            self.discount_code_pool_service.get_num_available_codes()[PooledDiscountCodeType.TMG_GROUP_50_USD_OFF], 5
+        )
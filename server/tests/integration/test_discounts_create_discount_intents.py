@@ -5,7 +5,9 @@ import random
 import uuid
 
 from server import encoder
-from server.database.models import DiscountType
+from sqlalchemy import event as sqlalchemy_event
+
+from server.database.models import DiscountType, Discount
 from server.services.discount_service import (
     GIFT_DISCOUNT_CODE_PREFIX,
 )
@@ -717,9 +719,9 @@ class TestDiscountsCreateDiscountIntent(BaseTestCase):
             fixtures.create_look_request(user_id=user.id, product_specs=self.create_look_test_product_specs())
         )
         # hack to reduce price of the look so smaller discount is applied
-        look.product_specs["bundle"]["variant_price"] = random.randint(200, 299)
-        update_look_model = fixtures.update_look_request(name=look.name, product_specs=look.product_specs)
-        self.app.look_service.update_look(look.id, update_look_model)
+        self.shopify_service.shopify_variants.get(
+            look.product_specs["bundle"]["variant_id"]
+        ).variant_price = random.randint(200, 299)
         attendee1 = self.app.attendee_service.create_attendee(
             fixtures.create_attendee_request(
                 user_id=attendee_user1.id, event_id=event.id, look_id=look.id, style=True, invite=True
@@ -761,3 +763,78 @@ class TestDiscountsCreateDiscountIntent(BaseTestCase):
         # then
         self.assertStatus(response, 400)
         self.assertTrue("Pay amount exceeds look price" in response.json["errors"])
+
+    def test_create_for_party_in_constant_number_of_queries(self):
+        # given
+        user = self.app.user_service.create_user(fixtures.create_user_request())
+        event = self.app.event_service.create_event(fixtures.create_event_request(user_id=user.id))
+        look = self.app.look_service.create_look(
+            fixtures.create_look_request(user_id=user.id, product_specs=self.create_look_test_product_specs())
+        )
+        attendees = []
+
+        for _ in range(6):
+            attendee_user = self.app.user_service.create_user(fixtures.create_user_request())
+            attendees.append(
+                self.app.attendee_service.create_attendee(
+                    fixtures.create_attendee_request(
+                        email=attendee_user.email, event_id=event.id, look_id=look.id, style=True, invite=True
+                    )
+                )
+            )
+
+        self.app.discount_service.create_discount(event.id, attendees[0].id, 5, DiscountType.GIFT)
+        discount_intents = [
+            fixtures.create_gift_discount_intent_request(attendee_id=attendee.id, amount=10) for attendee in attendees
+        ]
+
+        # when
+        # includes bumping the event read model version after each of the two commits
+        with self.assert_max_queries(10):
+            response = self.app.discount_service.create_discount_intents(event.id, discount_intents)
+
+        # then
+        shopify_virtual_product_variant = self.app.shopify_service.shopify_virtual_product_variants.get(
+            response.variant_id
+        )
+        self.assertEqual(shopify_virtual_product_variant["price"], 60)
+
+        for attendee in attendees:
+            discounts = self.discount_service.get_discounts_by_attendee_id(attendee.id)
+            self.assertEqual(len(discounts), 1)
+            self.assertEqual(discounts[0].amount, 10)
+            self.assertEqual(discounts[0].shopify_virtual_product_variant_id, response.variant_id)
+
+    def test_create_writes_discounts_through_the_session_so_they_are_audit_logged(self):
+        # given
+        user = self.app.user_service.create_user(fixtures.create_user_request())
+        event = self.app.event_service.create_event(fixtures.create_event_request(user_id=user.id))
+        look = self.app.look_service.create_look(
+            fixtures.create_look_request(user_id=user.id, product_specs=self.create_look_test_product_specs())
+        )
+        attendee_user = self.app.user_service.create_user(fixtures.create_user_request())
+        attendee = self.app.attendee_service.create_attendee(
+            fixtures.create_attendee_request(
+                email=attendee_user.email, event_id=event.id, look_id=look.id, style=True, invite=True
+            )
+        )
+        previous_intent = self.app.discount_service.create_discount(event.id, attendee.id, 5, DiscountType.GIFT)
+        operations = []
+
+        # audit logger is registered on the same mapper events, it's off in tests
+        for operation in ["after_insert", "after_update", "before_delete"]:
+            listener = lambda m, c, t, o=operation: operations.append((o, t.id))
+            sqlalchemy_event.listen(Discount, operation, listener)
+            self.addCleanup(sqlalchemy_event.remove, Discount, operation, listener)
+
+        # when
+        self.app.discount_service.create_discount_intents(
+            event.id, [fixtures.create_gift_discount_intent_request(attendee_id=attendee.id, amount=10)]
+        )
+
+        # then
+        intent = self.discount_service.get_discounts_by_attendee_id(attendee.id)[0]
+        self.assertCountEqual(
+            operations,
+            [("before_delete", previous_intent.id), ("after_insert", intent.id), ("after_update", intent.id)],
+        )
@@ -349,9 +349,9 @@ class TestDiscountsGetOwnerDiscounts(BaseTestCase):
             fixtures.create_look_request(user_id=attendee_user1.id, product_specs=self.create_look_test_product_specs())
         )
         # hack to reduce price of the look so smaller discount is applied
-        look1.product_specs["bundle"]["variant_price"] = random.randint(200, 299)
-        update_look_model = fixtures.update_look_request(name=look1.name, product_specs=look1.product_specs)
-        self.app.look_service.update_look(look1.id, update_look_model)
+        self.shopify_service.shopify_variants.get(
+            look1.product_specs["bundle"]["variant_id"]
+        ).variant_price = random.randint(200, 299)
         look2 = self.app.look_service.create_look(
             fixtures.create_look_request(user_id=attendee_user2.id, product_specs=self.create_look_test_product_specs())
         )
@@ -612,9 +612,9 @@ class TestDiscountsGetOwnerDiscounts(BaseTestCase):
             fixtures.create_look_request(user_id=attendee_user1.id, product_specs=self.create_look_test_product_specs())
         )
         # hack to reduce price of the look so smaller discount is applied
-        look1.product_specs["bundle"]["variant_price"] = random.randint(200, 299)
-        update_look_model = fixtures.update_look_request(name=look1.name, product_specs=look1.product_specs)
-        self.app.look_service.update_look(look1.id, update_look_model)
+        self.shopify_service.shopify_variants.get(
+            look1.product_specs["bundle"]["variant_id"]
+        ).variant_price = random.randint(200, 299)
         look2 = self.app.look_service.create_look(
             fixtures.create_look_request(user_id=attendee_user2.id, product_specs=self.create_look_test_product_specs())
         )
@@ -656,7 +656,7 @@ class TestDiscountsGetOwnerDiscounts(BaseTestCase):
             discount_attendee_id = discount["attendee_id"]
 
             if str(discount_attendee_id) == str(attendee1.id):
-                look_price = self.look_service.get_look_price(look1)
+                look_price = self.look_service.get_look_prices([look1])[look1.id]
 
                 self.assertEqual(discount["remaining_amount"], look_price - TMG_GROUP_50_USD_AMOUNT)
             else:
@@ -676,9 +676,9 @@ class TestDiscountsGetOwnerDiscounts(BaseTestCase):
             fixtures.create_look_request(user_id=attendee_user1.id, product_specs=self.create_look_test_product_specs())
         )
         # hack to reduce price of the look so smaller discount is applied
-        look1.product_specs["bundle"]["variant_price"] = random.randint(200, 299)
-        update_look_model = fixtures.update_look_request(name=look1.name, product_specs=look1.product_specs)
-        self.app.look_service.update_look(look1.id, update_look_model)
+        self.shopify_service.shopify_variants.get(
+            look1.product_specs["bundle"]["variant_id"]
+        ).variant_price = random.randint(200, 299)
         look2 = self.app.look_service.create_look(
             fixtures.create_look_request(user_id=attendee_user2.id, product_specs=self.create_look_test_product_specs())
         )
@@ -743,7 +743,7 @@ class TestDiscountsGetOwnerDiscounts(BaseTestCase):
             discount_attendee_id = discount["attendee_id"]
 
             if str(discount_attendee_id) == str(attendee1.id):
-                look_price = self.look_service.get_look_price(look1)
+                look_price = self.look_service.get_look_prices([look1])[look1.id]
 
                 self.assertEqual(
                     discount["remaining_amount"],
@@ -934,3 +934,54 @@ class TestDiscountsGetOwnerDiscounts(BaseTestCase):
             elif str(discount_attendee_id) == str(attendee4.id):
                 self.assertEqual(discount["gift_codes"][0]["code"], discount4.shopify_discount_code)
                 self.assertEqual(discount["gift_codes"][0]["amount"], discount4.amount)
+
+    def test_get_owner_discounts_in_single_query(self):
+        # given
+        user = self.app.user_service.create_user(fixtures.create_user_request())
+        event = self.app.event_service.create_event(fixtures.create_event_request(user_id=user.id))
+        look = self.app.look_service.create_look(
+            fixtures.create_look_request(user_id=user.id, product_specs=self.create_look_test_product_specs())
+        )
+        attendees = [
+            self.app.attendee_service.create_attendee(
+                fixtures.create_attendee_request(
+                    email=utils.generate_email(), event_id=event.id, look_id=look.id, invite=True, style=True
+                )
+            )
+            for _ in range(4)
+        ]
+        discount_intent = self.app.discount_service.create_discount(event.id, attendees[0].id, 50, DiscountType.GIFT)
+        gift_codes = [
+            self.app.discount_service.create_discount(
+                event.id,
+                attendees[1].id,
+                random.randint(10, 90),
+                DiscountType.GIFT,
+                used,
+                f"{GIFT_DISCOUNT_CODE_PREFIX}-{random.randint(100000, 1000000)}",
+                random.randint(10000, 100000),
+            )
+            for used in [True, False]
+        ]
+
+        # when
+        # one query for the event, plus one for current prices of the bundles of its looks
+        with self.assert_max_queries(2):
+            owner_discounts = self.app.discount_service.get_owner_discounts_for_event(event.id)
+
+        # then
+        self.assertEqual(len(owner_discounts), 4)
+        owner_discounts_by_attendee_id = {
+            owner_discount.attendee_id: owner_discount for owner_discount in owner_discounts
+        }
+        self.assertEqual(owner_discounts_by_attendee_id[attendees[0].id].amount, discount_intent.amount)
+        self.assertEqual(
+            [
+                (gift_code.code, gift_code.amount, gift_code.used)
+                for gift_code in owner_discounts_by_attendee_id[attendees[1].id].gift_codes
+                if gift_code.type == str(DiscountType.GIFT)
+            ],
+            [(gift_code.shopify_discount_code, gift_code.amount, gift_code.used) for gift_code in gift_codes],
+        )
+        # attendees with gift codes go last
+        self.assertEqual(owner_discounts[-1].attendee_id, attendees[1].id)
@@ -0,0 +1,207 @@
+import random
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+from sqlalchemy import update
+
+from server.database.database_manager import db
+from server.database.models import Discount, DiscountType, Event, Attendee
+from server.handlers.discount_lifecycle_handler import lambda_handler, FakeLambdaContext
+from server.services.discount_service import (
+    GIFT_DISCOUNT_CODE_PREFIX,
+    TMG_GROUP_50_USD_OFF_DISCOUNT_CODE_PREFIX,
+)
+from server.services import ServiceError
+from server.services.integrations.shopify_service import (
+    ShopifyService,
+    ShopifyQueryError,
+    DISCOUNTS_PER_DEACTIVATION_REQUEST,
+)
+from server.tests.integration import BaseTestCase, fixtures
+
+
+class TestDiscountsLifecycle(BaseTestCase):
+    def create_attendee(self, event_id=None):
+        if not event_id:
+            user = self.app.user_service.create_user(fixtures.create_user_request())
+            event_id = self.app.event_service.create_event(fixtures.create_event_request(user_id=user.id)).id
+
+        attendee_user = self.app.user_service.create_user(fixtures.create_user_request())
+
+        return self.app.attendee_service.create_attendee(
+            fixtures.create_attendee_request(email=attendee_user.email, event_id=event_id)
+        )
+
+    def create_code(self, attendee, discount_type=DiscountType.GIFT, used=False):
+        prefix = (
+            GIFT_DISCOUNT_CODE_PREFIX
+            if discount_type == DiscountType.GIFT
+            else TMG_GROUP_50_USD_OFF_DISCOUNT_CODE_PREFIX
+        )
+
+        return self.app.discount_service.create_discount(
+            attendee.event_id,
+            attendee.id,
+            50,
+            discount_type,
+            used,
+            f"{prefix}-{random.randint(100000, 1000000)}",
+            random.randint(10000, 10000000),
+        )
+
+    @staticmethod
+    def get_deactivated_discount_ids() -> set:
+        return {discount.id for discount in Discount.query.filter(Discount.deactivated_at.isnot(None)).all()}
+
+    def test_deactivate_used_and_expired_discounts(self):
+        # given
+        attendee = self.create_attendee()
+        used_gift_code = self.create_code(attendee, used=True)
+        used_group_code = self.create_code(attendee, DiscountType.PARTY_OF_FOUR, used=True)
+        unused_gift_code = self.create_code(attendee)
+        unused_group_code = self.create_code(attendee, DiscountType.PARTY_OF_FOUR)
+        self.app.discount_service.create_discount(attendee.event_id, attendee.id, 50)
+
+        removed_attendee = self.create_attendee()
+        removed_attendee_group_code = self.create_code(removed_attendee, DiscountType.PARTY_OF_FOUR)
+        removed_attendee_gift_code = self.create_code(removed_attendee)
+        db.session.execute(update(Attendee).where(Attendee.id == removed_attendee.id).values(is_active=False))
+
+        past_event_attendee = self.create_attendee()
+        past_event_group_code = self.create_code(past_event_attendee, DiscountType.PARTY_OF_FOUR)
+        db.session.execute(
+            update(Event)
+            .where(Event.id == past_event_attendee.event_id)
+            .values(event_at=datetime.now() - timedelta(days=365))
+        )
+        db.session.commit()
+
+        # when
+        with patch.object(
+            self.app.shopify_service, "deactivate_discounts", wraps=self.app.shopify_service.deactivate_discounts
+        ) as deactivate_discounts:
+            result = self.app.discount_service.deactivate_used_and_expired_discounts()
+
+        # then
+        self.assertEqual(result, {"batches": 1, "found": 4, "deactivated": 4})
+        self.assertEqual(
+            set(deactivate_discounts.call_args.args[0]),
+            {
+                ShopifyService.discount_gid(discount.shopify_discount_code_id)
+                for discount in [used_gift_code, used_group_code, removed_attendee_group_code, past_event_group_code]
+            },
+        )
+        self.assertEqual(
+            self.get_deactivated_discount_ids(),
+            {used_gift_code.id, used_group_code.id, removed_attendee_group_code.id, past_event_group_code.id},
+        )
+        self.assertNotIn(unused_gift_code.id, self.get_deactivated_discount_ids())
+        self.assertNotIn(unused_group_code.id, self.get_deactivated_discount_ids())
+        self.assertNotIn(removed_attendee_gift_code.id, self.get_deactivated_discount_ids())
+
+        # when
+        result = self.app.discount_service.deactivate_used_and_expired_discounts()
+
+        # then
+        self.assertEqual(result, {"batches": 0, "found": 0, "deactivated": 0})
+
+    def test_deactivate_in_batches_with_one_update_per_batch(self):
+        # given
+        attendee = self.create_attendee()
+        used_codes = [self.create_code(attendee, used=True) for _ in range(5)]
+
+        # when
+        with self.assert_max_queries(6) as statements:
+            result = self.app.discount_service.deactivate_used_and_expired_discounts(batch_size=2)
+
+        # then
+        self.assertEqual(result, {"batches": 3, "found": 5, "deactivated": 5})
+        self.assertEqual(len([statement for statement in statements if statement.startswith("UPDATE discounts")]), 3)
+        self.assertEqual(self.get_deactivated_discount_ids(), {discount.id for discount in used_codes})
+
+    def test_deactivation_resumes_where_previous_run_stopped(self):
+        # given
+        attendee = self.create_attendee()
+        used_codes = [self.create_code(attendee, used=True) for _ in range(5)]
+
+        # when
+        result = self.app.discount_service.deactivate_used_and_expired_discounts(batch_size=2, max_batches=1)
+
+        # then
+        self.assertEqual(result, {"batches": 1, "found": 2, "deactivated": 2})
+        self.assertEqual(len(self.get_deactivated_discount_ids()), 2)
+
+        # when
+        result = self.app.discount_service.deactivate_used_and_expired_discounts(batch_size=2)
+
+        # then
+        self.assertEqual(result, {"batches": 2, "found": 3, "deactivated": 3})
+        self.assertEqual(self.get_deactivated_discount_ids(), {discount.id for discount in used_codes})
+
+    def test_discounts_shopify_failed_to_deactivate_are_retried_by_next_run(self):
+        # given
+        attendee = self.create_attendee()
+        used_codes = [self.create_code(attendee, used=True) for _ in range(3)]
+        failing_gid = ShopifyService.discount_gid(used_codes[1].shopify_discount_code_id)
+
+        # when
+        with patch.object(
+            self.app.shopify_service,
+            "deactivate_discounts",
+            side_effect=lambda gids: [gid for gid in gids if gid != failing_gid],
+        ):
+            result = self.app.discount_service.deactivate_used_and_expired_discounts(batch_size=1)
+
+        # then
+        self.assertEqual(result, {"batches": 3, "found": 3, "deactivated": 2})
+        self.assertEqual(self.get_deactivated_discount_ids(), {used_codes[0].id, used_codes[2].id})
+
+        # when
+        result = lambda_handler({}, FakeLambdaContext())
+
+        # then
+        self.assertEqual(result["statusCode"], 200)
+        self.assertEqual(self.get_deactivated_discount_ids(), {discount.id for discount in used_codes})
+
+    def test_discounts_deactivated_before_a_chunk_fails_are_returned(self):
+        # given
+        shopify_service = ShopifyService("")
+        discount_gids = [ShopifyService.discount_gid(i) for i in range(DISCOUNTS_PER_DEACTIVATION_REQUEST + 1)]
+        deactivated_chunk = {
+            "data": {
+                f"d{index}": {"codeDiscountNode": {"id": gid}, "userErrors": []}
+                for index, gid in enumerate(discount_gids[:DISCOUNTS_PER_DEACTIVATION_REQUEST])
+            }
+        }
+
+        # when
+        with patch.object(
+            shopify_service,
+            "_ShopifyService__admin_api_graphql_request",
+            side_effect=[deactivated_chunk, ShopifyQueryError()],
+        ):
+            with self.assertLogs("server.services.integrations.shopify_service", level="ERROR"):
+                deactivated_discount_gids = shopify_service.deactivate_discounts(discount_gids)
+
+        # then
+        self.assertEqual(deactivated_discount_gids, discount_gids[:DISCOUNTS_PER_DEACTIVATION_REQUEST])
+
+        # when
+        with patch.object(
+            shopify_service, "_ShopifyService__admin_api_graphql_request", side_effect=ShopifyQueryError()
+        ):
+            # then
+            with self.assertRaises(ServiceError):
+                shopify_service.deactivate_discounts(discount_gids)
+
+    def test_mark_discount_as_paid_deactivates_it(self):
+        # given
+        attendee = self.create_attendee()
+        code = self.create_code(attendee)
+
+        # when
+        self.app.discount_service.mark_discount_by_shopify_code_as_paid(code.shopify_discount_code)
+
+        # then
+        self.assertEqual(self.get_deactivated_discount_ids(), {code.id})
+        self.assertEqual(self.app.discount_service.deactivate_used_and_expired_discounts()["found"], 0)
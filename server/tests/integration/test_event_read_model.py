@@ -0,0 +1,236 @@
+import json
+
+from sqlalchemy import select, update
+
+from server.database.database_manager import db
+from server.database.models import Attendee, Event, EventReadModel, User
+from server.handlers import audit_log_handler, event_read_model_handler
+from server.models.attendee_model import UpdateAttendeeModel
+from server.models.event_model import EventUserStatus
+from server.tests.integration import BaseTestCase, fixtures
+
+
+class TestEventReadModel(BaseTestCase):
+    def setUp(self):
+        super().setUp()
+
+        self.populate_shopify_variants()
+
+    def create_event_with_attendee(self):
+        owner = self.user_service.create_user(fixtures.create_user_request())
+        event = self.event_service.create_event(fixtures.create_event_request(user_id=owner.id))
+        look = self.look_service.create_look(
+            fixtures.create_look_request(user_id=owner.id, product_specs=self.create_look_test_product_specs())
+        )
+        role = self.role_service.create_role(fixtures.create_role_request(event_id=event.id))
+        attendee_user = self.user_service.create_user(fixtures.create_user_request())
+        attendee = self.attendee_service.create_attendee(
+            fixtures.create_attendee_request(
+                event_id=event.id, email=attendee_user.email, look_id=look.id, role_id=role.id, invite=True
+            )
+        )
+
+        return owner, event, attendee_user, attendee
+
+    @staticmethod
+    def process_audit_message(message_type: str, entity_class, entity_id, diff: dict = None):
+        entity = db.session.execute(select(entity_class).where(entity_class.id == entity_id)).scalar_one()
+
+        response = audit_log_handler.lambda_handler(
+            {"Records": [{"body": fixtures.audit_log_queue_message(message_type, entity, diff=diff)}]},
+            audit_log_handler.FakeLambdaContext(),
+        )
+
+        assert response["batchItemFailures"] == []
+
+    @staticmethod
+    def get_read_model(event_id) -> EventReadModel:
+        read_model = db.session.execute(
+            select(EventReadModel).where(EventReadModel.event_id == event_id)
+        ).scalar_one_or_none()
+
+        if read_model:
+            db.session.refresh(read_model)
+
+        return read_model
+
+    def get_enriched_events(self, user_id, status: EventUserStatus = None) -> list[dict]:
+        return [
+            event.to_enriched_response()
+            for event in self.event_service.get_user_events(user_id, status=status, enriched=True)
+        ]
+
+    def test_audit_message_builds_document_served_to_enriched_events(self):
+        # given
+        owner, event, attendee_user, attendee = self.create_event_with_attendee()
+        live_events = self.get_enriched_events(owner.id, EventUserStatus.OWNER)
+
+        # when
+        self.process_audit_message("ATTENDEE_CREATED", Attendee, attendee.id)
+
+        # then
+        read_model = self.get_read_model(event.id)
+        self.assertEqual(read_model.built_version, read_model.version)
+        self.assertEqual([attendee["id"] for attendee in read_model.document["attendees"]], [str(attendee.id)])
+
+        with self.assert_max_queries(3) as statements:
+            events = self.get_enriched_events(owner.id, EventUserStatus.OWNER)
+
+        self.assertEqual(events, live_events)
+        self.assertEqual(events[0]["attendees"][0]["user"]["email"], attendee_user.email)
+        self.assertIn("event_read_models", statements[-1])
+
+    def test_change_is_served_live_until_its_audit_message_is_processed(self):
+        # given
+        owner, event, attendee_user, attendee = self.create_event_with_attendee()
+        self.process_audit_message("ATTENDEE_CREATED", Attendee, attendee.id)
+        version = self.get_read_model(event.id).version
+
+        # when
+        self.attendee_service.update_attendee(attendee.id, UpdateAttendeeModel(first_name="Renamed"))
+
+        # then
+        read_model = self.get_read_model(event.id)
+        self.assertEqual(read_model.version, version + 1)
+        self.assertNotEqual(read_model.built_version, read_model.version)
+        self.assertEqual(self.get_enriched_events(owner.id)[0]["attendees"][0]["first_name"], "Renamed")
+
+        # when
+        self.process_audit_message("ATTENDEE_UPDATED", Attendee, attendee.id)
+
+        # then
+        read_model = self.get_read_model(event.id)
+        self.assertEqual(read_model.built_version, read_model.version)
+        self.assertEqual(read_model.document["attendees"][0]["first_name"], "Renamed")
+        self.assertEqual(self.get_enriched_events(owner.id)[0]["attendees"][0]["first_name"], "Renamed")
+
+    def test_user_name_change_makes_documents_of_attendee_events_stale(self):
+        # given
+        owner, event, attendee_user, attendee = self.create_event_with_attendee()
+        self.process_audit_message("ATTENDEE_CREATED", Attendee, attendee.id)
+        version = self.get_read_model(event.id).version
+        user = db.session.execute(select(User).where(User.id == attendee_user.id)).scalar_one()
+
+        # when
+        user.meta = {"tags": ["test"]}
+        db.session.commit()
+
+        # then
+        self.assertEqual(self.get_read_model(event.id).version, version)
+
+        # when
+        user.first_name = "Renamed"
+        db.session.commit()
+
+        # then
+        self.assertEqual(self.get_read_model(event.id).version, version + 1)
+
+        # when
+        self.process_audit_message("USER_UPDATED", User, user.id, diff={"first_name": {"after": "Renamed"}})
+
+        # then
+        read_model = self.get_read_model(event.id)
+        self.assertEqual(read_model.built_version, read_model.version)
+        self.assertEqual(read_model.document["attendees"][0]["user"]["first_name"], "Renamed")
+
+    def test_attendee_moved_to_another_event_makes_documents_of_both_events_stale(self):
+        # given
+        owner, event, attendee_user, attendee = self.create_event_with_attendee()
+        other_event = self.event_service.create_event(fixtures.create_event_request(user_id=owner.id))
+        version = self.get_read_model(event.id).version
+        other_version = self.get_read_model(other_event.id).version
+
+        # when
+        db.session.execute(select(Attendee).where(Attendee.id == attendee.id)).scalar_one().event_id = other_event.id
+        db.session.commit()
+
+        # then
+        self.assertEqual(self.get_read_model(event.id).version, version + 1)
+        self.assertEqual(self.get_read_model(other_event.id).version, other_version + 1)
+
+    def test_invited_events_show_only_own_attendee_from_document(self):
+        # given
+        owner, event, attendee_user, attendee = self.create_event_with_attendee()
+        self.attendee_service.create_attendee(fixtures.create_attendee_request(event_id=event.id, invite=True))
+        self.process_audit_message("EVENT_UPDATED", Event, event.id)
+
+        # when
+        events = self.get_enriched_events(attendee_user.id, EventUserStatus.ATTENDEE)
+
+        # then
+        self.assertEqual(len(events), 1)
+        self.assertEqual([attendee["id"] for attendee in events[0]["attendees"]], [attendee.id])
+        self.assertEqual(len(self.get_read_model(event.id).document["attendees"]), 2)
+
+    def test_rebuild_builds_documents_of_active_events(self):
+        # given
+        _, event1, _, _ = self.create_event_with_attendee()
+        _, event2, _, _ = self.create_event_with_attendee()
+        inactive_event = self.event_service.create_event(fixtures.create_event_request(user_id=event1.user_id))
+        self.event_service.delete_event(inactive_event.id)
+
+        # when
+        response = event_read_model_handler.lambda_handler(
+            {"action": "rebuild"}, event_read_model_handler.FakeLambdaContext()
+        )
+
+        # then
+        self.assertEqual(response["statusCode"], 200)
+        self.assertEqual(json.loads(response["body"]), {"rebuilt": 2})
+
+        for event in [event1, event2]:
+            read_model = self.get_read_model(event.id)
+            self.assertEqual(read_model.built_version, read_model.version)
+
+        self.assertIsNone(self.get_read_model(inactive_event.id).document)
+
+    def test_consistency_check_alerts_on_and_rebuilds_drifted_documents(self):
+        # given
+        _, event1, _, _ = self.create_event_with_attendee()
+        _, event2, _, _ = self.create_event_with_attendee()
+        self.app.event_read_model_service.rebuild()
+        document = self.get_read_model(event1.id).document
+        db.session.execute(
+            update(EventReadModel)
+            .where(EventReadModel.event_id == event1.id)
+            .values(document={**document, "attendees": []})
+        )
+        db.session.commit()
+
+        # when
+        with self.assertLogs("server.services.event_read_model_service", level="ERROR") as logs:
+            response = event_read_model_handler.lambda_handler({}, event_read_model_handler.FakeLambdaContext())
+
+        # then
+        self.assertEqual(json.loads(response["body"]), {"checked": 2, "drifted": 1})
+        self.assertIn(str(event1.id), logs.output[0])
+        self.assertEqual(self.get_read_model(event1.id).document, document)
+
+        # when
+        with self.assertNoLogs("server.services.event_read_model_service", level="ERROR"):
+            response = event_read_model_handler.lambda_handler({}, event_read_model_handler.FakeLambdaContext())
+
+        # then
+        self.assertEqual(json.loads(response["body"]), {"checked": 2, "drifted": 0})
+
+    def test_product_price_change_does_not_drift_documents(self):
+        # given
+        owner, event, _, _ = self.create_event_with_attendee()
+        look = self.look_service.get_looks_by_user_id(owner.id)[0]
+        variant_id = look.product_specs["bundle"]["variant_id"]
+        product = {"id": int(variant_id), "title": "Bundle", "variants": [{"id": int(variant_id), "price": "250.00"}]}
+        self.shopify_product_service.upsert_product(int(variant_id), {**product, "updated_at": "2026-10-19T10:00:00Z"})
+        self.app.event_read_model_service.rebuild()
+
+        # when
+        self.shopify_product_service.upsert_product(
+            int(variant_id),
+            {**product, "variants": [{"id": int(variant_id), "price": "275.00"}], "updated_at": "2026-10-19T11:00:00Z"},
+        )
+
+        with self.assertNoLogs("server.services.event_read_model_service", level="ERROR"):
+            response = event_read_model_handler.lambda_handler({}, event_read_model_handler.FakeLambdaContext())
+
+        # then
+        self.assertEqual(json.loads(response["body"]), {"checked": 1, "drifted": 0})
+        self.assertEqual(self.look_service.get_looks_by_user_id(owner.id)[0].price, 275)
@@ -9,7 +9,8 @@ from sqlalchemy import select
 from server import encoder
 from server.controllers import FORCE_DELETE_HEADER
 from server.database.database_manager import db
-from server.database.models import Attendee
+from server.database.models import Attendee, DiscountType
+from server.models.attendee_model import UpdateAttendeeModel
 from server.models.event_model import EventTypeModel
 from server.services.event_service import NUMBER_OF_WEEKS_IN_ADVANCE_FOR_EVENT_CREATION
 from server.services.role_service import PREDEFINED_ROLES
@@ -370,6 +371,65 @@ class TestEvents(BaseTestCase):
         self.assertEqual(reponse_role.get("id"), str(role1.id))
         self.assertEqual(reponse_role.get("name"), role1.name)
 
+    def test_get_attendees_for_events_in_single_query(self):
+        # given
+        user = self.user_service.create_user(fixtures.create_user_request())
+        event1 = self.event_service.create_event(fixtures.create_event_request(user_id=user.id))
+        event2 = self.event_service.create_event(fixtures.create_event_request(user_id=user.id))
+        look = self.look_service.create_look(
+            fixtures.create_look_request(user_id=user.id, product_specs=self.create_look_test_product_specs())
+        )
+        role = self.role_service.create_role(fixtures.create_role_request(event_id=event1.id))
+        attendee_user = self.user_service.create_user(fixtures.create_user_request())
+        attendee = self.attendee_service.create_attendee(
+            fixtures.create_attendee_request(
+                event_id=event1.id, email=attendee_user.email, look_id=look.id, role_id=role.id
+            )
+        )
+        owner_attendee = self.attendee_service.create_attendee(
+            fixtures.create_attendee_request(event_id=event1.id, email=user.email)
+        )
+        self.order_service.create_order(
+            fixtures.create_order_request(
+                user_id=attendee_user.id, event_id=event1.id, outbound_tracking="123123", shopify_order_id="777"
+            )
+        )
+        self.order_service.create_order(fixtures.create_order_request(user_id=attendee_user.id, event_id=event1.id))
+        gift_code = self.app.discount_service.create_discount(
+            event1.id, attendee.id, 50, DiscountType.GIFT, False, f"GIFT-{uuid.uuid4()}", 12345
+        )
+        self.app.discount_service.create_discount(event1.id, attendee.id, 10, DiscountType.GIFT)
+        event2_attendee = self.attendee_service.create_attendee(
+            fixtures.create_attendee_request(event_id=event2.id, email=attendee_user.email)
+        )
+
+        # when
+        with self.assert_max_queries(1):
+            attendees = self.attendee_service.get_attendees_for_events([event1.id, event2.id])
+
+        # then
+        self.assertEqual([attendee.id for attendee in attendees[event1.id]], [owner_attendee.id, attendee.id])
+        self.assertTrue(attendees[event1.id][0].is_owner)
+
+        enriched_attendee = attendees[event1.id][1]
+        self.assertEqual(enriched_attendee.user.email, attendee_user.email)
+        self.assertEqual(enriched_attendee.role.name, role.name)
+        self.assertEqual(enriched_attendee.look.product_specs, look.product_specs)
+        self.assertEqual([tracking.tracking_number for tracking in enriched_attendee.tracking], ["123123"])
+        self.assertTrue(enriched_attendee.ship)
+        self.assertEqual(
+            [gift_code.to_response() for gift_code in enriched_attendee.gift_codes],
+            [{"code": gift_code.shopify_discount_code, "amount": 50.0, "type": "gift", "used": False}],
+        )
+        self.assertFalse(enriched_attendee.can_be_deleted)
+
+        self.assertEqual([attendee.id for attendee in attendees[event2.id]], [event2_attendee.id])
+        self.assertIsNone(attendees[event2.id][0].look)
+        self.assertIsNone(attendees[event2.id][0].role)
+        self.assertEqual(attendees[event2.id][0].gift_codes, [])
+        self.assertEqual(attendees[event2.id][0].tracking, [])
+        self.assertTrue(attendees[event2.id][0].can_be_deleted)
+
     def test_get_event_non_active(self):
         # given
         user = self.user_service.create_user(fixtures.create_user_request())
@@ -551,6 +611,118 @@ class TestEvents(BaseTestCase):
         self.assertEqual(str(attendee.id), response_attendee["id"])
         self.assertIsNotNone(response_attendee["user"])
 
+    def test_get_event_by_id_answers_if_none_match_with_not_modified(self):
+        # given
+        user = self.user_service.create_user(fixtures.create_user_request())
+        event = self.event_service.create_event(fixtures.create_event_request(user_id=user.id))
+        attendee = self.attendee_service.create_attendee(fixtures.create_attendee_request(event_id=event.id))
+        response = self.client.open(
+            f"/events/{str(event.id)}",
+            query_string={**self.hmac_query_params, "enriched": "true"},
+            method="GET",
+            headers=self.request_headers,
+            content_type=self.content_type,
+        )
+        self.assertStatus(response, 200)
+        etag = response.headers["ETag"]
+        self.assertIn("Last-Modified", response.headers)
+
+        # when
+        with self.assert_max_queries(1):
+            response = self.client.open(
+                f"/events/{str(event.id)}",
+                query_string={**self.hmac_query_params, "enriched": "true"},
+                method="GET",
+                headers={**self.request_headers, "If-None-Match": etag},
+                content_type=self.content_type,
+            )
+
+        # then
+        self.assertStatus(response, 304)
+        self.assertEqual(response.headers["ETag"], etag)
+
+        # when
+        self.attendee_service.update_attendee(attendee.id, UpdateAttendeeModel(first_name="Renamed"))
+        response = self.client.open(
+            f"/events/{str(event.id)}",
+            query_string={**self.hmac_query_params, "enriched": "true"},
+            method="GET",
+            headers={**self.request_headers, "If-None-Match": etag},
+            content_type=self.content_type,
+        )
+
+        # then
+        self.assertStatus(response, 200)
+        self.assertNotEqual(response.headers["ETag"], etag)
+        self.assertEqual(response.json["attendees"][0]["first_name"], "Renamed")
+
+    def test_event_etag_changes_with_owner(self):
+        # given
+        user = self.user_service.create_user(fixtures.create_user_request())
+        event = self.event_service.create_event(fixtures.create_event_request(user_id=user.id))
+        etag = self.client.open(
+            f"/events/{str(event.id)}",
+            query_string=self.hmac_query_params,
+            method="GET",
+            headers=self.request_headers,
+            content_type=self.content_type,
+        ).headers["ETag"]
+
+        # when
+        self.user_service.update_user(user.id, fixtures.update_user_request(first_name="Renamed"))
+        response = self.client.open(
+            f"/events/{str(event.id)}",
+            query_string=self.hmac_query_params,
+            method="GET",
+            headers={**self.request_headers, "If-None-Match": etag},
+            content_type=self.content_type,
+        )
+
+        # then
+        self.assertStatus(response, 200)
+        self.assertNotEqual(response.headers["ETag"], etag)
+        self.assertEqual(response.json["owner"]["first_name"], "Renamed")
+
+    def test_get_event_attendees_answers_if_none_match_with_not_modified(self):
+        # given
+        user = self.user_service.create_user(fixtures.create_user_request())
+        event = self.event_service.create_event(fixtures.create_event_request(user_id=user.id))
+        self.attendee_service.create_attendee(fixtures.create_attendee_request(event_id=event.id))
+        etag = self.client.open(
+            f"/events/{str(event.id)}/attendees",
+            query_string=self.hmac_query_params,
+            method="GET",
+            headers=self.request_headers,
+            content_type=self.content_type,
+        ).headers["ETag"]
+
+        # when
+        with self.assert_max_queries(1):
+            response = self.client.open(
+                f"/events/{str(event.id)}/attendees",
+                query_string=self.hmac_query_params,
+                method="GET",
+                headers={**self.request_headers, "If-None-Match": etag},
+                content_type=self.content_type,
+            )
+
+        # then
+        self.assertStatus(response, 304)
+
+        # when
+        self.attendee_service.create_attendee(fixtures.create_attendee_request(event_id=event.id))
+        response = self.client.open(
+            f"/events/{str(event.id)}/attendees",
+            query_string=self.hmac_query_params,
+            method="GET",
+            headers={**self.request_headers, "If-None-Match": etag},
+            content_type=self.content_type,
+        )
+
+        # then
+        self.assertStatus(response, 200)
+        self.assertEqual(len(response.json), 2)
+
     def test_attendees_for_non_existing_event(self):
         # when
         response = self.client.open(
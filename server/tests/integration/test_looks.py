@@ -1,11 +1,14 @@
 from __future__ import absolute_import
 
+import base64
 import json
+import random
 import uuid
 
 from server import encoder
 from server.database.models import Look
-from server.tests.integration import BaseTestCase, fixtures
+from server.services.look_service import DATA_BUCKET
+from server.tests.integration import BaseTestCase, WEBHOOK_SHOPIFY_ENDPOINT, fixtures
 
 
 class TestLooks(BaseTestCase):
@@ -85,6 +88,26 @@ class TestLooks(BaseTestCase):
         )
         self.assertEqual(db_look.user_id, user.id)
 
+    def test_create_look_with_image_streams_decoded_image_to_s3(self):
+        # given
+        user = self.user_service.create_user(fixtures.create_user_request())
+
+        with open("assets/look_1.png", "rb") as f:
+            image = f.read()
+
+        # data url with the payload wrapped in lines, as some browsers and tools encode it
+        look_data = fixtures.create_look_request(
+            user_id=user.id,
+            product_specs=self.create_look_test_product_specs(),
+            image=f"data:image/png;base64,{base64.encodebytes(image).decode('utf-8')}",
+        )
+
+        # when
+        look = self.look_service.create_look(look_data)
+
+        # then
+        self.assertEqual(self.app.aws_service.get_object_from_s3(DATA_BUCKET, look.image_path), image)
+
     def test_create_look_duplicate(self):
         # given
         user = self.user_service.create_user(fixtures.create_user_request())
@@ -378,3 +401,82 @@ class TestLooks(BaseTestCase):
         # then
         self.assertStatus(response, 400)
         self.assertEqual(response.json["errors"], "Look name must be between 2 and 64 characters long")
+
+    def store_bundle_product(self, variant_id: str, price: float, updated_at: str) -> None:
+        self.shopify_product_service.upsert_product(
+            int(variant_id), self.bundle_product_payload(variant_id, price, updated_at)
+        )
+
+    @staticmethod
+    def bundle_product_payload(variant_id: str, price: float, updated_at: str) -> dict:
+        return {
+            "id": int(variant_id),
+            "title": "Bundle",
+            "updated_at": updated_at,
+            "variants": [{"id": int(variant_id), "price": f"{price:.2f}"}],
+        }
+
+    def test_look_prices_are_resolved_from_stored_products_in_one_query(self):
+        # given
+        user = self.user_service.create_user(fixtures.create_user_request())
+        looks = [
+            self.look_service.create_look(
+                fixtures.create_look_request(user_id=user.id, product_specs=self.create_look_test_product_specs())
+            )
+            for _ in range(3)
+        ]
+        prices = {look.id: float(random.randint(200, 299)) for look in looks}
+
+        for look in looks:
+            self.store_bundle_product(
+                look.product_specs["bundle"]["variant_id"], prices[look.id], "2026-10-19T10:00:00Z"
+            )
+
+        # when
+        with self.assert_max_queries(1):
+            look_prices = self.look_service.get_look_prices(looks)
+
+        # then
+        self.assertEqual(look_prices, prices)
+
+        # when
+        with self.assert_max_queries(0):
+            look_prices = self.look_service.get_look_prices(looks)
+
+        # then
+        self.assertEqual(look_prices, prices)
+
+    def test_look_price_cached_for_variant_is_invalidated_by_product_update(self):
+        # given
+        user = self.user_service.create_user(fixtures.create_user_request())
+        look = self.look_service.create_look(
+            fixtures.create_look_request(user_id=user.id, product_specs=self.create_look_test_product_specs())
+        )
+        variant_id = look.product_specs["bundle"]["variant_id"]
+        self.store_bundle_product(variant_id, 250, "2026-10-19T10:00:00Z")
+        self.assertEqual(self.look_service.get_look_prices([look]), {look.id: 250.0})
+
+        # when
+        response = self._post(
+            WEBHOOK_SHOPIFY_ENDPOINT,
+            self.bundle_product_payload(variant_id, 225, "2026-10-19T11:00:00Z"),
+            {"X-Shopify-Topic": "products/update"},
+        )
+
+        # then
+        self.assert200(response)
+        self.assertEqual(self.look_service.get_look_prices([look]), {look.id: 225.0})
+
+    def test_look_prices_of_bundles_not_stored_come_from_shopify(self):
+        # given
+        user = self.user_service.create_user(fixtures.create_user_request())
+        look = self.look_service.create_look(
+            fixtures.create_look_request(user_id=user.id, product_specs=self.create_look_test_product_specs())
+        )
+        self.shopify_service.shopify_variants.get(look.product_specs["bundle"]["variant_id"]).variant_price = 275
+
+        # when
+        look_prices = self.look_service.get_look_prices([look])
+
+        # then
+        self.assertEqual(look_prices, {look.id: 275.0})
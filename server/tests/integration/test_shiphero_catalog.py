@@ -0,0 +1,231 @@
+import json
+import uuid
+from datetime import timedelta
+from unittest.mock import patch
+
+from sqlalchemy import event, select
+from sqlalchemy.exc import IntegrityError
+
+from server.database.database_manager import db
+from server.database.models import AuditOutbox, Product
+
+from server.handlers.shiphero_catalog_sync_handler import lambda_handler, FakeLambdaContext
+from server.models.product_model import CreateProductModel
+from server.models.shiphero_model import ShipHeroProductModel
+from server.services.integrations.shiphero_service import FakeShipHeroService
+from server.services.shiphero_catalog_service import ShipHeroCatalogService
+from server.tests.integration import BaseTestCase
+
+
+class TestShipHeroCatalog(BaseTestCase):
+    def setUp(self):
+        super().setUp()
+
+        self.shiphero_service = FakeShipHeroService()
+        self.shiphero_catalog_service = ShipHeroCatalogService(self.shiphero_service, self.product_service)
+
+    @staticmethod
+    def __shiphero_product(sku: str = None, price: float = 100.0) -> ShipHeroProductModel:
+        sku = sku or f"TEST{uuid.uuid4().hex[:12].upper()}"
+
+        return ShipHeroProductModel(id=str(uuid.uuid4()), name=f"Product {sku}", sku=sku, price=price)
+
+    def test_sync_catalog_creates_new_and_updates_changed_products(self):
+        # given
+        changed_product = self.__shiphero_product()
+        self.product_service.create_products(
+            [CreateProductModel(name=changed_product.name, sku=changed_product.sku, price=1)]
+        )
+        self.shiphero_service.catalog = [self.__shiphero_product() for _ in range(4)] + [changed_product]
+
+        # when
+        result = self.shiphero_catalog_service.sync_catalog(page_size=2)
+
+        # then
+        self.assertEqual(result, {"pages": 3, "products": 5, "created": 4, "updated": 1, "complete": True})
+        products = self.product_service.get_products_by_skus(product.sku for product in self.shiphero_service.catalog)
+        self.assertEqual(len(products), 5)
+        self.assertEqual(products[changed_product.sku].price, changed_product.price)
+
+    def test_sync_catalog_is_audit_logged(self):
+        # given
+        changed_product = self.__shiphero_product()
+        stored_product = self.product_service.create_products(
+            [CreateProductModel(name=changed_product.name, sku=changed_product.sku, price=1)]
+        )[0]
+        new_product = self.__shiphero_product()
+        self.shiphero_service.catalog = [changed_product, new_product]
+
+        # when
+        with self.audit_logging(Product):
+            self.shiphero_catalog_service.sync_catalog()
+
+        # then
+        messages = {
+            message["payload"]["id"]: message for message in db.session.execute(select(AuditOutbox.message)).scalars()
+        }
+        self.assertEqual(messages[str(stored_product.id)]["type"], "PRODUCT_UPDATED")
+        self.assertEqual(
+            messages[str(stored_product.id)]["diff"]["price"], {"before": 1, "after": changed_product.price}
+        )
+        new_product_id = self.product_service.get_products_by_skus([new_product.sku])[new_product.sku].id
+        self.assertEqual(messages[str(new_product_id)]["type"], "PRODUCT_CREATED")
+
+    def test_sync_catalog_is_idempotent(self):
+        # given
+        self.shiphero_service.catalog = [self.__shiphero_product() for _ in range(3)]
+        self.shiphero_catalog_service.sync_catalog()
+        num_products = self.product_service.get_num_products()
+
+        # when
+        result = self.shiphero_catalog_service.sync_catalog()
+
+        # then
+        self.assertEqual(result["created"], 0)
+        self.assertEqual(result["updated"], 0)
+        self.assertEqual(self.product_service.get_num_products(), num_products)
+
+    def test_sync_catalog_resumes_from_where_the_previous_run_stopped(self):
+        # given
+        self.shiphero_service.catalog = [self.__shiphero_product() for _ in range(5)]
+        first_run = self.shiphero_catalog_service.sync_catalog(page_size=2, max_pages=2)
+
+        # when
+        with patch.object(self.shiphero_service, "get_products", wraps=self.shiphero_service.get_products) as spy:
+            second_run = self.shiphero_catalog_service.sync_catalog(page_size=2, max_pages=2)
+
+        # then
+        self.assertEqual(first_run, {"pages": 2, "products": 4, "created": 4, "updated": 0, "complete": False})
+        self.assertEqual(second_run, {"pages": 1, "products": 1, "created": 1, "updated": 0, "complete": True})
+        spy.assert_called_once_with(2, "4")
+        products = self.product_service.get_products_by_skus(product.sku for product in self.shiphero_service.catalog)
+        self.assertEqual(len(products), 5)
+
+    def test_sync_catalog_starts_over_after_a_complete_pass(self):
+        # given
+        self.shiphero_service.catalog = [self.__shiphero_product() for _ in range(3)]
+        self.shiphero_catalog_service.sync_catalog(page_size=2)
+
+        # when
+        result = self.shiphero_catalog_service.sync_catalog(page_size=2)
+
+        # then
+        self.assertEqual(result, {"pages": 2, "products": 3, "created": 0, "updated": 0, "complete": True})
+
+    def test_sync_catalog_handler(self):
+        # given
+        catalog = [self.__shiphero_product() for _ in range(3)]
+        self.app.shiphero_service.catalog = catalog
+        self.addCleanup(setattr, self.app.shiphero_service, "catalog", [])
+
+        # when
+        response = lambda_handler({}, FakeLambdaContext())
+
+        # then
+        self.assertEqual(response["statusCode"], 200)
+        self.assertEqual(json.loads(response["body"])["created"], 3)
+        self.assertEqual(len(self.product_service.get_products_by_skus(product.sku for product in catalog)), 3)
+
+    def test_create_products_is_audit_logged(self):
+        # given
+        create_products = [CreateProductModel(**self.__shiphero_product().model_dump(exclude={"id"})) for _ in range(3)]
+
+        # when
+        with self.audit_logging(Product):
+            products = self.product_service.create_products(create_products)
+
+        # then
+        messages = db.session.execute(
+            select(AuditOutbox.message).where(AuditOutbox.type == "PRODUCT_CREATED")
+        ).scalars()
+        self.assertCountEqual(
+            [message["payload"]["id"] for message in messages], [str(product.id) for product in products]
+        )
+
+    def test_create_products_returns_stored_products_of_skus_already_stored(self):
+        # given
+        stored_product = self.product_service.create_product(
+            CreateProductModel(**self.__shiphero_product().model_dump(exclude={"id"}))
+        )
+        new_product = CreateProductModel(**self.__shiphero_product().model_dump(exclude={"id"}))
+
+        # when
+        products = self.product_service.create_products(
+            [new_product, CreateProductModel(sku=stored_product.sku, name="Other", price=1)]
+        )
+
+        # then
+        self.assertEqual([product.sku for product in products], [new_product.sku, stored_product.sku])
+        self.assertEqual(products[1].id, stored_product.id)
+        self.assertEqual(len(self.product_service.get_products_by_skus([stored_product.sku])), 1)
+
+    def test_create_products_keeps_the_rest_when_a_product_fails_to_insert(self):
+        # given
+        create_products = [CreateProductModel(**self.__shiphero_product().model_dump(exclude={"id"})) for _ in range(3)]
+        failing_sku = create_products[1].sku
+
+        def fail_insert(mapper, connection, target):
+            if target.sku == failing_sku:
+                raise IntegrityError("INSERT INTO products", {}, Exception("duplicate key"))
+
+        event.listen(Product, "before_insert", fail_insert)
+        self.addCleanup(event.remove, Product, "before_insert", fail_insert)
+
+        # when
+        products = self.product_service.create_products(create_products)
+
+        # then
+        self.assertEqual([product.sku for product in products], [create_products[0].sku, create_products[2].sku])
+        self.assertEqual(
+            set(self.product_service.get_products_by_skus(create_product.sku for create_product in create_products)),
+            {create_products[0].sku, create_products[2].sku},
+        )
+
+    def test_unknown_sku_is_not_fetched_again_while_cached(self):
+        # given
+        unknown_sku = f"TEST{uuid.uuid4().hex[:8].upper()}SHIPHERO_NOT_FOUND"
+        self.shiphero_catalog_service.get_products_by_skus([unknown_sku])
+
+        # when
+        with patch.object(self.shiphero_service, "get_product_by_sku") as get_product_by_sku:
+            products = self.shiphero_catalog_service.get_products_by_skus([unknown_sku])
+
+        # then
+        self.assertEqual(products, {})
+        get_product_by_sku.assert_not_called()
+        metrics = self.shiphero_catalog_service.metrics()
+        self.assertEqual(metrics["lookups"], 2)
+        self.assertEqual(metrics["unknown_sku_hits"], 1)
+        self.assertEqual(metrics["shiphero_misses"], 1)
+        self.assertEqual(metrics["hit_rate"], 0.5)
+
+    def test_unknown_sku_is_fetched_again_after_ttl(self):
+        # given
+        shiphero_catalog_service = ShipHeroCatalogService(
+            self.shiphero_service, self.product_service, unknown_sku_ttl=timedelta(0)
+        )
+        unknown_sku = f"TEST{uuid.uuid4().hex[:8].upper()}SHIPHERO_NOT_FOUND"
+        shiphero_catalog_service.get_products_by_skus([unknown_sku])
+
+        # when
+        with patch.object(
+            self.shiphero_service, "get_product_by_sku", wraps=self.shiphero_service.get_product_by_sku
+        ) as get_product_by_sku:
+            shiphero_catalog_service.get_products_by_skus([unknown_sku])
+
+        # then
+        get_product_by_sku.assert_called_once_with(unknown_sku)
+
+    def test_failed_shiphero_request_is_not_cached_as_unknown(self):
+        # given
+        sku = f"TEST{uuid.uuid4().hex[:12].upper()}"
+
+        with patch.object(self.shiphero_service, "get_product_by_sku", side_effect=Exception("timeout")):
+            self.shiphero_catalog_service.get_products_by_skus([sku])
+
+        # when
+        products = self.shiphero_catalog_service.get_products_by_skus([sku])
+
+        # then
+        self.assertEqual(products[sku].sku, sku)
+        self.assertEqual(self.shiphero_catalog_service.metrics()["shiphero_hits"], 1)
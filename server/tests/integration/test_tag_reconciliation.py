@@ -0,0 +1,173 @@
+from datetime import timedelta
+from unittest.mock import patch
+
+from sqlalchemy import select, update, func
+
+from server.database.database_manager import db
+from server.database.models import Event, TagReconciliationQueue, User
+from server.handlers.tag_reconciliation_handler import lambda_handler, FakeLambdaContext
+from server.models.audit_log_model import AuditLogMessage
+from server.models.shopify_model import ShopifyCustomer
+from server.services.integrations.shopify_service import ShopifyService
+from server.services.tagging_service import TaggingService, TAG_EVENT_OWNER_4_PLUS, TAG_MEMBER_OF_4_PLUS_EVENT
+from server.tests.integration import BaseTestCase, fixtures
+
+
+class TestTagReconciliation(BaseTestCase):
+    def setUp(self):
+        super().setUp()
+
+        self.populate_shopify_variants()
+
+        self.tagging_service = TaggingService(
+            self.user_service,
+            self.event_service,
+            self.attendee_service,
+            self.look_service,
+            self.shopify_service,
+            reconciliation_debounce=timedelta(seconds=30),
+        )
+
+    def __create_event_with_4_attendees(self, tags: list[str]):
+        user_model = self.user_service.create_user(fixtures.create_user_request(meta={"tags": tags}))
+        event_model = self.event_service.create_event(fixtures.create_event_request(user_id=user_model.id))
+        event = db.session.execute(select(Event).where(Event.id == event_model.id)).scalar_one()
+
+        for _ in range(4):
+            self.attendee_service.create_attendee(fixtures.create_attendee_request(event_id=event.id, invite=True))
+
+        self.shopify_service.customers[ShopifyService.customer_gid(user_model.shopify_id)] = ShopifyCustomer(
+            gid=ShopifyService.customer_gid(user_model.shopify_id),
+            first_name=user_model.first_name,
+            last_name=user_model.last_name,
+            email=user_model.email,
+            tags=tags,
+        )
+
+        return user_model, event
+
+    @staticmethod
+    def __make_queue_due():
+        db.session.execute(update(TagReconciliationQueue).values(due_at=func.now() - timedelta(seconds=1)))
+        db.session.commit()
+
+    def test_repeated_updates_are_coalesced_into_one_entry_per_user(self):
+        # given
+        user_model, event = self.__create_event_with_4_attendees(["test1"])
+        message = AuditLogMessage.from_string(fixtures.audit_log_queue_message("EVENT_UPDATED", event))
+
+        # when
+        for _ in range(10):
+            self.tagging_service.tag_customers_on_event_updated(message)
+
+        # then
+        queued_user_ids = db.session.execute(select(TagReconciliationQueue.user_id)).scalars().all()
+        self.assertEqual(len(queued_user_ids), len(set(queued_user_ids)))
+        self.assertIn(user_model.id, queued_user_ids)
+        self.assertEqual(
+            len(queued_user_ids), 1 + len(self.attendee_service.get_invited_attendees_for_the_event(event.id))
+        )
+
+    def test_customers_are_queued_as_part_of_the_callers_transaction(self):
+        # given
+        _, event = self.__create_event_with_4_attendees(["test1"])
+
+        # when
+        self.tagging_service.tag_customers_on_event_updated(
+            AuditLogMessage.from_string(fixtures.audit_log_queue_message("EVENT_UPDATED", event))
+        )
+        db.session.rollback()
+
+        # then
+        self.assertEqual(db.session.execute(select(TagReconciliationQueue)).scalars().all(), [])
+
+    def test_nothing_is_reconciled_within_debounce_window(self):
+        # given
+        user_model, event = self.__create_event_with_4_attendees(["test1"])
+        self.tagging_service.tag_customers_on_event_updated(
+            AuditLogMessage.from_string(fixtures.audit_log_queue_message("EVENT_UPDATED", event))
+        )
+
+        # when
+        num_reconciled = self.tagging_service.reconcile_customer_tags()
+
+        # then
+        self.assertEqual(num_reconciled, 0)
+        self.assertNotIn(
+            TAG_EVENT_OWNER_4_PLUS,
+            self.shopify_service.customers[ShopifyService.customer_gid(user_model.shopify_id)].tags,
+        )
+        self.assertGreater(len(db.session.execute(select(TagReconciliationQueue)).scalars().all()), 0)
+
+    def test_scheduled_reconciliation_applies_tags_once_due(self):
+        # given
+        user_model, event = self.__create_event_with_4_attendees(["test1"])
+        self.tagging_service.tag_customers_on_event_updated(
+            AuditLogMessage.from_string(fixtures.audit_log_queue_message("EVENT_UPDATED", event))
+        )
+        self.__make_queue_due()
+
+        # when
+        response = lambda_handler({}, FakeLambdaContext())
+
+        # then
+        self.assertEqual(response["statusCode"], 200)
+        self.assertIn(
+            TAG_EVENT_OWNER_4_PLUS,
+            self.shopify_service.customers[ShopifyService.customer_gid(user_model.shopify_id)].tags,
+        )
+        self.assertIn(
+            TAG_EVENT_OWNER_4_PLUS,
+            db.session.execute(select(User).where(User.id == user_model.id)).scalar_one().meta.get("tags", []),
+        )
+
+        for attendee in self.attendee_service.get_invited_attendees_for_the_event(event.id):
+            self.assertIn(
+                TAG_MEMBER_OF_4_PLUS_EVENT,
+                db.session.execute(select(User).where(User.id == attendee.user_id)).scalar_one().meta.get("tags", []),
+            )
+
+        self.assertEqual(len(db.session.execute(select(TagReconciliationQueue)).scalars().all()), 0)
+
+    def test_customers_with_up_to_date_tags_are_not_pushed_to_shopify(self):
+        # given
+        user_model, event = self.__create_event_with_4_attendees(["test1"])
+        self.tagging_service.tag_customers_on_event_updated(
+            AuditLogMessage.from_string(fixtures.audit_log_queue_message("EVENT_UPDATED", event))
+        )
+        self.__make_queue_due()
+        self.tagging_service.reconcile_customer_tags()
+
+        self.tagging_service.tag_customers_on_event_updated(
+            AuditLogMessage.from_string(fixtures.audit_log_queue_message("EVENT_UPDATED", event))
+        )
+        self.__make_queue_due()
+
+        # when
+        with (
+            patch.object(self.shopify_service, "add_tags") as add_tags,
+            patch.object(self.shopify_service, "remove_tags") as remove_tags,
+        ):
+            num_reconciled = self.tagging_service.reconcile_customer_tags()
+
+        # then
+        self.assertGreater(num_reconciled, 0)
+        add_tags.assert_not_called()
+        remove_tags.assert_not_called()
+
+    def test_failed_customer_stays_in_queue(self):
+        # given
+        user_model, event = self.__create_event_with_4_attendees(["test1"])
+        self.tagging_service.tag_customers_on_event_updated(
+            AuditLogMessage.from_string(fixtures.audit_log_queue_message("EVENT_UPDATED", event))
+        )
+        self.__make_queue_due()
+
+        # when
+        with patch.object(self.shopify_service, "add_tags", side_effect=Exception("Shopify is down")):
+            self.tagging_service.reconcile_customer_tags()
+
+        # then
+        queued_entries = db.session.execute(select(TagReconciliationQueue)).scalars().all()
+        self.assertIn(user_model.id, {entry.user_id for entry in queued_entries})
+        self.assertEqual(self.tagging_service.reconcile_customer_tags(), 0)  # leased until retry
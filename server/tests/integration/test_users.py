@@ -548,6 +548,45 @@ class TestUsers(BaseTestCase):
         self.assertTrue(response_event1["id"] in (str(event1.id), str(event2.id)))
         self.assertTrue(response_event2["id"] in (str(event1.id), str(event2.id)))
 
+    def test_get_owned_and_invited_enriched_events_in_single_query(self):
+        # given
+        user = self.user_service.create_user(fixtures.create_user_request())
+        owned_events = [
+            self.event_service.create_event(fixtures.create_event_request(user_id=user.id)) for _ in range(2)
+        ]
+        invited_events = []
+
+        for _ in range(2):
+            owner = self.user_service.create_user(fixtures.create_user_request())
+            event = self.event_service.create_event(fixtures.create_event_request(user_id=owner.id))
+            self.attendee_service.create_attendee(
+                fixtures.create_attendee_request(event_id=event.id, email=user.email, invite=True)
+            )
+            self.attendee_service.create_attendee(fixtures.create_attendee_request(event_id=event.id, invite=True))
+            invited_events.append(event)
+
+        self.app.event_read_model_service.rebuild()
+
+        # when
+        with self.assert_max_queries(2):
+            events = self.event_service.get_user_events(user.id, enriched=True)
+
+        # then
+        self.assertEqual(
+            {event.id: event.status for event in events},
+            {
+                **{event.id: EventUserStatus.OWNER for event in owned_events},
+                **{event.id: EventUserStatus.ATTENDEE for event in invited_events},
+            },
+        )
+        self.assertTrue(
+            all(
+                [attendee.user_id for attendee in event.attendees] == [user.id]
+                for event in events
+                if event.status == EventUserStatus.ATTENDEE
+            )
+        )
+
     def test_get_user_looks_for_non_existing_user(self):
         # when
         response = self.client.open(
@@ -621,6 +660,91 @@ class TestUsers(BaseTestCase):
             {self.look_service.get_look_price(look1), self.look_service.get_look_price(look2)},
         )
 
+    def test_get_user_looks_answers_if_none_match_with_not_modified(self):
+        # given
+        user = self.user_service.create_user(fixtures.create_user_request())
+        look = self.look_service.create_look(
+            fixtures.create_look_request(user_id=user.id, product_specs=self.create_look_test_product_specs())
+        )
+        response = self.client.open(
+            f"/users/{str(user.id)}/looks",
+            query_string=self.hmac_query_params,
+            method="GET",
+            headers=self.request_headers,
+            content_type=self.content_type,
+        )
+        etag = response.headers["ETag"]
+        self.assertIn("Last-Modified", response.headers)
+
+        # when
+        # looks and the stored products of their bundles
+        with self.assert_max_queries(2):
+            response = self.client.open(
+                f"/users/{str(user.id)}/looks",
+                query_string=self.hmac_query_params,
+                method="GET",
+                headers={**self.request_headers, "If-None-Match": etag},
+                content_type=self.content_type,
+            )
+
+        # then
+        self.assertStatus(response, 304)
+        self.assertEqual(response.headers["ETag"], etag)
+
+        # when
+        self.look_service.update_look(
+            look.id, fixtures.update_look_request(name="Renamed", product_specs=look.product_specs)
+        )
+        response = self.client.open(
+            f"/users/{str(user.id)}/looks",
+            query_string=self.hmac_query_params,
+            method="GET",
+            headers={**self.request_headers, "If-None-Match": etag},
+            content_type=self.content_type,
+        )
+
+        # then
+        self.assertStatus(response, 200)
+        self.assertNotEqual(response.headers["ETag"], etag)
+        self.assertEqual(response.json[0]["name"], "Renamed")
+
+    def test_get_user_looks_answers_if_none_match_with_changed_price_after_product_update(self):
+        # given
+        user = self.user_service.create_user(fixtures.create_user_request())
+        look = self.look_service.create_look(
+            fixtures.create_look_request(user_id=user.id, product_specs=self.create_look_test_product_specs())
+        )
+        variant_id = look.product_specs["bundle"]["variant_id"]
+        product = {"id": int(variant_id), "title": "Bundle", "variants": [{"id": int(variant_id), "price": "250.00"}]}
+        self.shopify_product_service.upsert_product(int(variant_id), {**product, "updated_at": "2026-10-19T10:00:00Z"})
+        response = self.client.open(
+            f"/users/{str(user.id)}/looks",
+            query_string=self.hmac_query_params,
+            method="GET",
+            headers=self.request_headers,
+            content_type=self.content_type,
+        )
+        etag = response.headers["ETag"]
+        self.assertEqual(response.json[0]["price"], 250)
+
+        # when
+        self.shopify_product_service.upsert_product(
+            int(variant_id),
+            {**product, "variants": [{"id": int(variant_id), "price": "275.00"}], "updated_at": "2026-10-19T11:00:00Z"},
+        )
+        response = self.client.open(
+            f"/users/{str(user.id)}/looks",
+            query_string=self.hmac_query_params,
+            method="GET",
+            headers={**self.request_headers, "If-None-Match": etag},
+            content_type=self.content_type,
+        )
+
+        # then
+        self.assertStatus(response, 200)
+        self.assertNotEqual(response.headers["ETag"], etag)
+        self.assertEqual(response.json[0]["price"], 275)
+
     def test_create_user_first_name_too_long(self):
         # given
         email = utils.generate_email()
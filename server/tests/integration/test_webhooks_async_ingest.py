@@ -0,0 +1,106 @@
+import json
+import random
+import uuid
+from unittest.mock import patch
+
+from sqlalchemy import select
+
+from server.database.database_manager import db
+from server.database.models import Webhook, WebhookDeadLetter
+from server.handlers.webhook_queue_handler import lambda_handler, FakeLambdaContext, MAX_ATTEMPTS
+from server.services import NotFoundError
+from server.tests.integration import BaseTestCase, fixtures, WEBHOOK_SHOPIFY_ENDPOINT
+
+CUSTOMERS_CREATE_REQUEST_HEADERS = {
+    "X-Shopify-Topic": "customers/create",
+}
+
+
+class TestWebhooksAsyncIngest(BaseTestCase):
+    def setUp(self):
+        super().setUp()
+
+        self.app.webhook_async_ingest = True
+        self.aws_service = self.app.aws_service
+
+    def __ingest_customer_create(self) -> dict:
+        webhook_customer = fixtures.webhook_customer_update(phone=random.randint(1000000000, 9999999999))
+
+        response = self._post(WEBHOOK_SHOPIFY_ENDPOINT, webhook_customer, CUSTOMERS_CREATE_REQUEST_HEADERS)
+        self.assert200(response)
+
+        return webhook_customer
+
+    @staticmethod
+    def __record(body: str, receive_count: int = 1) -> dict:
+        return {
+            "messageId": str(uuid.uuid4()),
+            "body": body,
+            "attributes": {"ApproximateReceiveCount": str(receive_count)},
+        }
+
+    def test_webhook_is_stored_and_queued_but_not_processed(self):
+        # when
+        webhook_customer = self.__ingest_customer_create()
+
+        # then
+        message = json.loads(self.aws_service.dequeue_message(self.app.webhook_sqs_queue_url))
+        webhook = db.session.execute(select(Webhook).where(Webhook.id == message["webhook_id"])).scalar_one()
+        self.assertEqual(webhook.type, "customers/create")
+        self.assertEqual(message["topic"], "customers/create")
+        self.assertEqual(webhook.payload["email"], webhook_customer["email"])
+        with self.assertRaises(NotFoundError):
+            self.user_service.get_user_by_email(webhook_customer["email"])
+
+    def test_queued_webhook_is_processed_by_worker(self):
+        # given
+        webhook_customer = self.__ingest_customer_create()
+        record = self.__record(self.aws_service.dequeue_message(self.app.webhook_sqs_queue_url))
+
+        # when
+        response = lambda_handler({"Records": [record]}, FakeLambdaContext())
+
+        # then
+        self.assertEqual(response["batchItemFailures"], [])
+        user = self.user_service.get_user_by_email(webhook_customer["email"])
+        self.assertIsNotNone(user)
+        self.assertEqual(user.shopify_id, str(webhook_customer["id"]))
+
+    def test_failed_webhook_is_returned_to_queue_for_retry(self):
+        # given
+        self.__ingest_customer_create()
+        record = self.__record(self.aws_service.dequeue_message(self.app.webhook_sqs_queue_url))
+
+        # when
+        with patch.object(self.app.shopify_webhook_dispatcher, "dispatch", side_effect=Exception("boom")):
+            response = lambda_handler({"Records": [record]}, FakeLambdaContext())
+
+        # then
+        self.assertEqual(response["batchItemFailures"], [{"itemIdentifier": record["messageId"]}])
+        self.assertEqual(len(db.session.execute(select(WebhookDeadLetter)).scalars().all()), 0)
+
+    def test_webhook_is_dead_lettered_after_max_attempts(self):
+        # given
+        self.__ingest_customer_create()
+        body = self.aws_service.dequeue_message(self.app.webhook_sqs_queue_url)
+        record = self.__record(body, MAX_ATTEMPTS)
+
+        # when
+        with patch.object(self.app.shopify_webhook_dispatcher, "dispatch", side_effect=Exception("boom")):
+            response = lambda_handler({"Records": [record]}, FakeLambdaContext())
+
+        # then
+        self.assertEqual(response["batchItemFailures"], [])
+        dead_letter = db.session.execute(select(WebhookDeadLetter)).scalar_one()
+        self.assertEqual(str(dead_letter.webhook_id), json.loads(body)["webhook_id"])
+        self.assertEqual(dead_letter.type, "customers/create")
+        self.assertEqual(dead_letter.error, "boom")
+        self.assertEqual(dead_letter.attempts, MAX_ATTEMPTS)
+
+    def test_webhook_is_processed_inline_when_queueing_fails(self):
+        # when
+        with patch.object(self.aws_service, "enqueue_message", side_effect=Exception("SQS is down")):
+            webhook_customer = self.__ingest_customer_create()
+
+        # then
+        self.assertIsNotNone(self.user_service.get_user_by_email(webhook_customer["email"]))
@@ -0,0 +1,226 @@
+import json
+import random
+import uuid
+from datetime import timedelta
+from unittest.mock import patch
+
+from sqlalchemy import func, select, update
+
+from server.database.database_manager import db
+from server.database.models import Webhook
+from server.handlers.webhook_queue_handler import lambda_handler, FakeLambdaContext, MAX_ATTEMPTS
+from server.services.webhook_service import WebhookService
+from server.tests.integration import BaseTestCase, fixtures, WEBHOOK_SHOPIFY_ENDPOINT
+
+
+class TestWebhooksIdempotency(BaseTestCase):
+    def __post_customer_create(self, webhook_customer: dict, shopify_webhook_id: str):
+        response = self._post(
+            WEBHOOK_SHOPIFY_ENDPOINT,
+            webhook_customer,
+            {"X-Shopify-Topic": "customers/create", "X-Shopify-Webhook-Id": shopify_webhook_id},
+        )
+        self.assert200(response)
+
+    @staticmethod
+    def __stored_webhooks(shopify_webhook_id: str) -> list[Webhook]:
+        return (
+            db.session.execute(select(Webhook).where(Webhook.shopify_webhook_id == shopify_webhook_id)).scalars().all()
+        )
+
+    def __dequeue_webhook_messages(self) -> list[str]:
+        messages = []
+
+        try:
+            while True:
+                messages.append(self.app.aws_service.dequeue_message(self.app.webhook_sqs_queue_url))
+        except IndexError:
+            return messages
+
+    @staticmethod
+    def __process_queued(message: str, receive_count: int = 1) -> dict:
+        return lambda_handler(
+            {
+                "Records": [
+                    {
+                        "messageId": str(uuid.uuid4()),
+                        "body": message,
+                        "attributes": {"ApproximateReceiveCount": str(receive_count)},
+                    }
+                ]
+            },
+            FakeLambdaContext(),
+        )
+
+    def test_redelivered_webhook_is_processed_once(self):
+        # given
+        shopify_webhook_id = str(uuid.uuid4())
+        webhook_customer = fixtures.webhook_customer_update(phone=random.randint(1000000000, 9999999999))
+
+        # when
+        with patch.object(
+            self.app.shopify_webhook_dispatcher, "dispatch", wraps=self.app.shopify_webhook_dispatcher.dispatch
+        ) as dispatch:
+            self.__post_customer_create(webhook_customer, shopify_webhook_id)
+            self.__post_customer_create(webhook_customer, shopify_webhook_id)
+
+        # then
+        self.assertEqual(dispatch.call_count, 1)
+        self.assertEqual(len(self.__stored_webhooks(shopify_webhook_id)), 1)
+        self.assertIsNotNone(self.user_service.get_user_by_email(webhook_customer["email"]))
+
+    def test_redelivered_webhook_is_processed_once_by_worker(self):
+        # given
+        self.app.webhook_async_ingest = True
+        shopify_webhook_id = str(uuid.uuid4())
+        webhook_customer = fixtures.webhook_customer_update(phone=random.randint(1000000000, 9999999999))
+        self.__post_customer_create(webhook_customer, shopify_webhook_id)
+        self.__post_customer_create(webhook_customer, shopify_webhook_id)
+        messages = self.__dequeue_webhook_messages()
+
+        # when
+        with patch.object(
+            self.app.shopify_webhook_dispatcher, "dispatch", wraps=self.app.shopify_webhook_dispatcher.dispatch
+        ) as dispatch:
+            responses = [self.__process_queued(message) for message in messages]
+
+        # then
+        self.assertEqual(len(messages), 2)
+        self.assertEqual([response["batchItemFailures"] for response in responses], [[], []])
+        self.assertEqual(dispatch.call_count, 1)
+        self.assertEqual(len(self.__stored_webhooks(shopify_webhook_id)), 1)
+        self.assertIsNotNone(self.user_service.get_user_by_email(webhook_customer["email"]))
+
+    def test_redelivery_of_queued_webhook_that_failed_in_worker_is_processed(self):
+        # given
+        self.app.webhook_async_ingest = True
+        shopify_webhook_id = str(uuid.uuid4())
+        webhook_customer = fixtures.webhook_customer_update(phone=random.randint(1000000000, 9999999999))
+        self.__post_customer_create(webhook_customer, shopify_webhook_id)
+
+        with patch.object(self.app.shopify_webhook_dispatcher, "dispatch", side_effect=Exception("Lambda timed out")):
+            self.__process_queued(self.__dequeue_webhook_messages()[0], MAX_ATTEMPTS)
+
+        # when
+        self.__post_customer_create(webhook_customer, shopify_webhook_id)
+        response = self.__process_queued(self.__dequeue_webhook_messages()[0])
+
+        # then
+        self.assertEqual(response["batchItemFailures"], [])
+        webhook = self.__stored_webhooks(shopify_webhook_id)[0]
+        self.assertIsNotNone(webhook.queued_at)
+        self.assertIsNotNone(webhook.processed_at)
+        self.assertIsNotNone(self.user_service.get_user_by_email(webhook_customer["email"]))
+
+    def test_sqs_redelivery_of_processed_webhook_is_skipped(self):
+        # given
+        self.app.webhook_async_ingest = True
+        webhook_customer = fixtures.webhook_customer_update(phone=random.randint(1000000000, 9999999999))
+        self.__post_customer_create(webhook_customer, str(uuid.uuid4()))
+        message = self.__dequeue_webhook_messages()[0]
+        self.__process_queued(message)
+
+        # when
+        with patch.object(self.app.shopify_webhook_dispatcher, "dispatch") as dispatch:
+            response = self.__process_queued(message, 2)
+
+        # then
+        self.assertEqual(response["batchItemFailures"], [])
+        dispatch.assert_not_called()
+
+    def test_webhook_claimed_by_another_worker_is_returned_to_queue(self):
+        # given
+        self.app.webhook_async_ingest = True
+        webhook_customer = fixtures.webhook_customer_update(phone=random.randint(1000000000, 9999999999))
+        self.__post_customer_create(webhook_customer, str(uuid.uuid4()))
+        message = self.__dequeue_webhook_messages()[0]
+        db.session.execute(
+            update(Webhook).where(Webhook.id == json.loads(message)["webhook_id"]).values(claimed_at=func.now())
+        )
+        db.session.commit()
+
+        # when
+        with patch.object(self.app.shopify_webhook_dispatcher, "dispatch") as dispatch:
+            response = self.__process_queued(message)
+
+        # then
+        self.assertEqual(len(response["batchItemFailures"]), 1)
+        dispatch.assert_not_called()
+
+    def test_webhook_claim_left_by_crashed_worker_times_out(self):
+        # given
+        webhook = self.webhook_service.store_webhook("customers/create", {}, str(uuid.uuid4()))
+        db.session.execute(
+            update(Webhook).where(Webhook.id == webhook.id).values(claimed_at=func.now() - timedelta(hours=1))
+        )
+        db.session.commit()
+
+        # when
+        response_payload = self.webhook_service.process_webhook(webhook, lambda: {"processed": True})
+
+        # then
+        self.assertEqual(response_payload, {"processed": True})
+
+    def test_redelivery_of_webhook_that_failed_to_be_handled_is_processed(self):
+        # given
+        shopify_webhook_id = str(uuid.uuid4())
+        webhook_customer = fixtures.webhook_customer_update(phone=random.randint(1000000000, 9999999999))
+        dispatch = self.app.shopify_webhook_dispatcher.dispatch
+
+        with patch.object(self.app.shopify_webhook_dispatcher, "dispatch", side_effect=Exception("Lambda timed out")):
+            self.__post_customer_create(webhook_customer, shopify_webhook_id)
+
+        # when
+        with patch.object(self.app.shopify_webhook_dispatcher, "dispatch", wraps=dispatch) as retried_dispatch:
+            self.__post_customer_create(webhook_customer, shopify_webhook_id)
+            self.__post_customer_create(webhook_customer, shopify_webhook_id)
+
+        # then
+        self.assertEqual(retried_dispatch.call_count, 1)
+        self.assertEqual(len(self.__stored_webhooks(shopify_webhook_id)), 1)
+        self.assertIsNotNone(self.__stored_webhooks(shopify_webhook_id)[0].processed_at)
+        self.assertIsNotNone(self.user_service.get_user_by_email(webhook_customer["email"]))
+
+    def test_recently_seen_webhook_skips_database(self):
+        # given
+        shopify_webhook_id = str(uuid.uuid4())
+        self.webhook_service.process_webhook(
+            self.webhook_service.store_webhook("customers/create", {}, shopify_webhook_id), lambda: {}
+        )
+
+        # when
+        with patch.object(db.session, "execute", side_effect=Exception("database hit")):
+            webhook = self.webhook_service.store_webhook("customers/create", {}, shopify_webhook_id)
+
+        # then
+        self.assertIsNone(webhook)
+
+    def test_webhook_stored_by_other_instance_is_skipped(self):
+        # given
+        shopify_webhook_id = str(uuid.uuid4())
+        other_instance = WebhookService()
+        other_instance.process_webhook(
+            other_instance.store_webhook("customers/create", {}, shopify_webhook_id), lambda: {}
+        )
+
+        # when
+        webhook = WebhookService().store_webhook("customers/create", {}, shopify_webhook_id)
+
+        # then
+        self.assertIsNone(webhook)
+        self.assertEqual(len(self.__stored_webhooks(shopify_webhook_id)), 1)
+
+    def test_same_webhook_id_with_other_topic_or_without_id_is_stored(self):
+        # given
+        shopify_webhook_id = str(uuid.uuid4())
+        self.webhook_service.store_webhook("customers/create", {}, shopify_webhook_id)
+
+        # when
+        other_topic_webhook = self.webhook_service.store_webhook("customers/update", {}, shopify_webhook_id)
+        webhook_without_id = self.webhook_service.store_webhook("customers/create", {})
+        other_webhook_without_id = self.webhook_service.store_webhook("customers/create", {})
+
+        # then
+        self.assertIsNotNone(other_topic_webhook)
+        self.assertNotEqual(webhook_without_id.id, other_webhook_without_id.id)
+        self.assertEqual(len(self.__stored_webhooks(shopify_webhook_id)), 2)
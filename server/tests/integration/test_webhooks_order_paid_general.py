@@ -1,9 +1,11 @@
 import json
 import random
+from unittest.mock import patch
 
 from parameterized import parameterized
 
 from server.database.models import Product, Address, DiscountType, Discount
+from server.models.product_model import CreateProductModel
 from server.services.discount_service import DISCOUNT_GIFT_FOR_ATTENDEE, GIFT_DISCOUNT_CODE_PREFIX
 from server.services.order_service import (
     ORDER_STATUS_READY,
@@ -661,6 +663,59 @@ class TestWebhooksOrderPaidGeneral(BaseTestCase):
         self.assertIsNone(order.order_items[0].product_id)
         self.assertEqual(order.order_items[0].shopify_sku, shopify_sku)
 
+    def test_order_process_resolves_missing_products_from_shiphero_in_one_batch(self):
+        # given
+        user = self.user_service.create_user(fixtures.create_user_request())
+        event_id = self.event_service.create_event(fixtures.create_event_request(user_id=user.id)).id
+        attendee_user = self.user_service.create_user(fixtures.create_user_request())
+        self.attendee_service.create_attendee(
+            fixtures.create_attendee_request(user_id=attendee_user.id, event_id=event_id, email=attendee_user.email)
+        )
+        Product.query.delete()  # delete all products from the database
+        known_shopify_sku = self.get_random_shopify_sku_by_product_type(ProductType.NECK_TIE)
+        known_product = self.product_service.create_product(
+            CreateProductModel(name="Known product", sku=self.app.sku_builder.build(known_shopify_sku, None, None))
+        )
+        missing_shopify_sku = self.get_random_shopify_sku_by_product_type(ProductType.BOW_TIE)
+        not_in_shiphero_shopify_sku = (
+            self.get_random_shopify_sku_by_product_type(ProductType.BOW_TIE)
+            + f"SHIPHERO_NOT_FOUND{random.randint(1000, 9999)}"
+        )
+
+        webhook_request = fixtures.webhook_shopify_paid_order(
+            customer_email=attendee_user.email,
+            line_items=[
+                fixtures.webhook_shopify_line_item(sku=known_shopify_sku),
+                fixtures.webhook_shopify_line_item(sku=missing_shopify_sku),
+                fixtures.webhook_shopify_line_item(sku=not_in_shiphero_shopify_sku),
+            ],
+            event_id=str(event_id),
+        )
+
+        # when
+        with patch.object(
+            self.app.shiphero_service, "get_product_by_sku", wraps=self.app.shiphero_service.get_product_by_sku
+        ) as get_shiphero_product_by_sku:
+            response = self._post(WEBHOOK_SHOPIFY_ENDPOINT, webhook_request, PAID_ORDER_REQUEST_HEADERS)
+
+        # then
+        self.assert200(response)
+        self.assertEqual(
+            {call.args[0] for call in get_shiphero_product_by_sku.call_args_list},
+            {
+                self.app.sku_builder.build(missing_shopify_sku, None, None),
+                self.app.sku_builder.build(not_in_shiphero_shopify_sku, None, None),
+            },
+        )
+        self.assertEqual(get_shiphero_product_by_sku.call_count, 2)
+        order = self.order_service.get_order_by_id(response.json["id"])
+        self.assertEqual(order.status, ORDER_STATUS_PENDING_MISSING_SKU)
+        product_ids_by_shopify_sku = {order_item.shopify_sku: order_item.product_id for order_item in order.order_items}
+        self.assertEqual(product_ids_by_shopify_sku[known_shopify_sku], known_product.id)
+        self.assertIsNotNone(product_ids_by_shopify_sku[missing_shopify_sku])
+        self.assertIsNone(product_ids_by_shopify_sku[not_in_shiphero_shopify_sku])
+        self.assertEqual(self.product_service.get_num_products(), 2)
+
     def test_order_process_unknown_product(self):
         # given
         user = self.user_service.create_user(fixtures.create_user_request())
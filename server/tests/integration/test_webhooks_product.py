@@ -0,0 +1,129 @@
+import json
+import random
+import uuid
+from unittest.mock import patch
+
+from sqlalchemy import select
+
+from server.database.database_manager import db
+from server.database.models import ShopifyProduct
+from server.handlers.webhook_queue_handler import lambda_handler, FakeLambdaContext
+from server.tests.integration import BaseTestCase, WEBHOOK_SHOPIFY_ENDPOINT
+
+PRODUCT_UPDATE_REQUEST_HEADERS = {
+    "X-Shopify-Topic": "products/update",
+}
+
+
+class TestWebhooksProduct(BaseTestCase):
+    @staticmethod
+    def __product_payload(product_id: int, title: str, updated_at: str) -> dict:
+        return {
+            "id": product_id,
+            "title": title,
+            "updated_at": updated_at,
+            "variants": [{"id": random.randint(1000000, 100000000), "sku": f"00{random.randint(10000, 1000000)}"}],
+        }
+
+    @staticmethod
+    def __stored_product(product_id: int) -> ShopifyProduct:
+        return db.session.execute(
+            select(ShopifyProduct)
+            .where(ShopifyProduct.product_id == product_id)
+            .execution_options(populate_existing=True)
+        ).scalar_one()
+
+    def test_product_update_is_stored(self):
+        # given
+        product_id = random.randint(1000000, 100000000)
+        payload = self.__product_payload(product_id, "Suit", "2026-10-19T10:00:00-04:00")
+
+        # when
+        response = self._post(WEBHOOK_SHOPIFY_ENDPOINT, payload, PRODUCT_UPDATE_REQUEST_HEADERS)
+
+        # then
+        self.assert200(response)
+        product = self.__stored_product(product_id)
+        self.assertEqual(product.data["title"], "Suit")
+        self.assertEqual(product.shopify_updated_at.isoformat(), "2026-10-19T14:00:00")
+
+    def test_older_product_update_does_not_overwrite_newer_one(self):
+        # given
+        product_id = random.randint(1000000, 100000000)
+        self.shopify_product_service.upsert_product(
+            product_id, self.__product_payload(product_id, "Newer", "2026-10-19T10:00:00-04:00")
+        )
+
+        # when
+        upserted_product = self.shopify_product_service.upsert_product(
+            product_id, self.__product_payload(product_id, "Older", "2026-10-19T09:59:59-04:00")
+        )
+
+        # then
+        self.assertIsNone(upserted_product)
+        self.assertEqual(self.__stored_product(product_id).data["title"], "Newer")
+
+    def test_product_update_with_unchanged_content_is_skipped(self):
+        # given
+        product_id = random.randint(1000000, 100000000)
+        payload = self.__product_payload(product_id, "Suit", "2026-10-19T10:00:00-04:00")
+        stored_product = self.shopify_product_service.upsert_product(product_id, payload)
+
+        # when
+        upserted_product = self.shopify_product_service.upsert_product(
+            product_id, {**payload, "updated_at": "2026-10-19T10:05:00-04:00"}
+        )
+
+        # then
+        self.assertIsNone(upserted_product)
+        self.assertEqual(self.__stored_product(product_id).updated_at, stored_product.updated_at)
+
+    def test_product_update_with_unchanged_content_restores_deleted_product(self):
+        # given
+        product_id = random.randint(1000000, 100000000)
+        payload = self.__product_payload(product_id, "Suit", "2026-10-19T10:00:00-04:00")
+        self.shopify_product_service.upsert_product(product_id, payload)
+        self.shopify_product_service.delete_product(product_id)
+
+        # when
+        upserted_product = self.shopify_product_service.upsert_product(product_id, payload)
+
+        # then
+        self.assertIsNotNone(upserted_product)
+        self.assertFalse(self.__stored_product(product_id).is_deleted)
+
+    def test_only_latest_product_update_of_queued_batch_is_processed(self):
+        # given
+        product_id = random.randint(1000000, 100000000)
+        other_product_id = random.randint(1000000, 100000000)
+        payloads = [
+            self.__product_payload(product_id, "First", "2026-10-19T10:00:00-04:00"),
+            self.__product_payload(product_id, "Latest", "2026-10-19T10:02:00-04:00"),
+            self.__product_payload(other_product_id, "Other", "2026-10-19T10:01:00-04:00"),
+            # delivered last but older than the latest
+            self.__product_payload(product_id, "Late", "2026-10-19T10:01:00-04:00"),
+        ]
+        records = [
+            {
+                "messageId": str(uuid.uuid4()),
+                "body": json.dumps(
+                    {
+                        "webhook_id": str(self.webhook_service.store_webhook("products/update", payload).id),
+                        "topic": "products/update",
+                    }
+                ),
+            }
+            for payload in payloads
+        ]
+
+        # when
+        with patch.object(
+            self.app.shopify_webhook_dispatcher, "dispatch", wraps=self.app.shopify_webhook_dispatcher.dispatch
+        ) as dispatch:
+            response = lambda_handler({"Records": records}, FakeLambdaContext())
+
+        # then
+        self.assertEqual(response["batchItemFailures"], [])
+        self.assertEqual([call.args[2]["title"] for call in dispatch.call_args_list], ["Latest", "Other"])
+        self.assertEqual(self.__stored_product(product_id).data["title"], "Latest")
+        self.assertEqual(self.__stored_product(other_product_id).data["title"], "Other")